@@ -7,8 +7,8 @@ las variables del sistema operativo.
 """
 
 from pydantic_settings import BaseSettings
-from typing import Optional, Literal
-from pydantic import ConfigDict
+from typing import Optional, Literal, List, Dict
+from pydantic import BaseModel, ConfigDict
 from pathlib import Path
 import os
 
@@ -64,10 +64,19 @@ class DatabaseSettings(BaseSettings):
         test_db_name = f"test_{self.name}"
         return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{test_db_name}"
 
+class AzureDeploymentTarget(BaseModel):
+    """Deployment de Azure OpenAI para el balanceo de carga"""
+    
+    endpoint: str
+    deployment: str
+    weight: float = 1.0
+    api_key: Optional[str] = None        # Por defecto: azure_openai_api_key
+    api_version: Optional[str] = None    # Por defecto: azure_api_version
+
 class LLMSettings(BaseSettings):
     """Configuración de LLM con soporte para Azure OpenAI"""
     
-    provider: Literal["openai", "azure"] = "azure"
+    provider: Literal["openai", "azure", "replay"] = "azure"
     
     # Configuración de OpenAI (original)
     openai_api_key: Optional[str] = None
@@ -78,12 +87,92 @@ class LLMSettings(BaseSettings):
     azure_deployment_name: Optional[str] = None
     azure_api_version: str = "2024-02-15-preview"
     
+    # Balanceo entre varios deployments (JSON en LLM_AZURE_TARGETS), p.ej.
+    # [{"endpoint": "https://eroski-we.openai.azure.com", "deployment": "gpt4", "weight": 2}]
+    # Si está vacío se usa el deployment único de arriba.
+    azure_targets: List[AzureDeploymentTarget] = []
+    balancer_eject_after_failures: int = 3
+    balancer_cooldown_seconds: int = 30
+    balancer_failover_timeout: Optional[float] = None  # Por defecto: timeout
+    
     # Configuración común
     model: str = "gpt-4"
     temperature: float = 0.7
     max_tokens: int = 2000
     timeout: int = 30
     
+    # max_tokens y tamaño de prompt por tipo de llamada (ver utils/llm/token_budget.py).
+    # max_tokens queda como valor por defecto para los tipos sin perfil.
+    token_budget_enabled: bool = True
+    context_window_tokens: int = 8192
+    # Ajustes por tipo en JSON, p.ej. {"phase2": {"max_completion_tokens": 800, "max_prompt_tokens": 6000}}
+    token_profiles: Dict[str, Dict[str, int]] = {}
+    
+    # Cache de respuestas
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: int = 3600
+    cache_sqlite_path: Optional[str] = None  # p.ej. "data/llm_cache.sqlite3"
+    
+    # Variantes pregeneradas para generate_natural_message
+    # (se construyen con scripts/build_message_pool.py)
+    message_pool_enabled: bool = True
+    message_pool_path: str = "scripts/message_pool.json"
+    
+    # Agrupar peticiones idénticas concurrentes en una sola llamada
+    singleflight_enabled: bool = True
+    
+    # Planificador de llamadas (concurrencia, prioridad y ritmo).
+    # Los límites son por deployment: se multiplican por len(azure_targets)
+    scheduler_enabled: bool = True
+    scheduler_max_concurrency: int = 8
+    scheduler_requests_per_minute: int = 300
+    scheduler_burst: int = 10
+    scheduler_max_retries: int = 3
+    
+    # Hedging: duplicar la llamada si supera el p90 reciente de su nodo
+    hedging_enabled: bool = False
+    hedging_percentile: float = 90.0
+    hedging_max_ratio: float = 0.1        # Máximo de llamadas duplicadas (ventana reciente)
+    hedging_min_samples: int = 20
+    hedging_min_delay_seconds: float = 0.5
+    
+    # Circuit breaker: tras N fallos seguidos, fallback inmediato durante el cool-down
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_cooldown_seconds: float = 30.0
+    circuit_breaker_call_timeout: Optional[float] = None  # Por defecto: timeout del cliente
+    
+    # Grabación/reproducción de llamadas (benchmarks sin Azure, ver utils/llm/replay.py)
+    record_cassette_path: Optional[str] = None       # Grabar cada llamada, p.ej. "data/llm_cassette.jsonl"
+    replay_cassette_path: str = "data/llm_cassette.jsonl"  # Con provider "replay"
+    replay_latency_mode: Literal["none", "recorded", "empirical", "fixed"] = "recorded"
+    replay_latency_scale: float = 1.0
+    replay_latency_seconds: float = 0.0              # Con replay_latency_mode "fixed"
+    replay_miss_response: Optional[str] = None       # Sin valor: error si el prompt no está grabado
+    replay_seed: Optional[int] = None
+    
+    # Pedir JSON mode a Azure en las decisiones estructuradas (utils/llm/structured.py).
+    # Requiere gpt-35-turbo 1106+, gpt-4 1106-preview/turbo o gpt-4o y api-version
+    # 2023-12-01-preview o posterior; con otros deployments (p.ej. gpt-4 0613 en
+    # 2024-02-15-preview) Azure responde 400 y se repite sin JSON mode, recordándolo
+    # por deployment. Desactivar si ningún deployment lo admite.
+    structured_output_json_mode: bool = True
+    
+    # Pool HTTP compartido por todos los clientes de Azure (keep-alive; HTTP/2 si hay `h2`)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 60.0
+    http2_enabled: bool = True
+    warmup_enabled: bool = True          # Precalentar conexiones y grafo al arrancar
+    
+    # Telemetría por llamada (tokens, latencia, reintentos por nodo y sesión)
+    telemetry_enabled: bool = True
+    telemetry_max_records: int = 10000
+    telemetry_trace_path: Optional[str] = None  # p.ej. "logs/llm_calls.jsonl"
+    telemetry_prompt_cost_per_1k: float = 0.0
+    telemetry_completion_cost_per_1k: float = 0.0
+    
     model_config = ConfigDict(extra="ignore", env_prefix="LLM_")
 
     def get_active_api_key(self) -> str:
@@ -92,6 +181,8 @@ class LLMSettings(BaseSettings):
             if not self.azure_openai_api_key:
                 raise ValueError("AZURE_OPENAI_API_KEY requerida para provider 'azure'")
             return self.azure_openai_api_key
+        elif self.provider == "replay":
+            return ""
         else:
             if not self.openai_api_key:
                 raise ValueError("OPENAI_API_KEY requerida para provider 'openai'")
@@ -101,6 +192,12 @@ class LLMSettings(BaseSettings):
         """Validar configuración específica de Azure"""
         if self.provider != "azure":
             return True
+        
+        if self.azure_targets:
+            missing_keys = [t.endpoint for t in self.azure_targets if not (t.api_key or self.azure_openai_api_key)]
+            if missing_keys:
+                raise ValueError(f"API key requerida para los deployments: {missing_keys}")
+            return True
             
         required_fields = [
             ("azure_openai_api_key", self.azure_openai_api_key),
@@ -143,6 +240,44 @@ class WorkflowSettings(BaseSettings):
     enable_llm_message_generation: bool = True
     enable_similarity_matching: bool = True
     
+    # Preclasificador local (BM25): por encima del umbral se salta la FASE 1 LLM
+    preclassifier_enabled: bool = True
+    preclassifier_threshold: float = 0.85
+    
+    # FASE 2 especulativa: lanzar la FASE 2 de los top-k tipos en paralelo con la FASE 1
+    speculative_phase2_enabled: bool = False
+    speculative_phase2_top_k: int = 2
+    speculative_phase2_min_probability: float = 0.15
+    
+    # Historial en prompts: últimos N mensajes literales + resumen de los anteriores
+    history_compaction_enabled: bool = True
+    history_window_messages: int = 10
+    history_summary_batch: int = 6
+    
+    # Prefetch especulativo del empleado (y sus incidencias recientes) al ver un email
+    employee_prefetch_enabled: bool = True
+    employee_prefetch_ttl_seconds: float = 120.0
+    employee_prefetch_recent_incidents: int = 5
+    
+    # Presupuesto de visitas por turno y por sesión: al agotarse se escala sin más
+    # llamadas al LLM (<= 0: sin límite; por turno debe quedar por debajo del
+    # recursion_limit de 20; la sesión no cuenta las visitas de paso como
+    # authenticate con el usuario ya autenticado)
+    visit_budget_enabled: bool = True
+    visit_budget_per_node: int = 5
+    visit_budget_per_turn: int = 15
+    visit_budget_per_session: int = 40
+    visit_budget_node_overrides: Dict[str, int] = {}
+    
+    # Checkpointer de sesiones: memory (SQLite en memoria), sqlite (fichero, un nodo)
+    # o postgres (settings.database, varios nodos)
+    checkpointer_backend: Literal["memory", "sqlite", "postgres"] = "memory"
+    checkpointer_sqlite_path: str = "data/checkpoints.sqlite"
+    checkpointer_max_per_thread: int = 20
+    checkpointer_idle_ttl_seconds: int = 86400      # hilos inactivos: 24 horas
+    checkpointer_finished_ttl_seconds: int = 3600   # conversaciones terminadas: 1 hora
+    checkpointer_prune_interval_seconds: int = 300
+    
     # Timeouts para diferentes operaciones
     user_response_timeout: int = 300  # 5 minutos
     database_query_timeout: int = 10  # 10 segundos
@@ -164,6 +299,12 @@ class LoggingSettings(BaseSettings):
     database_log_level: str = "WARNING" 
     llm_log_level: str = "INFO"
     
+    # Trazas por turno (turno → nodo → LLM → BD) en JSON compatible con OTLP
+    tracing_enabled: bool = False
+    tracing_exporter: Literal["file", "stdout"] = "file"
+    tracing_path: str = "logs/traces.jsonl"
+    tracing_service_name: str = "eroski-chatbot"
+    
     model_config = ConfigDict(extra="ignore", env_prefix="LOG_")
 
     @property
@@ -102,11 +102,13 @@ class ManualVectorizer:
                 logger.info("   - LLM_AZURE_EMBEDDING_DEPLOYMENT")
                 return False
             
-            # Crear cliente Azure OpenAI
+            # Crear cliente Azure OpenAI sobre el pool HTTP compartido
+            from utils.llm.http_client import get_http_client
             self.openai_client = AzureOpenAI(
                 api_key=api_key,
                 azure_endpoint=endpoint,
-                api_version=api_version
+                api_version=api_version,
+                http_client=get_http_client()
             )
             
             # Guardar nombre del deployment para embeddings
@@ -15,11 +15,11 @@ import logging
 from typing import Dict, Any, Optional
 from langgraph.graph.state import CompiledStateGraph
 
-from models.state import EroskiState
+from models.eroski_state import EroskiState
 from config.settings import get_settings
 from datetime import datetime
-from workflows import get_workflow_manager, WorkflowType 
-from langgraph.checkpoint.memory import MemorySaver
+from workflows.workflow_manager import get_workflow_manager, WorkflowType
+from workflows.graph_registry import get_graph_registry
 logger = logging.getLogger("Graph")
 
 # =====================================================
@@ -69,17 +69,8 @@ def build_graph_with_checkpointer(workflow_type: str = WorkflowType.INCIDENCIA)
     try:
         logger.info(f"🔨 Construyendo grafo con checkpointer (tipo: {workflow_type})")
         
-        # Obtener manager de workflows
-        workflow_manager = get_workflow_manager()
-        
-        # Obtener workflow específico
-        workflow = workflow_manager.get_workflow(workflow_type)
-        
-        # ✅ CREAR CHECKPOINTER PARA PERSISTENCIA
-        memory = MemorySaver()
-        
-        # ✅ COMPILAR CON CHECKPOINTER E INTERRUPCIONES
-        compiled_graph = workflow.compile_with_checkpointer(memory)
+        # ✅ Grafo compartido del registro (se compila una vez por proceso)
+        compiled_graph = get_graph_registry().get(workflow_type, checkpointer=True)
         
         logger.info(f"✅ Grafo con checkpointer construido exitosamente")
         
@@ -106,14 +97,10 @@ def build_graph(workflow_type: str = WorkflowType.INCIDENCIA) -> CompiledStateGr
     try:
         logger.info(f"🔨 Construyendo grafo principal (tipo: {workflow_type})")
         
-        # Obtener manager de workflows
-        workflow_manager = get_workflow_manager()
-        
-        # Obtener workflow específico
-        workflow = workflow_manager.get_workflow(workflow_type)
-        
-        # Compilar workflow
-        compiled_graph = workflow.compile()
+        # Grafo compartido del registro (se compila una vez por proceso)
+        registry = get_graph_registry()
+        compiled_graph = registry.get(workflow_type, checkpointer=False)
+        workflow = registry.workflow(workflow_type)
         
         logger.info(f"✅ Grafo principal construido exitosamente")
         logger.debug(f"📋 Descripción: {workflow.get_workflow_description()}")
@@ -143,7 +130,6 @@ class GraphBuilder:
     def __init__(self):
         self.settings = get_settings()
         self.logger = logging.getLogger("GraphBuilder")
-        self._cached_graphs: Dict[str, CompiledStateGraph] = {}
         self._workflow_manager = get_workflow_manager()
     
     def build_with_config(
@@ -164,29 +150,20 @@ class GraphBuilder:
             Grafo compilado
         """
         try:
-            cache_key = f"{workflow_type}_{hash(str(custom_config))}"
-            
-            # Verificar caché
-            if enable_cache and cache_key in self._cached_graphs:
-                self.logger.debug(f"📦 Usando grafo desde caché: {cache_key}")
-                return self._cached_graphs[cache_key]
-            
-            self.logger.info(f"🔨 Construyendo grafo con config: {workflow_type}")
-            
             # Aplicar configuración personalizada si existe
             if custom_config:
                 self._apply_custom_config(custom_config)
             
-            # Construir workflow
-            workflow = self._workflow_manager.get_workflow(workflow_type)
-            compiled_graph = workflow.compile()
-            
-            # Guardar en caché si está habilitado
-            if enable_cache:
-                self._cached_graphs[cache_key] = compiled_graph
-                self.logger.debug(f"💾 Grafo guardado en caché: {cache_key}")
+            registry = get_graph_registry()
+            if not enable_cache:
+                # Sin caché: compilación propia, fuera del registro compartido
+                self.logger.info(f"🔨 Construyendo grafo sin caché: {workflow_type}")
+                return registry.workflow(workflow_type).build_graph().compile()
             
-            self.logger.info(f"✅ Grafo construido con configuración personalizada")
+            # La configuración personalizada aún no altera el grafo: todos
+            # comparten el grafo compilado del registro
+            compiled_graph = registry.get(workflow_type, checkpointer=False)
+            self.logger.debug(f"📦 Grafo {workflow_type} desde el registro")
             return compiled_graph
             
         except Exception as e:
@@ -199,8 +176,8 @@ class GraphBuilder:
         self.logger.debug(f"⚙️ Aplicando configuración: {list(config.keys())}")
     
     def clear_cache(self):
-        """Limpiar caché de grafos"""
-        self._cached_graphs.clear()
+        """Limpiar caché de grafos (el registro compartido)"""
+        get_graph_registry().clear()
         self.logger.info("🧹 Caché de grafos limpiado")
     
     def get_graph_info(self, workflow_type: str) -> Dict[str, Any]:
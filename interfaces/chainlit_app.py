@@ -25,7 +25,7 @@ from langchain_core.messages import AIMessage
 
 try:
     # Intentar importar la interfaz optimizada
-    from interfaces.eroski_chat_interface import get_global_chat_interface
+    from interfaces.eroski_chat_interface import get_global_chat_interface, warm_up_chat_interface
     INTERFACE_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"EroskiChatInterface no disponible: {e}")
@@ -106,6 +106,26 @@ else:
 
 logger.info(f"🔧 Modo: {'Avanzado' if ADVANCED_MODE else 'Fallback'}")
 
+# ========== PRECALENTAMIENTO ==========
+
+_warm_up_task: Optional[asyncio.Task] = None
+
+async def warm_up_once():
+    """Precalentar este proceso (grafo + conexiones con Azure) una sola vez"""
+    global _warm_up_task
+    if not ADVANCED_MODE:
+        return
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.ensure_future(warm_up_chat_interface())
+    try:
+        await _warm_up_task
+    except Exception as e:
+        logger.warning(f"⚠️ Precalentamiento fallido: {e}")
+
+if hasattr(cl, "on_app_startup"):
+    # Chainlit >= 2.x: antes de aceptar la primera sesión
+    cl.on_app_startup(warm_up_once)
+
 # ========== EVENTOS DE CHAINLIT ==========
 
 @cl.on_chat_start
@@ -119,6 +139,9 @@ async def start():
         cl.user_session.set("session_id", session_id)
         cl.user_session.set("start_time", datetime.now())
         
+        # Sin on_app_startup, se precalienta con la primera sesión
+        await warm_up_once()
+        
         logger.info(f"🆕 Nueva sesión iniciada: {session_id}")
         
         # Mensaje de bienvenida
@@ -203,12 +226,23 @@ async def main(message: cl.Message):
 
         try:
             if ADVANCED_MODE:
-                # Ejecutar el grafo con EroskiChatInterface
-                result = await message_processor.process_message(
+                # Ejecutar el grafo en streaming: los tokens se muestran según llegan
+                response_msg = cl.Message(content="", author="Asistente Eroski")
+                streamed = False
+                result: Dict[str, Any] = {}
+
+                async for event in message_processor.process_message_stream(
                     user_message=user_message,
                     session_id=session_id,
                     user_context={"platform": "chainlit", "timestamp": datetime.now()}
-                )
+                ):
+                    if event["type"] == "token":
+                        if not streamed:
+                            await processing_msg.remove()
+                            streamed = True
+                        await response_msg.stream_token(event["content"])
+                    elif event["type"] == "final":
+                        result = event["data"]
 
                 # Guardar el resultado en la sesión
                 cl.user_session.set("state", result)
@@ -216,12 +250,24 @@ async def main(message: cl.Message):
                 # Obtener respuesta
                 response = result.get("response", "Sin respuesta del asistente.")
                 author = result.get("status", "") == "error" and "Sistema ⚠️" or "Asistente Eroski"
+
+                if not streamed:
+                    await processing_msg.remove()
+
+                # El texto definitivo es el del estado final del grafo
+                response_msg.author = author
+                response_msg.content = response
+                if streamed:
+                    await response_msg.update()
+                else:
+                    await response_msg.send()
             else:
                 response = await message_processor.process_message(user_message, session_id)
                 author = "Asistente Eroski"
 
-            await processing_msg.remove()
-            await cl.Message(content=response, author=author).send()
+                await processing_msg.remove()
+                await cl.Message(content=response, author=author).send()
+
             logger.info("✅ Mensaje procesado exitosamente")
 
         except Exception as proc_error:
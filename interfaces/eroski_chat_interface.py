@@ -18,7 +18,7 @@ PRINCIPIOS:
 - Manejo robusto de errores
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 #from langgraph.graph import StateSnapshot
 from datetime import datetime
@@ -27,8 +27,14 @@ import uuid
 import traceback
 import json
 
-from workflows.eroski_main_workflow import EroskiFinalWorkflow
+from workflows.graph_registry import get_graph_registry
+from workflows.workflow_manager import WorkflowType
 from models.eroski_state import EroskiState, create_initial_eroski_state
+from utils.llm.streaming import UserFacingStreamFilter
+from utils.llm.scheduler import priority_from_state, set_llm_priority
+from utils.employee_prefetch import find_email, get_employee_prefetcher
+from utils.tracing import get_tracer
+from utils.visit_budget import reset_node_visits
 
 class EroskiChatInterface:
     """
@@ -40,8 +46,10 @@ class EroskiChatInterface:
     
     def __init__(self):
         self.logger = logging.getLogger("EroskiChatInterface")
-        self.workflow = EroskiFinalWorkflow()
-        self.graph = self.workflow.compile_with_checkpointer()
+        # Grafo compilado una vez por proceso y compartido entre sesiones
+        registry = get_graph_registry()
+        self.workflow = registry.workflow(WorkflowType.INCIDENCIA)
+        self.graph = registry.get(WorkflowType.INCIDENCIA)
         self.active_sessions: Dict[str, Dict] = {}  # Cache de sesiones activas
         
         self.logger.info("🤖 EroskiChatInterface inicializada correctamente")
@@ -71,41 +79,21 @@ class EroskiChatInterface:
             self.logger.info(f"📨 Procesando mensaje para sesión {session_id}")
             self.logger.debug(f"📝 Mensaje: {user_message[:100]}...")
             
-            # Configuración para persistencia del grafo
-            config = {
-                "configurable": {"thread_id": session_id},
-                "recursion_limit": 20
-            }
-            # Recuperar estado anterior desde el checkpointer
-            previous_state = await self.graph.aget_state({"configurable": {"thread_id": session_id}})
-            print(previous_state.values)
-            previous_state_data = previous_state.values if previous_state else {}
-            previous_messages = previous_state_data.get("messages", [])
-
-            # Agregar el nuevo mensaje del usuario
-            all_messages = previous_messages + [HumanMessage(content=user_message)]
-
-            # Preparar input para el grafo
-            input_data = {
-                 **previous_state_data,
-                "messages": all_messages,
-                "session_id": session_id,
-                "last_activity": datetime.now()
-            }
-            
-            # Agregar contexto del usuario si se proporciona
-            if user_context:
-                input_data.update(user_context)
-            
-            # Ejecutar grafo
-            self.logger.debug("🔄 Ejecutando workflow...")
-            result = await self.graph.ainvoke(input_data, config)
-            #self.logger.info(f"🌄JGL Estado recibido: {json.dumps(result, indent=2, default=str)}")
-            # Procesar resultado
-            response_data = self._process_workflow_result(result, session_id)
-            
-            # Actualizar cache de sesión
-            self._update_session_cache(session_id, result)
+            # Span raíz del turno: los nodos, routers, LLM y BD cuelgan de él
+            with get_tracer().span("graph.turn", **{"session.id": session_id}) as span:
+                input_data, config = await self._prepare_turn_input(user_message, session_id, user_context)
+                
+                # Ejecutar grafo
+                self.logger.debug("🔄 Ejecutando workflow...")
+                result = await self.graph.ainvoke(input_data, config)
+                #self.logger.info(f"🌄JGL Estado recibido: {json.dumps(result, indent=2, default=str)}")
+                # Procesar resultado
+                response_data = self._process_workflow_result(result, session_id)
+                
+                # Actualizar cache de sesión
+                self._update_session_cache(session_id, result)
+                if span is not None:
+                    span.set_attribute("turn.current_node", result.get("current_node"))
             
             self.logger.info(f"✅ Mensaje procesado exitosamente para {session_id}")
             return response_data
@@ -116,6 +104,125 @@ class EroskiChatInterface:
             
             return self._create_error_response(str(e), session_id)
     
+    async def process_message_stream(
+        self,
+        user_message: str,
+        session_id: Optional[str] = None,
+        user_context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Procesar mensaje del usuario emitiendo los tokens del LLM según llegan.
+        
+        Usa graph.astream_events: los chat models invocados dentro de los nodos
+        pasan automáticamente a modo streaming y sus chunks se filtran con
+        UserFacingStreamFilter para mostrar solo texto dirigido al usuario.
+        
+        Args:
+            user_message: Mensaje del usuario
+            session_id: ID de la sesión (se genera si no se proporciona)
+            user_context: Contexto adicional del usuario
+            
+        Yields:
+            {"type": "token", "content": str} por cada fragmento de texto y,
+            al final, {"type": "final", "data": <misma respuesta que process_message>}
+        """
+        try:
+            if not session_id:
+                session_id = f"eroski_{uuid.uuid4().hex[:8]}"
+            
+            self.logger.info(f"📨 Procesando mensaje (streaming) para sesión {session_id}")
+            
+            with get_tracer().span("graph.turn", **{"session.id": session_id, "turn.streaming": True}):
+                input_data, config = await self._prepare_turn_input(user_message, session_id, user_context)
+                stream_filter = UserFacingStreamFilter()
+                
+                async for event in self.graph.astream_events(input_data, config, version="v2"):
+                    if event.get("event") != "on_chat_model_stream":
+                        continue
+                    
+                    chunk = event.get("data", {}).get("chunk")
+                    content = getattr(chunk, "content", "")
+                    if not isinstance(content, str) or not content:
+                        continue
+                    
+                    delta = stream_filter.feed(event.get("run_id", ""), content, event.get("tags"))
+                    if delta:
+                        yield {"type": "token", "content": delta}
+                
+                # Estado final persistido por el checkpointer
+                snapshot = await self.graph.aget_state({"configurable": {"thread_id": session_id}})
+                result = snapshot.values if snapshot else {}
+                
+                response_data = self._process_workflow_result(result, session_id)
+                self._update_session_cache(session_id, result)
+            
+            self.logger.info(f"✅ Mensaje procesado (streaming) para {session_id}")
+            yield {"type": "final", "data": response_data}
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error procesando mensaje en streaming: {e}")
+            self.logger.error(f"📍 Traceback: {traceback.format_exc()}")
+            
+            yield {"type": "final", "data": self._create_error_response(str(e), session_id)}
+    
+    async def _prepare_turn_input(
+        self,
+        user_message: str,
+        session_id: str,
+        user_context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Preparar el input incremental de un turno.
+        
+        Solo se envían el mensaje nuevo y los campos que cambian en cada turno;
+        el resto del estado lo aporta el checkpointer. Reenviar el estado
+        completo obligaba a add_messages a recorrer todo el historial en cada
+        turno (coste O(historial)). El presupuesto de visitas por turno se
+        reinicia aquí (node_visits); el de sesión (session_visits) no.
+        
+        Returns:
+            Tupla (input_data, config)
+        """
+        # Configuración para persistencia del grafo
+        config = {
+            "configurable": {"thread_id": session_id},
+            "recursion_limit": 20
+        }
+        
+        # Búsqueda del empleado en cuanto aparece un email, antes de que el
+        # grafo llegue a authenticate (no hace falta si ya está autenticado)
+        email = find_email(user_message)
+        if email and not self.active_sessions.get(session_id, {}).get("authenticated"):
+            get_employee_prefetcher().start(session_id, email)
+        
+        # Prioridad de las llamadas al LLM de este turno según la sesión
+        set_llm_priority(await self._get_session_priority(session_id))
+        
+        input_data = {
+            "messages": [HumanMessage(content=user_message)],
+            "session_id": session_id,
+            "node_visits": reset_node_visits(),
+            "last_activity": datetime.now()
+        }
+        
+        # Agregar contexto del usuario si se proporciona
+        if user_context:
+            input_data.update(user_context)
+        
+        return input_data, config
+    
+    async def _get_session_priority(self, session_id: str) -> int:
+        """
+        Prioridad LLM de la sesión: la del cache si el turno anterior pasó por
+        este proceso; si no, se calcula desde el estado del checkpointer.
+        """
+        cached = self.active_sessions.get(session_id, {}).get("llm_priority")
+        if cached is not None:
+            return cached
+        
+        previous_state = await self.graph.aget_state({"configurable": {"thread_id": session_id}})
+        return priority_from_state(previous_state.values if previous_state else {})
+    
     def _process_workflow_result(self, result: EroskiState, session_id: str) -> Dict[str, Any]:
         """
         Procesar resultado del workflow y extraer información relevante.
@@ -263,7 +370,9 @@ class EroskiChatInterface:
                 "employee_id": state.get("employee_id"),
                 "store_id": state.get("store_id"),
                 "total_messages": len(state.get("messages", [])),
-                "current_node": state.get("current_node")
+                "current_node": state.get("current_node"),
+                "authenticated": bool(state.get("authenticated")),
+                "llm_priority": priority_from_state(state)
             }
             
             # Limpiar sesiones antiguas (más de 24 horas)
@@ -376,10 +485,14 @@ Por favor:
             # Limpiar del cache
             if session_id in self.active_sessions:
                 del self.active_sessions[session_id]
+            get_employee_prefetcher().discard(session_id)
             
             # Crear nuevo estado inicial para la sesión
             config = {"configurable": {"thread_id": session_id}}
             initial_state = create_initial_eroski_state(session_id)
+            # El reducer acumula: {} no vaciaría los contadores
+            initial_state["node_visits"] = reset_node_visits()
+            initial_state["session_visits"] = reset_node_visits()
             
             # Guardar estado inicial en el checkpointer
             await self.graph.aupdate_state(config, initial_state)
@@ -420,6 +533,14 @@ Por favor:
             "workflow_name": self.workflow.name
         }
 
+    async def get_checkpointer_stats(self) -> Dict[str, Any]:
+        """Hilos, checkpoints y bytes guardados en el checkpointer (y podar caducados)"""
+        checkpointer = self.graph.checkpointer
+        if not hasattr(checkpointer, "aget_stats"):
+            return {"backend": type(checkpointer).__name__}
+        await checkpointer.aprune()
+        return await checkpointer.aget_stats()
+
 # ========== FUNCIONES DE CONVENIENCIA ==========
 
 def create_eroski_chat_interface() -> EroskiChatInterface:
@@ -465,4 +586,34 @@ async def process_user_message(
         Respuesta procesada
     """
     interface = get_global_chat_interface()
-    return await interface.process_message(message, session_id, context)
\ No newline at end of file
+    return await interface.process_message(message, session_id, context)
+
+async def warm_up_chat_interface() -> Dict[str, Any]:
+    """
+    Precalentar la aplicación antes de aceptar sesiones.
+    
+    - Compila el grafo (instancia global de la interfaz)
+    - Construye la pila del LLM (clientes de Azure sobre el pool compartido)
+    - Abre las conexiones con los endpoints de Azure
+    
+    Returns:
+        Resumen del precalentamiento
+    """
+    from config.settings import get_settings
+    from utils.llm import get_llm
+    from utils.llm.http_client import warm_up_connections
+    
+    logger = logging.getLogger("EroskiChatInterface")
+    settings = get_settings()
+    if not settings.llm.warmup_enabled:
+        return {"enabled": False}
+    
+    start = datetime.now()
+    get_graph_registry().warm()
+    get_global_chat_interface()
+    get_llm()
+    connections = await warm_up_connections(settings) if settings.llm.provider != "replay" else {}
+    elapsed = (datetime.now() - start).total_seconds()
+    
+    logger.info(f"🔥 Aplicación precalentada en {elapsed:.2f}s")
+    return {"enabled": True, "connections": connections, "elapsed_seconds": elapsed}
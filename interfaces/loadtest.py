@@ -0,0 +1,513 @@
+# =====================================================
+# interfaces/loadtest.py - Prueba de carga extremo a extremo de EroskiChatInterface
+# =====================================================
+"""
+Generador de carga con sesiones concurrentes contra
+EroskiChatInterface.process_message (el mismo camino que Chainlit).
+
+Cada empleado virtual (--users) recorre --sessions-per-user diálogos
+guionizados de varios turnos (saludo → autenticación → clasificación →
+solución → confirmación), elegidos por peso desde --dialogues, con un tiempo
+de reflexión entre turnos (--think-ms / --think-dist). Los empleados arrancan
+escalonados a lo largo de --ramp-up-s.
+
+LLM (--llm):
+- fake: ScriptedChatModel responde lo que marca el guion del diálogo para
+  cada nodo (llm_call_context) con latencia simulada (--llm-ms / --llm-dist).
+  Sustituye al cliente de get_llm() sin sus capas (caché, planificador...)
+- replay: LLM_PROVIDER=replay, cassette grabado (--cassette); pasa por todas
+  las capas de get_llm() configuradas
+- configured: el LLM que indique la configuración (p. ej. para grabar el
+  cassette con LLM_RECORD_CASSETTE_PATH)
+
+El informe (JSON con --output / --json) incluye throughput, p50/p95/p99 por
+turno (total y por etiqueta del turno), tasa de errores, desenlace de las
+sesiones y crecimiento de memoria (RSS y, con --tracemalloc, Python). Con
+--baseline se añaden las diferencias frente a un informe anterior para
+comparar builds; --max-error-rate termina con código 1 si se supera.
+
+Uso:
+    python main.py loadtest [--users 20] [--sessions-per-user 3] [--ramp-up-s 5]
+                            [--think-ms 1500] [--think-dist lognormal]
+                            [--llm fake|replay|configured] [--llm-ms 800]
+                            [--output report.json] [--baseline old.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from utils.llm.telemetry import get_llm_call_context, percentile
+
+DEFAULT_DIALOGUES = ROOT_DIR / "config" / "loadtest_dialogues.json"
+DISTRIBUTIONS = ["none", "fixed", "exponential", "lognormal"]
+LOGNORMAL_SIGMA = 0.5
+
+logger = logging.getLogger("LoadTest")
+
+
+def sample_delay(rng: random.Random, distribution: str, mean_seconds: float) -> float:
+    """Muestra de una espera (s) con la media indicada"""
+    if distribution == "none" or mean_seconds <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return mean_seconds
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean_seconds)
+    # lognormal con la misma media: mu = ln(media) - sigma²/2
+    return rng.lognormvariate(math.log(mean_seconds) - LOGNORMAL_SIGMA ** 2 / 2, LOGNORMAL_SIGMA)
+
+
+def fill_template(value: Any, employee: Dict[str, str]) -> Any:
+    """Sustituir $name, $email, $store, $section en textos y respuestas del guion"""
+    if isinstance(value, str):
+        return string.Template(value).safe_substitute(employee)
+    if isinstance(value, list):
+        return [fill_template(item, employee) for item in value]
+    if isinstance(value, dict):
+        return {key: fill_template(item, employee) for key, item in value.items()}
+    return value
+
+
+# =====================================================
+# LLM falso guionizado
+# =====================================================
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model que responde según el guion del diálogo de cada sesión.
+
+    Las respuestas se eligen por (sesión, nodo) usando llm_call_context: la
+    n-ésima llamada de un nodo recibe la n-ésima respuesta del guion (la
+    última se repite). Sin guion se responde default_response.
+    """
+
+    default_response: str = "Entendido."
+    latency_distribution: str = "lognormal"
+    latency_seconds: float = 0.8
+    seed: Optional[int] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _scripts: Dict[str, Dict[str, List[str]]] = PrivateAttr(default_factory=dict)
+    _calls: Dict[str, int] = PrivateAttr(default_factory=lambda: defaultdict(int))
+    _stats: Counter = PrivateAttr(default_factory=Counter)
+    _random: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any):
+        super().model_post_init(__context)
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def register_session(self, session_id: str, script: Dict[str, List[Any]]):
+        """Guion {nodo: [respuestas]} de una sesión (las respuestas no texto se serializan a JSON)"""
+        self._scripts[session_id] = {
+            node: [item if isinstance(item, str) else json.dumps(item, ensure_ascii=False) for item in responses]
+            for node, responses in script.items()
+        }
+
+    def _respond(self) -> str:
+        context = get_llm_call_context()
+        node = context.get("node") or "unknown"
+        responses = self._scripts.get(context.get("session_id") or "", {}).get(node)
+        self._stats[node] += 1
+        if not responses:
+            self._stats["unscripted"] += 1
+            return self.default_response
+
+        key = f"{context.get('session_id')}|{node}"
+        index = self._calls[key]
+        self._calls[key] += 1
+        return responses[min(index, len(responses) - 1)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content = self._respond()
+        time.sleep(sample_delay(self._random, self.latency_distribution, self.latency_seconds))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content = self._respond()
+        await asyncio.sleep(sample_delay(self._random, self.latency_distribution, self.latency_seconds))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"calls_by_node": dict(self._stats), "calls": sum(
+            count for node, count in self._stats.items() if node != "unscripted"
+        )}
+
+
+# =====================================================
+# Memoria
+# =====================================================
+
+def current_rss_bytes() -> int:
+    """RSS actual del proceso (bytes); máximo RSS si /proc no está disponible"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class MemorySampler:
+    """Muestreo periódico del RSS durante la prueba"""
+
+    def __init__(self, interval_seconds: float = 0.5):
+        self.interval_seconds = interval_seconds
+        self.samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            self.samples.append(current_rss_bytes())
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        self.samples.append(current_rss_bytes())
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        gc.collect()
+        self.samples.append(current_rss_bytes())
+
+
+# =====================================================
+# Empleados virtuales
+# =====================================================
+
+class LoadTest:
+    """Empleados virtuales recorriendo diálogos guionizados contra la interfaz"""
+
+    def __init__(self, interface: Any, config: Dict[str, Any], args, llm: Optional[ScriptedChatModel] = None):
+        self.interface = interface
+        self.dialogues = config["dialogues"]
+        self.employees = config["employees"]
+        self.args = args
+        self.llm = llm
+        self.rng = random.Random(args.seed)
+        self.turns: List[Dict[str, Any]] = []
+        self.sessions: List[Dict[str, Any]] = []
+
+    def _pick_dialogue(self) -> Dict[str, Any]:
+        weights = [dialogue.get("weight", 1) for dialogue in self.dialogues]
+        return self.rng.choices(self.dialogues, weights=weights)[0]
+
+    async def run_session(self, user: int, iteration: int):
+        dialogue = self._pick_dialogue()
+        employee = self.employees[user % len(self.employees)]
+        session_id = f"loadtest-{user}-{iteration}-{uuid.uuid4().hex[:6]}"
+        if self.llm is not None:
+            self.llm.register_session(session_id, fill_template(dialogue.get("llm", {}), employee))
+
+        last_response: Dict[str, Any] = {}
+        session_errors = 0
+        for index, turn in enumerate(dialogue["turns"]):
+            if index:
+                await asyncio.sleep(sample_delay(self.rng, self.args.think_dist, self.args.think_ms / 1000))
+
+            error = None
+            start = time.perf_counter()
+            try:
+                last_response = await self.interface.process_message(fill_template(turn["message"], employee), session_id)
+                if not last_response.get("success"):
+                    error = last_response.get("error") or "success=False"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                last_response = {}
+            latency = time.perf_counter() - start
+
+            session_errors += error is not None
+            self.turns.append({
+                "dialogue": dialogue["name"],
+                "label": turn.get("label", f"turn_{index + 1}"),
+                "latency": latency,
+                "error": error,
+                "current_node": last_response.get("current_node"),
+            })
+
+        if session_errors:
+            outcome = "error"
+        elif last_response.get("escalated"):
+            outcome = "escalated"
+        elif last_response.get("resolved"):
+            outcome = "resolved"
+        else:
+            outcome = last_response.get("status") or "unknown"
+        self.sessions.append({"dialogue": dialogue["name"], "outcome": outcome, "errors": session_errors})
+
+    async def run_user(self, user: int):
+        await asyncio.sleep(self.args.ramp_up_s * user / max(1, self.args.users))
+        for iteration in range(self.args.sessions_per_user):
+            await self.run_session(user, iteration)
+
+    async def run(self) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(self.run_user(user) for user in range(self.args.users)))
+        return time.perf_counter() - start
+
+
+# =====================================================
+# Informe
+# =====================================================
+
+def latency_summary(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(turn["latency"] * 1000 for turn in turns)
+    errors = sum(1 for turn in turns if turn["error"])
+    return {
+        "count": len(turns),
+        "errors": errors,
+        "error_rate": round(errors / len(turns), 4) if turns else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def build_report(test: LoadTest, duration: float, memory: MemorySampler, args, llm_stats: Dict[str, Any],
+                 traced_memory: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    by_label: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for turn in test.turns:
+        by_label[turn["label"]].append(turn)
+
+    errors = Counter(turn["error"] for turn in test.turns if turn["error"])
+    mb = 1024 * 1024
+    rss_growth = memory.samples[-1] - memory.samples[0]
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "llm": args.llm,
+            "users": args.users,
+            "sessions_per_user": args.sessions_per_user,
+            "ramp_up_s": args.ramp_up_s,
+            "think": {"distribution": args.think_dist, "mean_ms": args.think_ms},
+            "llm_latency": {"distribution": args.llm_dist, "mean_ms": args.llm_ms} if args.llm == "fake" else None,
+            "dialogues": str(args.dialogues),
+            "seed": args.seed,
+        },
+        "totals": {
+            "sessions": len(test.sessions),
+            "turns": len(test.turns),
+            "duration_s": round(duration, 2),
+            "throughput_turns_per_s": round(len(test.turns) / duration, 2) if duration else 0.0,
+            "throughput_sessions_per_s": round(len(test.sessions) / duration, 3) if duration else 0.0,
+            "error_rate": latency_summary(test.turns)["error_rate"],
+        },
+        "latency": {
+            "all": latency_summary(test.turns),
+            "by_label": {label: latency_summary(turns) for label, turns in by_label.items()},
+        },
+        "outcomes": dict(Counter(session["outcome"] for session in test.sessions)),
+        "memory": {
+            "rss_start_mb": round(memory.samples[0] / mb, 1),
+            "rss_end_mb": round(memory.samples[-1] / mb, 1),
+            "rss_peak_mb": round(max(memory.samples) / mb, 1),
+            "rss_growth_mb": round(rss_growth / mb, 1),
+            "rss_growth_per_session_kb": round(rss_growth / 1024 / max(1, len(test.sessions)), 1),
+        },
+        "llm_stats": llm_stats,
+        "top_errors": [{"error": error[:200], "count": count} for error, count in errors.most_common(5)],
+    }
+    if traced_memory is not None:
+        report["memory"]["python_growth_mb"] = round(traced_memory["growth"] / mb, 2)
+        report["memory"]["python_peak_mb"] = round(traced_memory["peak"] / mb, 2)
+    return report
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Diferencias relativas frente a un informe anterior (positivo = más que el baseline)"""
+
+    def delta(current: float, previous: float) -> Optional[float]:
+        return round(current / previous - 1, 3) if previous else None
+
+    comparison = {
+        "baseline_commit": baseline.get("meta", {}).get("git_commit"),
+        "throughput_turns_per_s": delta(
+            report["totals"]["throughput_turns_per_s"], baseline["totals"]["throughput_turns_per_s"]
+        ),
+        "error_rate": round(report["totals"]["error_rate"] - baseline["totals"]["error_rate"], 4),
+        "rss_growth_mb": round(report["memory"]["rss_growth_mb"] - baseline["memory"]["rss_growth_mb"], 1),
+    }
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        comparison[key] = delta(report["latency"]["all"][key], baseline["latency"]["all"][key])
+    return comparison
+
+
+def print_report(report: Dict[str, Any]):
+    totals = report["totals"]
+    print(f"🏁 {totals['sessions']} sesiones, {totals['turns']} turnos en {totals['duration_s']} s "
+          f"({totals['throughput_turns_per_s']} turnos/s, errores {totals['error_rate']:.1%})")
+    print(f"\n{'turno':<14} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    rows = [("TOTAL", report["latency"]["all"]), *report["latency"]["by_label"].items()]
+    for label, row in rows:
+        print(f"{label:<14} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['error_rate']:>8.1%}")
+
+    memory = report["memory"]
+    print(f"\n🧠 RSS {memory['rss_start_mb']} → {memory['rss_end_mb']} MB (pico {memory['rss_peak_mb']} MB, "
+          f"{memory['rss_growth_per_session_kb']} KB/sesión)")
+    print(f"📋 Desenlaces: {report['outcomes']}")
+    for error in report["top_errors"]:
+        print(f"❌ {error['count']}× {error['error']}")
+    if "comparison" in report:
+        comparison = report["comparison"]
+        print(f"\n📊 Frente a {comparison['baseline_commit']}: " + ", ".join(
+            f"{key} {value:+.1%}" for key, value in comparison.items()
+            if key.startswith(("p5", "p9", "throughput")) and value is not None
+        ))
+
+
+# =====================================================
+# Ejecución
+# =====================================================
+
+def configure_llm(args) -> Optional[ScriptedChatModel]:
+    """Preparar el LLM de la prueba antes de crear la interfaz"""
+    from config.settings import reload_settings
+    import utils.llm.providers as providers
+
+    if args.llm == "replay":
+        os.environ["LLM_PROVIDER"] = "replay"
+        if args.cassette:
+            os.environ["LLM_REPLAY_CASSETTE_PATH"] = str(args.cassette)
+    reload_settings()
+    providers.reset_llm()
+
+    if args.llm != "fake":
+        return None
+    llm = ScriptedChatModel(
+        default_response=args.default_response,
+        latency_distribution=args.llm_dist,
+        latency_seconds=args.llm_ms / 1000,
+        seed=args.seed
+    )
+    providers._llm_instance = llm
+    return llm
+
+
+async def main_async(args) -> Dict[str, Any]:
+    from interfaces.eroski_chat_interface import EroskiChatInterface
+    from utils.llm.providers import get_llm_stats
+
+    config = json.loads(Path(args.dialogues).read_text(encoding="utf-8"))
+    if args.default_response is None:
+        args.default_response = config.get("default_llm_response", "Entendido.")
+    llm = configure_llm(args)
+
+    interface = EroskiChatInterface()
+    test = LoadTest(interface, config, args, llm=llm)
+
+    gc.collect()
+    if args.tracemalloc:
+        tracemalloc.start()
+    traced_start = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+
+    memory = MemorySampler()
+    memory.start()
+    duration = await test.run()
+    await memory.stop()
+
+    traced_memory = None
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        traced_memory = {"growth": current - traced_start, "peak": peak}
+
+    llm_stats = llm.get_stats() if llm is not None else get_llm_stats()
+    return build_report(test, duration, memory, args, llm_stats, traced_memory)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="main.py loadtest", description="Prueba de carga de EroskiChatInterface")
+    parser.add_argument("--users", type=int, default=20, help="Empleados virtuales concurrentes")
+    parser.add_argument("--sessions-per-user", type=int, default=3, help="Diálogos seguidos por empleado")
+    parser.add_argument("--ramp-up-s", type=float, default=5.0, help="Arranque escalonado de los empleados (s)")
+    parser.add_argument("--think-ms", type=float, default=1500, help="Tiempo medio de reflexión entre turnos")
+    parser.add_argument("--think-dist", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--llm", choices=["fake", "replay", "configured"], default="fake")
+    parser.add_argument("--llm-ms", type=float, default=800, help="Latencia media del LLM falso")
+    parser.add_argument("--llm-dist", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--cassette", type=Path, help="Cassette para --llm replay (LLM_REPLAY_CASSETTE_PATH)")
+    parser.add_argument("--default-response", help="Respuesta del LLM falso para nodos sin guion")
+    parser.add_argument("--dialogues", type=Path, default=DEFAULT_DIALOGUES, help="Empleados y diálogos (JSON)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tracemalloc", action="store_true", help="Medir también la memoria Python (más lento)")
+    parser.add_argument("--output", type=Path, help="Guardar el informe JSON en este fichero")
+    parser.add_argument("--baseline", type=Path, help="Informe JSON anterior con el que comparar")
+    parser.add_argument("--max-error-rate", type=float, help="Terminar con código 1 si la tasa de errores la supera")
+    parser.add_argument("--json", action="store_true", help="Imprimir el informe en JSON")
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--verbose", action="store_true", help="No silenciar la salida de los nodos")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.ERROR), force=True)
+
+    # Los nodos escriben trazas con print(): fuera de la salida del informe
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+        report = asyncio.run(main_async(args))
+    if args.baseline:
+        report["comparison"] = compare_reports(report, json.loads(args.baseline.read_text(encoding="utf-8")))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+
+    if args.max_error_rate is not None and report["totals"]["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
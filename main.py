@@ -52,6 +52,11 @@ async def main():
         
         logger.info(f"🔧 Iniciando interfaz: {interface}")
         
+        # Chainlit sirve desde su propio proceso (ver chainlit_app.py), así
+        # que allí se precalienta ese proceso; el resto corre en este
+        if interface in ("fastapi", "test"):
+            await run_warm_up(logger)
+        
         if interface == "chainlit":
             await run_chainlit_interface(settings, logger)
         elif interface == "fastapi":
@@ -71,6 +76,15 @@ async def main():
         print(f"❌ Error crítico al iniciar aplicación: {e}")
         sys.exit(1)
 
+async def run_warm_up(logger):
+    """Compilar el grafo y abrir las conexiones con Azure antes de aceptar sesiones"""
+    try:
+        from interfaces.eroski_chat_interface import warm_up_chat_interface
+        await warm_up_chat_interface()
+    except Exception as e:
+        # Sin precalentar la aplicación funciona igual, solo el primer turno es más lento
+        logger.warning(f"⚠️ Precalentamiento fallido: {e}")
+
 async def run_chainlit_interface(settings, logger):
     """Ejecutar interfaz de Chainlit"""
     logger.info("🔗 Iniciando aplicación Chainlit...")
@@ -274,8 +288,7 @@ async def verify_workflows():
     # Compilar cada workflow
     for workflow_name in workflows:
         try:
-            workflow = workflow_manager.get_workflow(workflow_name)
-            compiled = workflow.compile()
+            compiled = workflow_manager.get_compiled_workflow(workflow_name)
             print(f"✅ {workflow_name}: Compilado correctamente")
         except Exception as e:
             print(f"❌ {workflow_name}: Error - {e}")
@@ -296,6 +309,7 @@ Uso:
     INTERFACE=fastapi python main.py  # Ejecutar con FastAPI (futuro)
     INTERFACE=test python main.py     # Ejecutar tests
     INTERFACE=setup python main.py    # Ejecutar setup inicial
+    python main.py loadtest --help    # Prueba de carga con sesiones concurrentes
 
 Variables de entorno importantes:
     INTERFACE      # Tipo de interfaz (chainlit, fastapi, test, setup)
@@ -353,6 +367,9 @@ if __name__ == "__main__":
         elif sys.argv[1] == "--version":
             print("Chatbot de Incidencias v0.1.0")
             sys.exit(0)
+        elif sys.argv[1] == "loadtest":
+            from interfaces.loadtest import main as run_loadtest
+            sys.exit(run_loadtest(sys.argv[2:]))
     
     # Ejecutar aplicación principal
     try:
@@ -24,6 +24,7 @@ from langchain_core.messages import BaseMessage
 from datetime import datetime
 from enum import Enum
 from langgraph.graph.message import add_messages
+from utils.visit_budget import merge_node_visits
 
 # ========== ENUMS PARA TIPOS ESPECÍFICOS ==========
 
@@ -92,6 +93,8 @@ class EroskiState(TypedDict, total=False):
     
     # ========== CONVERSACIÓN ==========
     messages: Annotated[List[BaseMessage], add_messages]             # Historia de mensajes
+    conversation_summary: Optional[str]     # Resumen de los mensajes fuera de la ventana
+    summarized_message_count: int           # Mensajes ya incluidos en el resumen
     
     # ========== CLASIFICACIÓN DE LA CONSULTA ==========
     query_type: Optional[ConsultaType]      # Tipo de consulta identificado
@@ -155,6 +158,8 @@ class EroskiState(TypedDict, total=False):
     # ========== DEBUG Y LOGGING ==========
     debug_info: Optional[Dict[str, Any]]     # Información de debug
     execution_path: Optional[List[str]]      # Ruta de ejecución en el grafo
+    node_visits: Annotated[Dict[str, int], merge_node_visits]  # Visitas por nodo en el turno (presupuesto de visitas)
+    session_visits: Annotated[Dict[str, int], merge_node_visits]  # Visitas con trabajo en la sesión (presupuesto de visitas)
     error_count: int                         # Número de errores encontrados
 
 # ========== FUNCIONES DE CREACIÓN Y MANIPULACIÓN ==========
@@ -206,6 +211,8 @@ def create_initial_eroski_state(
         
         # Debug
         execution_path=["start"],
+        node_visits={},
+        session_visits={},
         error_count=0
     )
 
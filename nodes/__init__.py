@@ -1,90 +1,65 @@
 # =====================================================
-# nodes/__init__.py - CORREGIDO: Imports con manejo de errores
+# nodes/__init__.py - Exportaciones perezosas de nodos
 # =====================================================
-
-from .base_node import BaseNode
-
-# ========== IMPORTS CON MANEJO DE ERRORES ==========
-try:
-    # CORRECCIÓN: Era authenticate_llm__driven (doble guión bajo)
-    # AHORA: authenticate_llm_driven (guión bajo simple)
-    from .authenticate_llm_driven import llm_driven_authenticate_node
-    AUTHENTICATE_AVAILABLE = True
-    print("✅ authenticate disponible")
-except ImportError as e:
-    print(f"⚠️ Warning: authenticate no disponible: {e}")
-    AUTHENTICATE_AVAILABLE = False
-
-try:
-    from .classify_enhanced import classify_query_node 
-    CLASSIFY_AVAILABLE = True
-    print("✅ classify disponible")
-except ImportError as e:
-    print(f"⚠️ Warning: classify no disponible: {e}")
-    CLASSIFY_AVAILABLE = False
-
-# Otros nodos (crear si no existen)
-try:
-    from .collect_incident import collect_incident_details_node
-    COLLECT_AVAILABLE = True
-except ImportError:
-    COLLECT_AVAILABLE = False
-
-try:
-    from .search_solution import search_solution_node
-    SEARCH_SOLUTION_AVAILABLE = True
-except ImportError:
-    SEARCH_SOLUTION_AVAILABLE = False
-
-try:
-    from .search_knowledge import search_knowledge_node
-    SEARCH_KNOWLEDGE_AVAILABLE = True
-except ImportError:
-    SEARCH_KNOWLEDGE_AVAILABLE = False
-
-try:
-    from .escalate import escalate_supervisor_node
-    ESCALATE_AVAILABLE = True
-except ImportError:
-    ESCALATE_AVAILABLE = False
-
-try:
-    from .verify import verify_resolution_node
-    VERIFY_AVAILABLE = True
-except ImportError:
-    VERIFY_AVAILABLE = False
-
-try:
-    from .finalize import finalize_conversation_node
-    FINALIZE_AVAILABLE = True
-except ImportError:
-    FINALIZE_AVAILABLE = False
-
-# ========== EXPORTS DINÁMICOS ==========
-__all__ = ["BaseNode"]
-
-if AUTHENTICATE_AVAILABLE:
-    __all__.extend(["llm_driven_authenticate_node"])  # CORRECCIÓN: nombre correcto
-
-if CLASSIFY_AVAILABLE:
-    __all__.extend(["classify_query_node"])
-
-if COLLECT_AVAILABLE:
-    __all__.append("collect_incident_details_node")
-
-if SEARCH_SOLUTION_AVAILABLE:
-    __all__.append("search_solution_node")
-
-if SEARCH_KNOWLEDGE_AVAILABLE:
-    __all__.append("search_knowledge_node")
-
-if ESCALATE_AVAILABLE:
-    __all__.append("escalate_supervisor_node")
-
-if VERIFY_AVAILABLE:
-    __all__.append("verify_resolution_node")
-
-if FINALIZE_AVAILABLE:
-    __all__.append("finalize_conversation_node")
-
-print(f"📋 Nodos disponibles: {len(__all__)}")
\ No newline at end of file
+"""
+Exportaciones perezosas (PEP 562): `from nodes.base_node import BaseNode` ya no
+importa (ni construye LLMs de) todos los nodos. Cada nodo se importa la
+primera vez que se pide; los flags *_AVAILABLE se calculan igual, bajo
+demanda.
+"""
+
+import importlib
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger("Nodes")
+
+# Nombre exportado -> módulo
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "BaseNode": ".base_node",
+    "llm_driven_authenticate_node": ".authenticate_llm_driven",
+    "classify_query_node": ".classify_enhanced",
+    "collect_incident_details_node": ".collect_incident",
+    "search_solution_node": ".search_solution",
+    "search_knowledge_node": ".search_knowledge",
+    "escalate_supervisor_node": ".escalate",
+    "verify_resolution_node": ".verify",
+    "finalize_conversation_node": ".finalize",
+}
+
+# Flag de disponibilidad -> nodo
+_AVAILABILITY_FLAGS: Dict[str, str] = {
+    "AUTHENTICATE_AVAILABLE": "llm_driven_authenticate_node",
+    "CLASSIFY_AVAILABLE": "classify_query_node",
+    "COLLECT_AVAILABLE": "collect_incident_details_node",
+    "SEARCH_SOLUTION_AVAILABLE": "search_solution_node",
+    "SEARCH_KNOWLEDGE_AVAILABLE": "search_knowledge_node",
+    "ESCALATE_AVAILABLE": "escalate_supervisor_node",
+    "VERIFY_AVAILABLE": "verify_resolution_node",
+    "FINALIZE_AVAILABLE": "finalize_conversation_node",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _AVAILABILITY_FLAGS:
+        try:
+            __getattr__(_AVAILABILITY_FLAGS[name])
+            available = True
+        except ImportError as e:
+            logger.warning(f"⚠️ {_AVAILABILITY_FLAGS[name]} no disponible: {e}")
+            available = False
+        globals()[name] = available
+        return available
+    
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_AVAILABILITY_FLAGS))
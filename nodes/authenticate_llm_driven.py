@@ -24,7 +24,11 @@ import re
 from models.eroski_state import EroskiState
 from nodes.base_node import BaseNode
 from utils.eroski_database_auth import EroskiEmployeeDatabaseAuth
+from utils.employee_prefetch import find_email, get_employee_prefetcher, search_employee
 from utils.llm.providers import get_llm
+from utils.llm.circuit_breaker import LLMCircuitOpenError
+from utils.llm.token_budget import get_token_budget
+from utils.llm.structured import StructuredOutputError, ainvoke_structured
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
@@ -143,7 +147,7 @@ class LLMDrivenAuthenticateNode(BaseNode):
                 self.logger.info(f"🌄Entra primera visita")
                 try:
                     self.logger.info("🤖 Analizando primer mensaje con LLM...")
-                    decision = await self._get_llm_decision(state)
+                    decision = await self._get_llm_decision_with_prefetch(state)
                     
                     # Si el LLM extrajo algún dato, procesarlo
                     if decision.extracted_data and any(decision.extracted_data.values()):
@@ -216,8 +220,8 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
         """Continuar conversación dirigida por LLM"""
         
         try:
-            # Obtener decisión del LLM
-            decision = await self._get_llm_decision(state)
+            # Obtener decisión del LLM (con búsqueda en BD en paralelo)
+            decision = await self._get_llm_decision_with_prefetch(state)
             
             # Ejecutar la acción decidida por el LLM
             return await self._execute_llm_decision(state, decision)
@@ -226,6 +230,18 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
             self.logger.error(f"❌ Error en conversación LLM: {e}")
             return await self._fallback_to_manual_mode(state)
     
+    async def _get_llm_decision_with_prefetch(self, state: EroskiState) -> ConversationDecision:
+        """
+        Obtener la decisión del LLM con la búsqueda en BD del email del mensaje
+        ya en marcha (prefetch por sesión, ver utils/employee_prefetch).
+        _search_database_and_continue consume el resultado si el LLM extrae
+        el mismo email.
+        """
+        email = find_email(self._get_last_user_message(state))
+        if email:
+            get_employee_prefetcher().start(state.get("session_id"), email, db_auth=self.db_auth)
+        return await self._get_llm_decision(state)
+    
     async def _get_llm_decision(self, state: EroskiState) -> ConversationDecision:
         """Obtener decisión inteligente del LLM"""
 
@@ -233,61 +249,31 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
         context = self._build_conversation_context(state)
 
         # Formatear prompt
-        formatted_prompt = self.conversation_prompt.format(**context)
+        formatted_prompt, llm_kwargs = get_token_budget().format(self.conversation_prompt, context, "auth_decision")
 
         # Invocar LLM
         self.logger.debug("🤖 Solicitando decisión a LLM...")
         self.logger.debug(f"🤖 Prompt: {formatted_prompt[:200]}...")
-        response = await self.llm.ainvoke(formatted_prompt)
-        # ✅ LOGGING DE LA RESPUESTA DEL LLM
-        self.logger.info(f"🤖 Respuesta LLM: {response.content}")
-
         try:
-            raw_response = response.content
-            self.logger.debug(f"📥 Respuesta cruda del LLM: {raw_response}")
-            self.logger.debug(f"🧪 Tipo real de raw_response: {type(raw_response)}")
-
-            # 🔧 Si viene como string, limpiar y parsear
-            if isinstance(raw_response, str):
-                raw_response = raw_response.strip()
-                if raw_response.startswith("```json"):
-                    raw_response = raw_response.replace("```json", "").strip()
-                if raw_response.startswith("```"):
-                    raw_response = raw_response.replace("```", "").strip()
-                if raw_response.endswith("```"):
-                    raw_response = raw_response[:-3].strip()
-
-                self.logger.debug(f"📥 JSON limpio para parser: ->{raw_response}<-")
-
-                # Parsear con JsonOutputParser
-                parsed = self.parser.parse(raw_response)
-
-                # Verificar si es dict (por fallback interno del parser)
-                if isinstance(parsed, dict):
-                    decision = ConversationDecision(**parsed)
-                else:
-                    decision = parsed
-
-            # ✅ Si ya viene como dict, construir el modelo directamente
-            elif isinstance(raw_response, dict):
-                self.logger.debug("📥 Dict detectado, creando modelo directamente")
-                decision = ConversationDecision(**raw_response)
-
-            else:
-                raise ValueError("⚠️ Respuesta del LLM en formato inesperado")
-
-            self.logger.info(f"📧 Email detectado: {decision.email_detected}")
-            if decision.email_detected:
-                self.logger.info(f"📧 Email extraído: {decision.extracted_data.get('email')}")
-
-            self.logger.info(f"🧠 Datos extraídos por el LLM: {decision.extracted_data}")
-            self.logger.info(f"🎯 LLM decidió: {decision.next_action}")
-            return decision
-
-        except Exception as parse_error:
+            decision = await ainvoke_structured(
+                self.llm, formatted_prompt, ConversationDecision, "auth_decision", **llm_kwargs
+            )
+        except LLMCircuitOpenError:
+            # Azure caído: modo degradado inmediato por reglas
+            self.logger.warning("🔌 Circuito LLM abierto, usando decisión de fallback")
+            return self._create_fallback_decision(state)
+        except StructuredOutputError as parse_error:
             self.logger.warning(f"⚠️ Error parseando LLM, usando fallback: {parse_error}")
             return self._create_fallback_decision(state)
 
+        self.logger.info(f"📧 Email detectado: {decision.email_detected}")
+        if decision.email_detected:
+            self.logger.info(f"📧 Email extraído: {decision.extracted_data.get('email')}")
+
+        self.logger.info(f"🧠 Datos extraídos por el LLM: {decision.extracted_data}")
+        self.logger.info(f"🎯 LLM decidió: {decision.next_action}")
+        return decision
+
     async def _execute_llm_decision(self, state: EroskiState, decision: ConversationDecision) -> Command:
         """Ejecutar la decisión tomada por el LLM"""
         
@@ -397,8 +383,15 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
         email = decision.extracted_data.get("email")
         self.logger.info(f"🔍 Ejecutando búsqueda en BD para: {email}")
         
-        # 1. BUSCAR EN BASE DE DATOS
-        db_result = await self._search_employee_database(email)
+        # 1. BUSCAR EN BASE DE DATOS (recogiendo la búsqueda lanzada al ver el email)
+        prefetcher = get_employee_prefetcher()
+        session_id = state.get("session_id")
+        prefetcher.start(session_id, email, db_auth=self.db_auth)
+        prefetched = await prefetcher.consume(session_id, email)
+        if prefetched is not None:
+            db_result = {**prefetched["employee_lookup"], "recent_incidents": prefetched["recent_incidents"]}
+        else:
+            db_result = await self._search_employee_database(email)
         
         if db_result.get("found"):
             # ✅ CASO 1: USUARIO ENCONTRADO EN BD
@@ -589,7 +582,8 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
         """Manejar usuario encontrado en BD"""
         
         employee = db_result["employee"]
-        self.logger.info(f"✅ Usuario encontrado en BD: {employee.get('name')}")
+        recent_incidents = db_result.get("recent_incidents", [])
+        self.logger.info(f"✅ Usuario encontrado en BD: {employee.get('name')} ({len(recent_incidents)} incidencias recientes)")
         
         success_message = f"""✅ **¡Perfecto {employee.get('name', 'usuario')}!** Te he encontrado en el sistema.
 
@@ -612,6 +606,8 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
             "incident_email": decision.extracted_data.get('email'),
             "found_in_database": True,
             "employee_data": employee,
+            "previous_tickets": [incident["numero_ticket"] for incident in recent_incidents],
+            "employee_context": {**(state.get("employee_context") or {}), "recent_incidents": recent_incidents},
             "authenticated": True,
             "messages": state.get("messages", []) + [AIMessage(content=success_message)]
         })
@@ -1038,67 +1034,13 @@ Puedes darme **toda la información de una vez** o por partes, como prefieras. 
     # =========================================================================
     
     async def _search_employee_database(self, email: str) -> Dict[str, Any]:
-        """Buscar empleado en base de datos - MANEJO ROBUSTO"""
+        """Buscar empleado en base de datos - MANEJO ROBUSTO (ver search_employee)"""
         
-        try:
-            self.logger.info(f"🔍 Buscando empleado en BD: {email}")
-            
-            # Asegurar que db_auth esté inicializado
-            if not hasattr(self, 'db_auth') or self.db_auth is None:
-                from utils.eroski_database_auth import EroskiEmployeeDatabaseAuth
-                self.db_auth = EroskiEmployeeDatabaseAuth()
-            
-            # ✅ INTENTAR MÚLTIPLES MÉTODOS DE BÚSQUEDA
-            employee_data = None
-            
-            # Método 1: validate_employee
-            try:
-                employee_data = await self.db_auth.validate_employee(email)
-                if employee_data:
-                    self.logger.info(f"✅ Empleado encontrado con validate_employee: {employee_data.get('name')}")
-            except AttributeError:
-                self.logger.debug("⚠️ Método validate_employee no disponible")
-            except Exception as e:
-                self.logger.debug(f"⚠️ Error en validate_employee: {e}")
-            
-            # Método 2: Si no se encontró, intentar otros métodos
-            if not employee_data:
-                try:
-                    # Buscar por email usando repositorio directo
-                    if hasattr(self.db_auth, 'user_repository'):
-                        employee_data = await self.db_auth.user_repository.get_user_by_email(email)
-                        if employee_data:
-                            self.logger.info(f"✅ Empleado encontrado con user_repository: {employee_data.get('name')}")
-                except Exception as e:
-                    self.logger.debug(f"⚠️ Error en user_repository: {e}")
-            
-            # ✅ RESULTADO DE LA BÚSQUEDA
-            if employee_data:
-                self.logger.info(f"✅ Empleado encontrado en BD: {employee_data.get('name', 'Sin nombre')}")
-                return {
-                    "found": True,
-                    "employee": employee_data,
-                    "source": "database"
-                }
-            else:
-                # ✅ NO ES UN ERROR - Es un caso normal
-                self.logger.info(f"📄 Email {email} no está registrado en BD (caso normal)")
-                return {
-                    "found": False,
-                    "reason": "Email no registrado en base de datos",
-                    "email": email,
-                    "is_error": False  # ✅ Indicar que NO es un error
-                }
-                
-        except Exception as e:
-            # ✅ ESTE SÍ ES UN ERROR TÉCNICO
-            self.logger.error(f"❌ Error técnico en búsqueda BD: {e}")
-            return {
-                "found": False,
-                "error": str(e),
-                "email": email,
-                "is_error": True  # ✅ Indicar que SÍ es un error
-            }
+        # Asegurar que db_auth esté inicializado
+        if not hasattr(self, 'db_auth') or self.db_auth is None:
+            self.db_auth = EroskiEmployeeDatabaseAuth()
+        
+        return await search_employee(email, self.db_auth)
 
 
     # =========================================================================
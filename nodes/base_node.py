@@ -10,16 +10,78 @@ CARACTERÍSTICAS:
 - Logging integrado
 - Utilidades comunes
 - Validaciones básicas
+- Ramas paralelas dentro de un nodo (run_parallel)
 """
 
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional, List
 from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.types import Command
+import asyncio
+import functools
+import inspect
 import logging
 from datetime import datetime
 
 from models.eroski_state import EroskiState
+from utils.llm.telemetry import llm_call_context
+from utils.tracing import get_tracer
+
+def _with_llm_call_context(execute):
+    """Ejecutar execute() dentro de llm_call_context(nodo, sesión) y de un span node.<nombre>"""
+    
+    @functools.wraps(execute)
+    async def wrapper(self, state: EroskiState, *args, **kwargs) -> Command:
+        session_id = state.get("session_id") if isinstance(state, dict) else None
+        with llm_call_context(node=self.name, session_id=session_id), \
+                get_tracer().span(f"node.{self.name}", **{"session.id": session_id}):
+            return await execute(self, state, *args, **kwargs)
+    
+    wrapper._llm_call_context = True
+    return wrapper
+
+async def run_parallel(branches: Dict[str, Any], return_exceptions: bool = False) -> Dict[str, Any]:
+    """
+    Ejecutar ramas independientes de un nodo a la vez (fan-out) y unirlas.
+    
+    Cada rama es una corrutina o un callable sin argumentos; los callables
+    síncronos (I/O de ficheros, etc.) se ejecutan en un hilo. Cada rama
+    corre en su propia tarea con copia del contexto (llm_call_context y el
+    span actual), dentro de un span branch.<nombre>.
+    
+    La unión es determinista: se esperan SIEMPRE todas las ramas, el
+    resultado respeta el orden de declaración y, si fallan varias, se
+    relanza la excepción de la primera declarada (no la primera en fallar).
+    
+    Args:
+        branches: {nombre: corrutina | callable}
+        return_exceptions: Devolver las excepciones como resultado en vez de relanzarlas
+        
+    Returns:
+        {nombre: resultado} en el orden de declaración
+    """
+    tracer = get_tracer()
+    
+    async def run_branch(name: str, branch: Any) -> Any:
+        with tracer.span(f"branch.{name}"):
+            if inspect.isawaitable(branch):
+                return await branch
+            result = await asyncio.to_thread(branch)
+            if inspect.isawaitable(result):
+                return await result
+            return result
+    
+    names = list(branches)
+    results = await asyncio.gather(
+        *(run_branch(name, branches[name]) for name in names),
+        return_exceptions=True
+    )
+    
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    return dict(zip(names, results))
 
 class BaseNode(ABC):
     """
@@ -29,6 +91,13 @@ class BaseNode(ABC):
     que deben implementar todos los nodos.
     """
     
+    def __init_subclass__(cls, **kwargs):
+        """Envolver execute() para atribuir sus llamadas al LLM al nodo y la sesión"""
+        super().__init_subclass__(**kwargs)
+        execute = cls.__dict__.get("execute")
+        if execute is not None and not getattr(execute, "_llm_call_context", False):
+            cls.execute = _with_llm_call_context(execute)
+    
     def __init__(self, name: str):
         self.name = name
         self.logger = logging.getLogger(f"Node.{name}")
@@ -245,6 +314,18 @@ Te he derivado a un especialista que podrá ayudarte mejor.
             "messages": [AIMessage(content=escalation_message)]
         }
     
+    async def run_parallel(self, branches: Dict[str, Any], return_exceptions: bool = False) -> Dict[str, Any]:
+        """
+        Solapar I/O independiente (BD, ficheros) con la llamada al LLM del nodo.
+        
+        Ver run_parallel(): unión determinista en orden de declaración.
+        """
+        start = datetime.now()
+        results = await run_parallel(branches, return_exceptions=return_exceptions)
+        elapsed_ms = (datetime.now() - start).total_seconds() * 1000
+        self.logger.debug(f"🔀 Ramas paralelas {list(branches)} unidas en {elapsed_ms:.1f} ms")
+        return results
+    
     def log_execution(self, state: EroskiState, action: str, details: str = ""):
         """
         Registrar ejecución del nodo.
@@ -415,7 +496,8 @@ def node_wrapper(func):
     @functools.wraps(func)
     async def wrapper(state: EroskiState) -> Command:
         try:
-            return await func(state)
+            with get_tracer().span(f"node.{func.__name__}", **{"session.id": state.get("session_id")}):
+                return await func(state)
         except Exception as e:
             logger = logging.getLogger(f"NodeWrapper.{func.__name__}")
             logger.error(f"❌ Error en {func.__name__}: {e}")
@@ -21,6 +21,7 @@ from typing import Dict, Any, Optional, List, Union
 from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.types import Command
 from datetime import datetime
+import functools
 import logging
 import json
 import re
@@ -29,6 +30,9 @@ from pathlib import Path
 from models.eroski_state import EroskiState
 from nodes.base_node import BaseNode
 from utils.llm.providers import get_llm
+from utils.llm.history import format_history
+from utils.llm.token_budget import get_token_budget
+from utils.llm.structured import StructuredOutputError, ainvoke_structured
 from utils.two_phase_classifier import execute_two_phase_classification
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -43,7 +47,9 @@ from utils.incident_helpers import (
     ConfirmationLLMHandler,
     IncidentPersistence,
     IncidentHelpersFactory,
-    ConfirmationDecision
+    ConfirmationDecision,
+    finish_incident_initialization,
+    mark_incident_initializing
 )
 
 # Eliminar todos los handlers del root logger
@@ -803,35 +809,21 @@ RESPONDE ÚNICAMENTE CON JSON VÁLIDO incluyendo TODOS los campos:
             )
     
     def _get_conversation_history(self, state: EroskiState) -> str:
-        """Obtener historial de conversación formateado"""
-        messages = state.get("messages", [])
-        
-        # Filtrar solo mensajes del usuario (HumanMessage)
-        user_messages = []
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                user_messages.append(f"Usuario: {msg.content}")
-        
-        if not user_messages:
-            return "No hay mensajes previos del usuario"
-        
-        return "\n".join(user_messages)
+        """Obtener historial de conversación formateado (resumen + mensajes recientes del usuario)"""
+        return format_history(
+            state,
+            lambda msg: f"Usuario: {msg.content}" if isinstance(msg, HumanMessage) else None,
+            empty="No hay mensajes previos del usuario"
+        )
     
     def _get_full_conversation_history(self, state: EroskiState) -> str:
-        """Obtener historial completo incluyendo respuestas del bot"""
-        messages = state.get("messages", [])
-        
-        formatted_messages = []
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                formatted_messages.append(f"👤 Usuario: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                formatted_messages.append(f"🤖 Bot: {msg.content}")
-        
-        if not formatted_messages:
-            return "No hay historial de conversación"
-        
-        return "\n".join(formatted_messages)
+        """Obtener historial completo incluyendo respuestas del bot (resumen + ventana reciente)"""
+        return format_history(
+            state,
+            lambda msg: f"👤 Usuario: {msg.content}" if isinstance(msg, HumanMessage)
+            else f"🤖 Bot: {msg.content}" if isinstance(msg, AIMessage) else None,
+            empty="No hay historial de conversación"
+        )
     
     async def _analyze_historical_messages(self, state: EroskiState) -> Command:
         """
@@ -855,16 +847,14 @@ RESPONDE ÚNICAMENTE CON JSON VÁLIDO incluyendo TODOS los campos:
         }
         
         # Ejecutar análisis histórico con LLM
-        formatted_prompt = self.historical_analysis_prompt.format(**prompt_input)
+        formatted_prompt, llm_kwargs = get_token_budget().format(self.historical_analysis_prompt, prompt_input, "classification")
         
         self.logger.info("🤖 Ejecutando análisis histórico inicial")
         
         try:
-            response = await self.llm.ainvoke(formatted_prompt)
-            
-            # Parsear respuesta
-            decision_data = self.parser.parse(response.content)
-            decision = ClassificationDecision(**decision_data)
+            decision = await ainvoke_structured(
+                self.llm, formatted_prompt, ClassificationDecision, "classification_historical", **llm_kwargs
+            )
             
             self.logger.info(f"✅ Análisis histórico completado: {decision.next_action}")
             self.logger.info(f"🔍 Info histórica encontrada: {decision.historical_info_found}")
@@ -1027,7 +1017,15 @@ RESPONDE ÚNICAMENTE CON JSON VÁLIDO incluyendo TODOS los campos:
             if not state.get("incident_code"):
                 incident_code = self.code_manager.generate_unique_code()
                 state = {**state, "incident_code": incident_code}
-                self._initialize_incident_with_helpers(state, incident_code)
+                
+                # Inicializar el registro (hilo) mientras el LLM clasifica; las
+                # escrituras de la clasificación esperan a la inicialización
+                mark_incident_initializing(incident_code)
+                results = await self.run_parallel({
+                    "incident_init": functools.partial(self._initialize_incident_with_helpers, state, incident_code),
+                    "classification": execute_two_phase_classification(state),
+                })
+                return results["classification"]
             
             # Ejecutar clasificación en dos fases
             return await execute_two_phase_classification(state)
@@ -1134,23 +1132,20 @@ RESPONDE ÚNICAMENTE CON JSON VÁLIDO:
         )
         
         # Ejecutar LLM
-        formatted_prompt = continuous_prompt.format(**prompt_input)
+        formatted_prompt, llm_kwargs = get_token_budget().format(continuous_prompt, prompt_input, "classification")
         
         self.logger.info(f"🤖 Ejecutando análisis LLM continuo (intento {attempt_number})")
         
-        response = await self.llm.ainvoke(formatted_prompt)
-        
-        # Parsear respuesta
         try:
-            decision_data = self.parser.parse(response.content)
-            decision = ClassificationDecision(**decision_data)
+            decision = await ainvoke_structured(
+                self.llm, formatted_prompt, ClassificationDecision, "classification_continuous", **llm_kwargs
+            )
             
             self.logger.info(f"✅ Decisión LLM: {decision.next_action}")
             return decision
             
-        except Exception as e:
+        except StructuredOutputError as e:
             self.logger.error(f"❌ Error parseando respuesta LLM: {e}")
-            self.logger.error(f"Respuesta raw: {response.content}")
             
             # Fallback: crear decisión básica
             return ClassificationDecision(
@@ -1425,7 +1420,10 @@ Por favor, ten preparada la siguiente información:
             state: Estado actual
             incident_code: Código de la incidencia
         """
-        success = self.persistence_manager.initialize_incident(state, incident_code)
+        try:
+            success = self.persistence_manager.initialize_incident(state, incident_code)
+        finally:
+            finish_incident_initialization(incident_code)
         if success:
             self.logger.info(f"✅ Incidencia {incident_code} inicializada")
         else:
@@ -19,6 +19,8 @@ from langchain_core.messages import AIMessage
 from langgraph.types import Command
 from datetime import datetime
 
+from utils.tracing import get_tracer
+
 def node_wrapper(func: Callable) -> Callable:
     """
     Decorator para convertir funciones async en nodos de LangGraph con manejo de errores.
@@ -40,8 +42,9 @@ def node_wrapper(func: Callable) -> Callable:
         logger = logging.getLogger(f"NodeWrapper.{func.__name__}")
         
         try:
-            # Ejecutar función original
-            result = await func(state)
+            # Ejecutar función original dentro de su span
+            with get_tracer().span(f"node.{func.__name__}", **{"session.id": state.get("session_id")}):
+                result = await func(state)
             
             # Verificar que devuelve Command
             if not isinstance(result, Command):
@@ -0,0 +1,258 @@
+# =====================================================
+# scripts/benchmark_fan_out.py - Benchmark de las ramas paralelas por nodo
+# =====================================================
+"""
+Mide la latencia por turno de los nodos authenticate y classify con y sin
+ramas paralelas (BaseNode.run_parallel), con latencias simuladas:
+
+- LLM (--llm-ms): la decisión de autenticación y la clasificación
+- BD (--db-ms): la búsqueda del empleado por email
+- Fichero de incidencias (--io-ms): cada escritura de incidents_database.json
+
+Se comparan:
+
+- sequential: el flujo anterior (LLM y después BD; inicializar la incidencia
+  y después clasificar)
+- fan_out: el flujo actual (la búsqueda en BD se lanza al ver el email,
+  utils/employee_prefetch, y la inicialización se solapa con el LLM)
+
+Se usan los nodos reales con un LLM falso; la clasificación en dos fases se
+sustituye por una espera del LLM seguida de la escritura de la solución, que
+pasa por la misma barrera de inicialización que el clasificador real.
+
+El nodo classify medido es LLMDrivenClassifyNode (nodes/classify_llm_driven).
+El grafo principal cablea nodes/classify_enhanced, que solo hace la llamada
+al LLM (no crea el registro de incidencia ni escribe ficheros), así que en
+él no hay I/O que solapar y el fan-out no aplica.
+
+Uso:
+    python scripts/benchmark_fan_out.py [--turns 20] [--llm-ms 300] [--db-ms 80]
+                                        [--io-ms 40] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command
+
+import nodes.classify_llm_driven as classify_module
+import utils.employee_prefetch as employee_prefetch
+from nodes.authenticate_llm_driven import LLMDrivenAuthenticateNode
+from nodes.base_node import BaseNode
+from nodes.classify_llm_driven import LLMDrivenClassifyNode
+from utils.incident_helpers import IncidentCodeManager, IncidentPersistence, wait_for_incident_initialization
+
+AUTH_DECISION = {
+    "is_complete": False,
+    "should_search_database": True,
+    "wants_to_cancel": False,
+    "extracted_data": {"email": "ana.garcia@eroski.es"},
+    "email_detected": True,
+    "next_action": "search_db",
+    "message_to_user": "Déjame buscarte en el sistema",
+}
+
+
+class DelayedLLM:
+    """LLM falso: responde siempre lo mismo tras --llm-ms"""
+
+    def __init__(self, content: str, delay: float):
+        self.content = content
+        self.delay = delay
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self.delay)
+        return AIMessage(content=self.content)
+
+
+class DelayedEmployeeDatabase:
+    """BD de empleados falsa con latencia --db-ms"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def validate_employee(self, email):
+        await asyncio.sleep(self.delay)
+        return {"name": "Ana García", "email": email, "store_name": "Eroski Bilbao Centro", "section": "Caja"}
+
+
+class DelayedIncidentPersistence(IncidentPersistence):
+    """Persistencia real de incidencias con latencia --io-ms por escritura"""
+
+    def __init__(self, incidents_file: Path, delay: float):
+        super().__init__(incidents_file)
+        self.delay = delay
+
+    def _save_incidents_data(self, data: Dict[str, Any]) -> bool:
+        time.sleep(self.delay)
+        return super()._save_incidents_data(data)
+
+
+# =====================================================
+# Nodos: flujo actual y flujo secuencial anterior
+# =====================================================
+
+class SequentialClassifyNode(LLMDrivenClassifyNode):
+    """Flujo anterior: inicializar la incidencia y después clasificar"""
+
+    async def execute(self, state):
+        if not state.get("incident_code"):
+            incident_code = self.code_manager.generate_unique_code()
+            state = {**state, "incident_code": incident_code}
+            self._initialize_incident_with_helpers(state, incident_code)
+        return await classify_module.execute_two_phase_classification(state)
+
+
+def make_authenticate_node(node_class, args) -> LLMDrivenAuthenticateNode:
+    node = node_class.__new__(node_class)
+    BaseNode.__init__(node, "authenticate")
+    node.max_attempts = 5
+    node.required_fields = {"name": "", "email": "", "store_name": "", "section": ""}
+    node.db_auth = DelayedEmployeeDatabase(args.db_ms / 1000)
+    node.llm = DelayedLLM(json.dumps(AUTH_DECISION), args.llm_ms / 1000)
+    node.conversation_prompt = node._build_conversation_prompt()
+    return node
+
+
+def make_classify_node(node_class, incidents_file: Path, args) -> LLMDrivenClassifyNode:
+    node = node_class.__new__(node_class)
+    BaseNode.__init__(node, "classify")
+    node.incidents_file = incidents_file
+    node.code_manager = IncidentCodeManager(incidents_file)
+    node.persistence_manager = DelayedIncidentPersistence(incidents_file, args.io_ms / 1000)
+    return node
+
+
+def simulated_classification(persistence: IncidentPersistence, llm_delay: float):
+    """Clasificación en dos fases simulada: LLM y escritura de la solución propuesta"""
+
+    async def classify(state):
+        await asyncio.sleep(llm_delay)
+        solution = "Reinicia la balanza desde el interruptor trasero"
+        await wait_for_incident_initialization(state["incident_code"])
+        await asyncio.to_thread(persistence.update_incident, state["incident_code"], {
+            "tipo_incidencia": "balanza",
+            "solucion_aplicada": solution,
+            "estado_solucion": "propuesta",
+        })
+        return Command(update={"messages": [AIMessage(content=solution)], "incident_code": state["incident_code"]})
+
+    return classify
+
+
+# =====================================================
+# Medición
+# =====================================================
+
+async def run_turns(mode: str, args, incidents_file: Path) -> Dict[str, List[float]]:
+    sequential = mode == "sequential"
+    # Sin prefetch la búsqueda en BD empieza cuando responde el LLM (flujo anterior)
+    employee_prefetch._employee_prefetcher = employee_prefetch.EmployeePrefetcher(
+        enabled=not sequential, recent_incidents_limit=0
+    )
+    auth_node = make_authenticate_node(LLMDrivenAuthenticateNode, args)
+    classify_node = make_classify_node(
+        SequentialClassifyNode if sequential else LLMDrivenClassifyNode, incidents_file, args
+    )
+    classify_module.execute_two_phase_classification = simulated_classification(
+        classify_node.persistence_manager, args.llm_ms / 1000
+    )
+
+    timings = {"authenticate": [], "classify": []}
+    for turn in range(args.turns):
+        auth_state = {
+            "messages": [HumanMessage(content="Hola, soy Ana, mi email es ana.garcia@eroski.es")],
+            "session_id": f"{mode}-{turn}",
+            "auth_conversation_started": True,
+            "auth_data_collected": {},
+            "attempts": 1,
+        }
+        start = time.perf_counter()
+        result = await auth_node.execute(auth_state)
+        timings["authenticate"].append(time.perf_counter() - start)
+        if not result.update.get("found_in_database"):
+            raise RuntimeError(f"authenticate no encontró al empleado: {result.update}")
+
+        classify_state = {
+            "messages": [HumanMessage(content="La balanza de la caja no pesa")],
+            "session_id": f"{mode}-{turn}",
+            "auth_data_collected": {"name": "Ana García", "email": "ana.garcia@eroski.es"},
+        }
+        start = time.perf_counter()
+        result = await classify_node.execute(classify_state)
+        timings["classify"].append(time.perf_counter() - start)
+
+        record = classify_node.persistence_manager.get_incident(result.update["incident_code"])
+        if not record or record.get("estado_solucion") != "propuesta" or record.get("nombre_empleado") != "Ana García":
+            raise RuntimeError(f"Registro de incidencia incompleto: {record}")
+    return timings
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "mean_ms": round(statistics.mean(values) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    original_classification = classify_module.execute_two_phase_classification
+    report: Dict[str, Any] = {}
+    try:
+        for mode in ("sequential", "fan_out"):
+            with tempfile.TemporaryDirectory() as tmp:
+                timings = await run_turns(mode, args, Path(tmp) / "incidents_database.json")
+            report[mode] = {node: summarize(values) for node, values in timings.items()}
+            report[mode]["turn"] = summarize([a + c for a, c in zip(timings["authenticate"], timings["classify"])])
+    finally:
+        classify_module.execute_two_phase_classification = original_classification
+        employee_prefetch.reset_employee_prefetcher()
+
+    report["reduction"] = {
+        key: round(1 - report["fan_out"][key]["mean_ms"] / report["sequential"][key]["mean_ms"], 3)
+        for key in ("authenticate", "classify", "turn")
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las ramas paralelas por nodo")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=300, help="Latencia simulada de cada llamada al LLM")
+    parser.add_argument("--db-ms", type=float, default=80, help="Latencia simulada de la búsqueda de empleado")
+    parser.add_argument("--io-ms", type=float, default=40, help="Latencia simulada de cada escritura de incidencias")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'modo':<12} {'authenticate ms':>18} {'classify ms':>18} {'turno ms':>18}")
+    for mode in ("sequential", "fan_out"):
+        row = report[mode]
+        print(f"{mode:<12} " + " ".join(
+            f"{row[key]['mean_ms']:>8.1f} (p95 {row[key]['p95_ms']:>6.1f})" for key in ("authenticate", "classify", "turn")
+        ))
+    reduction = report["reduction"]
+    print(f"\n⚡ Reducción media: authenticate {reduction['authenticate']:.0%}, "
+          f"classify {reduction['classify']:.0%}, turno {reduction['turn']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# =====================================================
+# scripts/benchmark_import_time.py - Benchmark del tiempo de arranque
+# =====================================================
+"""
+Mide el tiempo de import de los módulos de entrada con `python -X importtime`
+(un proceso nuevo por medida, se toma el mínimo de --repeat) y el tiempo de
+arranque de pytest (recolección de los tests indicados).
+
+Además comprueba que los módulos ligeros no arrastran dependencias pesadas
+(langchain_openai, openai, asyncpg): con las exportaciones perezosas de
+utils, nodes y workflows, importar utils.tracing o el WorkflowManager no
+debe cargar el proveedor LLM ni el driver de la BD.
+
+Con --check el script termina con código 1 si algún módulo supera su
+presupuesto (ms) o importa una dependencia prohibida (uso como test de
+regresión en CI).
+
+Uso:
+    python scripts/benchmark_import_time.py [--repeat 3] [--check] [--json]
+                                            [--budget-scale 1.0] [--no-pytest]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Módulo -> presupuesto de import (ms, acumulado)
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "config.settings": 250,
+    "utils.tracing": 50,
+    "utils.employee_prefetch": 100,
+    "workflows.workflow_manager": 300,
+    "workflows.graph_registry": 300,
+    "nodes.base_node": 500,
+    "interfaces.eroski_chat_interface": 600,
+    "main": 400,
+}
+
+# Módulos que deben arrancar sin el proveedor LLM ni el driver de BD
+HEAVY_MODULES = ["langchain_openai", "openai", "asyncpg"]
+LIGHT_MODULES = [
+    "config.settings",
+    "utils.tracing",
+    "utils.employee_prefetch",
+    "workflows.workflow_manager",
+    "workflows.graph_registry",
+    "main",
+]
+
+# Arranque de la suite: recolección de estos tests
+PYTEST_TARGETS = ["tests/test_tracing.py", "tests/test_checkpointer.py", "tests/test_graph_registry.py"]
+PYTEST_BUDGET_MS = 3000
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)$")
+
+
+def measure_import(module: str) -> Tuple[float, Set[str]]:
+    """Tiempo acumulado (ms) del import de `module` en un proceso nuevo y módulos cargados"""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} falló: {result.stderr.strip().splitlines()[-1:]}")
+
+    cumulative_us: Optional[int] = None
+    imported: Set[str] = set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(3)
+        imported.add(name)
+        if name == module:
+            cumulative_us = max(cumulative_us or 0, int(match.group(2)))
+    if cumulative_us is None:
+        cumulative_us = 0  # ya importado por el intérprete
+    return cumulative_us / 1000, imported
+
+
+def measure_pytest_collection(targets: List[str]) -> float:
+    """Tiempo (ms) de arrancar pytest y recolectar los tests indicados"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider", *targets],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"pytest --collect-only falló:\n{result.stdout[-2000:]}")
+    return elapsed
+
+
+def run(args) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"imports": {}, "failures": []}
+
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        budget *= args.budget_scale
+        timings = []
+        imported: Set[str] = set()
+        for _ in range(args.repeat):
+            elapsed, imported = measure_import(module)
+            timings.append(elapsed)
+        elapsed = min(timings)
+
+        heavy = sorted(
+            heavy for heavy in HEAVY_MODULES
+            if module in LIGHT_MODULES and heavy in imported
+        )
+        report["imports"][module] = {
+            "ms": round(elapsed, 1),
+            "budget_ms": round(budget, 1),
+            "modules": len(imported),
+            "heavy_imported": heavy,
+        }
+        if elapsed > budget:
+            report["failures"].append(f"{module}: {elapsed:.0f} ms > {budget:.0f} ms")
+        if heavy:
+            report["failures"].append(f"{module}: importa {', '.join(heavy)}")
+
+    if not args.no_pytest:
+        budget = PYTEST_BUDGET_MS * args.budget_scale
+        elapsed = min(measure_pytest_collection(PYTEST_TARGETS) for _ in range(args.repeat))
+        report["pytest_collection"] = {"ms": round(elapsed, 1), "budget_ms": budget, "targets": PYTEST_TARGETS}
+        if elapsed > budget:
+            report["failures"].append(f"pytest --collect-only: {elapsed:.0f} ms > {budget:.0f} ms")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de arranque (python -X importtime)")
+    parser.add_argument("--repeat", type=int, default=3, help="Medidas por módulo (se toma el mínimo)")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiplicar los presupuestos (máquinas lentas)")
+    parser.add_argument("--no-pytest", action="store_true", help="No medir el arranque de pytest")
+    parser.add_argument("--check", action="store_true", help="Fallar si se supera algún presupuesto")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'módulo':<36} {'ms':>8} {'presupuesto':>12} {'módulos':>8}  pesados")
+        for module, row in report["imports"].items():
+            heavy = ", ".join(row["heavy_imported"]) or "-"
+            print(f"{module:<36} {row['ms']:>8.1f} {row['budget_ms']:>12.0f} {row['modules']:>8}  {heavy}")
+        if "pytest_collection" in report:
+            row = report["pytest_collection"]
+            print(f"{'pytest --collect-only':<36} {row['ms']:>8.1f} {row['budget_ms']:>12.0f}")
+        for failure in report["failures"]:
+            print(f"❌ {failure}")
+
+    if args.check and report["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# =====================================================
+# scripts/benchmark_preclassifier.py - Benchmark del preclasificador local
+# =====================================================
+"""
+Mide cuántas llamadas LLM de la FASE 1 se ahorran con el preclasificador
+local sobre las conversaciones grabadas en incidents_database.json.
+
+Para cada incidencia con mensajes se recorren los turnos del usuario: el
+primer turno en que el preclasificador supera el umbral sustituye a la
+llamada LLM de la FASE 1. Se compara el tipo predicho con el registrado.
+
+Uso:
+    python scripts/benchmark_preclassifier.py [--database incidents_database.json]
+                                              [--thresholds 0.7 0.8 0.85 0.9] [--json]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.incident_preclassifier import get_incident_preclassifier, preclassify_messages
+
+
+def load_incidents(path: str, max_repairs: int = 20) -> Tuple[Dict[str, Any], int]:
+    """
+    Cargar incidents_database.json tolerando caracteres sueltos fuera de
+    cadenas (el fichero se edita a mano y a veces queda corrupto).
+
+    Returns:
+        (incidencias, número de reparaciones aplicadas)
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    repairs = 0
+    while True:
+        try:
+            return json.loads(text), repairs
+        except json.JSONDecodeError as e:
+            if repairs >= max_repairs:
+                raise
+            # Eliminar los caracteres no estructurales desde el punto del error hasta fin de línea
+            end = text.find("\n", e.pos)
+            end = len(text) if end == -1 else end
+            stray = re.match(r'[^"{}\[\],:]*', text[e.pos:end])
+            if not stray or not stray.group(0):
+                raise
+            text = text[:e.pos] + text[e.pos + len(stray.group(0)):]
+            repairs += 1
+
+
+def evaluate(incidents: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """Evaluar el preclasificador con un umbral concreto"""
+    results = {
+        "threshold": threshold,
+        "conversations": 0,
+        "baseline_phase1_llm_calls": 0,
+        "phase1_llm_calls_saved": 0,
+        "correct": 0,
+        "wrong": 0,
+        "fallback_to_llm": 0,
+    }
+
+    for incident in incidents.values():
+        expected = incident.get("tipo_incidencia")
+        user_messages = [m.get("contenido", "") for m in incident.get("mensajes", []) if m.get("tipo") == "usuario"]
+        if not expected or not user_messages:
+            continue
+
+        results["conversations"] += 1
+        results["baseline_phase1_llm_calls"] += 1
+
+        prediction = None
+        for turn in range(1, len(user_messages) + 1):
+            result = preclassify_messages(user_messages[:turn])
+            if result.incident_type and result.confidence >= threshold:
+                prediction = result.incident_type
+                break
+
+        if prediction is None:
+            results["fallback_to_llm"] += 1
+        elif prediction == expected:
+            results["correct"] += 1
+            results["phase1_llm_calls_saved"] += 1
+        else:
+            results["wrong"] += 1
+            results["phase1_llm_calls_saved"] += 1
+
+    calls = results["baseline_phase1_llm_calls"]
+    results["saved_ratio"] = results["phase1_llm_calls_saved"] / calls if calls else 0.0
+    fast = results["correct"] + results["wrong"]
+    results["fast_path_precision"] = results["correct"] / fast if fast else None
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del preclasificador local de incidencias")
+    parser.add_argument("--database", default="incidents_database.json", help="Conversaciones grabadas")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.85, 0.9])
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    classifier = get_incident_preclassifier()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    incidents, repairs = load_incidents(args.database)
+
+    start = time.perf_counter()
+    reports = [evaluate(incidents, threshold) for threshold in args.thresholds]
+    eval_ms = (time.perf_counter() - start) * 1000
+
+    summary = {
+        "database": args.database,
+        "json_repairs": repairs,
+        "types": len(classifier.type_ids),
+        "vocabulary": len(classifier.vocabulary),
+        "calibration": {"temperature": classifier.temperature, "null_score": classifier.null_score},
+        "index_load_ms": round(load_ms, 2),
+        "evaluation_ms": round(eval_ms, 2),
+        "results": reports,
+    }
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"📊 Preclasificador: {summary['types']} tipos, {summary['vocabulary']} términos, carga {load_ms:.1f} ms")
+    if repairs:
+        print(f"⚠️ {args.database}: {repairs} reparaciones de JSON aplicadas")
+    print(f"{'umbral':>7} {'conv':>5} {'llm_base':>8} {'ahorradas':>9} {'ok':>4} {'mal':>4} {'llm':>4} {'precisión':>9}")
+    for r in reports:
+        precision = "-" if r["fast_path_precision"] is None else f"{r['fast_path_precision']:.2f}"
+        print(
+            f"{r['threshold']:>7.2f} {r['conversations']:>5} {r['baseline_phase1_llm_calls']:>8} "
+            f"{r['phase1_llm_calls_saved']:>9} {r['correct']:>4} {r['wrong']:>4} {r['fallback_to_llm']:>4} {precision:>9}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
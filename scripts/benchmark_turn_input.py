@@ -0,0 +1,190 @@
+# =====================================================
+# scripts/benchmark_turn_input.py - Benchmark del input incremental por turno
+# =====================================================
+"""
+Mide el tiempo por turno de EroskiChatInterface a medida que crece una sesión.
+
+El grafo es un nodo eco sin LLM sobre EroskiState con el checkpointer
+configurado, así que solo se mide el coste del propio turno: preparar el
+input, fusionar el estado y persistir el checkpoint. Se compara:
+
+- incremental: el input actual (mensaje nuevo + campos del turno)
+- full_state: el input anterior (aget_state + estado completo + historial)
+
+Se informa del tiempo total del turno y del de preparar el input, y del
+crecimiento (media de los últimos turnos entre la de los primeros).
+
+El script es un test de regresión: termina con código 1 si el turno
+incremental crece más de --max-growth (por defecto MAX_GROWTH; 0 lo
+desactiva). tests/test_turn_input.py ejecuta la misma comprobación.
+
+Limitación conocida: con el input incremental la preparación es constante y
+el checkpointer solo guarda los canales que cambian, pero el canal messages
+es una lista completa por versión. Decodificarla al cargar el checkpoint,
+fusionarla con add_messages y codificarla al guardar sigue siendo O(historial),
+así que el turno crece ~2x en 60 turnos. Para que fuera plano habría que
+guardar los mensajes como deltas.
+
+Uso:
+    python scripts/benchmark_turn_input.py [--turns 60] [--window 10]
+                                           [--max-growth 2.5] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from interfaces.eroski_chat_interface import EroskiChatInterface
+from models.eroski_state import EroskiState
+from workflows.checkpointer import create_checkpointer
+
+# Crecimiento máximo del turno incremental en 60 turnos (medido: ~1.9x)
+MAX_GROWTH = 2.5
+
+
+def build_echo_graph():
+    """Grafo de un nodo que responde con eco, compilado con el checkpointer configurado"""
+
+    async def respond(state: EroskiState):
+        last = state["messages"][-1].content
+        return {"messages": [AIMessage(content=f"Recibido: {last}")], "current_node": "respond"}
+
+    builder = StateGraph(EroskiState)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "respond")
+    builder.add_edge("respond", END)
+    return builder.compile(checkpointer=create_checkpointer())
+
+
+class FullStateChatInterface(EroskiChatInterface):
+    """Input de turno anterior: estado completo reenviado en cada ainvoke"""
+
+    async def _prepare_turn_input(self, user_message, session_id, user_context=None):
+        config = {"configurable": {"thread_id": session_id}, "recursion_limit": 20}
+        previous_state = await self.graph.aget_state({"configurable": {"thread_id": session_id}})
+        previous_state_data = previous_state.values if previous_state else {}
+        input_data = {
+            **previous_state_data,
+            "messages": previous_state_data.get("messages", []) + [HumanMessage(content=user_message)],
+            "session_id": session_id,
+            "last_activity": datetime.now()
+        }
+        if user_context:
+            input_data.update(user_context)
+        return input_data, config
+
+
+def create_interface(interface_class) -> EroskiChatInterface:
+    interface = interface_class.__new__(interface_class)
+    interface.logger = logging.getLogger("EroskiChatInterface")
+    interface.graph = build_echo_graph()
+    interface.active_sessions = {}
+    return interface
+
+
+class TimedTurnInput:
+    """Mide cuánto tarda _prepare_turn_input y cuántos mensajes envía"""
+
+    def __init__(self, interface: EroskiChatInterface):
+        self.prepare = interface._prepare_turn_input
+        self.seconds = 0.0
+        self.input_messages = 0
+        interface._prepare_turn_input = self
+
+    async def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        input_data, config = await self.prepare(*args, **kwargs)
+        self.seconds = time.perf_counter() - start
+        self.input_messages = len(input_data.get("messages", []))
+        return input_data, config
+
+
+async def run_session(interface: EroskiChatInterface, turns: int) -> Dict[str, List[float]]:
+    """Tiempos por turno (segundos) de una sesión de `turns` mensajes"""
+    timed_input = TimedTurnInput(interface)
+    timings = {"turn": [], "prepare": [], "input_messages": []}
+    for turn in range(turns):
+        start = time.perf_counter()
+        response = await interface.process_message(f"Mensaje {turn}: la balanza sigue sin pesar", "benchmark")
+        timings["turn"].append(time.perf_counter() - start)
+        timings["prepare"].append(timed_input.seconds)
+        timings["input_messages"].append(timed_input.input_messages)
+        if not response.get("success", True):
+            raise RuntimeError(response)
+    del interface._prepare_turn_input
+    return timings
+
+
+def growth(values: List[float], window: int) -> Dict[str, float]:
+    first = statistics.mean(values[:window])
+    last = statistics.mean(values[-window:])
+    return {
+        "first_ms": round(first * 1000, 3),
+        "last_ms": round(last * 1000, 3),
+        "growth": round(last / first, 2) if first else 0.0,
+    }
+
+
+def summarize(timings: Dict[str, List[float]], window: int) -> Dict[str, Any]:
+    return {
+        "turns": len(timings["turn"]),
+        "turn": growth(timings["turn"], window),
+        "prepare_input": growth(timings["prepare"], window),
+        "input_messages_last_turn": timings["input_messages"][-1],
+        "total_ms": round(sum(timings["turn"]) * 1000, 1),
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    report = {}
+    for name, interface_class in (("incremental", EroskiChatInterface), ("full_state", FullStateChatInterface)):
+        interface = create_interface(interface_class)
+        await run_session(interface, args.window)  # calentamiento
+        interface.graph = build_echo_graph()
+        report[name] = summarize(await run_session(interface, args.turns), args.window)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del input incremental por turno")
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--window", type=int, default=10, help="Turnos promediados al inicio y al final")
+    parser.add_argument("--max-growth", type=float, default=MAX_GROWTH,
+                        help="Fallar si el crecimiento del modo incremental lo supera (0: sin límite)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'modo':<12} {'turnos':>6} {'turno ms (inicio → fin)':>26} {'input ms (inicio → fin)':>26} {'msgs enviados':>14}")
+        for name, row in report.items():
+            turn, prepare = row["turn"], row["prepare_input"]
+            print(f"{name:<12} {row['turns']:>6} "
+                  f"{turn['first_ms']:>8.3f} → {turn['last_ms']:>7.3f} ({turn['growth']:>4.2f}x) "
+                  f"{prepare['first_ms']:>8.3f} → {prepare['last_ms']:>7.3f} ({prepare['growth']:>4.2f}x) "
+                  f"{row['input_messages_last_turn']:>14}")
+
+    incremental_growth = report["incremental"]["turn"]["growth"]
+    if args.max_growth > 0 and incremental_growth > args.max_growth:
+        print(f"❌ El tiempo por turno crece {incremental_growth}x (máximo {args.max_growth}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
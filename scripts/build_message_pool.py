@@ -0,0 +1,59 @@
+# =====================================================
+# scripts/build_message_pool.py - Construir pool de mensajes
+# =====================================================
+"""
+Pregenerar variantes de los mensajes estáticos de generate_natural_message.
+
+Uso:
+    python scripts/build_message_pool.py [--variants 20] [--output scripts/message_pool.json]
+
+El pool se guarda en JSON con versión y hash de cada prompt; si un prompt
+cambia, sus variantes se ignoran en ejecución hasta regenerar el pool.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import get_settings
+from utils.llm.providers import get_llm
+from utils.llm.message_generator import build_message_prompts
+from utils.llm.message_pool import STATIC_MESSAGE_TYPES, build_message_pool
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("MessagePoolBuilder")
+
+
+async def main(variants: int, output: str) -> bool:
+    try:
+        pool = await build_message_pool(
+            get_llm(),
+            build_message_prompts({}),
+            output,
+            variants_per_type=variants,
+            message_types=list(STATIC_MESSAGE_TYPES)
+        )
+        empty = [tipo for tipo, items in pool["variants"].items() if not items]
+        if empty:
+            logger.warning(f"⚠️ Tipos sin variantes: {empty}")
+        return not empty
+    except Exception as e:
+        logger.error(f"❌ Error construyendo pool de mensajes: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pregenerar variantes de mensajes estáticos")
+    parser.add_argument("--variants", type=int, default=20, help="Variantes por tipo de mensaje")
+    parser.add_argument("--output", default=get_settings().llm.message_pool_path, help="Ruta del pool JSON")
+    args = parser.parse_args()
+
+    success = asyncio.run(main(args.variants, args.output))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,76 @@
+# =====================================================
+# scripts/llm_telemetry_report.py - Informe de telemetría LLM
+# =====================================================
+"""
+Resumen por nodo de una traza JSONL de llamadas al LLM
+(LLM_TELEMETRY_TRACE_PATH): latencia p50/p95/p99, tokens, reintentos y coste.
+
+Uso:
+    python scripts/llm_telemetry_report.py logs/llm_calls.jsonl [--session ID] [--since EPOCH] [--json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.llm.telemetry import summarize_records
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Leer la traza JSONL ignorando líneas corruptas (p.ej. escritura interrumpida)"""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Informe de latencia y tokens del LLM por nodo")
+    parser.add_argument("trace", help="Traza JSONL de llamadas al LLM")
+    parser.add_argument("--session", help="Filtrar por session_id")
+    parser.add_argument("--since", type=float, help="Solo llamadas posteriores a este timestamp (epoch)")
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    args = parser.parse_args()
+
+    records = load_records(args.trace)
+    if args.session:
+        records = [r for r in records if r.get("session_id") == args.session]
+    if args.since:
+        records = [r for r in records if r.get("timestamp", 0) >= args.since]
+
+    summary = summarize_records(records)
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    if not summary:
+        print("ℹ️ Sin llamadas en la traza")
+        return 0
+
+    print(f"📊 {len(records)} llamadas al LLM en {args.trace}")
+    header = f"{'nodo':<28} {'calls':>6} {'coal':>5} {'err':>4} {'retry':>5} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'prompt':>8} {'compl':>7} {'coste':>9}"
+    print(header)
+    print("-" * len(header))
+    for node, s in summary.items():
+        print(
+            f"{node[:28]:<28} {s['calls']:>6} {s['coalesced']:>5} {s['errors']:>4} {s['retries']:>5} "
+            f"{s['latency_p50']:>7.2f} {s['latency_p95']:>7.2f} {s['latency_p99']:>7.2f} "
+            f"{s['prompt_tokens']:>8} {s['completion_tokens']:>7} {s['cost']:>9.4f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# =====================================================
+# scripts/trace_summary.py - Camino crítico por turno
+# =====================================================
+"""
+Resumen de las trazas OTLP JSON de los turnos (LOG_TRACING_PATH): para cada
+turno, el camino crítico (turno → nodo → LLM/BD) con la duración de cada
+span y su tiempo propio, y al final el tiempo acumulado en el camino
+crítico por span.
+
+Uso:
+    python scripts/trace_summary.py logs/traces.jsonl [--session ID] [--last N] [--json]
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.tracing import critical_path, load_otlp_spans
+
+
+def summarize_turns(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Un resumen por traza (turno), en orden cronológico"""
+    by_trace: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        by_trace[span["trace_id"]].append(span)
+
+    turns = []
+    for trace_id, trace_spans in by_trace.items():
+        path = critical_path(trace_spans)
+        root = path[0]
+        turns.append({
+            "trace_id": trace_id,
+            "session_id": root["attributes"].get("session.id"),
+            "root": root["name"],
+            "start_ns": min(span["start_ns"] for span in trace_spans),
+            "duration_ms": round(root["duration_ms"], 3),
+            "spans": len(trace_spans),
+            "errors": sum(span["error"] for span in trace_spans),
+            "critical_path": [
+                {**step, "duration_ms": round(step["duration_ms"], 3), "self_ms": round(step["self_ms"], 3)}
+                for step in path
+            ],
+        })
+    return sorted(turns, key=lambda turn: turn["start_ns"])
+
+
+def critical_path_totals(turns: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Tiempo propio acumulado en el camino crítico por nombre de span"""
+    totals: Dict[str, float] = defaultdict(float)
+    for turn in turns:
+        for step in turn["critical_path"]:
+            totals[step["name"]] += step["self_ms"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Camino crítico por turno de las trazas OTLP JSON")
+    parser.add_argument("trace", help="Fichero JSONL de trazas (LOG_TRACING_PATH)")
+    parser.add_argument("--session", help="Filtrar por session.id")
+    parser.add_argument("--last", type=int, help="Mostrar solo los N últimos turnos")
+    parser.add_argument("--json", action="store_true", help="Salida JSON")
+    args = parser.parse_args()
+
+    with open(args.trace, "r", encoding="utf-8") as f:
+        turns = summarize_turns(load_otlp_spans(f))
+    if args.session:
+        turns = [turn for turn in turns if turn["session_id"] == args.session]
+    if args.last:
+        turns = turns[-args.last:]
+
+    totals = critical_path_totals(turns)
+
+    if args.json:
+        print(json.dumps({"turns": turns, "critical_path_totals_ms": totals}, ensure_ascii=False, indent=2))
+        return 0
+
+    if not turns:
+        print("ℹ️ Sin turnos en la traza")
+        return 0
+
+    for turn in turns:
+        errors = f" ❌ {turn['errors']} errores" if turn["errors"] else ""
+        print(f"\n🧭 Turno {turn['trace_id'][:8]} · sesión {turn['session_id']} · "
+              f"{turn['duration_ms']:.1f} ms · {turn['spans']} spans{errors}")
+        for step in turn["critical_path"]:
+            label = "  " * step["depth"] + step["name"]
+            route = step["attributes"].get("route")
+            suffix = f" → {route}" if route else ""
+            print(f"   {label:<40} {step['duration_ms']:>10.1f} ms  (propio {step['self_ms']:>8.1f} ms){suffix}")
+
+    print(f"\n📊 Tiempo propio en el camino crítico ({len(turns)} turnos)")
+    for name, total in totals.items():
+        print(f"   {name:<40} {total:>10.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# =====================================================
+# tests/test_checkpointer.py - Tests del checkpointer persistente y acotado
+# =====================================================
+
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from models.eroski_state import EroskiState
+from workflows.checkpointer import SQLiteCheckpointSaver, create_checkpointer, get_checkpointer, reset_checkpointer
+
+
+def build_graph(saver):
+    def respond(state: EroskiState):
+        return {
+            "messages": [AIMessage(content="respuesta")],
+            "flow_completed": len(state["messages"]) >= 3,
+            "current_node": "respond",
+        }
+
+    graph = StateGraph(EroskiState)
+    graph.add_node("respond", respond)
+    graph.add_edge(START, "respond")
+    graph.add_edge("respond", END)
+    return graph.compile(checkpointer=saver)
+
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def turn(*texts):
+    return {"messages": [HumanMessage(content=text) for text in texts]}
+
+
+def contents(state):
+    return [message.content for message in state.values["messages"]]
+
+
+class TestSQLiteCheckpointSaver:
+    """Persistencia, límite por hilo, caducidad y métricas"""
+
+    def test_state_survives_restart(self, tmp_path):
+        path = str(tmp_path / "checkpoints.sqlite")
+        graph = build_graph(SQLiteCheckpointSaver(path))
+        asyncio.run(graph.ainvoke(turn("hola"), config("s1")))
+
+        restarted = build_graph(SQLiteCheckpointSaver(path))
+        state = asyncio.run(restarted.aget_state(config("s1")))
+        assert contents(state) == ["hola", "respuesta"]
+        assert state.values["current_node"] == "respond"
+
+    def test_checkpoints_per_thread_are_capped(self):
+        saver = SQLiteCheckpointSaver(max_per_thread=3)
+        graph = build_graph(saver)
+        for _ in range(5):
+            graph.invoke(turn("hola"), config("s1"))
+
+        history = list(graph.get_state_history(config("s1")))
+        assert len(history) == 3
+        assert len(history[0].values["messages"]) == 10
+        assert len(history[-1].values["messages"]) == 8  # checkpoint de entrada del último turno
+        assert saver.get_stats()["trimmed_checkpoints"] > 0
+
+    def test_put_stores_only_changed_channels(self):
+        saver = SQLiteCheckpointSaver(max_per_thread=3)
+        graph = build_graph(saver)
+        graph.invoke(turn("hola"), config("s1"))
+        blobs = saver.get_stats()["blobs"]
+
+        graph.invoke(turn("otra"), config("s1"))
+        # Un turno escribe messages (entrada y respuesta), flow_completed y
+        # current_node, más los canales internos del grafo: no todo el estado
+        assert saver.get_stats()["blobs"] - blobs <= 6
+
+        # Las versiones que ya no usa ningún checkpoint conservado se borran
+        for _ in range(10):
+            graph.invoke(turn("hola"), config("s1"))
+        with saver._transaction() as cursor:
+            versions = cursor.execute(
+                "SELECT COUNT(*) FROM lg_blobs WHERE channel = 'messages'"
+            ).fetchone()[0]
+        assert versions <= 3
+        assert len(contents(graph.get_state(config("s1")))) == 24
+
+    def test_prune_removes_finished_and_idle_threads(self):
+        saver = SQLiteCheckpointSaver(idle_ttl_seconds=3600, finished_ttl_seconds=60)
+        graph = build_graph(saver)
+        graph.invoke(turn("a", "b", "c"), config("terminada"))
+        graph.invoke(turn("a"), config("activa"))
+
+        assert saver.prune(now=time.time() + 120) == 1
+        assert graph.get_state(config("terminada")).values == {}
+        assert contents(graph.get_state(config("activa"))) == ["a", "respuesta"]
+
+        assert saver.prune(now=time.time() + 7200) == 1
+        assert saver.get_stats()["threads"] == 0
+
+    def test_stats_report_stored_bytes(self):
+        saver = SQLiteCheckpointSaver()
+        graph = build_graph(saver)
+        graph.invoke(turn("hola"), config("s1"))
+        stats = saver.get_stats()
+
+        assert stats["backend"] == "memory"
+        assert stats["threads"] == 1
+        assert stats["stored_bytes"] == stats["checkpoint_bytes"] + stats["blob_bytes"] + stats["write_bytes"] > 0
+
+        saver.delete_thread("s1")
+        assert saver.get_stats()["stored_bytes"] == 0
+
+    def test_factory_uses_settings_backend(self, tmp_path):
+        from config.settings import get_settings
+        settings = get_settings().model_copy(deep=True)
+        settings.workflow.checkpointer_backend = "sqlite"
+        settings.workflow.checkpointer_sqlite_path = str(tmp_path / "db" / "checkpoints.sqlite")
+        settings.workflow.checkpointer_max_per_thread = 7
+
+        saver = create_checkpointer(settings)
+        assert saver.backend == "sqlite"
+        assert saver.max_per_thread == 7
+        assert (tmp_path / "db" / "checkpoints.sqlite").exists()
+
+    def test_async_methods_run_off_the_event_loop(self):
+        saver = SQLiteCheckpointSaver(":memory:")
+        graph = build_graph(saver)
+
+        async def run():
+            # Con el lock ocupado por otro hilo, el event loop sigue atendiendo
+            saver._lock.acquire()
+            try:
+                task = asyncio.ensure_future(graph.ainvoke(turn("hola"), config("s1")))
+                await asyncio.sleep(0.05)
+                assert not task.done()
+            finally:
+                saver._lock.release()
+            await task
+            return await saver.aget_stats()
+
+        assert asyncio.run(run())["threads"] == 1
+
+    def test_workflows_share_one_checkpointer(self):
+        from workflows.eroski_main_workflow import EroskiFinalWorkflow
+        reset_checkpointer()
+        try:
+            assert EroskiFinalWorkflow().memory is EroskiFinalWorkflow().memory is get_checkpointer()
+        finally:
+            reset_checkpointer()
@@ -0,0 +1,152 @@
+# =====================================================
+# tests/test_employee_prefetch.py - Tests del prefetch especulativo del empleado
+# =====================================================
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+
+import utils.database.connection_manager as connection_manager_module
+import utils.employee_prefetch as employee_prefetch
+from utils.database.connection_manager import ConnectionManager
+from utils.database.incidencia_repository import IncidenciaRepository
+from utils.employee_prefetch import EmployeePrefetcher, find_email
+from tests.test_fan_out import CountingDatabase, make_auth_node
+
+INCIDENCIA_ROW = {
+    "id": 1, "numero_ticket": "INC-20260101-0001", "tipo": "balanza",
+    "descripcion": "La balanza de la caja no pesa", "prioridad": "media", "estado": "abierta",
+    "fecha_creacion": datetime(2026, 1, 1, 9, 30), "fecha_actualizacion": datetime(2026, 1, 1, 9, 30),
+    "fecha_resolucion": None, "tiempo_resolucion_minutos": None, "intentos_resolucion": 0,
+    "nombre_empleado": "Ana", "email_empleado": "ana@eroski.es", "codigo_tienda": "T1",
+    "nombre_tienda": "Eroski Bilbao", "nombre_seccion": "Caja", "numero_serie_equipo": None,
+    "ubicacion_exacta": None, "solucion_aplicada": None, "escalado_a": None, "notas_internas": None,
+}
+
+
+class StubConnection:
+    """Conexión asyncpg falsa: registra las consultas y devuelve filas fijas"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        return self.rows
+
+
+class StubPool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.connection
+
+
+def stub_connection_manager(monkeypatch, rows):
+    """ConnectionManager con el IncidenciaRepository real sobre una conexión falsa"""
+    connection = StubConnection(rows)
+    manager = ConnectionManager()
+    repository = IncidenciaRepository(manager)
+    repository._pool = StubPool(connection)
+    manager._repositories["incidencia"] = repository
+    manager._initialized = True
+    monkeypatch.setattr(connection_manager_module, "_connection_manager", manager)
+    return connection
+
+
+class TestEmployeePrefetcher:
+    """Un futuro por (sesión, email) que consume la decisión del LLM"""
+
+    def test_start_is_idempotent_and_consume_pops_the_entry(self):
+        prefetcher = EmployeePrefetcher(recent_incidents_limit=0)
+        db = CountingDatabase()
+
+        async def scenario():
+            first = prefetcher.start("s1", "ana@eroski.es", db_auth=db)
+            assert prefetcher.start("s1", "ANA@eroski.es", db_auth=db) is first
+            result = await prefetcher.consume("s1", "Ana@Eroski.es")
+            return result, await prefetcher.consume("s1", "ana@eroski.es")
+
+        result, second = asyncio.run(scenario())
+        assert result["employee_lookup"]["found"] is True
+        assert second is None
+        assert db.lookups == ["ana@eroski.es"]
+        assert prefetcher.get_stats()["hits"] == 1
+
+    def test_unconsumed_entries_expire(self):
+        prefetcher = EmployeePrefetcher(ttl_seconds=0, recent_incidents_limit=0)
+
+        async def scenario():
+            stale = prefetcher.start("s1", "ana@eroski.es", db_auth=CountingDatabase())
+            await asyncio.sleep(0.001)
+            prefetcher.start("s2", "luis@eroski.es", db_auth=CountingDatabase())
+            await asyncio.sleep(0)
+            return stale
+
+        stale = asyncio.run(scenario())
+        assert stale.cancelled()
+        assert prefetcher.get_stats()["expired"] == 1
+
+    def test_find_email(self):
+        assert find_email("Soy Ana, ana.garcia@eroski.es, de Bilbao") == "ana.garcia@eroski.es"
+        assert find_email("Soy Ana de Bilbao") is None
+
+
+class TestAuthenticateConsumesPrefetch:
+    """authenticate recoge la búsqueda lanzada por la interfaz con las incidencias recientes"""
+
+    def teardown_method(self):
+        employee_prefetch.reset_employee_prefetcher()
+
+    def test_recent_incidents_go_through_the_repository(self, monkeypatch):
+        connection = stub_connection_manager(monkeypatch, [INCIDENCIA_ROW])
+
+        recent = asyncio.run(employee_prefetch.fetch_recent_incidents("ana@eroski.es", limit=3))
+
+        assert recent == [{
+            "numero_ticket": "INC-20260101-0001",
+            "tipo": "balanza",
+            "estado": "abierta",
+            "descripcion": "La balanza de la caja no pesa",
+            "fecha_creacion": "2026-01-01T09:30:00",
+        }]
+        query, args = connection.queries[0]
+        assert "WHERE email_empleado = $1" in query
+        assert args == ("ana@eroski.es", 3)
+
+    def test_prefetched_lookup_and_recent_incidents_reach_state(self, monkeypatch):
+        stub_connection_manager(monkeypatch, [INCIDENCIA_ROW])
+        employee_prefetch._employee_prefetcher = EmployeePrefetcher()
+        node = make_auth_node({
+            "is_complete": False,
+            "should_search_database": True,
+            "wants_to_cancel": False,
+            "extracted_data": {"email": "ana@eroski.es"},
+            "email_detected": True,
+            "next_action": "search_db",
+            "message_to_user": "Voy a buscarte",
+        })
+        state = {
+            "messages": [HumanMessage(content="Soy Ana, ana@eroski.es")],
+            "session_id": "s1",
+            "auth_conversation_started": True,
+            "auth_data_collected": {},
+            "attempts": 1,
+        }
+
+        async def scenario():
+            # La interfaz lanza la búsqueda antes de que el grafo llegue al nodo
+            employee_prefetch.get_employee_prefetcher().start("s1", "ana@eroski.es", db_auth=node.db_auth)
+            return await node.execute(state)
+
+        result = asyncio.run(scenario())
+
+        assert node.db_auth.lookups == ["ana@eroski.es"]
+        assert result.update["found_in_database"] is True
+        assert result.update["previous_tickets"] == ["INC-20260101-0001"]
+        assert result.update["employee_context"]["recent_incidents"][0]["tipo"] == "balanza"
@@ -0,0 +1,172 @@
+# =====================================================
+# tests/test_fan_out.py - Tests de las ramas paralelas dentro de un nodo
+# =====================================================
+
+import asyncio
+import json
+import threading
+import time
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import HumanMessage
+
+from nodes.authenticate_llm_driven import LLMDrivenAuthenticateNode
+from nodes.base_node import BaseNode, run_parallel
+import utils.employee_prefetch as employee_prefetch
+from utils.incident_helpers import (
+    IncidentPersistence, finish_incident_initialization, mark_incident_initializing, wait_for_incident_initialization
+)
+
+
+class TestRunParallel:
+    """Unión determinista: orden de declaración, todas las ramas esperadas"""
+
+    def test_branches_overlap_and_keep_declaration_order(self):
+        async def branch(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        async def scenario():
+            start = time.perf_counter()
+            results = await run_parallel({
+                "slow": branch("llm", 0.1),
+                "fast": branch("db", 0.08),
+                "sync": lambda: threading.current_thread() is threading.main_thread(),
+            })
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(scenario())
+        assert list(results.items()) == [("slow", "llm"), ("fast", "db"), ("sync", False)]
+        assert elapsed < 0.15
+
+    def test_first_declared_error_wins_after_all_branches_finish(self):
+        finished = []
+
+        async def fail(message, delay):
+            await asyncio.sleep(delay)
+            finished.append(message)
+            raise ValueError(message)
+
+        async def scenario():
+            return await run_parallel({"first": fail("first", 0.03), "second": fail("second", 0.0)})
+
+        try:
+            asyncio.run(scenario())
+        except ValueError as e:
+            assert str(e) == "first"
+        else:
+            raise AssertionError("run_parallel debía relanzar el error")
+        assert finished == ["second", "first"]
+
+
+class TestIncidentInitializationBarrier:
+    """Las escrituras de la clasificación esperan a la inicialización en paralelo"""
+
+    def test_update_waits_for_pending_initialization(self, tmp_path):
+        persistence = IncidentPersistence(tmp_path / "incidents.json")
+        state = {"auth_data_collected": {"name": "Ana", "email": "ana@eroski.es"}}
+        ticks = []
+
+        def initialize():
+            time.sleep(0.05)
+            persistence.initialize_incident(state, "ER-1234")
+
+        async def other_session():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        async def classify():
+            await wait_for_incident_initialization("ER-1234")
+            return persistence.update_incident("ER-1234", {"tipo_incidencia": "balanza"})
+
+        async def scenario():
+            mark_incident_initializing("ER-1234")
+            init = asyncio.create_task(asyncio.to_thread(initialize))
+            updated, _ = await asyncio.gather(classify(), other_session())
+            await init
+            return updated
+
+        start = time.perf_counter()
+        assert asyncio.run(scenario())
+        # La espera no bloquea el bucle: la otra sesión avanza durante la inicialización
+        assert ticks[-1] - start < 0.05
+
+        record = persistence.get_incident("ER-1234")
+        assert record["tipo_incidencia"] == "balanza"
+        assert record["nombre_empleado"] == "Ana"
+
+    def test_wait_times_out_without_cancelling_initialization(self):
+        mark_incident_initializing("ER-5678")
+        assert asyncio.run(wait_for_incident_initialization("ER-5678", timeout=0.01)) is False
+        finish_incident_initialization("ER-5678")
+        assert asyncio.run(wait_for_incident_initialization("ER-5678")) is True
+
+    def test_concurrent_writers_do_not_lose_records(self, tmp_path):
+        path = tmp_path / "incidents.json"
+        state = {"auth_data_collected": {"name": "Ana"}}
+        writers = [
+            threading.Thread(target=IncidentPersistence(path).initialize_incident, args=(state, f"ER-{i:04d}"))
+            for i in range(20)
+        ]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+
+        assert len(IncidentPersistence(path).get_all_incidents()) == 20
+        assert list(tmp_path.iterdir()) == [path]
+
+
+class CountingDatabase:
+    def __init__(self):
+        self.lookups = []
+
+    async def validate_employee(self, email):
+        self.lookups.append(email)
+        await asyncio.sleep(0.01)
+        return {"name": "Ana García", "email": email, "store_name": "Eroski Bilbao", "section": "Caja"}
+
+
+def make_auth_node(decision):
+    node = LLMDrivenAuthenticateNode.__new__(LLMDrivenAuthenticateNode)
+    BaseNode.__init__(node, "authenticate")
+    node.max_attempts = 5
+    node.required_fields = {"name": "", "email": "", "store_name": "", "section": ""}
+    node.db_auth = CountingDatabase()
+    node.llm = GenericFakeChatModel(messages=iter([json.dumps(decision)]))
+    node.conversation_prompt = node._build_conversation_prompt()
+    return node
+
+
+class TestAuthenticatePrefetch:
+    """La búsqueda en BD del email del mensaje se solapa con el LLM y se reutiliza"""
+
+    def setup_method(self):
+        employee_prefetch._employee_prefetcher = employee_prefetch.EmployeePrefetcher(recent_incidents_limit=0)
+
+    def teardown_method(self):
+        employee_prefetch.reset_employee_prefetcher()
+
+    def test_lookup_runs_once_alongside_llm(self):
+        node = make_auth_node({
+            "is_complete": False,
+            "should_search_database": True,
+            "wants_to_cancel": False,
+            "extracted_data": {"email": "Ana@Eroski.es"},
+            "email_detected": True,
+            "next_action": "search_db",
+            "message_to_user": "Voy a buscarte",
+        })
+        state = {
+            "messages": [HumanMessage(content="Hola, mi email es ana@eroski.es")],
+            "session_id": "s1",
+            "auth_conversation_started": True,
+            "auth_data_collected": {},
+            "attempts": 1,
+        }
+
+        result = asyncio.run(node.execute(state))
+
+        assert node.db_auth.lookups == ["ana@eroski.es"]
+        assert result.update["found_in_database"] is True
@@ -0,0 +1,76 @@
+# =====================================================
+# tests/test_graph_registry.py - Tests del registro de grafos compilados
+# =====================================================
+
+import threading
+
+from workflows.eroski_main_workflow import EroskiFinalWorkflow
+from workflows.graph_registry import CompiledGraphRegistry
+from workflows.workflow_manager import WorkflowType
+
+
+class CountingWorkflow(EroskiFinalWorkflow):
+    """Workflow principal que cuenta sus compilaciones"""
+
+    instances = 0
+    compilations = 0
+
+    def __init__(self):
+        super().__init__()
+        CountingWorkflow.instances += 1
+
+    def compile_with_checkpointer(self, checkpointer=None):
+        CountingWorkflow.compilations += 1
+        return super().compile_with_checkpointer(checkpointer)
+
+
+def make_registry():
+    CountingWorkflow.instances = 0
+    CountingWorkflow.compilations = 0
+    return CompiledGraphRegistry({WorkflowType.INCIDENCIA: CountingWorkflow})
+
+
+class TestCompiledGraphRegistry:
+    """Cada workflow se compila una sola vez por proceso"""
+
+    def test_graph_is_compiled_once_and_shared(self):
+        registry = make_registry()
+        first = registry.get(WorkflowType.INCIDENCIA)
+        second = registry.get("incidencia")
+
+        assert first is second
+        assert CountingWorkflow.instances == 1
+        assert CountingWorkflow.compilations == 1
+        assert registry.get_stats()["hits"] == 1
+
+    def test_concurrent_first_requests_compile_once(self):
+        registry = make_registry()
+        graphs = []
+        threads = [threading.Thread(target=lambda: graphs.append(registry.get())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(graph) for graph in graphs}) == 1
+        assert CountingWorkflow.compilations == 1
+
+    def test_warm_precompiles_and_clear_forces_recompile(self):
+        registry = make_registry()
+        timings = registry.warm()
+
+        assert "incidencia" in timings
+        assert registry.is_compiled(WorkflowType.INCIDENCIA)
+
+        registry.clear()
+        assert not registry.is_compiled(WorkflowType.INCIDENCIA)
+        registry.get()
+        assert CountingWorkflow.compilations == 2
+
+    def test_sessions_share_graph_but_not_state(self):
+        registry = make_registry()
+        graph = registry.get()
+        checkpointer = graph.checkpointer
+
+        assert checkpointer is registry.get().checkpointer
+        assert graph.get_state({"configurable": {"thread_id": "a"}}).values == {}
@@ -0,0 +1,77 @@
+# =====================================================
+# tests/test_history_compaction.py - Tests de la compactación del historial
+# =====================================================
+
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command
+
+from utils.llm.history import HistoryCompactor, merge_history_updates
+
+
+class SummaryChatModel:
+    """Chat model falso que devuelve un resumen fijo y registra los prompts"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        self.prompts.append(prompt)
+        return AIMessage(content=f"resumen {len(self.prompts)}")
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages += [HumanMessage(content=f"usuario {i}"), AIMessage(content=f"bot {i}")]
+    return messages
+
+
+class TestHistoryCompactor:
+    """Tests de la ventana de historial con resumen incremental"""
+
+    def test_short_history_is_verbatim(self):
+        compactor = HistoryCompactor(llm=SummaryChatModel(), window_messages=4, summary_batch=2)
+        state = {"messages": conversation(2)}
+
+        assert asyncio.run(compactor.compact(state)) == {}
+        assert compactor.format(state).splitlines() == [
+            "👤 Usuario: usuario 0", "🤖 Asistente: bot 0", "👤 Usuario: usuario 1", "🤖 Asistente: bot 1"
+        ]
+
+    def test_summary_only_updates_when_window_slides(self):
+        llm = SummaryChatModel()
+        compactor = HistoryCompactor(llm=llm, window_messages=4, summary_batch=4)
+
+        state = {"messages": conversation(4)}
+        updates = asyncio.run(compactor.compact(state))
+        assert updates == {"conversation_summary": "resumen 1", "summarized_message_count": 4}
+        assert "usuario 1" in llm.prompts[0] and "usuario 2" not in llm.prompts[0]
+
+        # Un turno más no desliza un lote completo: sin llamada al LLM
+        state = {**state, **updates, "messages": conversation(5)}
+        assert asyncio.run(compactor.compact(state)) == {}
+        assert len(llm.prompts) == 1
+
+        # El siguiente sí: el resumen anterior se pasa al LLM
+        state = {**state, "messages": conversation(6)}
+        updates = asyncio.run(compactor.compact(state))
+        assert updates["summarized_message_count"] == 8
+        assert "resumen 1" in llm.prompts[1]
+
+    def test_prompt_size_stays_bounded(self):
+        compactor = HistoryCompactor(llm=SummaryChatModel(), window_messages=4, summary_batch=2)
+        state = {"messages": [], "conversation_summary": None, "summarized_message_count": 0}
+        sizes = []
+        for turns in range(1, 40):
+            state = {**state, "messages": conversation(turns)}
+            state = {**state, **asyncio.run(compactor.compact(state))}
+            sizes.append(len(compactor.format(state).splitlines()))
+        assert max(sizes) <= 1 + 1 + 4 + 2
+
+    def test_merge_updates_into_command(self):
+        command = Command(update={"current_step": "classify"}, goto="classify")
+        merged = merge_history_updates(command, {"conversation_summary": "resumen"})
+        assert merged.update == {"current_step": "classify", "conversation_summary": "resumen"}
+        assert merged.goto == "classify"
@@ -0,0 +1,80 @@
+# =====================================================
+# tests/test_import_time.py - Tests del arranque perezoso
+# =====================================================
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from workflows.workflow_manager import WorkflowManager, WorkflowType
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def modules_loaded_by(code: str) -> set:
+    """Módulos cargados tras ejecutar `code` en un intérprete nuevo"""
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+class TestLazyImports:
+    """Importar utilidades ligeras no arrastra el LLM, la BD ni los workflows"""
+
+    def test_light_modules_skip_llm_db_and_workflows(self):
+        loaded = modules_loaded_by(
+            "import utils.tracing, utils.employee_prefetch, workflows.graph_registry\n"
+            "from workflows.workflow_manager import WorkflowManager\n"
+            "WorkflowManager()"
+        )
+        assert not {"langchain_openai", "openai", "asyncpg"} & loaded
+        assert "workflows.eroski_main_workflow" not in loaded
+        assert "nodes.authenticate_llm_driven" not in loaded
+
+    def test_lazy_exports_still_resolve(self):
+        import nodes
+        import utils
+        import workflows
+        from nodes.base_node import BaseNode
+        from utils.llm.providers import get_llm
+
+        assert utils.get_llm is get_llm
+        assert nodes.BaseNode is BaseNode
+        assert workflows.BaseWorkflow.__name__ == "BaseWorkflow"
+        assert "IncidenciaRepository" in dir(utils)
+
+
+class TestLazyWorkflowRegistration:
+    """Cada workflow se instancia en su primer uso"""
+
+    def test_factory_runs_on_first_use_and_errors_are_recorded(self):
+        created = []
+
+        class DummyWorkflow:
+            name = "consulta"
+            build_graph = get_entry_point = get_workflow_description = None
+
+        def factory():
+            created.append(1)
+            return DummyWorkflow()
+
+        manager = WorkflowManager({
+            WorkflowType.CONSULTA: factory,
+            WorkflowType.ESCALACION: ("workflows.no_existe", "NoExiste"),
+        })
+        assert created == []
+        assert manager.is_available(WorkflowType.CONSULTA)
+
+        assert manager.get_workflow("consulta") is manager.get_workflow(WorkflowType.CONSULTA)
+        assert created == [1]
+
+        try:
+            manager.get_workflow(WorkflowType.ESCALACION)
+        except ValueError as e:
+            assert "ImportError" in str(e)
+        else:
+            raise AssertionError("get_workflow debía fallar")
+        assert WorkflowType.ESCALACION not in manager.list_workflows()
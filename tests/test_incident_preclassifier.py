@@ -0,0 +1,106 @@
+# =====================================================
+# tests/test_incident_preclassifier.py - Tests del preclasificador local
+# =====================================================
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.incident_preclassifier import get_incident_preclassifier, preclassify_messages, tokenize
+from utils.two_phase_classifier import TwoPhaseClassifier
+
+
+class TestIncidentPreClassifier:
+    """Tests del índice BM25 y la confianza calibrada"""
+
+    def test_tokenize_folds_accents_and_stems(self):
+        assert tokenize("La báscula NO imprime") == ["bascul", "imprim"]
+
+    def test_detects_obvious_type(self):
+        result = get_incident_preclassifier().classify("la balanza no imprime etiquetas")
+        assert result.incident_type == "balanza"
+        assert result.confidence >= 0.85
+        assert result.matched_terms
+
+    def test_greeting_is_not_classified(self):
+        result = get_incident_preclassifier().classify("hola buenos días")
+        assert result.incident_type is None
+
+    def test_uses_history_when_last_message_is_vague(self):
+        result = preclassify_messages(["la balanza no imprime etiquetas", "sí, eso es"])
+        assert result.incident_type == "balanza"
+
+
+class TestLocalPhase1:
+    """Tests del atajo de la FASE 1 en TwoPhaseClassifier"""
+
+    def _classifier(self):
+        with patch("utils.two_phase_classifier.get_llm", return_value=None):
+            return TwoPhaseClassifier()
+
+    def test_confident_match_skips_llm(self):
+        state = {"messages": [AIMessage(content="¿Qué ocurre?"), HumanMessage(content="la balanza no imprime etiquetas")]}
+        decision = self._classifier()._try_local_phase_1(state)
+        assert decision is not None
+        assert decision.incident_type == "balanza"
+        assert decision.reasoning == "Preclasificador local BM25"
+
+    def test_vague_message_falls_back_to_llm(self):
+        state = {"messages": [HumanMessage(content="necesito ayuda con una cosa")]}
+        assert self._classifier()._try_local_phase_1(state) is None
+
+
+class SlowPhasesChatModel:
+    """Chat model falso: FASE 1 decide 'tpv', FASE 2 tarda y registra cancelaciones"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.cancelled = []
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        if "MISIÓN FASE 1" in prompt:
+            await asyncio.sleep(self.delay)
+            return AIMessage(content=json.dumps({
+                "incident_type_identified": True, "incident_type": "tpv", "confidence_level": 0.9,
+                "reasoning": "cobro", "needs_clarification": False
+            }))
+
+        incident_type = prompt.split("dentro de ")[1].split(".")[0]
+        try:
+            await asyncio.sleep(self.delay * 1.5)
+        except asyncio.CancelledError:
+            self.cancelled.append(incident_type)
+            raise
+        return AIMessage(content=json.dumps({
+            "problem_identified": True, "specific_problem": f"fallo {incident_type}",
+            "problem_description": f"fallo {incident_type}", "solution_available": False,
+            "proposed_solution": None, "confidence_level": 0.8, "next_action": "ask_details"
+        }))
+
+
+class TestSpeculativePhase2:
+    """Tests de la FASE 2 especulativa en paralelo con la FASE 1"""
+
+    def test_reuses_winner_and_cancels_losers(self):
+        llm = SlowPhasesChatModel()
+        with patch("utils.two_phase_classifier.get_llm", return_value=llm):
+            classifier = TwoPhaseClassifier()
+
+        processed = AsyncMock(return_value="command")
+        state = {"messages": [HumanMessage(content="no puedo cobrar ni imprimir el ticket")]}
+
+        with patch.object(classifier, "_execute_phase_2_with_state", processed):
+            start = time.perf_counter()
+            result = asyncio.run(classifier._classify_speculative(state, ["tpv", "impresora"]))
+            elapsed = time.perf_counter() - start
+
+        assert result == "command"
+        updated_state, phase2_result = processed.call_args.args
+        assert updated_state["incident_type"] == "tpv"
+        assert phase2_result.specific_problem == "fallo tpv"
+        assert llm.cancelled == ["impresora"]
+        # FASE 1 y FASE 2 solapadas: ~max(fase1, fase2) en lugar de la suma
+        assert elapsed < llm.delay * 2
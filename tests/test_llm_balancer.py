@@ -0,0 +1,69 @@
+# =====================================================
+# tests/test_llm_balancer.py - Tests del balanceo entre deployments
+# =====================================================
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from utils.llm.balancer import BalancedChatModel, BalancerTarget
+
+
+class FakeDeployment:
+    """Deployment falso con latencia y fallos configurables"""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise asyncio.TimeoutError()
+        return AIMessage(content=self.name)
+
+
+def make_balancer(*deployments, **kwargs):
+    targets = [BalancerTarget(name=d.name, client=d, weight=getattr(d, "weight", 1.0)) for d in deployments]
+    return BalancedChatModel(targets, **kwargs)
+
+
+class TestBalancedChatModel:
+
+    @pytest.mark.asyncio
+    async def test_least_outstanding_spreads_concurrent_load(self):
+        west, north = FakeDeployment("west", delay=0.01), FakeDeployment("north", delay=0.01)
+        balancer = make_balancer(west, north)
+
+        await asyncio.gather(*(balancer.ainvoke("hola") for _ in range(10)))
+
+        assert west.calls == 5
+        assert north.calls == 5
+
+    @pytest.mark.asyncio
+    async def test_failover_and_ejection(self):
+        broken, healthy = FakeDeployment("broken", fail=True), FakeDeployment("healthy")
+        balancer = make_balancer(broken, healthy, eject_after_failures=1, cooldown_seconds=60)
+
+        responses = [await balancer.ainvoke("hola") for _ in range(4)]
+
+        assert all(r.content == "healthy" for r in responses)
+        assert broken.calls == 1
+        stats = balancer.get_stats()
+        assert stats["targets"]["broken"]["available"] is False
+        assert stats["targets"]["broken"]["ejections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_triggers_failover(self):
+        slow, fast = FakeDeployment("slow", delay=1.0), FakeDeployment("fast")
+        slow.weight = 10.0
+        balancer = make_balancer(slow, fast, failover_timeout=0.05)
+
+        response = await balancer.ainvoke("hola")
+
+        assert response.content == "fast"
+        assert balancer.get_stats()["failovers"] == 1
@@ -0,0 +1,77 @@
+# =====================================================
+# tests/test_llm_cache.py - Tests del cache de respuestas LLM
+# =====================================================
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from utils.llm.cache import LLMResponseCache, CachedChatModel
+
+
+class FakeChatModel:
+    """Chat model mínimo que cuenta las llamadas"""
+
+    deployment_name = "gpt-test"
+    temperature = 0.7
+    max_tokens = 200
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls += 1
+        return AIMessage(content=f"respuesta {self.calls}")
+
+
+class TestLLMResponseCache:
+
+    @pytest.mark.asyncio
+    async def test_identical_prompt_hits_cache(self):
+        fake = FakeChatModel()
+        llm = CachedChatModel(fake, LLMResponseCache(max_entries=10))
+
+        first = await llm.ainvoke("Hola, soy Juan")
+        second = await llm.ainvoke("Hola, soy Juan")
+
+        assert fake.calls == 1
+        assert first.content == second.content
+        assert llm.cache.get_stats()["hits"] == 1
+        assert llm.cache.get_stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_generation_params_are_part_of_key(self):
+        fake = FakeChatModel()
+        llm = CachedChatModel(fake, LLMResponseCache(max_entries=10))
+
+        await llm.ainvoke("Hola")
+        fake.temperature = 0.0
+        await llm.ainvoke("Hola")
+
+        assert fake.calls == 2
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LLMResponseCache(max_entries=2, ttl_seconds=0)
+        for i in range(3):
+            cache.set(f"k{i}", AIMessage(content=str(i)))
+
+        assert cache.get("k0") is None
+        assert cache.get("k2").content == "2"
+        assert cache.get_stats()["evictions"] == 1
+
+        cache.ttl_seconds = 1
+        cache._memory["k2"] = (0.0, cache._memory["k2"][1])
+        assert cache.get("k2") is None
+        assert cache.stats["expired"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sqlite_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "llm_cache.sqlite3")
+        fake = FakeChatModel()
+
+        await CachedChatModel(fake, LLMResponseCache(sqlite_path=path)).ainvoke("¿Cómo reinicio el TPV?")
+        restarted = CachedChatModel(fake, LLMResponseCache(sqlite_path=path))
+        response = await restarted.ainvoke("¿Cómo reinicio el TPV?")
+
+        assert fake.calls == 1
+        assert response.content == "respuesta 1"
+        assert restarted.cache.get_stats()["sqlite_hits"] == 1
@@ -0,0 +1,138 @@
+# =====================================================
+# tests/test_llm_circuit_breaker.py - Tests del circuit breaker del LLM
+# =====================================================
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.llm.circuit_breaker import (
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN,
+    CircuitBreaker, CircuitBreakerChatModel, LLMCircuitOpenError, is_transient_error
+)
+from utils.two_phase_classifier import TwoPhaseClassifier
+
+
+class FlakyChatModel:
+    """Chat model falso que falla mientras `failing` sea True"""
+
+    def __init__(self, failing=True):
+        self.failing = failing
+        self.calls = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise TimeoutError("Azure no responde")
+        return AIMessage(content="ok")
+
+
+def open_breaker(llm, breaker):
+    wrapped = CircuitBreakerChatModel(llm, breaker)
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(TimeoutError):
+            asyncio.run(wrapped.ainvoke("hola"))
+    return wrapped
+
+
+class TestCircuitBreaker:
+    """Tests de la máquina de estados"""
+
+    def test_opens_after_consecutive_failures_and_short_circuits(self):
+        llm = FlakyChatModel()
+        breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=60)
+        wrapped = open_breaker(llm, breaker)
+
+        assert breaker.state == STATE_OPEN
+        start = time.perf_counter()
+        with pytest.raises(LLMCircuitOpenError):
+            asyncio.run(wrapped.ainvoke("hola"))
+        assert time.perf_counter() - start < 0.05
+        assert llm.calls == 3
+        assert breaker.get_stats()["short_circuited"] == 1
+
+    def test_half_open_probe_closes_on_success(self):
+        llm = FlakyChatModel()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.01)
+        wrapped = open_breaker(llm, breaker)
+
+        time.sleep(0.02)
+        llm.failing = False
+        assert asyncio.run(wrapped.ainvoke("hola")).content == "ok"
+        assert breaker.state == STATE_CLOSED
+
+    def test_half_open_probe_failure_reopens(self):
+        llm = FlakyChatModel()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.01)
+        wrapped = open_breaker(llm, breaker)
+
+        time.sleep(0.02)
+        assert breaker.allow()
+        assert breaker.state == STATE_HALF_OPEN
+        # Solo una prueba a la vez
+        assert not breaker.allow()
+        breaker.record_failure(TimeoutError())
+        assert breaker.state == STATE_OPEN
+
+
+def api_error(error_class, status_code):
+    request = httpx.Request("POST", "https://azure.example/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    return error_class("error", response=response, body=None)
+
+
+class TestErrorClassification:
+    """Solo los fallos del servicio abren el circuito"""
+
+    def test_transient_errors(self):
+        request = httpx.Request("POST", "https://azure.example/chat/completions")
+        assert is_transient_error(TimeoutError())
+        assert is_transient_error(openai.APITimeoutError(request=request))
+        assert is_transient_error(openai.APIConnectionError(request=request))
+        assert is_transient_error(api_error(openai.RateLimitError, 429))
+        assert is_transient_error(api_error(openai.InternalServerError, 503))
+        assert not is_transient_error(api_error(openai.BadRequestError, 400))
+        assert not is_transient_error(ValueError("prompt mal formado"))
+
+    def test_bad_requests_do_not_open_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60)
+        breaker.record_error(TimeoutError())
+        breaker.record_error(api_error(openai.BadRequestError, 400))  # Azure responde: racha reiniciada
+        breaker.record_error(TimeoutError())
+        for _ in range(5):
+            breaker.record_error(api_error(openai.BadRequestError, 400))
+            breaker.record_error(KeyError("local"))
+
+        assert breaker.state == STATE_CLOSED
+        assert breaker.get_stats()["ignored_errors"] == 11
+
+
+class TestDegradedClassification:
+    """Con el circuito abierto, la clasificación usa reglas sin esperar al LLM"""
+
+    def _classifier(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+        breaker.record_failure(TimeoutError())
+        llm = CircuitBreakerChatModel(FlakyChatModel(), breaker)
+        with patch("utils.two_phase_classifier.get_llm", return_value=llm):
+            return TwoPhaseClassifier()
+
+    def test_phase_1_uses_preclassifier(self):
+        state = {"messages": [HumanMessage(content="la balanza no imprime las etiquetas")]}
+        decision = asyncio.run(self._classifier()._execute_phase_1(state))
+        assert decision.incident_type_identified
+        assert decision.incident_type == "balanza"
+
+    def test_phase_2_uses_keyword_catalog(self):
+        state = {
+            "incident_type": "balanza",
+            "messages": [HumanMessage(content="la balanza no imprime las etiquetas")]
+        }
+        decision = asyncio.run(self._classifier()._execute_phase_2(state))
+        assert decision.next_action == "provide_solution"
+        assert decision.specific_problem == "La Balanza no imprime las Etiquetas"
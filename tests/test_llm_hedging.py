@@ -0,0 +1,145 @@
+# =====================================================
+# tests/test_llm_hedging.py - Tests del hedging de peticiones LLM
+# =====================================================
+
+import asyncio
+import time
+
+from typing import List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from utils.llm.hedging import HedgedChatModel
+from utils.llm.streaming import STREAM_TO_USER_TAG, UserFacingStreamFilter
+from utils.llm.telemetry import llm_call_context
+
+
+class DelayedChatModel:
+    """Chat model falso con un retardo por llamada"""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return AIMessage(content=f"respuesta tras {delay}")
+
+
+class StreamingDelayedChatModel(BaseChatModel):
+    """Chat model falso que emite chunks con un retardo antes de cada uno"""
+
+    scripts: List[List[tuple]]
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-delayed"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        script = self.scripts[min(self.calls, len(self.scripts) - 1)]
+        self.calls += 1
+        for delay, text in script:
+            await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = "".join([chunk.text async for chunk in self._astream(messages)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def warm_up(hedged, samples):
+    async def run():
+        with llm_call_context(node="classify"):
+            for _ in range(samples):
+                await hedged.ainvoke("hola")
+    asyncio.run(run())
+
+
+async def timed_call(hedged):
+    with llm_call_context(node="classify"):
+        start = time.perf_counter()
+        response = await hedged.ainvoke("hola")
+        return response, time.perf_counter() - start
+
+
+class TestHedgedChatModel:
+    """Tests de la política de hedging"""
+
+    def test_slow_call_is_hedged_and_loser_cancelled(self):
+        llm = DelayedChatModel([0.01] * 10 + [2.0, 0.01])
+        hedged = HedgedChatModel(llm, min_samples=10, min_delay_seconds=0.05, max_hedge_ratio=0.5)
+        warm_up(hedged, 10)
+
+        response, elapsed = asyncio.run(timed_call(hedged))
+
+        assert response.content == "respuesta tras 0.01"
+        assert elapsed < 0.5
+        assert llm.cancelled == 1
+        assert hedged.stats["hedged"] == 1
+        assert hedged.stats["hedge_wins"] == 1
+
+    def test_no_hedge_without_enough_samples(self):
+        llm = DelayedChatModel([0.2, 0.01])
+        hedged = HedgedChatModel(llm, min_samples=10, min_delay_seconds=0.01)
+
+        response, _ = asyncio.run(timed_call(hedged))
+
+        assert response.content == "respuesta tras 0.2"
+        assert llm.calls == 1
+
+    def test_hedge_rate_is_capped(self):
+        llm = DelayedChatModel([0.01] * 10 + [0.2, 0.01])
+        hedged = HedgedChatModel(llm, min_samples=10, min_delay_seconds=0.02, max_hedge_ratio=0.0)
+        warm_up(hedged, 10)
+
+        response, _ = asyncio.run(timed_call(hedged))
+
+        assert response.content == "respuesta tras 0.2"
+        assert hedged.stats["hedged"] == 0
+        assert hedged.stats["skipped_by_cap"] == 1
+        assert hedged.get_stats()["hedge_rate"] == 0.0
+
+    def test_hedge_tokens_are_not_streamed_to_user(self):
+        fast = [(0.0, "respuesta rápida")]
+        llm = StreamingDelayedChatModel(scripts=[fast] * 10 + [[(0.0, "Hola, "), (2.0, "lenta")], fast])
+        hedged = HedgedChatModel(llm, min_samples=10, min_delay_seconds=0.05, max_hedge_ratio=0.5)
+        warm_up(hedged, 10)
+
+        async def node(_):
+            with llm_call_context(node="classify"):
+                return await hedged.ainvoke("hola")
+
+        async def stream():
+            stream_filter = UserFacingStreamFilter()
+            streamed = ""
+            runnable = RunnableLambda(node).with_config(tags=[STREAM_TO_USER_TAG])
+            async for event in runnable.astream_events("hola", version="v2"):
+                if event["event"] == "on_chat_model_stream":
+                    streamed += stream_filter.feed(event["run_id"], event["data"]["chunk"].content, event["tags"])
+                elif event["event"] == "on_chain_end" and event["name"] == "node":
+                    result = event["data"]["output"]
+            return streamed, result
+
+        streamed, result = asyncio.run(stream())
+
+        assert result.content == "respuesta rápida"
+        assert hedged.stats["hedge_wins"] == 1
+        # Solo se muestra la llamada original, sin intercalar la copia
+        assert streamed == "Hola, "
@@ -0,0 +1,89 @@
+# =====================================================
+# tests/test_llm_http_client.py - Tests del cliente HTTP compartido
+# =====================================================
+
+import asyncio
+
+import httpx
+
+from config.settings import get_settings, AzureDeploymentTarget
+from utils.llm import http_client
+from utils.llm.http_client import azure_endpoints, get_async_http_client, get_http_client, warm_up_connections
+from utils.llm.providers import _create_azure_client
+
+
+class TestSharedHTTPClient:
+    """El pool HTTP se comparte entre todos los clientes de Azure"""
+
+    def setup_method(self):
+        http_client.reset_http_clients()
+
+    def teardown_method(self):
+        http_client.reset_http_clients()
+
+    def test_clients_are_singletons(self):
+        assert get_http_client() is get_http_client()
+        assert get_async_http_client() is get_async_http_client()
+
+    def test_azure_clients_share_the_pool(self):
+        settings = get_settings().model_copy(deep=True)
+        settings.llm.azure_openai_api_key = "test-key"
+        settings.llm.azure_openai_endpoint = "https://eroski-we.openai.azure.com"
+        first = _create_azure_client(settings)
+        second = _create_azure_client(settings, AzureDeploymentTarget(
+            endpoint="https://eroski-ne.openai.azure.com", deployment="gpt4"
+        ))
+
+        assert first.http_async_client is second.http_async_client is get_async_http_client()
+        assert first.http_client is second.http_client is get_http_client()
+
+    def test_endpoints_are_deduplicated(self):
+        settings = get_settings().model_copy(deep=True)
+        settings.llm.azure_openai_api_key = "test-key"
+        settings.llm.azure_targets = [
+            AzureDeploymentTarget(endpoint="https://eroski-we.openai.azure.com/", deployment="gpt4"),
+            AzureDeploymentTarget(endpoint="https://eroski-we.openai.azure.com", deployment="gpt4-mini"),
+            AzureDeploymentTarget(endpoint="https://eroski-ne.openai.azure.com", deployment="gpt4"),
+        ]
+
+        endpoints = [e["endpoint"] for e in azure_endpoints(settings)]
+        assert endpoints == ["https://eroski-we.openai.azure.com", "https://eroski-ne.openai.azure.com"]
+
+
+class TestWarmUp:
+    """El precalentamiento abre conexiones y tolera endpoints caídos"""
+
+    def teardown_method(self):
+        http_client.reset_http_clients()
+
+    def test_warm_up_ignores_status_and_tolerates_errors(self):
+        requested = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request)
+            if request.url.host == "eroski-ne.openai.azure.com":
+                raise httpx.ConnectError("sin conexión", request=request)
+            return httpx.Response(401)
+
+        settings = get_settings().model_copy(deep=True)
+        settings.llm.azure_openai_api_key = "test-key"
+        settings.llm.azure_targets = [
+            AzureDeploymentTarget(endpoint="https://eroski-we.openai.azure.com", deployment="gpt4"),
+            AzureDeploymentTarget(endpoint="https://eroski-ne.openai.azure.com", deployment="gpt4"),
+        ]
+
+        async def run():
+            http_client._async_http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await warm_up_connections(settings)
+            finally:
+                await http_client.close_http_clients()
+
+        warmed = asyncio.run(run())
+
+        assert warmed == {
+            "https://eroski-we.openai.azure.com": True,
+            "https://eroski-ne.openai.azure.com": False,
+        }
+        assert requested[0].headers["api-key"] == "test-key"
+        assert requested[0].url.path == "/openai/models"
@@ -0,0 +1,121 @@
+# =====================================================
+# tests/test_llm_replay.py - Tests de grabación/reproducción del LLM
+# =====================================================
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from config.settings import get_settings
+from utils.llm.replay import (
+    LATENCY_FIXED, LATENCY_NONE, LATENCY_RECORDED,
+    LLMCassette, LLMReplayMissError, RecordingChatModel, ReplayChatModel,
+    as_messages, cassette_key, create_replay_llm
+)
+from utils.llm.telemetry import LLMTelemetry, llm_call_context
+
+
+class EchoChatModel:
+    """Chat model falso que responde con el último mensaje"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        text = llm_input if isinstance(llm_input, str) else llm_input[-1].content
+        return AIMessage(content=f"eco: {text}", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10})
+
+
+class TestRecordReplay:
+    """Lo grabado se reproduce igual, sin llamar al modelo real"""
+
+    def test_round_trip_through_cassette_file(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        recorder = RecordingChatModel(EchoChatModel(delay=0.02), LLMCassette(path))
+
+        async def record():
+            with llm_call_context(node="classify_incident"):
+                await recorder.ainvoke("la impresora no imprime")
+                await recorder.ainvoke([SystemMessage(content="Eres soporte"), HumanMessage(content="sin red")])
+
+        asyncio.run(record())
+
+        replay = ReplayChatModel(cassette=LLMCassette(path), latency_mode=LATENCY_NONE)
+        first = asyncio.run(replay.ainvoke("la impresora no imprime"))
+        second = replay.invoke([SystemMessage(content="Eres soporte"), HumanMessage(content="sin red")])
+
+        assert first.content == "eco: la impresora no imprime"
+        assert first.usage_metadata["output_tokens"] == 3
+        assert second.content == "eco: sin red"
+        assert replay.get_stats()["hits"] == 2
+        assert LLMCassette(path).latencies()[0] >= 0.02
+
+    def test_repeated_prompt_replays_in_order(self):
+        cassette = LLMCassette()
+        key = cassette_key(as_messages("hola"))
+        cassette.record(key, AIMessage(content="primera"), 0.0)
+        cassette.record(key, AIMessage(content="segunda"), 0.0)
+
+        replay = ReplayChatModel(cassette=cassette, latency_mode=LATENCY_NONE)
+        answers = [replay.invoke("hola").content for _ in range(3)]
+        assert answers == ["primera", "segunda", "primera"]
+
+    def test_miss_raises_or_uses_default(self):
+        strict = ReplayChatModel(cassette=LLMCassette(), latency_mode=LATENCY_NONE)
+        with pytest.raises(LLMReplayMissError):
+            strict.invoke("no grabado")
+
+        lenient = ReplayChatModel(cassette=LLMCassette(), latency_mode=LATENCY_NONE, miss_response="{}")
+        assert lenient.invoke("no grabado").content == "{}"
+        assert lenient.get_stats()["misses"] == 1
+
+
+class TestReplayLatency:
+    """Latencia simulada"""
+
+    def test_recorded_latency_is_scaled(self):
+        cassette = LLMCassette()
+        cassette.record(cassette_key(as_messages("hola")), AIMessage(content="x"), 0.1)
+
+        replay = ReplayChatModel(cassette=cassette, latency_mode=LATENCY_RECORDED, latency_scale=0.5)
+        start = time.perf_counter()
+        asyncio.run(replay.ainvoke("hola"))
+        assert 0.05 <= time.perf_counter() - start < 0.1
+
+    def test_fixed_latency(self):
+        replay = ReplayChatModel(
+            cassette=LLMCassette(), latency_mode=LATENCY_FIXED, latency_seconds=0.05, miss_response="ok"
+        )
+        start = time.perf_counter()
+        asyncio.run(replay.ainvoke("hola"))
+        assert time.perf_counter() - start >= 0.05
+
+
+class TestReplayTelemetry:
+    """El modelo de reproducción pasa por el callback de telemetría"""
+
+    def test_replay_calls_are_recorded_by_node(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        asyncio.run(RecordingChatModel(EchoChatModel(), LLMCassette(path)).ainvoke("hola"))
+
+        settings = get_settings().model_copy(deep=True)
+        settings.llm.replay_cassette_path = path
+        settings.llm.replay_latency_mode = LATENCY_NONE
+        settings.llm.telemetry_enabled = False
+        replay = create_replay_llm(settings)
+
+        telemetry = LLMTelemetry()
+
+        async def run():
+            with llm_call_context(node="authenticate", session_id="s1"):
+                await replay.ainvoke("hola", config={"callbacks": [telemetry.callback]})
+
+        asyncio.run(run())
+
+        record = telemetry.records[-1]
+        assert record.node == "authenticate"
+        assert record.status == "ok"
+        assert record.prompt_tokens == 7
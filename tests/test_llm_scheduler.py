@@ -0,0 +1,75 @@
+# =====================================================
+# tests/test_llm_scheduler.py - Tests del planificador de llamadas LLM
+# =====================================================
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from models.eroski_state import UrgencyLevel
+from utils.llm.scheduler import (
+    LLMScheduler, PRIORITY_URGENT, PRIORITY_NORMAL, PRIORITY_LOW, priority_from_state
+)
+
+
+class TestPriorityFromState:
+
+    def test_urgency_level_enum(self):
+        assert priority_from_state({"authenticated": True, "urgency_level": UrgencyLevel.CRITICA}) == PRIORITY_URGENT
+        assert priority_from_state({"authenticated": True, "urgency_level": UrgencyLevel.MEDIA}) == PRIORITY_NORMAL
+
+    def test_unauthenticated_is_low(self):
+        assert priority_from_state({}) == PRIORITY_LOW
+        assert priority_from_state({"authenticated": False}) == PRIORITY_LOW
+
+
+class TestLLMScheduler:
+
+    @pytest.mark.asyncio
+    async def test_urgent_requests_jump_the_queue(self):
+        scheduler = LLMScheduler(max_concurrency=1, requests_per_minute=60000, burst=100)
+        order = []
+        gate = asyncio.Event()
+
+        async def call(label):
+            if label == "first":
+                await gate.wait()
+            order.append(label)
+            return label
+
+        first = asyncio.create_task(scheduler.run(lambda: call("first"), PRIORITY_LOW))
+        await asyncio.sleep(0)
+        low = asyncio.create_task(scheduler.run(lambda: call("low"), PRIORITY_LOW))
+        urgent = asyncio.create_task(scheduler.run(lambda: call("urgent"), PRIORITY_URGENT))
+        await asyncio.sleep(0)
+
+        assert scheduler.get_stats()["queue_depth"] == 2
+        gate.set()
+        await asyncio.gather(first, low, urgent)
+
+        assert order == ["first", "urgent", "low"]
+        stats = scheduler.get_stats()
+        assert stats["max_queue_depth"] == 2
+        assert stats["completed"] == 3
+        assert stats["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_is_retried_and_slows_down(self):
+        scheduler = LLMScheduler(max_concurrency=2, requests_per_minute=60000, burst=100)
+        request = httpx.Request("POST", "https://eroski.openai.azure.com")
+        response = httpx.Response(429, headers={"retry-after-ms": "10"}, request=request)
+        attempts = {"count": 0}
+
+        async def call():
+            attempts["count"] += 1
+            if attempts["count"] == 1:
+                raise openai.RateLimitError("429", response=response, body=None)
+            return "ok"
+
+        assert await scheduler.run(call) == "ok"
+        stats = scheduler.get_stats()
+        assert stats["rate_limited"] == 1
+        assert stats["retries"] == 1
+        assert stats["current_requests_per_minute"] < 60000
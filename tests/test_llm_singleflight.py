@@ -0,0 +1,129 @@
+# =====================================================
+# tests/test_llm_singleflight.py - Tests de coalescencia de peticiones
+# =====================================================
+
+import asyncio
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from langchain_core.tracers._streaming import _StreamingCallbackHandler
+
+from utils.llm.scheduler import PRIORITY_URGENT, PRIORITY_NORMAL, llm_priority_scope
+from utils.llm.singleflight import SingleFlightChatModel
+from utils.llm.streaming import STREAM_TO_USER_TAG
+from utils.llm.telemetry import LLMTelemetry, llm_call_context
+
+
+class SlowChatModel:
+    """Chat model falso con latencia fija"""
+
+    deployment_name = "gpt-test"
+    temperature = 0.7
+    max_tokens = 200
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return AIMessage(content=f"¿Cuál es tu email corporativo? ({llm_input})")
+
+
+class StreamingHandler(BaseCallbackHandler, _StreamingCallbackHandler):
+    """Callback como el que añade astream_events"""
+
+    def tap_output_aiter(self, run_id, output):
+        return output
+
+    def tap_output_iter(self, run_id, output):
+        return output
+
+
+class TestSingleFlightChatModel:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_one_call(self):
+        fake = SlowChatModel()
+        llm = SingleFlightChatModel(fake)
+
+        responses = await asyncio.gather(*(llm.ainvoke("solicitar_email") for _ in range(20)))
+
+        assert fake.calls == 1
+        assert len({r.content for r in responses}) == 1
+        stats = llm.get_stats()
+        assert stats["coalesced"] == 19
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_prompts_are_not_coalesced(self):
+        fake = SlowChatModel()
+        llm = SingleFlightChatModel(fake)
+
+        await asyncio.gather(llm.ainvoke("solicitar_email"), llm.ainvoke("solicitar_nombre"))
+
+        assert fake.calls == 2
+        assert llm.get_stats()["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        fake = SlowChatModel()
+        llm = SingleFlightChatModel(fake)
+
+        first = asyncio.ensure_future(llm.ainvoke("solicitar_email"))
+        second = asyncio.ensure_future(llm.ainvoke("solicitar_email"))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        response = await second
+        assert "email" in response.content
+        assert fake.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_followers_keep_their_own_attribution(self):
+        fake = SlowChatModel()
+        telemetry = LLMTelemetry()
+        llm = SingleFlightChatModel(fake, telemetry=telemetry)
+
+        async def call(node, session_id):
+            with llm_call_context(node=node, session_id=session_id):
+                return await llm.ainvoke("solicitar_email")
+
+        await asyncio.gather(call("authenticate", "s1"), call("authenticate", "s2"), call("authenticate", "s3"))
+
+        assert fake.calls == 1
+        followers = [r for r in telemetry.records if r.status == "coalesced"]
+        assert sorted(r.session_id for r in followers) == ["s2", "s3"]
+        assert all(r.node == "authenticate" and r.cost == 0 for r in followers)
+        summary = telemetry.get_stats()["authenticate"]
+        assert summary["coalesced"] == 2 and summary["errors"] == 0
+        assert 'eroski_llm_coalesced_total{node="authenticate",deployment="gpt-test"} 2' in telemetry.to_prometheus()
+
+    @pytest.mark.asyncio
+    async def test_streaming_and_tagged_calls_are_not_coalesced(self):
+        fake = SlowChatModel()
+        llm = SingleFlightChatModel(fake)
+        streaming = {"callbacks": [StreamingHandler()]}
+
+        await asyncio.gather(
+            llm.ainvoke("solicitar_email"),
+            llm.ainvoke("solicitar_email", config=streaming),
+            llm.ainvoke("solicitar_email", config={"tags": [STREAM_TO_USER_TAG]}),
+        )
+
+        assert fake.calls == 3
+        assert llm.get_stats()["streaming_bypass"] == 1
+
+    @pytest.mark.asyncio
+    async def test_different_priorities_are_not_coalesced(self):
+        fake = SlowChatModel()
+        llm = SingleFlightChatModel(fake)
+
+        async def call(priority):
+            with llm_priority_scope(priority):
+                return await llm.ainvoke("solicitar_email")
+
+        await asyncio.gather(call(PRIORITY_URGENT), call(PRIORITY_NORMAL))
+
+        assert fake.calls == 2
@@ -0,0 +1,118 @@
+# =====================================================
+# tests/test_llm_telemetry.py - Tests de la telemetría por llamada al LLM
+# =====================================================
+
+import asyncio
+import json
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from nodes.base_node import BaseNode
+from utils.llm.telemetry import LLMTelemetry, llm_attempt_scope, llm_call_context, summarize_records
+
+
+class UsageChatModel(BaseChatModel):
+    """Chat model falso que informa del uso de tokens"""
+
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "usage-fake"
+
+    def _generate(self, messages: List[Any], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.fail:
+            raise TimeoutError("timeout")
+        message = AIMessage(
+            content="ok",
+            usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class EchoNode(BaseNode):
+    """Nodo mínimo que llama al LLM"""
+
+    def __init__(self, llm):
+        super().__init__("EchoNode")
+        self.llm = llm
+
+    async def execute(self, state):
+        return await self.llm.ainvoke("hola")
+
+    def get_required_fields(self):
+        return []
+
+    def get_actor_description(self):
+        return "test"
+
+
+class TestLLMTelemetry:
+    """Tests del callback y el registro de métricas"""
+
+    def test_records_tokens_node_and_session(self):
+        telemetry = LLMTelemetry(prompt_cost_per_1k=0.01, completion_cost_per_1k=0.03)
+        llm = UsageChatModel(callbacks=[telemetry.callback])
+
+        with llm_call_context(node="classify", session_id="s1"):
+            llm.invoke("hola")
+
+        record = telemetry.records[0]
+        assert (record.node, record.session_id, record.status) == ("classify", "s1", "ok")
+        assert (record.prompt_tokens, record.completion_tokens) == (120, 30)
+        assert abs(record.cost - (120 * 0.01 + 30 * 0.03) / 1000) < 1e-9
+        assert record.latency_seconds >= 0
+
+    def test_base_node_attributes_calls(self):
+        telemetry = LLMTelemetry()
+        node = EchoNode(UsageChatModel(callbacks=[telemetry.callback]))
+
+        asyncio.run(node.execute({"session_id": "abc"}))
+
+        assert telemetry.records[0].node == "EchoNode"
+        assert telemetry.records[0].session_id == "abc"
+
+    def test_errors_and_retries(self):
+        telemetry = LLMTelemetry()
+        llm = UsageChatModel(callbacks=[telemetry.callback], fail=True)
+
+        for attempt in range(2):
+            with llm_attempt_scope(attempt):
+                try:
+                    llm.invoke("hola")
+                except TimeoutError:
+                    pass
+
+        stats = telemetry.get_stats()["unknown"]
+        assert stats["calls"] == 2
+        assert stats["errors"] == 2
+        assert stats["retries"] == 1
+
+    def test_prometheus_and_jsonl_export(self, tmp_path):
+        trace = tmp_path / "llm_calls.jsonl"
+        telemetry = LLMTelemetry(trace_path=str(trace))
+        llm = UsageChatModel(callbacks=[telemetry.callback])
+
+        with llm_call_context(node="authenticate"):
+            llm.invoke("hola")
+
+        text = telemetry.to_prometheus()
+        assert 'eroski_llm_calls_total{node="authenticate",deployment="unknown"} 1' in text
+        assert 'kind="prompt"} 120' in text
+        assert 'eroski_llm_latency_seconds_bucket{node="authenticate",deployment="unknown",le="+Inf"} 1' in text
+
+        lines = trace.read_text(encoding="utf-8").splitlines()
+        assert json.loads(lines[0])["node"] == "authenticate"
+
+    def test_summary_percentiles(self):
+        records = [
+            {"node": "classify", "status": "ok", "attempt": 0, "latency_seconds": float(i),
+             "prompt_tokens": 10, "completion_tokens": 5}
+            for i in range(1, 101)
+        ]
+        summary = summarize_records(records)["classify"]
+        assert (summary["latency_p50"], summary["latency_p95"], summary["latency_p99"]) == (50.0, 95.0, 99.0)
+        assert summary["prompt_tokens"] == 1000
@@ -0,0 +1,89 @@
+# =====================================================
+# tests/test_loadtest.py - Tests del generador de carga
+# =====================================================
+
+import asyncio
+import logging
+
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Command
+
+from interfaces.eroski_chat_interface import EroskiChatInterface
+from interfaces.loadtest import LoadTest, MemorySampler, ScriptedChatModel, build_report, fill_template, parse_args
+from models.eroski_state import EroskiState
+from nodes.base_node import BaseNode
+from workflows.checkpointer import SQLiteCheckpointSaver
+
+CONFIG = {
+    "employees": [{"name": "Ana", "email": "ana@eroski.es", "store": "Eroski Bilbao", "section": "Caja"}],
+    "dialogues": [{
+        "name": "eco",
+        "turns": [{"label": "auth", "message": "Soy $name"}, {"label": "confirm", "message": "Gracias"}],
+        "llm": {"answer": ["Hola $name", "De nada $name"]},
+    }],
+}
+
+
+class AnswerNode(BaseNode):
+    """Responde con el LLM guionizado"""
+
+    def __init__(self, llm):
+        super().__init__("answer")
+        self.llm = llm
+
+    async def execute(self, state: EroskiState) -> Command:
+        response = await self.llm.ainvoke(state["messages"])
+        return Command(update={"messages": [AIMessage(content=response.content)]})
+
+    def get_required_fields(self):
+        return []
+
+    def get_actor_description(self):
+        return "Responde"
+
+
+def make_interface(llm):
+    builder = StateGraph(EroskiState)
+    builder.add_node("answer", AnswerNode(llm).execute)
+    builder.add_edge(START, "answer")
+    builder.add_edge("answer", END)
+
+    interface = EroskiChatInterface.__new__(EroskiChatInterface)
+    interface.logger = logging.getLogger("EroskiChatInterface")
+    interface.graph = builder.compile(checkpointer=SQLiteCheckpointSaver())
+    interface.active_sessions = {}
+    return interface
+
+
+class TestLoadTest:
+    """Empleados virtuales con diálogos guionizados y el informe comparable"""
+
+    def test_fill_template_keeps_json_braces(self):
+        assert fill_template({"email": "$email", "n": 1}, {"email": "ana@eroski.es"}) == {"email": "ana@eroski.es", "n": 1}
+
+    def test_scripted_sessions_produce_report(self):
+        args = parse_args(["--users", "3", "--sessions-per-user", "2", "--ramp-up-s", "0",
+                           "--think-dist", "none", "--llm-dist", "none"])
+        llm = ScriptedChatModel(latency_distribution="none")
+        test = LoadTest(make_interface(llm), CONFIG, args, llm=llm)
+
+        async def scenario():
+            memory = MemorySampler()
+            memory.start()
+            duration = await test.run()
+            await memory.stop()
+            return build_report(test, duration, memory, args, llm.get_stats(), None)
+
+        report = asyncio.run(scenario())
+
+        assert report["totals"]["sessions"] == 6
+        assert report["totals"]["turns"] == 12
+        assert report["totals"]["error_rate"] == 0.0
+        assert set(report["latency"]["by_label"]) == {"auth", "confirm"}
+        assert report["llm_stats"]["calls_by_node"] == {"answer": 12}
+
+        # El guion se sirve por (sesión, nodo) en orden
+        session_id = next(key for key in llm._scripts if key.startswith("loadtest-0-0-"))
+        state = asyncio.run(test.interface.graph.aget_state({"configurable": {"thread_id": session_id}}))
+        assert state.values["messages"][-1].content == "De nada Ana"
@@ -0,0 +1,63 @@
+# =====================================================
+# tests/test_message_pool.py - Tests del pool de variantes de mensajes
+# =====================================================
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from utils.llm.message_generator import build_message_prompts, generate_natural_message
+from utils.llm.message_pool import MessageVariantPool, build_message_pool, STATIC_MESSAGE_TYPES
+
+
+class VariantsChatModel:
+    """Chat model falso que devuelve una lista JSON de variantes"""
+
+    deployment_name = "gpt-test"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls += 1
+        return AIMessage(content=json.dumps(['"¿Me das tu email?"', "¿Cuál es tu email de trabajo?", "¿Me das tu email?"]))
+
+
+class TestMessageVariantPool:
+
+    @pytest.fixture
+    def pool_path(self, tmp_path):
+        path = tmp_path / "message_pool.json"
+        asyncio.run(build_message_pool(VariantsChatModel(), build_message_prompts({}), str(path), variants_per_type=5))
+        return path
+
+    def test_build_writes_versioned_deduplicated_pool(self, pool_path):
+        data = json.loads(pool_path.read_text(encoding="utf-8"))
+
+        assert data["version"] == 1
+        assert set(data["variants"]) == set(STATIC_MESSAGE_TYPES)
+        assert data["variants"]["solicitar_email"] == ["¿Me das tu email?", "¿Cuál es tu email de trabajo?"]
+
+    @pytest.mark.asyncio
+    async def test_static_types_are_served_without_llm(self, pool_path):
+        pool = MessageVariantPool(str(pool_path))
+
+        with patch("utils.llm.message_generator.get_message_pool", return_value=pool), \
+             patch("utils.llm.message_generator.get_llm", side_effect=AssertionError("no debe llamar al LLM")):
+            mensaje = await generate_natural_message("solicitar_email")
+
+        assert mensaje in pool.variants["solicitar_email"]
+        assert pool.stats["hits"] == 1
+
+    def test_changed_prompt_invalidates_variants(self, pool_path):
+        pool = MessageVariantPool(str(pool_path))
+
+        assert pool.sample("solicitar_email", "Otro prompt distinto") is None
+        assert pool.stats["stale"] == 1
+
+    def test_missing_pool_returns_none(self, tmp_path):
+        pool = MessageVariantPool(str(tmp_path / "no_existe.json"))
+        assert pool.sample("solicitar_email") is None
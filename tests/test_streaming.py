@@ -0,0 +1,67 @@
+# =====================================================
+# tests/test_streaming.py - Tests del streaming de tokens
+# =====================================================
+
+import logging
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, START, END
+
+from interfaces.eroski_chat_interface import EroskiChatInterface
+from models.eroski_state import EroskiState
+from utils.llm.streaming import UserFacingStreamFilter, STREAM_TO_USER_TAG
+
+
+class TestUserFacingStreamFilter:
+
+    def test_json_decision_streams_only_message_field(self):
+        stream_filter = UserFacingStreamFilter()
+        chunks = ['```json\n{"next_action": "ask", ', '"message_to_user": "Hola ', 'Juan, ¿qué', ' tienda?"}\n```']
+
+        emitted = "".join(stream_filter.feed("run-1", chunk) for chunk in chunks)
+
+        assert emitted == "Hola Juan, ¿qué tienda?"
+
+    def test_plain_text_requires_tag(self):
+        stream_filter = UserFacingStreamFilter()
+
+        assert stream_filter.feed("interno", "balanza") == ""
+        assert stream_filter.feed("usuario", "¿Cuál es ", [STREAM_TO_USER_TAG]) == "¿Cuál es "
+        assert stream_filter.feed("usuario", "tu email?", [STREAM_TO_USER_TAG]) == "tu email?"
+
+
+class TestProcessMessageStream:
+
+    @pytest.fixture
+    def chat_interface(self):
+        llm = GenericFakeChatModel(messages=iter(['{"message_to_user": "Reinicia la balanza y prueba de nuevo"}']))
+
+        async def respond(state: EroskiState):
+            response = await llm.ainvoke(state["messages"])
+            return {"messages": [AIMessage(content=response.content.split('"')[3])]}
+
+        builder = StateGraph(EroskiState)
+        builder.add_node("respond", respond)
+        builder.add_edge(START, "respond")
+        builder.add_edge("respond", END)
+
+        interface = EroskiChatInterface.__new__(EroskiChatInterface)
+        interface.logger = logging.getLogger("EroskiChatInterface")
+        interface.graph = builder.compile(checkpointer=MemorySaver())
+        interface.active_sessions = {}
+        return interface
+
+    @pytest.mark.asyncio
+    async def test_tokens_arrive_before_final_response(self, chat_interface):
+        events = [
+            event async for event in chat_interface.process_message_stream("La balanza no pesa", "test_stream")
+        ]
+
+        tokens = [event["content"] for event in events if event["type"] == "token"]
+        assert len(tokens) > 1
+        assert "".join(tokens) == "Reinicia la balanza y prueba de nuevo"
+        assert events[-1]["type"] == "final"
+        assert events[-1]["data"]["response"] == "Reinicia la balanza y prueba de nuevo"
@@ -0,0 +1,130 @@
+# =====================================================
+# tests/test_structured_output.py - Tests de la salida JSON estructurada
+# =====================================================
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from utils.llm.structured import (
+    JSON_MODE, StructuredOutputError, ainvoke_structured,
+    get_structured_output_stats, reset_json_mode_support, reset_structured_output_stats
+)
+
+
+class Decision(BaseModel):
+    next_action: str
+    confidence_level: float = 0.0
+
+
+class ScriptedChatModel:
+    """Chat model falso que devuelve respuestas en orden y guarda las llamadas"""
+
+    deployment_name = "gpt-test"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls.append((llm_input, dict(kwargs)))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return AIMessage(content=response)
+
+
+def json_mode_rejected():
+    """400 de Azure para un deployment sin JSON mode"""
+    request = httpx.Request("POST", "https://azure.example/chat/completions")
+    return openai.BadRequestError(
+        "Error code: 400 - {'error': {'message': \"Invalid parameter: 'response_format' of type "
+        "'json_object' is not supported with this model.\", 'param': 'response_format'}}",
+        response=httpx.Response(400, request=request), body=None
+    )
+
+
+PROMPT = "Responde con JSON válido: next_action y confidence_level"
+
+
+def run(llm, **kwargs):
+    return asyncio.run(ainvoke_structured(llm, PROMPT, Decision, "test_prompt", **kwargs))
+
+
+class TestStructuredOutput:
+    """Validación en una pasada y una única reparación"""
+
+    def setup_method(self):
+        reset_structured_output_stats()
+        reset_json_mode_support()
+
+    def test_valid_json_in_one_call_with_json_mode(self):
+        llm = ScriptedChatModel('{"next_action": "complete", "confidence_level": 0.9}')
+        decision = run(llm, max_tokens=100)
+
+        assert decision == Decision(next_action="complete", confidence_level=0.9)
+        assert len(llm.calls) == 1
+        assert llm.calls[0][1] == {"response_format": JSON_MODE, "max_tokens": 100}
+        assert get_structured_output_stats().get_stats()["test_prompt"]["first_pass"] == 1
+
+    def test_fenced_json_is_accepted(self):
+        llm = ScriptedChatModel('```json\n{"next_action": "clarify"}\n```')
+        assert run(llm).next_action == "clarify"
+        assert len(llm.calls) == 1
+
+    def test_invalid_output_gets_one_targeted_repair(self):
+        llm = ScriptedChatModel('{"confidence_level": "alta"}', '{"next_action": "clarify", "confidence_level": 0.5}')
+        decision = run(llm)
+
+        assert decision.next_action == "clarify"
+        assert len(llm.calls) == 2
+        repair_prompt = llm.calls[1][0]
+        assert "next_action" in repair_prompt and '"confidence_level": "alta"' in repair_prompt
+        assert PROMPT not in repair_prompt
+
+        stats = get_structured_output_stats().get_stats()["test_prompt"]
+        assert stats["repaired"] == 1
+        assert stats["parse_failure_rate"] == 1.0
+
+    def test_failed_repair_raises(self):
+        llm = ScriptedChatModel("no es json", "sigue sin serlo")
+        with pytest.raises(StructuredOutputError):
+            run(llm)
+        assert len(llm.calls) == 2
+        assert get_structured_output_stats().get_stats()["test_prompt"]["failed"] == 1
+
+    def test_prepare_normalizes_before_validation(self):
+        llm = ScriptedChatModel('{"next_action": null}')
+        decision = run(llm, prepare=lambda data: {**data, "next_action": data["next_action"] or "escalate"})
+        assert decision.next_action == "escalate"
+        assert len(llm.calls) == 1
+
+    def test_json_mode_rejected_retries_without_it_and_remembers(self):
+        llm = ScriptedChatModel(
+            json_mode_rejected(),
+            '{"next_action": "complete"}',
+            '{"next_action": "clarify"}',
+        )
+
+        assert run(llm, max_tokens=100).next_action == "complete"
+        assert run(llm, max_tokens=100).next_action == "clarify"
+
+        assert [kwargs for _, kwargs in llm.calls] == [
+            {"response_format": JSON_MODE, "max_tokens": 100},
+            {"max_tokens": 100},
+            {"max_tokens": 100},
+        ]
+        assert get_structured_output_stats().get_stats()["test_prompt"]["first_pass"] == 2
+
+    def test_other_bad_requests_are_not_retried(self):
+        request = httpx.Request("POST", "https://azure.example/chat/completions")
+        error = openai.BadRequestError("content_filter", response=httpx.Response(400, request=request), body=None)
+        llm = ScriptedChatModel(error)
+
+        with pytest.raises(openai.BadRequestError):
+            run(llm)
+        assert len(llm.calls) == 1
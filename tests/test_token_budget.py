@@ -0,0 +1,70 @@
+# =====================================================
+# tests/test_token_budget.py - Tests del presupuesto de tokens
+# =====================================================
+
+from langchain_core.prompts import PromptTemplate
+
+from utils.llm.token_budget import TRUNCATION_MARKER, TokenBudget, TokenCounter, TokenProfile
+
+
+TEMPLATE = PromptTemplate(
+    template="INSTRUCCIONES\n{conversation_history}\nMENSAJE: {user_message}\nResponde SOLO JSON",
+    input_variables=["conversation_history", "user_message"]
+)
+
+
+def make_budget(**kwargs):
+    profiles = {"tiny": TokenProfile(max_completion_tokens=20, max_prompt_tokens=60)}
+    return TokenBudget(profiles=profiles, context_window=4096, default_max_tokens=2000, **kwargs)
+
+
+class TestProfiles:
+    """max_tokens por tipo de prompt"""
+
+    def test_profile_sets_max_tokens(self):
+        budget = make_budget()
+        prompt, kwargs = budget.prepare("¿Confirmas?", "confirmation_intent")
+        assert prompt == "¿Confirmas?"
+        assert kwargs == {"max_tokens": 10}
+
+    def test_unknown_profile_uses_global_max_tokens(self):
+        _, kwargs = make_budget().prepare("hola", "desconocido")
+        assert kwargs == {"max_tokens": 2000}
+
+    def test_prompt_limit_respects_context_window(self):
+        budget = TokenBudget(context_window=1000)
+        assert budget.prompt_limit(TokenProfile(max_completion_tokens=400, max_prompt_tokens=6000)) == 600
+
+    def test_disabled_budget_is_a_no_op(self):
+        prompt, kwargs = make_budget(enabled=False).format(
+            TEMPLATE, {"conversation_history": "x " * 500, "user_message": "hola"}, "tiny"
+        )
+        assert kwargs == {}
+        assert prompt.count("x") == 500
+
+
+class TestTruncation:
+    """Los prompts que no caben se recortan por lo más antiguo"""
+
+    def test_history_is_trimmed_keeping_recent_messages(self):
+        budget = make_budget()
+        history = "\n".join(f"Usuario: mensaje número {i}" for i in range(40))
+        prompt, _ = budget.format(TEMPLATE, {"conversation_history": history, "user_message": "la TPV no enciende"}, "tiny")
+
+        assert budget.counter.count(prompt) <= 60
+        assert prompt.startswith("INSTRUCCIONES")
+        assert prompt.endswith("Responde SOLO JSON")
+        assert "MENSAJE: la TPV no enciende" in prompt
+        assert "mensaje número 39" in prompt
+        assert "mensaje número 0\n" not in prompt
+        assert budget.get_stats()["truncated"] == 1
+
+    def test_prompt_without_field_is_cut_in_the_middle(self):
+        counter = TokenCounter()
+        text = "inicio " + "relleno " * 200 + "final"
+        truncated = counter.truncate_middle(text, 30)
+
+        assert counter.count(truncated) <= 30
+        assert truncated.startswith("inicio")
+        assert truncated.endswith("final")
+        assert TRUNCATION_MARKER in truncated
@@ -0,0 +1,114 @@
+# =====================================================
+# tests/test_tracing.py - Tests de las trazas por turno
+# =====================================================
+
+import asyncio
+import json
+import logging
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Command
+
+import utils.tracing as tracing
+from interfaces.eroski_chat_interface import EroskiChatInterface
+from models.eroski_state import EroskiState
+from nodes.base_node import BaseNode
+from utils.llm.telemetry import LLMTelemetry
+from utils.tracing import SPAN_KIND_CLIENT, Tracer, critical_path, load_otlp_spans, traced_router
+from workflows.checkpointer import SQLiteCheckpointSaver
+
+
+class AnswerNode(BaseNode):
+    """Nodo que consulta 'la BD' y llama al LLM"""
+
+    def __init__(self):
+        super().__init__("answer")
+        self.llm = GenericFakeChatModel(messages=iter(["Reinicia la balanza"]), callbacks=[LLMTelemetry().callback])
+
+    async def execute(self, state: EroskiState) -> Command:
+        with tracing.get_tracer().span("db.query", SPAN_KIND_CLIENT, **{"db.operation": "SELECT"}):
+            await asyncio.sleep(0)
+        response = await self.llm.ainvoke(state["messages"])
+        return Command(update={"messages": [AIMessage(content=response.content)]})
+
+    def get_required_fields(self):
+        return []
+
+    def get_actor_description(self):
+        return "Responde"
+
+
+def route_answer(state: EroskiState) -> str:
+    return "done"
+
+
+def make_interface():
+    node = AnswerNode()
+    builder = StateGraph(EroskiState)
+    builder.add_node("answer", node.execute)
+    builder.add_edge(START, "answer")
+    builder.add_conditional_edges("answer", traced_router(route_answer), {"done": END})
+
+    interface = EroskiChatInterface.__new__(EroskiChatInterface)
+    interface.logger = logging.getLogger("EroskiChatInterface")
+    interface.graph = builder.compile(checkpointer=SQLiteCheckpointSaver())
+    interface.active_sessions = {}
+    return interface
+
+
+class TestTurnTracing:
+    """Un turno exporta spans anidados turno → nodo → LLM/BD"""
+
+    def teardown_method(self):
+        tracing.reset_tracer()
+
+    def test_turn_exports_nested_spans_as_otlp_json(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        tracing._tracer = Tracer(enabled=True, path=str(path))
+
+        response = asyncio.run(make_interface().process_message("La balanza no pesa", "s1"))
+        assert response["response"] == "Reinicia la balanza"
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        payload = json.loads(lines[0])
+        assert "resourceSpans" in payload
+
+        spans = {span["name"]: span for span in load_otlp_spans(lines)}
+        assert set(spans) == {"graph.turn", "node.answer", "db.query", "llm.call", "router.route_answer"}
+        assert len({span["trace_id"] for span in spans.values()}) == 1
+
+        turn = spans["graph.turn"]
+        assert turn["attributes"]["session.id"] == "s1"
+        assert spans["node.answer"]["parent_span_id"] == turn["span_id"]
+        assert spans["db.query"]["parent_span_id"] == spans["node.answer"]["span_id"]
+        assert spans["llm.call"]["parent_span_id"] == spans["node.answer"]["span_id"]
+        assert spans["router.route_answer"]["attributes"]["route"] == "done"
+
+    def test_disabled_tracer_writes_nothing(self, tmp_path):
+        tracer = Tracer(enabled=False, path=str(tmp_path / "traces.jsonl"))
+        with tracer.span("graph.turn") as span:
+            assert span is None
+        assert not (tmp_path / "traces.jsonl").exists()
+
+    def test_critical_path_follows_sequential_children(self):
+        def span(span_id, parent, name, start, end):
+            return {"trace_id": "t", "span_id": span_id, "parent_span_id": parent, "name": name,
+                    "start_ns": start * 1_000_000, "end_ns": end * 1_000_000, "attributes": {}, "error": False}
+
+        spans = [
+            span("root", "", "graph.turn", 0, 100),
+            span("a", "root", "node.authenticate", 0, 30),
+            span("c", "root", "node.classify", 30, 95),
+            span("l1", "c", "llm.call", 32, 60),
+            span("l2", "c", "llm.call", 35, 90),  # en paralelo con l1: solo l2 es crítico
+        ]
+        path = critical_path(spans)
+
+        assert [(step["name"], step["depth"]) for step in path] == [
+            ("graph.turn", 0), ("node.authenticate", 1), ("node.classify", 1), ("llm.call", 2)
+        ]
+        assert path[0]["self_ms"] == 5.0
+        assert path[3]["duration_ms"] == 55.0
@@ -0,0 +1,91 @@
+# =====================================================
+# tests/test_turn_input.py - Tests del input incremental por turno
+# =====================================================
+
+import asyncio
+import importlib.util
+import logging
+from argparse import Namespace
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph, START, END
+
+from interfaces.eroski_chat_interface import EroskiChatInterface
+from models.eroski_state import EroskiState
+from workflows.checkpointer import SQLiteCheckpointSaver
+
+
+def make_interface():
+    async def respond(state: EroskiState):
+        return {"messages": [AIMessage(content=f"Eco: {state['messages'][-1].content}")]}
+
+    builder = StateGraph(EroskiState)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "respond")
+    builder.add_edge("respond", END)
+
+    interface = EroskiChatInterface.__new__(EroskiChatInterface)
+    interface.logger = logging.getLogger("EroskiChatInterface")
+    interface.graph = builder.compile(checkpointer=SQLiteCheckpointSaver())
+    interface.active_sessions = {}
+    return interface
+
+
+class TestIncrementalTurnInput:
+    """Cada turno envía solo el mensaje nuevo; el historial lo aporta el checkpointer"""
+
+    def test_turn_input_contains_only_new_message(self):
+        interface = make_interface()
+        asyncio.run(interface.process_message("hola", "s1"))
+
+        input_data, config = asyncio.run(interface._prepare_turn_input("la balanza no pesa", "s1", {"store_id": "T1"}))
+
+        assert input_data["messages"] == [HumanMessage(content="la balanza no pesa")]
+        assert input_data["store_id"] == "T1"
+        assert config["configurable"]["thread_id"] == "s1"
+
+    def test_history_accumulates_without_duplicates(self):
+        interface = make_interface()
+        for text in ["uno", "dos", "tres"]:
+            asyncio.run(interface.process_message(text, "s1"))
+
+        state = asyncio.run(interface.graph.aget_state({"configurable": {"thread_id": "s1"}}))
+        contents = [message.content for message in state.values["messages"]]
+        assert contents == ["uno", "Eco: uno", "dos", "Eco: dos", "tres", "Eco: tres"]
+
+    def test_priority_is_cached_after_first_turn(self):
+        interface = make_interface()
+        asyncio.run(interface.process_message("hola", "s1"))
+
+        calls = []
+        original = interface.graph.aget_state
+
+        async def counting_aget_state(*args, **kwargs):
+            calls.append(args)
+            return await original(*args, **kwargs)
+
+        interface.graph.aget_state = counting_aget_state
+        asyncio.run(interface._prepare_turn_input("otra vez", "s1"))
+        assert calls == []
+        assert "llm_priority" in interface.active_sessions["s1"]
+
+
+def load_benchmark():
+    """scripts/ choca con database/scripts al ejecutar toda la suite: cargar por ruta"""
+    path = Path(__file__).resolve().parent.parent / "scripts" / "benchmark_turn_input.py"
+    spec = importlib.util.spec_from_file_location("benchmark_turn_input", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestTurnGrowthGate:
+    """Regresión: el turno incremental no puede crecer más de MAX_GROWTH en 60 turnos"""
+
+    def test_incremental_turn_growth_is_bounded(self):
+        benchmark = load_benchmark()
+        report = asyncio.run(benchmark.main_async(Namespace(turns=60, window=10)))
+
+        assert report["incremental"]["input_messages_last_turn"] == 1
+        assert report["incremental"]["turn"]["growth"] <= benchmark.MAX_GROWTH
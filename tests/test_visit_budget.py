@@ -0,0 +1,164 @@
+# =====================================================
+# tests/test_visit_budget.py - Tests del presupuesto de visitas
+# =====================================================
+
+import asyncio
+import logging
+from datetime import datetime
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Command
+
+from interfaces.eroski_chat_interface import EroskiChatInterface
+from models.eroski_state import EroskiState
+from utils.visit_budget import (
+    VisitBudget, enforce_visit_budget, merge_node_visits, reset_node_visits, with_visit_budget
+)
+
+
+def build_graph(budget, ask_goto=None):
+    """ask (la 'llamada al LLM') vuelve sobre sí misma hasta agotar el presupuesto"""
+    calls = []
+
+    async def ask(state):
+        calls.append(state.get("node_visits", {}).get("ask", 0))
+        update = {"messages": [AIMessage(content="¿Puedes concretar?")]}
+        return Command(update=update, goto=ask_goto) if ask_goto else Command(update=update)
+
+    async def escalate(state):
+        return {"escalation_needed": True, "escalation_reason": state.get("escalation_reason")}
+
+    routes = {"again": "ask", "wait": END, "escalate": "escalate"}
+
+    def route_ask(state):
+        return "again" if not ask_goto and len(state["messages"]) < 50 else "wait"
+
+    builder = StateGraph(EroskiState)
+    builder.add_node("ask", with_visit_budget("ask", ask, budget))
+    builder.add_node("escalate", with_visit_budget("escalate", escalate, budget))
+    builder.add_edge(START, "ask")
+    builder.add_conditional_edges("ask", enforce_visit_budget(route_ask, routes, budget), routes)
+    builder.add_edge("escalate", END)
+    return builder.compile(checkpointer=MemorySaver()), calls
+
+
+def run_turn(graph, text="Hola", thread="s1"):
+    config = {"configurable": {"thread_id": thread}}
+    return asyncio.run(graph.ainvoke({"messages": [HumanMessage(content=text)]}, config))
+
+
+def make_interface(budget, pass_through=False):
+    """Interfaz real sobre un grafo en el que cada turno entra por authenticate (como el principal)"""
+    calls = []
+
+    async def authenticate(state):
+        calls.append(len(calls))
+        if pass_through:
+            # Usuario ya autenticado: solo pasa al siguiente nodo
+            return {"current_node": "authenticate", "last_activity": datetime.now()}
+        return {"messages": [AIMessage(content="¿Algo más?")], "current_node": "authenticate"}
+
+    async def escalate(state):
+        return {"escalation_needed": True, "escalation_reason": state.get("escalation_reason")}
+
+    builder = StateGraph(EroskiState)
+    builder.add_node("authenticate", with_visit_budget("authenticate", authenticate, budget))
+    builder.add_node("escalate", with_visit_budget("escalate", escalate, budget))
+    builder.add_edge(START, "authenticate")
+    builder.add_edge("authenticate", END)
+    builder.add_edge("escalate", END)
+
+    interface = EroskiChatInterface.__new__(EroskiChatInterface)
+    interface.logger = logging.getLogger("EroskiChatInterface")
+    interface.graph = builder.compile(checkpointer=MemorySaver())
+    interface.active_sessions = {}
+    interface.calls = calls
+    return interface
+
+
+class TestVisitBudget:
+    """Los bucles se cortan por contador, sin llamadas extra al nodo"""
+
+    def test_reducer_accumulates_increments(self):
+        assert merge_node_visits({"ask": 2}, {"ask": 1, "escalate": 1}) == {"ask": 3, "escalate": 1}
+        assert merge_node_visits(None, {"ask": 1}) == {"ask": 1}
+
+    def test_reducer_reset_sentinel_clears_counts(self):
+        assert merge_node_visits({"ask": 9}, reset_node_visits()) == {}
+        assert merge_node_visits({"ask": 9}, {**reset_node_visits(), "ask": 1}) == {"ask": 1}
+        assert merge_node_visits({"ask": 9}, {}) == {"ask": 9}
+
+    def test_router_loop_escalates_when_node_budget_is_spent(self):
+        budget = VisitBudget(per_node=3, per_turn=0)
+        graph, calls = build_graph(budget)
+
+        result = run_turn(graph)
+
+        assert calls == [0, 1, 2]
+        assert result["node_visits"] == {"ask": 3, "escalate": 1}
+        assert result["escalation_reason"] == "Límite de 3 visitas al paso 'ask' alcanzado"
+        assert budget.stats["blocked_routes"] == 1
+
+    def test_goto_loop_is_stopped_at_node_entry(self):
+        budget = VisitBudget(per_node=2, per_turn=0)
+        graph, calls = build_graph(budget, ask_goto="ask")
+
+        result = run_turn(graph)
+
+        assert calls == [0, 1]
+        assert result["escalation_needed"] is True
+        assert budget.stats["blocked_entries"] == 1
+
+    def test_turn_budget_caps_steps_within_one_run(self):
+        budget = VisitBudget(per_node=0, per_turn=4)
+        graph, calls = build_graph(budget)
+
+        result = run_turn(graph)
+
+        assert calls == [0, 1, 2, 3]
+        assert result["escalation_reason"] == "Límite de 4 pasos por turno alcanzado"
+
+    def test_long_session_does_not_escalate(self):
+        # Cada turno entra por authenticate: sin reinicio el turno 4 agotaría per_node=3
+        interface = make_interface(VisitBudget(per_node=3, per_turn=5))
+        config = {"configurable": {"thread_id": "s1"}}
+
+        for turn in range(12):
+            asyncio.run(interface.process_message(f"Mensaje {turn}", "s1"))
+
+        state = asyncio.run(interface.graph.aget_state(config)).values
+        assert not state.get("escalation_needed")
+        assert state["node_visits"] == {"authenticate": 1}
+        assert state["session_visits"] == {"authenticate": 12}
+        assert len(state["messages"]) == 24
+
+        assert asyncio.run(interface.reset_session("s1"))
+        state = asyncio.run(interface.graph.aget_state(config)).values
+        assert state["node_visits"] == {} and state["session_visits"] == {}
+
+    def test_session_budget_escalates_across_turns(self):
+        interface = make_interface(VisitBudget(per_node=3, per_turn=5, per_session=4))
+        config = {"configurable": {"thread_id": "s1"}}
+
+        for turn in range(6):
+            asyncio.run(interface.process_message(f"Mensaje {turn}", "s1"))
+
+        state = asyncio.run(interface.graph.aget_state(config)).values
+        # Los turnos 5 y 6 escalan al entrar, sin ejecutar el nodo
+        assert interface.calls == [0, 1, 2, 3]
+        assert state["escalation_needed"] is True
+        assert state["escalation_reason"] == "Límite de 4 pasos por sesión alcanzado"
+
+    def test_pass_through_visits_do_not_spend_session_budget(self):
+        interface = make_interface(VisitBudget(per_node=3, per_turn=5, per_session=4), pass_through=True)
+        config = {"configurable": {"thread_id": "s1"}}
+
+        for turn in range(8):
+            asyncio.run(interface.process_message(f"Mensaje {turn}", "s1"))
+
+        state = asyncio.run(interface.graph.aget_state(config)).values
+        assert len(interface.calls) == 8
+        assert not state.get("escalation_needed")
+        assert state["session_visits"] == {}
@@ -1,58 +1,54 @@
 # =====================================================
 # utils/__init__.py - Exportaciones SIN imports circulares
 # =====================================================
+"""
+Exportaciones perezosas (PEP 562): `import utils` o `import utils.tracing`
+ya no cargan repositorios, asyncpg, langchain ni el proveedor LLM. Cada
+nombre se importa de su módulo la primera vez que se usa.
+"""
 
-# 🔥 SOLUCIÓN: Importar usando rutas absolutas específicas
-# En lugar de from .database import X, usamos from .database.module import X
+import importlib
+from typing import Any, Dict
 
-# Database imports con rutas específicas
-from .database.base_repository import BaseRepository
-from .database.connection_manager import ConnectionManager, get_connection_manager, init_database, close_database
-from .database.incidencia_repository import IncidenciaRepository  
-from .database.user_repository import UserRepository
-
-# Extractor imports con rutas específicas
-from .extractors.user_extractor import extraer_datos_usuario, UsuarioExtraido
-from .extractors.incident_extractor import (
-    extraer_tipo_incidencia,
-    extraer_detalles_incidencia, 
-    IncidenciaExtraida
-)
-
-# LLM imports con rutas específicas  
-from .llm.providers import get_llm, reset_llm
-from .llm.prompts import (
-    URGENCY_CLASSIFICATION_PROMPT,
-    INCIDENT_SUMMARY_PROMPT
-)
-
-from .llm.message_generator import (generate_natural_message, 
-                                    detect_confirmation_intent, 
-                                    generate_followup_questions)
-
-__all__ = [
+# Nombre exportado -> módulo (rutas específicas, sin imports circulares)
+_LAZY_ATTRIBUTES: Dict[str, str] = {
     # Database
-    "BaseRepository",
-    "ConnectionManager", 
-    "get_connection_manager",
-    "init_database",
-    "close_database",
-    "IncidenciaRepository",
-    "UserRepository",
+    "BaseRepository": ".database.base_repository",
+    "ConnectionManager": ".database.connection_manager",
+    "get_connection_manager": ".database.connection_manager",
+    "init_database": ".database.connection_manager",
+    "close_database": ".database.connection_manager",
+    "IncidenciaRepository": ".database.incidencia_repository",
+    "UserRepository": ".database.user_repository",
     
     # Extractors
-    "extraer_datos_usuario",
-    "UsuarioExtraido", 
-    "extraer_tipo_incidencia",
-    "extraer_detalles_incidencia",
-    "IncidenciaExtraida",
+    "extraer_datos_usuario": ".extractors.user_extractor",
+    "UsuarioExtraido": ".extractors.user_extractor",
+    "extraer_tipo_incidencia": ".extractors.incident_extractor",
+    "extraer_detalles_incidencia": ".extractors.incident_extractor",
+    "IncidenciaExtraida": ".extractors.incident_extractor",
     
     # LLM
-    "get_llm",
-    "reset_llm",
-    "generate_natural_message", 
-    "detect_confirmation_intent",
-    "generate_followup_questions",
-    "URGENCY_CLASSIFICATION_PROMPT",
-    "INCIDENT_SUMMARY_PROMPT"
-]
\ No newline at end of file
+    "get_llm": ".llm.providers",
+    "reset_llm": ".llm.providers",
+    "generate_natural_message": ".llm.message_generator",
+    "detect_confirmation_intent": ".llm.message_generator",
+    "generate_followup_questions": ".llm.message_generator",
+    "URGENCY_CLASSIFICATION_PROMPT": ".llm.prompts",
+    "INCIDENT_SUMMARY_PROMPT": ".llm.prompts",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
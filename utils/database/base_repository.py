@@ -10,6 +10,7 @@ from contextlib import asynccontextmanager
 import logging
 
 from config.settings import get_settings
+from utils.tracing import SPAN_KIND_CLIENT, get_tracer
 
 # TypeVar para hacer el repositorio genérico
 T = TypeVar('T')
@@ -69,9 +70,19 @@ class BaseRepository(Generic[T]):
                 self.logger.error(f"❌ Error en operación de BD: {e}")
                 raise
     
+    @asynccontextmanager
+    async def _query_span(self, query: str):
+        """Span db.query de la consulta (hijo del nodo en curso)"""
+        operation = query.split(None, 1)[0].upper() if query.strip() else "QUERY"
+        with get_tracer().span(
+            "db.query", SPAN_KIND_CLIENT,
+            **{"db.system": "postgresql", "db.operation": operation, "db.repository": self.__class__.__name__}
+        ):
+            yield
+    
     async def execute_query(self, query: str, *args) -> str:
         """Ejecutar query que no retorna datos"""
-        async with self.get_connection() as conn:
+        async with self._query_span(query), self.get_connection() as conn:
             try:
                 result = await conn.execute(query, *args)
                 self.logger.debug(f"📝 Query ejecutado: {result}")
@@ -82,7 +93,7 @@ class BaseRepository(Generic[T]):
     
     async def fetch_one(self, query: str, *args) -> Optional[asyncpg.Record]:
         """Obtener un registro"""
-        async with self.get_connection() as conn:
+        async with self._query_span(query), self.get_connection() as conn:
             try:
                 result = await conn.fetchrow(query, *args)
                 self.logger.debug(f"📄 Registro obtenido: {'✅' if result else '❌'}")
@@ -93,7 +104,7 @@ class BaseRepository(Generic[T]):
     
     async def fetch_many(self, query: str, *args) -> List[asyncpg.Record]:
         """Obtener múltiples registros"""
-        async with self.get_connection() as conn:
+        async with self._query_span(query), self.get_connection() as conn:
             try:
                 results = await conn.fetch(query, *args)
                 self.logger.debug(f"📄 Registros obtenidos: {len(results)}")
@@ -161,7 +161,7 @@ class IncidenciaRepository(BaseRepository[IncidenciaDB]):
             base_query += f" ORDER BY fecha_creacion DESC LIMIT ${param_count + 1}"
             params.append(limit)
             
-            rows = await self.fetch_all(base_query, *params)
+            rows = await self.fetch_many(base_query, *params)
             
             incidencias = []
             for row in rows:
@@ -238,7 +238,7 @@ class IncidenciaRepository(BaseRepository[IncidenciaDB]):
             base_query += f" ORDER BY fecha_creacion DESC LIMIT ${param_count + 1}"
             params.append(limit)
             
-            rows = await self.fetch_all(base_query, *params)
+            rows = await self.fetch_many(base_query, *params)
             return [self._row_to_incidencia(row) for row in rows]
             
         except Exception as e:
@@ -345,7 +345,7 @@ class IncidenciaRepository(BaseRepository[IncidenciaDB]):
                 ORDER BY incidencias_por_tipo DESC
             """
             
-            rows = await self.fetch_all(query, codigo_tienda)
+            rows = await self.fetch_many(query, codigo_tienda)
             
             # Procesar resultados
             tipos_mas_comunes = [
@@ -429,7 +429,7 @@ class IncidenciaRepository(BaseRepository[IncidenciaDB]):
             base_query += f" ORDER BY fecha_creacion DESC LIMIT ${param_count + 1}"
             params.append(limit)
             
-            rows = await self.fetch_all(base_query, *params)
+            rows = await self.fetch_many(base_query, *params)
             return [self._row_to_incidencia_simple(row) for row in rows]
             
         except Exception as e:
@@ -0,0 +1,271 @@
+# =====================================================
+# utils/employee_prefetch.py - Prefetch especulativo del empleado por email
+# =====================================================
+"""
+Búsqueda especulativa del empleado en cuanto aparece un email en el mensaje.
+
+En cuanto EroskiChatInterface (o el nodo authenticate) ve un email, se lanza
+en segundo plano:
+- la validación del empleado (EroskiEmployeeDatabaseAuth.validate_employee)
+- sus incidencias recientes (IncidenciaRepository.buscar_por_empleado)
+
+El futuro queda en un caché por sesión y email. Cuando la decisión del LLM
+confirma el email, authenticate consume el resultado en lugar de consultar
+la BD, así que la latencia de la BD sale del camino crítico del turno.
+
+Las entradas no consumidas caducan (WORKFLOW_EMPLOYEE_PREFETCH_TTL_SECONDS).
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.tracing import SPAN_KIND_CLIENT, get_tracer
+
+logger = logging.getLogger("EmployeePrefetch")
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+
+
+def find_email(text: str) -> Optional[str]:
+    """Primer email del texto (o None)"""
+    match = EMAIL_PATTERN.search(text or "")
+    return match.group() if match else None
+
+
+async def search_employee(email: str, db_auth: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Buscar empleado en BD - MANEJO ROBUSTO.
+
+    Returns:
+        {"found": True, "employee": ...} si existe; {"found": False, "is_error": False}
+        si el email no está registrado; {"found": False, "is_error": True, "error": ...}
+        ante un error técnico
+    """
+    try:
+        logger.info(f"🔍 Buscando empleado en BD: {email}")
+
+        if db_auth is None:
+            from utils.eroski_database_auth import get_database_employee_validator
+            db_auth = get_database_employee_validator()
+
+        # ✅ INTENTAR MÚLTIPLES MÉTODOS DE BÚSQUEDA
+        employee_data = None
+
+        # Método 1: validate_employee
+        try:
+            employee_data = await db_auth.validate_employee(email)
+            if employee_data:
+                logger.info(f"✅ Empleado encontrado con validate_employee: {employee_data.get('name')}")
+        except AttributeError:
+            logger.debug("⚠️ Método validate_employee no disponible")
+        except Exception as e:
+            logger.debug(f"⚠️ Error en validate_employee: {e}")
+
+        # Método 2: Si no se encontró, buscar por email usando repositorio directo
+        if not employee_data:
+            try:
+                if getattr(db_auth, 'user_repository', None) is not None:
+                    employee_data = await db_auth.user_repository.get_user_by_email(email)
+                    if employee_data:
+                        logger.info(f"✅ Empleado encontrado con user_repository: {employee_data.get('name')}")
+            except Exception as e:
+                logger.debug(f"⚠️ Error en user_repository: {e}")
+
+        if employee_data:
+            logger.info(f"✅ Empleado encontrado en BD: {employee_data.get('name', 'Sin nombre')}")
+            return {
+                "found": True,
+                "employee": employee_data,
+                "source": "database"
+            }
+
+        # ✅ NO ES UN ERROR - Es un caso normal
+        logger.info(f"📄 Email {email} no está registrado en BD (caso normal)")
+        return {
+            "found": False,
+            "reason": "Email no registrado en base de datos",
+            "email": email,
+            "is_error": False
+        }
+
+    except Exception as e:
+        # ✅ ESTE SÍ ES UN ERROR TÉCNICO
+        logger.error(f"❌ Error técnico en búsqueda BD: {e}")
+        return {
+            "found": False,
+            "error": str(e),
+            "email": email,
+            "is_error": True
+        }
+
+
+async def fetch_recent_incidents(email: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """Incidencias recientes del empleado (resumen serializable); [] si falla"""
+    try:
+        from utils.database.connection_manager import get_connection_manager
+
+        connection_manager = await get_connection_manager()
+        incidencias = await connection_manager.get_incidencia_repository().buscar_por_empleado(email, limit=limit)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron obtener las incidencias recientes de {email}: {e}")
+        return []
+
+    recent = []
+    for incidencia in incidencias:
+        data = incidencia.to_dict()
+        recent.append({
+            "numero_ticket": data.get("numero_ticket"),
+            "tipo": data.get("tipo"),
+            "estado": data.get("estado"),
+            "descripcion": data.get("descripcion"),
+            "fecha_creacion": data["fecha_creacion"].isoformat() if data.get("fecha_creacion") else None,
+        })
+    return recent
+
+
+class EmployeePrefetcher:
+    """Caché por sesión de búsquedas de empleado lanzadas antes de la decisión del LLM"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        ttl_seconds: float = 120.0,
+        recent_incidents_limit: int = 5,
+        max_entries: int = 1000
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.recent_incidents_limit = recent_incidents_limit
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"started": 0, "reused": 0, "hits": 0, "misses": 0, "expired": 0}
+
+    @staticmethod
+    def _key(session_id: str, email: str) -> str:
+        return f"{session_id}|{email.strip().lower()}"
+
+    def start(self, session_id: Optional[str], email: Optional[str], db_auth: Optional[Any] = None) -> Optional[asyncio.Task]:
+        """
+        Lanzar la búsqueda de (sesión, email) si no está ya en curso.
+
+        Returns:
+            La tarea de la búsqueda, o None si está desactivado o faltan datos
+        """
+        if not self.enabled or not session_id or not email:
+            return None
+
+        self._expire()
+        key = self._key(session_id, email)
+        entry = self._entries.get(key)
+        if entry is not None and entry["task"].get_loop() is asyncio.get_running_loop():
+            self.stats["reused"] += 1
+            return entry["task"]
+
+        task = asyncio.ensure_future(self._load(email, db_auth))
+        self._entries[key] = {"task": task, "created": time.monotonic()}
+        self.stats["started"] += 1
+        logger.info(f"🔮 Prefetch del empleado {email} para la sesión {session_id}")
+        return task
+
+    async def consume(self, session_id: Optional[str], email: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Recoger (y retirar del caché) el resultado de la búsqueda de (sesión, email).
+
+        Returns:
+            {"employee_lookup": <resultado de search_employee>, "recent_incidents": [...]}
+            o None si no hay búsqueda en curso para ese email
+        """
+        if not session_id or not email:
+            return None
+
+        entry = self._entries.pop(self._key(session_id, email), None)
+        if entry is None or entry["task"].get_loop() is not asyncio.get_running_loop():
+            self.stats["misses"] += 1
+            return None
+
+        try:
+            result = await asyncio.shield(entry["task"])
+        except Exception as e:
+            logger.warning(f"⚠️ Prefetch del empleado {email} fallido: {e}")
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        logger.info(f"⚡ Búsqueda del empleado {email} recogida del prefetch")
+        return result
+
+    def discard(self, session_id: str):
+        """Cancelar y olvidar las búsquedas pendientes de una sesión"""
+        prefix = f"{session_id}|"
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self._cancel(self._entries.pop(key))
+
+    async def _load(self, email: str, db_auth: Optional[Any]) -> Dict[str, Any]:
+        with get_tracer().span("prefetch.employee", SPAN_KIND_CLIENT):
+            if self.recent_incidents_limit <= 0:
+                return {"employee_lookup": await search_employee(email, db_auth), "recent_incidents": []}
+
+            employee_lookup, recent_incidents = await asyncio.gather(
+                search_employee(email, db_auth),
+                fetch_recent_incidents(email, self.recent_incidents_limit)
+            )
+            return {"employee_lookup": employee_lookup, "recent_incidents": recent_incidents}
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]
+        # Acotar el caché: descartar primero las entradas más antiguas
+        overflow = len(self._entries) - len(expired) - self.max_entries + 1
+        if overflow > 0:
+            alive = sorted(
+                (key for key in self._entries if key not in expired),
+                key=lambda key: self._entries[key]["created"]
+            )
+            expired.extend(alive[:overflow])
+
+        for key in expired:
+            self._cancel(self._entries.pop(key))
+            self.stats["expired"] += 1
+
+    @staticmethod
+    def _cancel(entry: Dict[str, Any]):
+        task = entry["task"]
+        if not task.done() and not task.get_loop().is_closed():
+            task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del prefetch"""
+        return {**self.stats, "pending": len(self._entries)}
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_employee_prefetcher: Optional[EmployeePrefetcher] = None
+
+
+def get_employee_prefetcher() -> EmployeePrefetcher:
+    """Obtener instancia singleton del prefetch de empleados"""
+    global _employee_prefetcher
+    if _employee_prefetcher is None:
+        try:
+            from config.settings import get_settings
+            workflow_settings = get_settings().workflow
+            _employee_prefetcher = EmployeePrefetcher(
+                enabled=workflow_settings.employee_prefetch_enabled and workflow_settings.enable_database_lookup,
+                ttl_seconds=workflow_settings.employee_prefetch_ttl_seconds,
+                recent_incidents_limit=workflow_settings.employee_prefetch_recent_incidents
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Configuración de prefetch no disponible, usando valores por defecto: {e}")
+            _employee_prefetcher = EmployeePrefetcher()
+    return _employee_prefetcher
+
+
+def reset_employee_prefetcher():
+    """Resetear el prefetch global"""
+    global _employee_prefetcher
+    _employee_prefetcher = None
@@ -11,9 +11,14 @@ RESPONSABILIDADES:
 - IncidentPersistence: Persistencia y gestión del archivo JSON
 """
 
+import asyncio
+import concurrent.futures
 import json
+import os
 import random
 import logging
+import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple, List
@@ -26,6 +31,96 @@ from pydantic import BaseModel, Field
 
 from models.eroski_state import EroskiState
 from utils.llm.providers import get_llm
+from utils.llm.token_budget import get_token_budget
+from utils.llm.circuit_breaker import LLMCircuitOpenError
+
+
+# =============================================================================
+# ARCHIVO DE INCIDENCIAS COMPARTIDO
+# =============================================================================
+# Todas las sesiones (y el hilo de inicialización de classify) leen, modifican
+# y reescriben el mismo JSON: cada lectura-modificación-escritura se hace bajo
+# incidents_file_lock() y la escritura es atómica (temporal + os.replace), así
+# que ni se pierden registros entre escritores ni se lee un archivo a medias.
+
+_incidents_file_lock = threading.RLock()
+
+
+def incidents_file_lock() -> threading.RLock:
+    """Lock de proceso para las lecturas-modificaciones-escrituras del archivo de incidencias"""
+    return _incidents_file_lock
+
+
+def read_incidents_file(incidents_file: Path) -> Dict[str, Any]:
+    """Leer el archivo de incidencias ({} si no existe)"""
+    if not incidents_file.exists():
+        return {}
+    with open(incidents_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_incidents_file(incidents_file: Path, data: Dict[str, Any]) -> None:
+    """Escribir el archivo de incidencias de forma atómica (llamar con el lock tomado)"""
+    incidents_file = Path(incidents_file)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{incidents_file.name}.", suffix=".tmp", dir=incidents_file.parent
+    )
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, incidents_file)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+# =============================================================================
+# INICIALIZACIONES PENDIENTES (RAMAS PARALELAS)
+# =============================================================================
+# classify inicializa el registro en un hilo mientras el LLM clasifica; antes
+# de escribir sobre la misma incidencia la clasificación hace
+# `await wait_for_incident_initialization(código)`, que no bloquea el bucle
+# de eventos (las demás sesiones siguen atendiéndose mientras tanto).
+
+_pending_initializations: Dict[str, concurrent.futures.Future] = {}
+_pending_lock = threading.Lock()
+
+
+def mark_incident_initializing(incident_code: str) -> None:
+    """Registrar que la inicialización de una incidencia está en curso"""
+    with _pending_lock:
+        _pending_initializations.setdefault(incident_code, concurrent.futures.Future())
+
+
+def finish_incident_initialization(incident_code: str) -> None:
+    """Marcar la inicialización como terminada (con éxito o no) y liberar a quien espera"""
+    with _pending_lock:
+        future = _pending_initializations.pop(incident_code, None)
+    if future is not None:
+        future.set_result(True)
+
+
+async def wait_for_incident_initialization(incident_code: Optional[str], timeout: float = 10.0) -> bool:
+    """
+    Esperar (sin bloquear el bucle de eventos) a que termine la
+    inicialización en curso de una incidencia.
+    
+    Returns:
+        False si no terminó dentro del timeout
+    """
+    with _pending_lock:
+        future = _pending_initializations.get(incident_code) if incident_code else None
+    if future is None:
+        return True
+    try:
+        # shield: un timeout de quien espera no cancela la inicialización
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+    except asyncio.TimeoutError:
+        logging.getLogger("IncidentPersistence").warning(
+            f"⚠️ La inicialización de {incident_code} no terminó en {timeout}s"
+        )
+        return False
+    return True
 
 
 # =============================================================================
@@ -371,8 +466,10 @@ RESPONDE CON JSON VÁLIDO:
         }
         
         try:
-            formatted_prompt = self.prompt.format(**prompt_input)
-            response = await self.llm.ainvoke(formatted_prompt)
+            formatted_prompt, llm_kwargs = get_token_budget().format(
+                self.prompt, prompt_input, "confirmation", shrink_field="previous_solution"
+            )
+            response = await self.llm.ainvoke(formatted_prompt, **llm_kwargs)
             
             decision_data = self.parser.parse(response.content)
             decision = ConfirmationDecision(**decision_data)
@@ -381,6 +478,10 @@ RESPONDE CON JSON VÁLIDO:
             
             return decision
             
+        except LLMCircuitOpenError:
+            self.logger.warning("🔌 Circuito LLM abierto, interpretación por palabras clave")
+            return self._fallback_interpretation(user_message)
+            
         except Exception as e:
             self.logger.error(f"❌ Error en interpretación LLM: {e}")
             # Fallback: interpretación básica
@@ -469,7 +570,10 @@ class IncidentPersistence:
             "mensajes": []
         }
         
-        return self._save_incident_record(incident_code, incident_record)
+        try:
+            return self._save_incident_record(incident_code, incident_record)
+        finally:
+            finish_incident_initialization(incident_code)
     
     def update_incident(self, incident_code: str, updates: Dict[str, Any]) -> bool:
         """
@@ -483,16 +587,17 @@ class IncidentPersistence:
             True si se actualizó correctamente
         """
         try:
-            incidents_data = self._load_incidents_data()
-            
-            if incident_code in incidents_data:
-                incidents_data[incident_code].update(updates)
-                incidents_data[incident_code]["timestamp_actualizacion"] = datetime.now().isoformat()
+            with incidents_file_lock():
+                incidents_data = self._load_incidents_data()
                 
-                return self._save_incidents_data(incidents_data)
-            else:
-                self.logger.warning(f"⚠️ Incidencia {incident_code} no encontrada para actualizar")
-                return False
+                if incident_code in incidents_data:
+                    incidents_data[incident_code].update(updates)
+                    incidents_data[incident_code]["timestamp_actualizacion"] = datetime.now().isoformat()
+                    
+                    return self._save_incidents_data(incidents_data)
+                else:
+                    self.logger.warning(f"⚠️ Incidencia {incident_code} no encontrada para actualizar")
+                    return False
                 
         except Exception as e:
             self.logger.error(f"❌ Error actualizando incidencia {incident_code}: {e}")
@@ -566,21 +671,17 @@ class IncidentPersistence:
     
     def _load_incidents_data(self) -> Dict[str, Any]:
         """Cargar datos del archivo de incidencias"""
-        if not self.incidents_file.exists():
-            return {}
-        
         try:
-            with open(self.incidents_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_incidents_file(self.incidents_file)
         except Exception as e:
             self.logger.error(f"❌ Error leyendo archivo de incidencias: {e}")
             return {}
     
     def _save_incidents_data(self, data: Dict[str, Any]) -> bool:
-        """Guardar datos en archivo de incidencias"""
+        """Guardar datos en archivo de incidencias (escritura atómica)"""
         try:
-            with open(self.incidents_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with incidents_file_lock():
+                write_incidents_file(self.incidents_file, data)
             return True
         except Exception as e:
             self.logger.error(f"❌ Error guardando archivo de incidencias: {e}")
@@ -589,9 +690,10 @@ class IncidentPersistence:
     def _save_incident_record(self, incident_code: str, record: Dict[str, Any]) -> bool:
         """Guardar registro individual de incidencia"""
         try:
-            incidents_data = self._load_incidents_data()
-            incidents_data[incident_code] = record
-            return self._save_incidents_data(incidents_data)
+            with incidents_file_lock():
+                incidents_data = self._load_incidents_data()
+                incidents_data[incident_code] = record
+                return self._save_incidents_data(incidents_data)
         except Exception as e:
             self.logger.error(f"❌ Error guardando incidencia {incident_code}: {e}")
             return False
@@ -0,0 +1,283 @@
+# =====================================================
+# utils/incident_preclassifier.py - Preclasificador local de incidencias
+# =====================================================
+"""
+Preclasificador local (sin LLM) del tipo de incidencia.
+
+Construye un índice BM25 vectorizado con NumPy a partir de
+scripts/eroski_incidents.json (keywords, nombre, descripción y títulos de
+problemas) sobre tokens en español sin acentos. La puntuación se convierte
+en una confianza calibrada con un softmax con temperatura y una clase
+"ninguno"; ambos parámetros se ajustan al cargar el índice:
+- Positivos: los títulos de problema, en validación leave-one-out
+- Negativos: frases de saludo y autenticación
+
+Si la confianza supera el umbral configurado, TwoPhaseClassifier se salta
+la FASE 1 (LLM) y pasa directamente a la FASE 2.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("IncidentPreClassifier")
+
+DEFAULT_CONFIG_PATH = "scripts/eroski_incidents.json"
+
+# Longitud del prefijo usado como "raíz" (stemming por truncado)
+STEM_LENGTH = 6
+
+# Pesos de cada campo al construir el documento de un tipo
+FIELD_WEIGHTS = {"keywords": 3, "name": 2, "description": 1, "problems": 1}
+
+SPANISH_STOPWORDS = {
+    "a", "al", "algo", "con", "de", "del", "el", "ella", "en", "es", "esta", "este", "esto",
+    "ha", "hay", "la", "las", "le", "lo", "los", "me", "mi", "mis", "muy", "no", "nos", "o",
+    "para", "pero", "por", "que", "se", "si", "sin", "su", "sus", "te", "tengo", "tiene",
+    "un", "una", "uno", "y", "ya", "yo", "como", "cuando", "donde", "mas", "problema",
+    "problemas", "hola", "buenas", "buenos", "dias", "tardes", "gracias", "favor",
+}
+
+# Frases sin incidencia usadas como negativos en la calibración
+CALIBRATION_NEGATIVES = (
+    "hola buenos días",
+    "me llamo Juan Pérez",
+    "mi email es juan.perez@eroski.es",
+    "trabajo en Eroski Bilbao Centro",
+    "estoy en la sección de carnicería",
+    "sí, los datos son correctos",
+    "vale, gracias",
+    "necesito ayuda",
+)
+
+
+def fold_accents(text: str) -> str:
+    """Quitar acentos y diacríticos (á→a, ñ→n, ü→u)"""
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenizar texto en español: minúsculas, sin acentos, sin stopwords, raíz por prefijo"""
+    tokens = re.findall(r"[a-z0-9]+", fold_accents(text.lower()))
+    return [t[:STEM_LENGTH] for t in tokens if t not in SPANISH_STOPWORDS and len(t) > 1]
+
+
+@dataclass
+class PreClassification:
+    """Resultado del preclasificador"""
+    incident_type: Optional[str]
+    confidence: float
+    ranking: List[Tuple[str, float]] = field(default_factory=list)
+    matched_terms: List[str] = field(default_factory=list)
+
+
+class IncidentPreClassifier:
+    """Clasificador BM25 del tipo de incidencia con confianza calibrada"""
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.type_ids: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.temperature = 1.0
+        self.null_score = 1.0
+
+        self._term_counts = np.zeros((0, 0))
+        self._weights = np.zeros((0, 0))
+        self._idf = np.zeros(0)
+        self._problem_samples: List[Tuple[str, str]] = []
+
+        self._load(config_path)
+
+    # -------------------------------------------------
+    # Construcción del índice
+    # -------------------------------------------------
+
+    def _load(self, config_path: str):
+        path = Path(config_path)
+        if not path.exists():
+            logger.warning(f"⚠️ No existe {config_path}, preclasificador desactivado")
+            return
+
+        with open(path, "r", encoding="utf-8") as f:
+            incident_types = json.load(f).get("incident_types", {})
+
+        documents: List[List[str]] = []
+        for type_id, data in incident_types.items():
+            tokens: List[str] = []
+            tokens += tokenize(" ".join(data.get("keywords", []))) * FIELD_WEIGHTS["keywords"]
+            tokens += tokenize(data.get("name", "")) * FIELD_WEIGHTS["name"]
+            tokens += tokenize(data.get("description", "")) * FIELD_WEIGHTS["description"]
+            for problem in data.get("problemas", {}):
+                tokens += tokenize(problem) * FIELD_WEIGHTS["problems"]
+                self._problem_samples.append((problem, type_id))
+            self.type_ids.append(type_id)
+            documents.append(tokens)
+
+        for tokens in documents:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        counts = np.zeros((len(documents), len(self.vocabulary)))
+        for row, tokens in enumerate(documents):
+            for token in tokens:
+                counts[row, self.vocabulary[token]] += 1
+
+        self._term_counts = counts
+        self._weights = self._bm25_weights(counts)
+        self._calibrate()
+
+        logger.info(
+            f"✅ Preclasificador cargado: {len(self.type_ids)} tipos, {len(self.vocabulary)} términos "
+            f"(T={self.temperature:.2f}, nulo={self.null_score:.2f})"
+        )
+
+    def _bm25_weights(self, counts: np.ndarray) -> np.ndarray:
+        """Matriz tipos×términos con el peso BM25 de cada término"""
+        n_docs = counts.shape[0]
+        doc_freq = (counts > 0).sum(axis=0)
+        self._idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        doc_len = counts.sum(axis=1, keepdims=True)
+        avg_len = doc_len.mean() if n_docs else 1.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+        return self._idf * counts * (self.k1 + 1) / (counts + norm)
+
+    # -------------------------------------------------
+    # Puntuación
+    # -------------------------------------------------
+
+    def _query_vector(self, text: str) -> Tuple[np.ndarray, List[str]]:
+        vector = np.zeros(len(self.vocabulary))
+        matched = []
+        for token in set(tokenize(text)):
+            index = self.vocabulary.get(token)
+            if index is not None:
+                vector[index] = 1.0
+                matched.append(token)
+        return vector, sorted(matched)
+
+    def _probabilities(self, scores: np.ndarray, temperature: float, null_score: float) -> np.ndarray:
+        """Softmax sobre [tipos..., ninguno]"""
+        logits = np.append(scores, null_score) / temperature
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def score(self, text: str) -> np.ndarray:
+        """Puntuaciones BM25 de cada tipo para el texto"""
+        vector, _ = self._query_vector(text)
+        return self._weights @ vector
+
+    def classify(self, text: str) -> PreClassification:
+        """
+        Clasificar un texto.
+
+        Returns:
+            PreClassification con el tipo más probable y su confianza calibrada
+        """
+        if not self.type_ids or not text.strip():
+            return PreClassification(incident_type=None, confidence=0.0)
+
+        vector, matched = self._query_vector(text)
+        scores = self._weights @ vector
+        probs = self._probabilities(scores, self.temperature, self.null_score)
+
+        type_probs = probs[:-1]
+        order = np.argsort(-type_probs)
+        ranking = [(self.type_ids[i], float(type_probs[i])) for i in order]
+
+        best = int(order[0])
+        if not matched or probs[best] <= probs[-1]:
+            return PreClassification(incident_type=None, confidence=float(probs[best]), ranking=ranking)
+
+        return PreClassification(
+            incident_type=self.type_ids[best],
+            confidence=float(probs[best]),
+            ranking=ranking,
+            matched_terms=matched
+        )
+
+    # -------------------------------------------------
+    # Calibración
+    # -------------------------------------------------
+
+    def _leave_one_out_scores(self) -> List[Tuple[np.ndarray, Optional[int]]]:
+        """Puntuaciones de cada muestra de calibración sin su propia contribución"""
+        samples: List[Tuple[np.ndarray, Optional[int]]] = []
+        for text, type_id in self._problem_samples:
+            row = self.type_ids.index(type_id)
+            counts = self._term_counts.copy()
+            for token in tokenize(text):
+                counts[row, self.vocabulary[token]] -= FIELD_WEIGHTS["problems"]
+            weights = self._bm25_weights(np.clip(counts, 0, None))
+            vector, _ = self._query_vector(text)
+            samples.append((weights @ vector, row))
+
+        # _bm25_weights actualiza el idf: restaurar el del índice completo
+        self._bm25_weights(self._term_counts)
+
+        for text in CALIBRATION_NEGATIVES:
+            samples.append((self.score(text), None))
+        return samples
+
+    def _calibrate(self):
+        """Ajustar temperatura y puntuación nula minimizando la log-verosimilitud negativa"""
+        samples = self._leave_one_out_scores()
+        if not samples:
+            return
+
+        scores = np.array([sample_scores for sample_scores, _ in samples])
+        targets = np.array([len(self.type_ids) if label is None else label for _, label in samples])
+        rows = np.arange(len(samples))
+
+        best = (float("inf"), self.temperature, self.null_score)
+        for temperature in np.geomspace(0.1, 5.0, 25):
+            for null_score in np.linspace(0.0, 6.0, 25):
+                logits = np.hstack([scores, np.full((len(samples), 1), null_score)]) / temperature
+                logits -= logits.max(axis=1, keepdims=True)
+                log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+                loss = -log_probs[rows, targets].sum()
+                if loss < best[0]:
+                    best = (float(loss), float(temperature), float(null_score))
+
+        _, self.temperature, self.null_score = best
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_preclassifier: Optional[IncidentPreClassifier] = None
+
+
+def get_incident_preclassifier() -> IncidentPreClassifier:
+    """Obtener instancia singleton del preclasificador"""
+    global _preclassifier
+    if _preclassifier is None:
+        _preclassifier = IncidentPreClassifier()
+    return _preclassifier
+
+
+def preclassify_messages(user_messages: Sequence[str]) -> PreClassification:
+    """
+    Preclasificar a partir de los mensajes del usuario de la conversación.
+
+    Se puntúa el último mensaje; si no es concluyente, todo el historial.
+    """
+    classifier = get_incident_preclassifier()
+    if not user_messages:
+        return PreClassification(incident_type=None, confidence=0.0)
+
+    last = classifier.classify(user_messages[-1])
+    if last.incident_type or len(user_messages) == 1:
+        return last
+
+    history = classifier.classify(" ".join(user_messages))
+    return history if history.incident_type else last
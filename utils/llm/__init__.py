@@ -1,16 +1,74 @@
 # =====================================================
 # utils/llm/__init__.py - Exportaciones
 # =====================================================
-from .providers import get_llm, reset_llm
-from .message_generator import generate_natural_message, detect_confirmation_intent, generate_followup_questions
-from .prompts import URGENCY_CLASSIFICATION_PROMPT, INCIDENT_SUMMARY_PROMPT
+"""
+Exportaciones perezosas (PEP 562): importar un submódulo (utils.llm.scheduler,
+utils.llm.telemetry...) no carga langchain_openai ni el resto de capas.
+"""
 
-__all__ = [
-    "get_llm",
-    "reset_llm",
-    "generate_natural_message", 
-    "detect_confirmation_intent",
-    "generate_followup_questions",
-    "URGENCY_CLASSIFICATION_PROMPT",
-    "INCIDENT_SUMMARY_PROMPT"
-]
\ No newline at end of file
+import importlib
+from typing import Any, Dict
+
+# Nombre exportado -> submódulo
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "get_llm": ".providers",
+    "reset_llm": ".providers",
+    "get_llm_stats": ".providers",
+    "LLMResponseCache": ".cache",
+    "CachedChatModel": ".cache",
+    "get_llm_cache": ".cache",
+    "BalancedChatModel": ".balancer",
+    "BalancerTarget": ".balancer",
+    "SingleFlightChatModel": ".singleflight",
+    "HedgedChatModel": ".hedging",
+    "CircuitBreaker": ".circuit_breaker",
+    "CircuitBreakerChatModel": ".circuit_breaker",
+    "LLMCircuitOpenError": ".circuit_breaker",
+    "get_llm_circuit_breaker": ".circuit_breaker",
+    "LLMScheduler": ".scheduler",
+    "ScheduledChatModel": ".scheduler",
+    "get_llm_scheduler": ".scheduler",
+    "priority_from_state": ".scheduler",
+    "llm_priority_scope": ".scheduler",
+    "set_llm_priority": ".scheduler",
+    "LLMTelemetry": ".telemetry",
+    "get_llm_telemetry": ".telemetry",
+    "llm_call_context": ".telemetry",
+    "get_http_client": ".http_client",
+    "get_async_http_client": ".http_client",
+    "warm_up_connections": ".http_client",
+    "LLMCassette": ".replay",
+    "RecordingChatModel": ".replay",
+    "ReplayChatModel": ".replay",
+    "LLMReplayMissError": ".replay",
+    "TokenBudget": ".token_budget",
+    "TokenProfile": ".token_budget",
+    "get_token_budget": ".token_budget",
+    "StructuredOutputError": ".structured",
+    "ainvoke_structured": ".structured",
+    "get_structured_output_stats": ".structured",
+    "HistoryCompactor": ".history",
+    "get_history_compactor": ".history",
+    "compact_history": ".history",
+    "format_history": ".history",
+    "generate_natural_message": ".message_generator",
+    "detect_confirmation_intent": ".message_generator",
+    "generate_followup_questions": ".message_generator",
+    "URGENCY_CLASSIFICATION_PROMPT": ".prompts",
+    "INCIDENT_SUMMARY_PROMPT": ".prompts",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,193 @@
+# =====================================================
+# utils/llm/balancer.py - Balanceo entre deployments de Azure OpenAI
+# =====================================================
+"""
+Cliente que reparte las llamadas entre varios deployments de Azure OpenAI.
+
+CARACTERÍSTICAS:
+- Enrutado por menor número de peticiones en curso (ponderado por peso)
+- Expulsión temporal (cool-down) de endpoints que fallan
+- Failover a otro deployment ante timeout o error de servidor
+- Estadísticas por deployment
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .scheduler import retry_after_seconds
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.Balancer")
+
+
+@dataclass
+class BalancerTarget:
+    """Estado de un deployment dentro del balanceador"""
+    name: str
+    client: Any
+    weight: float = 1.0
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+    total_latency: float = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def load_score(self) -> float:
+        return (self.outstanding + 1) / max(self.weight, 1e-6)
+
+
+class BalancedChatModel(ChatModelWrapper):
+    """
+    Chat model que reparte ainvoke entre varios clientes de Azure.
+
+    Los atributos no definidos aquí (deployment_name, temperature...) se
+    delegan al primer deployment, de forma que el resto de capas (cache,
+    scheduler) lo tratan como un modelo normal.
+    """
+
+    def __init__(
+        self,
+        targets: List[BalancerTarget],
+        eject_after_failures: int = 3,
+        cooldown_seconds: float = 30.0,
+        failover_timeout: Optional[float] = None
+    ):
+        if not targets:
+            raise ValueError("Se necesita al menos un deployment para el balanceador")
+        super().__init__(targets[0].client)
+        self.targets = targets
+        self.eject_after_failures = max(1, eject_after_failures)
+        self.cooldown_seconds = cooldown_seconds
+        self.failover_timeout = failover_timeout
+        self.stats = {"requests": 0, "failovers": 0, "all_ejected": 0}
+
+    # -------------------------------------------------
+    # Selección de deployment
+    # -------------------------------------------------
+
+    def _select_target(self, exclude: List[BalancerTarget]) -> Optional[BalancerTarget]:
+        now = time.monotonic()
+        candidates = [t for t in self.targets if t not in exclude and t.is_available(now)]
+
+        if not candidates:
+            # Todos expulsados: usar el que antes vuelve a estar disponible
+            remaining = [t for t in self.targets if t not in exclude]
+            if not remaining:
+                return None
+            self.stats["all_ejected"] += 1
+            return min(remaining, key=lambda t: t.ejected_until)
+
+        best_score = min(t.load_score() for t in candidates)
+        best = [t for t in candidates if t.load_score() == best_score]
+        return random.choice(best)
+
+    def _record_success(self, target: BalancerTarget, latency: float):
+        target.consecutive_failures = 0
+        target.total_latency += latency
+
+    def _record_failure(self, target: BalancerTarget, error: Exception):
+        target.failures += 1
+        target.consecutive_failures += 1
+
+        cooldown = None
+        if _is_rate_limit(error):
+            cooldown = _retry_after(error, self.cooldown_seconds)
+        elif target.consecutive_failures >= self.eject_after_failures:
+            cooldown = self.cooldown_seconds
+
+        if cooldown is not None:
+            target.ejected_until = time.monotonic() + cooldown
+            target.ejections += 1
+            logger.warning(f"🚫 Deployment {target.name} expulsado {cooldown:.0f}s: {type(error).__name__}")
+
+    # -------------------------------------------------
+    # Llamadas
+    # -------------------------------------------------
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        self.stats["requests"] += 1
+        tried: List[BalancerTarget] = []
+        last_error: Optional[Exception] = None
+
+        while True:
+            target = self._select_target(tried)
+            if target is None:
+                raise last_error
+            if tried:
+                self.stats["failovers"] += 1
+                logger.info(f"🔀 Failover a {target.name}")
+            tried.append(target)
+
+            target.outstanding += 1
+            target.requests += 1
+            start = time.monotonic()
+            try:
+                call = target.client.ainvoke(llm_input, config=config, **kwargs)
+                if self.failover_timeout:
+                    response = await asyncio.wait_for(call, timeout=self.failover_timeout)
+                else:
+                    response = await call
+                self._record_success(target, time.monotonic() - start)
+                return response
+            except Exception as e:
+                if not _is_failover_error(e):
+                    raise
+                self._record_failure(target, e)
+                last_error = e
+            finally:
+                target.outstanding -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas globales y por deployment"""
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "targets": {
+                t.name: {
+                    "weight": t.weight,
+                    "outstanding": t.outstanding,
+                    "requests": t.requests,
+                    "failures": t.failures,
+                    "ejections": t.ejections,
+                    "available": t.is_available(now),
+                    "avg_latency_seconds": t.total_latency / max(1, t.requests - t.failures),
+                }
+                for t in self.targets
+            },
+        }
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    try:
+        import openai
+        return isinstance(error, openai.RateLimitError)
+    except ImportError:
+        return False
+
+
+def _retry_after(error: Exception, default: float) -> float:
+    response = getattr(error, "response", None)
+    headers = dict(response.headers) if response is not None else None
+    return retry_after_seconds(headers, default)
+
+
+def _is_failover_error(error: Exception) -> bool:
+    """Errores que justifican probar otro deployment"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and getattr(error, "status_code", 0) >= 500
@@ -0,0 +1,299 @@
+# =====================================================
+# utils/llm/cache.py - Cache de respuestas del LLM
+# =====================================================
+"""
+Cache compartido de respuestas del LLM.
+
+CARACTERÍSTICAS:
+- Clave = deployment + hash del prompt + parámetros de generación
+- Nivel en memoria LRU con TTL
+- Nivel opcional en SQLite que sobrevive a reinicios
+- Contadores de aciertos/fallos
+- Envoltorio transparente sobre el chat model (ainvoke/invoke)
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.Cache")
+
+
+def serialize_llm_input(llm_input: Any) -> str:
+    """
+    Serializar la entrada de ainvoke (str, lista de mensajes o PromptValue)
+    a un texto estable para calcular la clave.
+    """
+    if isinstance(llm_input, str):
+        return llm_input
+
+    if hasattr(llm_input, "to_messages"):
+        llm_input = llm_input.to_messages()
+
+    if isinstance(llm_input, (list, tuple)):
+        items = []
+        for item in llm_input:
+            if isinstance(item, BaseMessage):
+                items.append({"type": item.type, "content": item.content})
+            else:
+                items.append(item)
+        return json.dumps(items, ensure_ascii=False, sort_keys=True, default=str)
+
+    return str(llm_input)
+
+
+def get_generation_params(llm: Any, **kwargs) -> Dict[str, Any]:
+    """Parámetros de generación que afectan a la respuesta"""
+    params = {
+        "deployment": getattr(llm, "deployment_name", None) or getattr(llm, "model_name", None),
+        "temperature": getattr(llm, "temperature", None),
+        "max_tokens": getattr(llm, "max_tokens", None),
+    }
+    for key, value in kwargs.items():
+        if key not in ("config", "callbacks"):
+            params[key] = value
+    return params
+
+
+def build_cache_key(llm_input: Any, params: Dict[str, Any]) -> str:
+    """Construir clave del cache: sha256(parámetros + prompt)"""
+    payload = json.dumps(params, sort_keys=True, default=str) + "\n" + serialize_llm_input(llm_input)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache de dos niveles para respuestas del LLM.
+
+    - Memoria: OrderedDict LRU con TTL por entrada
+    - SQLite (opcional): persistente, mismo TTL
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: int = 3600,
+        sqlite_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        if sqlite_path:
+            self._init_sqlite(sqlite_path)
+
+    # -------------------------------------------------
+    # SQLite
+    # -------------------------------------------------
+
+    def _init_sqlite(self, path: str):
+        """Inicializar nivel persistente en SQLite"""
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._conn.commit()
+            logger.info(f"💾 Cache LLM persistente en {path}")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo abrir cache SQLite ({path}): {e}")
+            self._conn = None
+
+    def _sqlite_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT created_at, payload FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            return row[0], json.loads(row[1])
+        except Exception as e:
+            logger.warning(f"⚠️ Error leyendo cache SQLite: {e}")
+            return None
+
+    def _sqlite_set(self, key: str, created_at: float, payload: Dict[str, Any]):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, created_at, payload) VALUES (?, ?, ?)",
+                (key, created_at, json.dumps(payload, ensure_ascii=False))
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Error escribiendo cache SQLite: {e}")
+
+    def _sqlite_delete(self, key: str):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Error borrando de cache SQLite: {e}")
+
+    # -------------------------------------------------
+    # API
+    # -------------------------------------------------
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and (time.time() - created_at) > self.ttl_seconds
+
+    def _memory_set(self, key: str, created_at: float, payload: Dict[str, Any]):
+        self._memory[key] = (created_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        """Obtener respuesta cacheada o None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_expired(entry[0]):
+                    del self._memory[key]
+                    self.stats["expired"] += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return messages_from_dict([entry[1]])[0]
+
+            entry = self._sqlite_get(key)
+            if entry is not None:
+                if self._is_expired(entry[0]):
+                    self._sqlite_delete(key)
+                    self.stats["expired"] += 1
+                else:
+                    self._memory_set(key, entry[0], entry[1])
+                    self.stats["hits"] += 1
+                    self.stats["sqlite_hits"] += 1
+                    return messages_from_dict([entry[1]])[0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, message: BaseMessage):
+        """Guardar respuesta en ambos niveles"""
+        payload = message_to_dict(message)
+        created_at = time.time()
+        with self._lock:
+            self._memory_set(key, created_at, payload)
+            self._sqlite_set(key, created_at, payload)
+            self.stats["stores"] += 1
+
+    def clear(self):
+        """Vaciar ambos niveles del cache"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM llm_cache")
+                    self._conn.commit()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error limpiando cache SQLite: {e}")
+        logger.info("🧹 Cache LLM limpiado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del cache"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._memory),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "persistent": self._conn is not None,
+        }
+
+
+class CachedChatModel(ChatModelWrapper):
+    """
+    Envoltorio sobre el chat model que consulta el cache antes de llamar a Azure.
+
+    Expone la misma interfaz que usan los nodos (ainvoke/invoke); el resto de
+    atributos se delegan al modelo original.
+    """
+
+    def __init__(self, llm: Any, cache: LLMResponseCache):
+        super().__init__(llm)
+        self.cache = cache
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> BaseMessage:
+        key = build_cache_key(llm_input, get_generation_params(self.llm, **kwargs))
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"🎯 Cache hit LLM: {key[:12]}")
+            return cached
+
+        response = await self.llm.ainvoke(llm_input, config=config, **kwargs)
+        self.cache.set(key, response)
+        return response
+
+    def invoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> BaseMessage:
+        key = build_cache_key(llm_input, get_generation_params(self.llm, **kwargs))
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self.llm.invoke(llm_input, config=config, **kwargs)
+        self.cache.set(key, response)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.cache.get_stats()
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Obtener instancia singleton del cache de respuestas"""
+    global _llm_cache
+    if _llm_cache is None:
+        from config.settings import get_settings
+        llm_settings = get_settings().llm
+        _llm_cache = LLMResponseCache(
+            max_entries=llm_settings.cache_max_entries,
+            ttl_seconds=llm_settings.cache_ttl_seconds,
+            sqlite_path=llm_settings.cache_sqlite_path
+        )
+    return _llm_cache
+
+
+def reset_llm_cache():
+    """Resetear el cache global (útil para tests)"""
+    global _llm_cache
+    _llm_cache = None
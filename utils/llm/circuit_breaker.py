@@ -0,0 +1,216 @@
+# =====================================================
+# utils/llm/circuit_breaker.py - Circuit breaker del LLM
+# =====================================================
+"""
+Circuit breaker compartido por todas las llamadas al LLM.
+
+- Cerrado: las llamadas pasan; N fallos transitorios seguidos lo abren
+  (timeouts, errores de conexión, 429 y 5xx; ver is_transient_error)
+- Abierto: las llamadas fallan al instante con LLMCircuitOpenError durante
+  el cool-down, y los nodos usan sus fallbacks por reglas/keywords
+- Semiabierto: pasado el cool-down se deja pasar una llamada de prueba; si
+  va bien se cierra, si falla vuelve a abrirse
+
+Así, con Azure caído o muy lento, un turno tarda milisegundos en lugar de
+esperar el timeout completo en cada llamada.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.CircuitBreaker")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+# Errores de transporte (openai / httpx) que indican que Azure no está disponible
+TRANSIENT_ERROR_NAMES = {"APITimeoutError", "APIConnectionError", "TransportError"}
+
+
+class LLMCircuitOpenError(Exception):
+    """El circuito está abierto: no se llama al LLM y se debe usar el fallback"""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    ¿El error indica que el servicio no está disponible?
+
+    Solo timeouts, errores de conexión, 429 y 5xx cuentan para abrir el
+    circuito. Un 400/401/404 (filtro de contenido, contexto demasiado largo)
+    o un error local dependen de la petición, no de Azure.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+def service_responded(error: BaseException) -> bool:
+    """¿El error es una respuesta HTTP del servicio (p. ej. un 400)?"""
+    return isinstance(getattr(error, "status_code", None), int)
+
+
+class CircuitBreaker:
+    """Máquina de estados cerrado → abierto → semiabierto"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.stats = {"opens": 0, "short_circuited": 0, "failures": 0, "successes": 0, "probes": 0,
+                      "ignored_errors": 0}
+
+    def allow(self) -> bool:
+        """¿Puede pasar la llamada? (en semiabierto, solo las de prueba)"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                return False
+            self.state = STATE_HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info("🟡 Circuito LLM semiabierto: probando Azure")
+
+        if self.state == STATE_HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                return False
+            self._probes_in_flight += 1
+            self.stats["probes"] += 1
+
+        return True
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self._mark_available()
+
+    def _mark_available(self):
+        self.consecutive_failures = 0
+        if self.state == STATE_HALF_OPEN:
+            self.state = STATE_CLOSED
+            self._probes_in_flight = 0
+            logger.info("🟢 Circuito LLM cerrado: Azure responde de nuevo")
+
+    def record_error(self, error: BaseException):
+        """
+        Registrar el error de una llamada según su tipo.
+
+        - Transitorio: cuenta como fallo
+        - Respuesta de error del servicio (4xx): Azure responde, la racha se reinicia
+        - Error local: no cambia la racha (solo libera el hueco de prueba)
+        """
+        if is_transient_error(error):
+            self.record_failure(error)
+            return
+
+        self.stats["ignored_errors"] += 1
+        if service_responded(error):
+            self._mark_available()
+        else:
+            self.release_probe()
+
+    def record_failure(self, error: BaseException):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open(error)
+
+    def release_probe(self):
+        """Liberar el hueco de prueba si la llamada se canceló sin resultado"""
+        if self.state == STATE_HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def _open(self, error: BaseException):
+        if self.state != STATE_OPEN:
+            self.stats["opens"] += 1
+            logger.warning(
+                f"🔴 Circuito LLM abierto {self.cooldown_seconds:.0f}s tras "
+                f"{self.consecutive_failures} fallos ({type(error).__name__})"
+            )
+        self.state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "state": self.state, "consecutive_failures": self.consecutive_failures}
+
+
+class CircuitBreakerChatModel(ChatModelWrapper):
+    """Envoltorio que corta las llamadas al LLM mientras el circuito está abierto"""
+
+    def __init__(self, llm: Any, breaker: CircuitBreaker, call_timeout: Optional[float] = None):
+        super().__init__(llm)
+        self.breaker = breaker
+        self.call_timeout = call_timeout
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        if not self.breaker.allow():
+            self.breaker.stats["short_circuited"] += 1
+            raise LLMCircuitOpenError("Circuito LLM abierto")
+
+        try:
+            call = self.llm.ainvoke(llm_input, config=config, **kwargs)
+            if self.call_timeout:
+                response = await asyncio.wait_for(call, timeout=self.call_timeout)
+            else:
+                response = await call
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self.breaker.record_error(e)
+            raise
+
+        self.breaker.record_success()
+        return response
+
+    def invoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        if not self.breaker.allow():
+            self.breaker.stats["short_circuited"] += 1
+            raise LLMCircuitOpenError("Circuito LLM abierto")
+
+        try:
+            response = self.llm.invoke(llm_input, config=config, **kwargs)
+        except Exception as e:
+            self.breaker.record_error(e)
+            raise
+
+        self.breaker.record_success()
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.breaker.get_stats()
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_circuit_breaker: Optional[CircuitBreaker] = None
+
+
+def get_llm_circuit_breaker() -> CircuitBreaker:
+    """Obtener instancia singleton del circuit breaker"""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        from config.settings import get_settings
+        llm_settings = get_settings().llm
+        _circuit_breaker = CircuitBreaker(
+            failure_threshold=llm_settings.circuit_breaker_failure_threshold,
+            cooldown_seconds=llm_settings.circuit_breaker_cooldown_seconds
+        )
+    return _circuit_breaker
+
+
+def reset_llm_circuit_breaker():
+    """Resetear el circuit breaker global"""
+    global _circuit_breaker
+    _circuit_breaker = None
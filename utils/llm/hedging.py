@@ -0,0 +1,156 @@
+# =====================================================
+# utils/llm/hedging.py - Peticiones duplicadas (hedging) contra la cola lenta
+# =====================================================
+"""
+Capa de hedging para el LLM.
+
+Si una llamada no ha respondido en el p90 reciente de su nodo, se lanza una
+copia; la primera que termina gana y la otra se cancela. Con balanceo entre
+deployments la copia va al deployment con menos peticiones en curso, que no
+es el de la original (ya tiene una pendiente).
+
+Para no duplicar el coste:
+- Solo se hace hedging con suficientes muestras de latencia del nodo
+- La proporción de llamadas duplicadas en la ventana reciente está acotada
+- No se duplica si el planificador tiene cola (sobrecarga, no cola lenta)
+
+La copia lleva la etiqueta HEDGE_TAG: en process_message_stream sus tokens
+se descartan para no intercalarlos con los de la llamada original.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+from langchain_core.runnables.config import ensure_config
+
+from .streaming import HEDGE_TAG
+from .telemetry import UNKNOWN, get_llm_call_context, percentile
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.Hedging")
+
+
+class HedgedChatModel(ChatModelWrapper):
+    """Envoltorio que duplica las llamadas lentas y se queda con la primera respuesta"""
+
+    def __init__(
+        self,
+        llm: Any,
+        trigger_percentile: float = 90.0,
+        max_hedge_ratio: float = 0.1,
+        min_samples: int = 20,
+        window: int = 200,
+        min_delay_seconds: float = 0.5,
+        can_hedge: Optional[Callable[[], bool]] = None
+    ):
+        super().__init__(llm)
+        self.trigger_percentile = trigger_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.can_hedge = can_hedge
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._recent_hedges: Deque[bool] = deque(maxlen=window)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "skipped_by_cap": 0, "skipped_by_load": 0}
+
+    # -------------------------------------------------
+    # Política
+    # -------------------------------------------------
+
+    def hedge_delay(self, node: str) -> Optional[float]:
+        """Retardo antes de duplicar la llamada (p90 del nodo) o None si no hay datos"""
+        latencies = self._latencies.get(node)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay_seconds, percentile(sorted(latencies), self.trigger_percentile))
+
+    def _hedge_allowed(self) -> bool:
+        recent = len(self._recent_hedges)
+        if recent and sum(self._recent_hedges) >= self.max_hedge_ratio * recent:
+            self.stats["skipped_by_cap"] += 1
+            return False
+        if self.can_hedge is not None and not self.can_hedge():
+            self.stats["skipped_by_load"] += 1
+            return False
+        return True
+
+    def _observe(self, node: str, latency: float, hedged: bool):
+        self._latencies[node].append(latency)
+        self._recent_hedges.append(hedged)
+
+    # -------------------------------------------------
+    # Llamadas
+    # -------------------------------------------------
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        node = get_llm_call_context().get("node") or UNKNOWN
+        self.stats["calls"] += 1
+        delay = self.hedge_delay(node)
+        start = time.monotonic()
+
+        if delay is None:
+            response = await self.llm.ainvoke(llm_input, config=config, **kwargs)
+            self._observe(node, time.monotonic() - start, hedged=False)
+            return response
+
+        primary = asyncio.ensure_future(self.llm.ainvoke(llm_input, config=config, **kwargs))
+        tasks: Set[asyncio.Task] = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._hedge_allowed():
+                response = await primary
+                self._observe(node, time.monotonic() - start, hedged=False)
+                return response
+
+            self.stats["hedged"] += 1
+            logger.debug(f"🪃 Hedging en {node}: sin respuesta tras {delay:.2f}s")
+            hedge_start = time.monotonic()
+            hedge = asyncio.ensure_future(self.llm.ainvoke(llm_input, config=_hedge_config(config), **kwargs))
+            tasks.add(hedge)
+
+            winner = await _first_success(tasks)
+            if winner is hedge:
+                self.stats["hedge_wins"] += 1
+                self._observe(node, time.monotonic() - hedge_start, hedged=True)
+            else:
+                self._observe(node, time.monotonic() - start, hedged=True)
+            return winner.result()
+        finally:
+            # La perdedora (o todas, si nos cancelan) se cancela
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tasa de hedging y retardo actual por nodo"""
+        calls = self.stats["calls"]
+        return {
+            **self.stats,
+            "hedge_rate": self.stats["hedged"] / calls if calls else 0.0,
+            "recent_hedge_rate": sum(self._recent_hedges) / len(self._recent_hedges) if self._recent_hedges else 0.0,
+            "hedge_delay_seconds": {node: self.hedge_delay(node) for node in self._latencies},
+        }
+
+
+def _hedge_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Config de la copia: la de la llamada (o la del nodo) con HEDGE_TAG"""
+    hedge_config = ensure_config(config)
+    hedge_config["tags"] = [*hedge_config.get("tags", []), HEDGE_TAG]
+    return hedge_config
+
+
+async def _first_success(tasks: Set[asyncio.Task]) -> asyncio.Task:
+    """Primera tarea que termina sin error; si fallan todas, el primer error"""
+    pending = set(tasks)
+    first_error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is None:
+                return task
+            first_error = first_error or error
+    raise first_error
@@ -0,0 +1,201 @@
+# =====================================================
+# utils/llm/history.py - Compactación del historial de conversación
+# =====================================================
+"""
+Ventana de historial + resumen incremental para los prompts de clasificación.
+
+Los últimos mensajes se incluyen literalmente; los anteriores se condensan en
+un resumen guardado en EroskiState (conversation_summary) junto con el número
+de mensajes ya resumidos (summarized_message_count). El resumen solo se
+actualiza cuando la ventana se desliza un lote completo, de modo que el
+tamaño del prompt queda acotado en sesiones largas sin llamar al LLM en cada
+turno.
+"""
+
+import dataclasses
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.types import Command
+
+from .token_budget import get_token_budget
+
+logger = logging.getLogger("LLM.History")
+
+SUMMARY_FIELD = "conversation_summary"
+SUMMARY_COUNT_FIELD = "summarized_message_count"
+
+SUMMARY_PROMPT = """Eres un asistente que resume conversaciones de soporte técnico de Eroski.
+
+RESUMEN ANTERIOR:
+{previous_summary}
+
+NUEVOS MENSAJES A INCORPORAR:
+{new_messages}
+
+Actualiza el resumen incorporando los nuevos mensajes. Conserva los datos
+útiles para clasificar la incidencia: equipo afectado, síntomas, códigos de
+error, pasos ya probados y lo que el usuario ha confirmado o descartado.
+Máximo 120 palabras. Responde SOLO con el resumen."""
+
+
+def format_message(message: BaseMessage) -> Optional[str]:
+    """Formato por defecto de un mensaje del historial"""
+    if isinstance(message, HumanMessage):
+        return f"👤 Usuario: {message.content}"
+    if isinstance(message, AIMessage):
+        return f"🤖 Asistente: {message.content}"
+    return None
+
+
+class HistoryCompactor:
+    """Mantiene la ventana de mensajes recientes y el resumen de los anteriores"""
+
+    def __init__(self, llm: Any = None, window_messages: int = 10, summary_batch: int = 6):
+        self._llm = llm
+        self.window_messages = window_messages
+        self.summary_batch = summary_batch
+        self.stats = {"summaries": 0, "summarized_messages": 0, "errors": 0}
+
+    @property
+    def llm(self) -> Any:
+        if self._llm is None:
+            from .providers import get_llm
+            self._llm = get_llm()
+        return self._llm
+
+    def split(self, state: Dict[str, Any]) -> Tuple[Optional[str], List[BaseMessage]]:
+        """
+        Separar el historial en (resumen, mensajes sin resumir).
+
+        Si el recuento guardado no cuadra con los mensajes (historial
+        reiniciado), se ignora el resumen.
+        """
+        messages = list(state.get("messages", []))
+        count = state.get(SUMMARY_COUNT_FIELD) or 0
+        if count > len(messages):
+            return None, messages
+        return state.get(SUMMARY_FIELD), messages[count:]
+
+    def needs_compaction(self, state: Dict[str, Any]) -> bool:
+        """La ventana se ha desplazado al menos un lote completo"""
+        _, pending = self.split(state)
+        return len(pending) >= self.window_messages + self.summary_batch
+
+    async def compact(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Incorporar al resumen los mensajes que han salido de la ventana.
+
+        Returns:
+            Actualizaciones de estado (vacío si no hace falta resumir o si falla el LLM)
+        """
+        if not self.needs_compaction(state):
+            return {}
+
+        summary, pending = self.split(state)
+        to_summarize = pending[:len(pending) - self.window_messages]
+        new_messages = "\n".join(filter(None, map(format_message, to_summarize)))
+
+        try:
+            prompt, llm_kwargs = get_token_budget().format(SUMMARY_PROMPT, {
+                "previous_summary": summary or "Sin resumen previo",
+                "new_messages": new_messages or "Sin mensajes relevantes"
+            }, "history_summary", shrink_field="new_messages")
+            response = await self.llm.ainvoke(prompt, **llm_kwargs)
+            new_summary = response.content.strip()
+        except Exception as e:
+            # Sin resumen nuevo el historial sigue completo: más largo, pero correcto
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ No se pudo actualizar el resumen del historial: {e}")
+            return {}
+
+        messages_total = len(state.get("messages", []))
+        count = messages_total - self.window_messages
+        self.stats["summaries"] += 1
+        self.stats["summarized_messages"] += len(to_summarize)
+        logger.info(f"🗜️ Historial compactado: {count} mensajes resumidos, {self.window_messages} en ventana")
+        return {SUMMARY_FIELD: new_summary, SUMMARY_COUNT_FIELD: count}
+
+    def format(
+        self,
+        state: Dict[str, Any],
+        formatter: Callable[[BaseMessage], Optional[str]] = format_message,
+        empty: str = "Sin historial previo"
+    ) -> str:
+        """Historial para el prompt: resumen de lo antiguo + mensajes recientes literales"""
+        summary, pending = self.split(state)
+        lines = [line for line in map(formatter, pending) if line]
+
+        if summary:
+            lines.insert(0, f"📝 Resumen de la conversación anterior: {summary}")
+            if pending:
+                lines.insert(1, "Mensajes recientes:")
+
+        return "\n".join(lines) if lines else empty
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+def merge_history_updates(command: Any, updates: Dict[str, Any]) -> Any:
+    """Añadir las actualizaciones del resumen al Command devuelto por un nodo"""
+    if not updates or not isinstance(command, Command):
+        return command
+    if command.update is None:
+        update = dict(updates)
+    elif isinstance(command.update, dict):
+        update = {**command.update, **updates}
+    else:
+        update = list(command.update) + list(updates.items())
+    # Command es un dataclass inmutable
+    return dataclasses.replace(command, update=update)
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_history_compactor: Optional[HistoryCompactor] = None
+
+
+def get_history_compactor() -> HistoryCompactor:
+    """Obtener instancia singleton del compactador de historial"""
+    global _history_compactor
+    if _history_compactor is None:
+        from config.settings import get_settings
+        workflow_settings = get_settings().workflow
+        _history_compactor = HistoryCompactor(
+            window_messages=workflow_settings.history_window_messages,
+            summary_batch=workflow_settings.history_summary_batch
+        )
+    return _history_compactor
+
+
+def reset_history_compactor():
+    """Resetear el compactador global"""
+    global _history_compactor
+    _history_compactor = None
+
+
+async def compact_history(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Compactar el historial del estado si la ventana se ha desplazado.
+
+    Returns:
+        (estado con el resumen actualizado, actualizaciones a persistir)
+    """
+    from config.settings import get_settings
+    if not get_settings().workflow.history_compaction_enabled:
+        return state, {}
+
+    updates = await get_history_compactor().compact(state)
+    return ({**state, **updates}, updates) if updates else (state, {})
+
+
+def format_history(
+    state: Dict[str, Any],
+    formatter: Callable[[BaseMessage], Optional[str]] = format_message,
+    empty: str = "Sin historial previo"
+) -> str:
+    """Historial compactado del estado listo para un prompt"""
+    return get_history_compactor().format(state, formatter, empty)
@@ -0,0 +1,139 @@
+# =====================================================
+# utils/llm/http_client.py - Cliente HTTP compartido para Azure OpenAI
+# =====================================================
+"""
+Clientes httpx compartidos por todos los clientes de Azure OpenAI.
+
+Cada AzureChatOpenAI/AzureOpenAI crea por defecto su propio pool de
+conexiones, así que cada deployment (y el script de embeddings) repetía el
+handshake TCP+TLS. Con un único pool con keep-alive las conexiones se
+reutilizan entre llamadas y deployments, y HTTP/2 (si está instalado `h2`)
+multiplexa las peticiones concurrentes sobre una sola conexión por endpoint.
+
+warm_up_connections() abre las conexiones antes de la primera sesión.
+"""
+
+import asyncio
+import importlib.util
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger("LLM.HTTPClient")
+
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def http2_available() -> bool:
+    """httpx solo negocia HTTP/2 si el paquete `h2` está instalado"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_options() -> Dict[str, Any]:
+    """Límites del pool y versión HTTP según la configuración"""
+    from config.settings import get_settings
+    llm_settings = get_settings().llm
+    return {
+        "limits": httpx.Limits(
+            max_connections=llm_settings.http_max_connections,
+            max_keepalive_connections=llm_settings.http_max_keepalive_connections,
+            keepalive_expiry=llm_settings.http_keepalive_expiry
+        ),
+        "timeout": httpx.Timeout(llm_settings.timeout),
+        "http2": llm_settings.http2_enabled and http2_available(),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Obtener el cliente HTTP síncrono compartido"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        options = _client_options()
+        _http_client = httpx.Client(**options)
+        logger.info(f"🌐 Cliente HTTP compartido creado (HTTP/2: {options['http2']})")
+    return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Obtener el cliente HTTP asíncrono compartido"""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        options = _client_options()
+        _async_http_client = httpx.AsyncClient(**options)
+        logger.info(f"🌐 Cliente HTTP asíncrono compartido creado (HTTP/2: {options['http2']})")
+    return _async_http_client
+
+
+async def close_http_clients():
+    """Cerrar los clientes compartidos (al apagar la aplicación)"""
+    global _http_client, _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+    if _http_client is not None:
+        _http_client.close()
+    _http_client = None
+    _async_http_client = None
+
+
+def reset_http_clients():
+    """Olvidar los clientes compartidos sin cerrarlos (útil para tests)"""
+    global _http_client, _async_http_client
+    _http_client = None
+    _async_http_client = None
+
+
+def azure_endpoints(settings: Any) -> List[Dict[str, Optional[str]]]:
+    """Endpoints de Azure configurados (deployment único o LLM_AZURE_TARGETS), sin duplicados"""
+    llm_settings = settings.llm
+    if llm_settings.azure_targets:
+        candidates = [
+            (t.endpoint, t.api_key or llm_settings.azure_openai_api_key, t.api_version or llm_settings.azure_api_version)
+            for t in llm_settings.azure_targets
+        ]
+    else:
+        candidates = [(llm_settings.azure_openai_endpoint, llm_settings.azure_openai_api_key, llm_settings.azure_api_version)]
+
+    endpoints: Dict[str, Dict[str, Optional[str]]] = {}
+    for endpoint, api_key, api_version in candidates:
+        if endpoint and endpoint.rstrip("/") not in endpoints:
+            endpoints[endpoint.rstrip("/")] = {"endpoint": endpoint.rstrip("/"), "api_key": api_key, "api_version": api_version}
+    return list(endpoints.values())
+
+
+async def warm_up_connections(settings: Any = None, timeout: float = 5.0) -> Dict[str, bool]:
+    """
+    Abrir de antemano una conexión con cada endpoint de Azure.
+
+    Se hace una petición barata (listado de modelos) por el pool compartido;
+    el código de estado da igual, lo que importa es dejar la conexión TLS
+    abierta en el pool. Los errores se registran y no se propagan.
+
+    Returns:
+        {endpoint: conexión abierta}
+    """
+    if settings is None:
+        from config.settings import get_settings
+        settings = get_settings()
+
+    client = get_async_http_client()
+
+    async def _warm(target: Dict[str, Optional[str]]) -> bool:
+        try:
+            await client.get(
+                f"{target['endpoint']}/openai/models",
+                params={"api-version": target["api_version"]},
+                headers={"api-key": target["api_key"] or ""},
+                timeout=timeout
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo precalentar {target['endpoint']}: {e}")
+            return False
+
+    targets = azure_endpoints(settings)
+    results = await asyncio.gather(*(_warm(target) for target in targets))
+    warmed = {target["endpoint"]: ok for target, ok in zip(targets, results)}
+    logger.info(f"🔥 Conexiones precalentadas: {sum(results)}/{len(targets)} endpoints de Azure")
+    return warmed
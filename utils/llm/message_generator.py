@@ -4,25 +4,25 @@
 from typing import Dict, Any, List
 from models.incidencia import TipoIncidencia
 from utils.llm import get_llm
+from utils.llm.streaming import STREAM_TO_USER_TAG
+from utils.llm.message_pool import STATIC_MESSAGE_TYPES, get_message_pool
+from utils.llm.token_budget import get_token_budget
+from config.settings import get_settings
 import logging 
 
 logger = logging.getLogger("Graph")
 
-async def generate_natural_message(tipo_mensaje: str, contexto: Dict[str, Any] = None) -> str:
+def build_message_prompts(contexto: Dict[str, Any]) -> Dict[str, str]:
     """
-    Generar mensajes naturales usando LLM en lugar de templates rígidos.
+    Construir los prompts de cada tipo de mensaje.
     
     Args:
-        tipo_mensaje: Tipo de mensaje a generar
-        contexto: Información adicional para personalizar el mensaje
+        contexto: Información para personalizar el mensaje
         
     Returns:
-        Mensaje natural generado
+        Diccionario {tipo_mensaje: prompt}
     """
-    contexto = contexto or {}
-    llm = get_llm()
-    
-    prompts = {
+    return {
         "solicitar_email": """
         Genera un mensaje corto y natural para pedir el email corporativo a un usuario.
         El mensaje debe ser amigable, directo y profesional.
@@ -87,14 +87,41 @@ async def generate_natural_message(tipo_mensaje: str, contexto: Dict[str, Any] =
         Ejemplo: "Para ayudarte con tu problema de software, ¿qué aplicación específica te da problemas?"
         """
     }
+
+async def generate_natural_message(tipo_mensaje: str, contexto: Dict[str, Any] = None) -> str:
+    """
+    Generar mensajes naturales usando LLM en lugar de templates rígidos.
+    
+    Los tipos estáticos (sin contexto) se sirven desde el pool de variantes
+    pregeneradas si está disponible; el LLM solo se usa para los tipos que
+    dependen del contexto o cuando no hay pool.
+    
+    Args:
+        tipo_mensaje: Tipo de mensaje a generar
+        contexto: Información adicional para personalizar el mensaje
+        
+    Returns:
+        Mensaje natural generado
+    """
+    contexto = contexto or {}
+    prompts = build_message_prompts(contexto)
+    
+    if tipo_mensaje in STATIC_MESSAGE_TYPES and get_settings().llm.message_pool_enabled:
+        mensaje = get_message_pool().sample(tipo_mensaje, prompts[tipo_mensaje])
+        if mensaje:
+            logger.debug(f"📦 Mensaje desde pool ({tipo_mensaje}): {mensaje}")
+            return mensaje
+    
+    llm = get_llm()
     
     if tipo_mensaje not in prompts:
         logger.warning(f"⚠️ Tipo de mensaje no reconocido: {tipo_mensaje}")
         return "¿Puedes ayudarme con más información?"
     
     try:
-        prompt = prompts[tipo_mensaje]
-        response = await llm.ainvoke(prompt)
+        prompt, llm_kwargs = get_token_budget().prepare(prompts[tipo_mensaje], "natural_message")
+        # Texto dirigido al usuario: se puede reenviar token a token
+        response = await llm.ainvoke(prompt, config={"tags": [STREAM_TO_USER_TAG]}, **llm_kwargs)
         
         # Limpiar respuesta (quitar comillas si las tiene)
         mensaje = response.content.strip().strip('"').strip("'")
@@ -164,7 +191,8 @@ Responde solo: CONFIRMA, RECHAZA o AMBIGUO
     
     try:
         logger.debug(f"🤖 Consultando LLM para detectar intención: '{respuesta_usuario}'")
-        response = await llm.ainvoke(prompt)
+        prompt, llm_kwargs = get_token_budget().prepare(prompt, "confirmation_intent")
+        response = await llm.ainvoke(prompt, **llm_kwargs)
         intencion = response.content.strip().upper()
         
         # Validar respuesta
@@ -224,7 +252,8 @@ Formato: Una pregunta por línea, máximo 15 palabras cada una.
 """
     
     try:
-        response = await llm.ainvoke(prompt)
+        prompt, llm_kwargs = get_token_budget().prepare(prompt, "followup_questions")
+        response = await llm.ainvoke(prompt, **llm_kwargs)
         preguntas = [
             pregunta.strip().lstrip('-').lstrip('•').strip() 
             for pregunta in response.content.split('\n') 
@@ -0,0 +1,197 @@
+# =====================================================
+# utils/llm/message_pool.py - Pool de variantes pregeneradas
+# =====================================================
+"""
+Pool de variantes pregeneradas para los mensajes estáticos de
+generate_natural_message (pedir email, nombre, etc.).
+
+- Se construye offline con scripts/build_message_pool.py
+- Se guarda en JSON versionado junto con el hash del prompt de cada tipo
+- En ejecución se elige una variante al azar; si el pool falta, tiene
+  otra versión o el prompt ha cambiado, se usa el LLM como hasta ahora
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("LLM.MessagePool")
+
+POOL_FORMAT_VERSION = 1
+
+# Tipos cuyo prompt no depende del contexto de la conversación
+STATIC_MESSAGE_TYPES = (
+    "solicitar_email",
+    "solicitar_nombre",
+    "solicitar_ambos",
+    "datos_confirmados",
+)
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Hash estable del prompt (ignora indentación y espacios extra)"""
+    normalized = " ".join(prompt.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class MessageVariantPool:
+    """Pool de variantes cargado desde disco"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.variants: Dict[str, List[str]] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.metadata: Dict[str, Any] = {}
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            logger.info(f"ℹ️ Pool de mensajes no encontrado ({self.path}), se usará el LLM")
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el pool de mensajes: {e}")
+            return
+
+        if data.get("version") != POOL_FORMAT_VERSION:
+            logger.warning(f"⚠️ Pool de mensajes con versión {data.get('version')} (esperada {POOL_FORMAT_VERSION}), ignorado")
+            return
+
+        self.variants = {k: [v for v in vs if v] for k, vs in data.get("variants", {}).items()}
+        self.fingerprints = data.get("prompt_fingerprints", {})
+        self.metadata = {k: v for k, v in data.items() if k not in ("variants", "prompt_fingerprints")}
+        logger.info(f"📦 Pool de mensajes cargado: {sum(len(v) for v in self.variants.values())} variantes")
+
+    def sample(self, tipo_mensaje: str, prompt: Optional[str] = None) -> Optional[str]:
+        """
+        Elegir una variante del pool.
+
+        Args:
+            tipo_mensaje: Tipo de mensaje
+            prompt: Prompt actual; si su hash no coincide con el del pool,
+                    las variantes se consideran obsoletas
+
+        Returns:
+            Variante o None si no hay variantes válidas
+        """
+        variants = self.variants.get(tipo_mensaje)
+        if not variants:
+            self.stats["misses"] += 1
+            return None
+
+        if prompt is not None and self.fingerprints.get(tipo_mensaje) != prompt_fingerprint(prompt):
+            self.stats["stale"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return random.choice(variants)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "types": {k: len(v) for k, v in self.variants.items()}, **self.metadata}
+
+
+# =====================================================
+# Construcción offline
+# =====================================================
+
+VARIANTS_PROMPT = """{prompt}
+
+Genera {n} variantes DISTINTAS que cumplan las instrucciones anteriores.
+Responde SOLO con una lista JSON de strings, sin texto adicional.
+"""
+
+
+def _parse_variants(content: str) -> List[str]:
+    """Extraer la lista de variantes de la respuesta del LLM"""
+    text = content.strip()
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if match:
+        try:
+            items = json.loads(match.group(0))
+            return [str(item) for item in items if isinstance(item, (str, int, float))]
+        except json.JSONDecodeError:
+            pass
+    # Fallback: una variante por línea
+    return [line.lstrip("-•*0123456789. ") for line in text.splitlines() if line.strip()]
+
+
+def _clean_variant(text: str) -> str:
+    return text.strip().strip('"').strip("'").strip()
+
+
+async def build_message_pool(
+    llm: Any,
+    prompts: Dict[str, str],
+    path: str,
+    variants_per_type: int = 20,
+    message_types: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Generar variantes con el LLM y guardarlas en un pool versionado.
+
+    Args:
+        llm: Chat model (get_llm())
+        prompts: Prompts por tipo de mensaje (build_message_prompts({}))
+        path: Ruta del JSON de salida
+        variants_per_type: Variantes por tipo
+        message_types: Tipos a generar (por defecto STATIC_MESSAGE_TYPES)
+
+    Returns:
+        Contenido del pool guardado
+    """
+    message_types = list(message_types or STATIC_MESSAGE_TYPES)
+    variants: Dict[str, List[str]] = {}
+
+    for tipo in message_types:
+        response = await llm.ainvoke(VARIANTS_PROMPT.format(prompt=prompts[tipo].strip(), n=variants_per_type))
+        unique: List[str] = []
+        for variant in map(_clean_variant, _parse_variants(response.content)):
+            if variant and variant not in unique:
+                unique.append(variant)
+        variants[tipo] = unique[:variants_per_type]
+        logger.info(f"✅ {tipo}: {len(variants[tipo])} variantes")
+
+    pool = {
+        "version": POOL_FORMAT_VERSION,
+        "generated_at": datetime.now().isoformat(),
+        "model": getattr(llm, "deployment_name", None),
+        "prompt_fingerprints": {tipo: prompt_fingerprint(prompts[tipo]) for tipo in message_types},
+        "variants": variants,
+    }
+
+    output = Path(path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(pool, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"💾 Pool de mensajes guardado en {output}")
+    return pool
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_message_pool: Optional[MessageVariantPool] = None
+
+
+def get_message_pool() -> MessageVariantPool:
+    """Obtener instancia singleton del pool de variantes"""
+    global _message_pool
+    if _message_pool is None:
+        from config.settings import get_settings
+        _message_pool = MessageVariantPool(get_settings().llm.message_pool_path)
+    return _message_pool
+
+
+def reset_message_pool():
+    """Resetear el pool global (p.ej. tras regenerarlo)"""
+    global _message_pool
+    _message_pool = None
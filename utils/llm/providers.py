@@ -2,22 +2,51 @@
 # utils/llm/providers.py - Proveedores de LLM CORREGIDO
 # =====================================================
 from langchain_openai import AzureChatOpenAI
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 import logging
 
-from config.settings import get_settings
+from config.settings import get_settings, AzureDeploymentTarget
+from .cache import CachedChatModel, get_llm_cache, reset_llm_cache
+from .scheduler import ScheduledChatModel, get_llm_scheduler, reset_llm_scheduler
+from .balancer import BalancedChatModel, BalancerTarget
+from .singleflight import SingleFlightChatModel
+from .hedging import HedgedChatModel
+from .circuit_breaker import CircuitBreakerChatModel, get_llm_circuit_breaker, reset_llm_circuit_breaker
+from .telemetry import get_llm_telemetry, reset_llm_telemetry
+from .token_budget import reset_token_budget
+from .structured import get_structured_output_stats, reset_structured_output_stats
+from .http_client import get_http_client, get_async_http_client
+from .replay import LLMCassette, RecordingChatModel, create_replay_llm
+from .wrappers import ChatModelWrapper
 
 logger = logging.getLogger("LLM.Provider")
 
 # Cache global para instancia de LLM
-_llm_instance: Optional[AzureChatOpenAI] = None
+_llm_instance: Optional[Union[AzureChatOpenAI, ChatModelWrapper]] = None
 
-def get_llm() -> AzureChatOpenAI:
+def get_llm() -> Union[AzureChatOpenAI, ChatModelWrapper]:
     """
     Obtener instancia singleton del LLM configurado.
     
+    Con LLM_PROVIDER=replay el modelo base responde desde un cassette grabado
+    (LLM_REPLAY_CASSETTE_PATH) en lugar de llamar a Azure.
+    
+    Capas opcionales (misma interfaz ainvoke/invoke), de dentro hacia fuera:
+    - LLM_AZURE_TARGETS: balanceo entre varios deployments
+    - LLM_RECORD_CASSETTE_PATH: graba cada llamada (prompt → respuesta, latencia)
+    - LLM_SCHEDULER_ENABLED: cola con prioridad, concurrencia y ritmo adaptativo
+    - LLM_HEDGING_ENABLED: duplica las llamadas que superan el p90 de su nodo
+    - LLM_CIRCUIT_BREAKER_ENABLED: corta las llamadas si Azure falla seguido
+    - LLM_SINGLEFLIGHT_ENABLED: agrupa peticiones idénticas concurrentes
+    - LLM_CACHE_ENABLED: cache de respuestas compartido
+    
+    Todos los clientes de Azure comparten el pool HTTP de http_client.py.
+    
+    Con LLM_TELEMETRY_ENABLED cada cliente de Azure lleva el callback de
+    telemetría (tokens, latencia y reintentos por nodo y sesión).
+    
     Returns:
-        Instancia configurada de AzureChatOpenAI
+        Instancia configurada de AzureChatOpenAI (opcionalmente envuelta)
     """
     global _llm_instance
     
@@ -27,28 +56,166 @@ def get_llm() -> AzureChatOpenAI:
         logger.info(f"🤖 Inicializando LLM: {settings.llm.model}")
         logger.info(f"🔵 Proveedor: Azure OpenAI")
         
-        # 🔥 SOLUCIÓN: Usar configuración correcta de Azure OpenAI
-        _llm_instance = AzureChatOpenAI(
-            # Configuración de Azure OpenAI
-            api_key=settings.llm.azure_openai_api_key,  # ✅ API key de Azure
-            azure_endpoint=settings.llm.azure_openai_endpoint,  # ✅ Endpoint de Azure
-            azure_deployment=settings.llm.azure_deployment_name,  # ✅ Deployment name
-            api_version=settings.llm.azure_api_version,  # ✅ API version
+        if settings.llm.provider == "replay":
+            _llm_instance = create_replay_llm(settings)
+            logger.info(f"📼 LLM en modo reproducción: {settings.llm.replay_cassette_path}")
+        elif settings.llm.azure_targets:
+            _llm_instance = _create_balanced_client(settings)
+        else:
+            # 🔥 SOLUCIÓN: Usar configuración correcta de Azure OpenAI
+            _llm_instance = _create_azure_client(settings)
             
-            # Configuración común
-            temperature=settings.llm.temperature,
-            max_tokens=settings.llm.max_tokens,
-            timeout=settings.llm.timeout
-        )
+            logger.info(f"✅ Azure OpenAI inicializado correctamente")
+            logger.info(f"🔧 Deployment: {settings.llm.azure_deployment_name}")
+            logger.info(f"🌐 Endpoint: {settings.llm.azure_openai_endpoint}")
+        
+        if settings.llm.record_cassette_path and settings.llm.provider != "replay":
+            # Bajo el planificador: se graba la latencia real de Azure
+            _llm_instance = RecordingChatModel(_llm_instance, LLMCassette(settings.llm.record_cassette_path))
+            logger.info(f"⏺️ Grabando llamadas LLM en {settings.llm.record_cassette_path}")
+        
+        if settings.llm.scheduler_enabled:
+            _llm_instance = ScheduledChatModel(_llm_instance, get_llm_scheduler())
+            logger.info(f"🚦 Planificador LLM activado (concurrencia {settings.llm.scheduler_max_concurrency})")
+        
+        if settings.llm.hedging_enabled:
+            scheduler = get_llm_scheduler() if settings.llm.scheduler_enabled else None
+            _llm_instance = HedgedChatModel(
+                _llm_instance,
+                trigger_percentile=settings.llm.hedging_percentile,
+                max_hedge_ratio=settings.llm.hedging_max_ratio,
+                min_samples=settings.llm.hedging_min_samples,
+                min_delay_seconds=settings.llm.hedging_min_delay_seconds,
+                # Con cola en el planificador duplicar solo añadiría carga
+                can_hedge=(lambda: scheduler.queue_depth == 0) if scheduler else None
+            )
+            logger.info(f"🪃 Hedging LLM activado (p{settings.llm.hedging_percentile:.0f}, máx {settings.llm.hedging_max_ratio:.0%})")
+        
+        if settings.llm.circuit_breaker_enabled:
+            _llm_instance = CircuitBreakerChatModel(
+                _llm_instance,
+                get_llm_circuit_breaker(),
+                call_timeout=settings.llm.circuit_breaker_call_timeout
+            )
+            logger.info(f"🔌 Circuit breaker LLM activado ({settings.llm.circuit_breaker_failure_threshold} fallos)")
         
-        logger.info(f"✅ Azure OpenAI inicializado correctamente")
-        logger.info(f"🔧 Deployment: {settings.llm.azure_deployment_name}")
-        logger.info(f"🌐 Endpoint: {settings.llm.azure_openai_endpoint}")
+        if settings.llm.singleflight_enabled:
+            _llm_instance = SingleFlightChatModel(
+                _llm_instance,
+                telemetry=get_llm_telemetry() if settings.llm.telemetry_enabled else None
+            )
+            logger.info("🔗 Coalescencia de peticiones LLM idénticas activada")
+        
+        if settings.llm.cache_enabled:
+            _llm_instance = CachedChatModel(_llm_instance, get_llm_cache())
+            logger.info(f"💾 Cache de respuestas LLM activado (TTL {settings.llm.cache_ttl_seconds}s)")
     
     return _llm_instance
 
+def get_llm_stats() -> Dict[str, Any]:
+    """
+    Obtener métricas de todas las capas activas del LLM.
+    
+    Returns:
+        Diccionario {capa: estadísticas}
+    """
+    stats: Dict[str, Any] = {}
+    layer = _llm_instance
+    while layer is not None:
+        if hasattr(type(layer), "get_stats"):
+            stats[type(layer).__name__] = layer.get_stats()
+        layer = layer.llm if isinstance(layer, ChatModelWrapper) else None
+    if _llm_instance is not None and get_settings().llm.telemetry_enabled:
+        stats["LLMTelemetry"] = get_llm_telemetry().get_stats()
+    if _llm_instance is not None:
+        stats["StructuredOutput"] = get_structured_output_stats().get_stats()
+    return stats
+
+def _create_azure_client(settings, target: Optional[AzureDeploymentTarget] = None) -> AzureChatOpenAI:
+    """
+    Crear cliente AzureChatOpenAI a partir de la configuración.
+    
+    Args:
+        settings: Configuración global
+        target: Deployment concreto (si no, el deployment único configurado)
+        
+    Returns:
+        Cliente de Azure OpenAI
+    """
+    client_kwargs = {
+        # Configuración de Azure OpenAI
+        "api_key": settings.llm.azure_openai_api_key,  # ✅ API key de Azure
+        "azure_endpoint": settings.llm.azure_openai_endpoint,  # ✅ Endpoint de Azure
+        "azure_deployment": settings.llm.azure_deployment_name,  # ✅ Deployment name
+        "api_version": settings.llm.azure_api_version,  # ✅ API version
+        
+        # Configuración común
+        "temperature": settings.llm.temperature,
+        "max_tokens": settings.llm.max_tokens,
+        "timeout": settings.llm.timeout,
+        
+        # Pool de conexiones compartido entre deployments (keep-alive)
+        "http_client": get_http_client(),
+        "http_async_client": get_async_http_client(),
+    }
+    
+    if settings.llm.scheduler_enabled:
+        # Los reintentos se centralizan en el planificador y las cabeceras
+        # x-ratelimit-* se usan para adaptar el ritmo
+        client_kwargs["max_retries"] = 0
+        client_kwargs["include_response_headers"] = True
+    
+    if settings.llm.telemetry_enabled:
+        client_kwargs["callbacks"] = [get_llm_telemetry().callback]
+    
+    if target is not None:
+        client_kwargs.update({
+            "azure_endpoint": target.endpoint,
+            "azure_deployment": target.deployment,
+            "api_key": target.api_key or settings.llm.azure_openai_api_key,
+            "api_version": target.api_version or settings.llm.azure_api_version,
+        })
+    
+    return AzureChatOpenAI(**client_kwargs)
+
+def _create_balanced_client(settings) -> BalancedChatModel:
+    """
+    Crear cliente balanceado entre los deployments de LLM_AZURE_TARGETS.
+    
+    Args:
+        settings: Configuración global
+        
+    Returns:
+        Cliente que reparte las llamadas entre deployments
+    """
+    targets = [
+        BalancerTarget(
+            name=f"{target.deployment}@{target.endpoint}",
+            client=_create_azure_client(settings, target),
+            weight=target.weight
+        )
+        for target in settings.llm.azure_targets
+    ]
+    
+    for target in targets:
+        logger.info(f"🔧 Deployment: {target.name} (peso {target.weight})")
+    logger.info(f"⚖️ Balanceo entre {len(targets)} deployments de Azure OpenAI")
+    
+    return BalancedChatModel(
+        targets,
+        eject_after_failures=settings.llm.balancer_eject_after_failures,
+        cooldown_seconds=settings.llm.balancer_cooldown_seconds,
+        failover_timeout=settings.llm.balancer_failover_timeout or settings.llm.timeout
+    )
+
 def reset_llm():
     """Resetear instancia de LLM (útil para tests)"""
     global _llm_instance
     _llm_instance = None
+    reset_llm_cache()
+    reset_llm_scheduler()
+    reset_llm_telemetry()
+    reset_llm_circuit_breaker()
+    reset_token_budget()
+    reset_structured_output_stats()
     logger.info("🔄 Instancia LLM reseteada")
\ No newline at end of file
@@ -0,0 +1,278 @@
+# =====================================================
+# utils/llm/replay.py - Grabación y reproducción de llamadas al LLM
+# =====================================================
+"""
+Backend falso del LLM para benchmarks deterministas sin gastar cuota de Azure.
+
+- Grabación (LLM_RECORD_CASSETTE_PATH): RecordingChatModel anota cada llamada
+  (hash del prompt → respuesta, latencia, nodo) en un cassette JSONL
+- Reproducción (LLM_PROVIDER=replay): ReplayChatModel sirve las respuestas
+  del cassette con latencia simulada opcional
+
+La clave es el hash de los mensajes del prompt, independiente del deployment,
+así que un cassette grabado contra un deployment sirve para cualquier otro.
+Si un mismo prompt se grabó varias veces, las respuestas se sirven en orden
+(y se vuelve a empezar al agotarlas).
+
+ReplayChatModel es un chat model de LangChain: el resto de capas de get_llm()
+y el callback de telemetría funcionan igual que con Azure.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage, BaseMessage, HumanMessage, convert_to_messages, message_to_dict, messages_from_dict
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from .cache import serialize_llm_input
+from .telemetry import get_llm_call_context, get_llm_telemetry
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.Replay")
+
+LATENCY_NONE = "none"
+LATENCY_RECORDED = "recorded"
+LATENCY_EMPIRICAL = "empirical"
+LATENCY_FIXED = "fixed"
+
+
+class LLMReplayMissError(LookupError):
+    """El prompt no está en el cassette"""
+
+
+def as_messages(llm_input: Any) -> List[BaseMessage]:
+    """Normalizar la entrada de ainvoke (str, PromptValue o lista) a mensajes"""
+    if isinstance(llm_input, str):
+        return [HumanMessage(content=llm_input)]
+    if hasattr(llm_input, "to_messages"):
+        return llm_input.to_messages()
+    return convert_to_messages(llm_input)
+
+
+def cassette_key(messages: List[BaseMessage]) -> str:
+    """Clave del cassette: sha256 de los mensajes del prompt"""
+    return hashlib.sha256(serialize_llm_input(messages).encode("utf-8")).hexdigest()
+
+
+class LLMCassette:
+    """Cassette JSONL de llamadas grabadas: {key, node, latency_seconds, response}"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if path and Path(path).exists():
+            self.load(path)
+
+    def load(self, path: str):
+        """Cargar un cassette ignorando líneas corruptas (grabación interrumpida)"""
+        loaded = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+                    loaded += 1
+                except (json.JSONDecodeError, KeyError):
+                    continue
+        logger.info(f"📼 Cassette cargado: {loaded} llamadas, {len(self._entries)} prompts distintos ({path})")
+
+    def record(self, key: str, response: BaseMessage, latency_seconds: float, node: Optional[str] = None):
+        """Añadir una llamada al cassette (y al fichero, si hay)"""
+        entry = {
+            "key": key,
+            "node": node,
+            "latency_seconds": latency_seconds,
+            "response": message_to_dict(response),
+        }
+        with self._lock:
+            self._entries[key].append(entry)
+            if self.path:
+                try:
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo escribir el cassette ({self.path}): {e}")
+
+    def next_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Siguiente respuesta grabada para el prompt (en orden, cíclico)"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            entry = entries[self._cursors[key] % len(entries)]
+            self._cursors[key] += 1
+            return entry
+
+    def latencies(self) -> List[float]:
+        """Latencias grabadas de todas las llamadas"""
+        with self._lock:
+            return [e.get("latency_seconds") or 0.0 for entries in self._entries.values() for e in entries]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+
+class RecordingChatModel(ChatModelWrapper):
+    """Envoltorio que graba cada llamada correcta en el cassette"""
+
+    def __init__(self, llm: Any, cassette: LLMCassette):
+        super().__init__(llm)
+        self.cassette = cassette
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(llm_input, config=config, **kwargs)
+        self._record(llm_input, response, time.perf_counter() - start)
+        return response
+
+    def invoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        start = time.perf_counter()
+        response = self.llm.invoke(llm_input, config=config, **kwargs)
+        self._record(llm_input, response, time.perf_counter() - start)
+        return response
+
+    def _record(self, llm_input: Any, response: BaseMessage, latency: float):
+        try:
+            key = cassette_key(as_messages(llm_input))
+        except Exception as e:
+            logger.warning(f"⚠️ Entrada del LLM no grabable: {e}")
+            return
+        self.cassette.record(key, response, latency, node=get_llm_call_context().get("node"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"recorded": len(self.cassette), "path": self.cassette.path}
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model que responde desde un cassette grabado.
+
+    Latencia simulada (latency_mode):
+    - none: sin espera
+    - recorded: la latencia grabada de esa respuesta
+    - empirical: una muestra aleatoria de todas las latencias grabadas
+    - fixed: latency_seconds
+    En todos los casos multiplicada por latency_scale.
+    """
+
+    cassette: Any
+    model_name: str = "replay"
+    latency_mode: str = LATENCY_RECORDED
+    latency_scale: float = 1.0
+    latency_seconds: float = 0.0
+    miss_response: Optional[str] = None
+    seed: Optional[int] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _random: random.Random = PrivateAttr()
+    _latencies: List[float] = PrivateAttr(default_factory=list)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"hits": 0, "misses": 0})
+
+    def model_post_init(self, __context: Any):
+        super().model_post_init(__context)
+        self._random = random.Random(self.seed)
+        self._latencies = self.cassette.latencies()
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "cassette": self.cassette.path}
+
+    def _replay(self, messages: List[BaseMessage]) -> Tuple[ChatResult, Optional[Dict[str, Any]]]:
+        """(respuesta, entrada del cassette) para el prompt"""
+        entry = self.cassette.next_entry(cassette_key(messages))
+        if entry is None:
+            self._stats["misses"] += 1
+            if self.miss_response is None:
+                raise LLMReplayMissError("Prompt no grabado en el cassette")
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.miss_response))]), None
+
+        self._stats["hits"] += 1
+        message = messages_from_dict([entry["response"]])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)]), entry
+
+    def _delay(self, entry: Optional[Dict[str, Any]]) -> float:
+        if self.latency_mode == LATENCY_RECORDED and entry is not None:
+            delay = entry.get("latency_seconds") or 0.0
+        elif self.latency_mode == LATENCY_EMPIRICAL and self._latencies:
+            delay = self._random.choice(self._latencies)
+        elif self.latency_mode == LATENCY_FIXED:
+            delay = self.latency_seconds
+        else:
+            delay = 0.0
+        return delay * self.latency_scale
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        result, entry = self._replay(messages)
+        delay = self._delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        result, entry = self._replay(messages)
+        delay = self._delay(entry)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "entries": len(self.cassette),
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            "latency_mode": self.latency_mode,
+        }
+
+
+def create_replay_llm(settings: Any) -> ReplayChatModel:
+    """Crear el chat model de reproducción a partir de la configuración"""
+    llm_settings = settings.llm
+    if not Path(llm_settings.replay_cassette_path).exists():
+        logger.warning(f"⚠️ Cassette no encontrado: {llm_settings.replay_cassette_path}")
+    cassette = LLMCassette(llm_settings.replay_cassette_path)
+    return ReplayChatModel(
+        cassette=cassette,
+        latency_mode=llm_settings.replay_latency_mode,
+        latency_scale=llm_settings.replay_latency_scale,
+        latency_seconds=llm_settings.replay_latency_seconds,
+        miss_response=llm_settings.replay_miss_response,
+        seed=llm_settings.replay_seed,
+        callbacks=[get_llm_telemetry().callback] if llm_settings.telemetry_enabled else None
+    )
@@ -0,0 +1,422 @@
+# =====================================================
+# utils/llm/scheduler.py - Planificador de llamadas al LLM
+# =====================================================
+"""
+Planificador global (por proceso) de llamadas a Azure OpenAI.
+
+CARACTERÍSTICAS:
+- Semáforo de concurrencia acotada
+- Cola con prioridad: las sesiones urgentes adelantan al saludo/autenticación
+- Token bucket que se adapta a las cabeceras x-ratelimit-* y a los 429
+- Reintentos centralizados de 429/timeouts (en lugar de reintentos por nodo)
+- Métricas de profundidad de cola y tiempo de espera
+
+La prioridad se propaga con una ContextVar: EroskiChatInterface la fija al
+comienzo de cada turno a partir del estado de la sesión y todas las llamadas
+al LLM hechas dentro del grafo la heredan.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .telemetry import llm_attempt_scope
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.Scheduler")
+
+# Prioridades (menor valor = se atiende antes)
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_URGENT: "urgent",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_LOW: "low",
+}
+
+# Nivel mínimo (UrgencyLevel / IncidentType.urgency_level) considerado urgente
+URGENT_LEVEL_THRESHOLD = 3
+
+_current_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_NORMAL)
+
+
+# =====================================================
+# Prioridad a partir del estado
+# =====================================================
+
+def priority_from_state(state: Optional[Mapping[str, Any]]) -> int:
+    """
+    Calcular la prioridad de las llamadas al LLM de una sesión.
+
+    - Urgente: urgency_level >= ALTA o tipo de incidencia con urgency_level >= 3
+    - Baja: empleado todavía sin autenticar (saludo / autenticación)
+    - Normal: resto
+    """
+    if not state:
+        return PRIORITY_LOW
+
+    urgency = state.get("urgency_level")
+    urgency_value = getattr(urgency, "value", urgency)
+    if isinstance(urgency_value, int) and urgency_value >= URGENT_LEVEL_THRESHOLD:
+        return PRIORITY_URGENT
+
+    incident_type = state.get("incident_type")
+    if incident_type:
+        try:
+            from config.incident_config import get_incident_by_id
+            incident = get_incident_by_id(incident_type)
+            if incident and incident.urgency_level >= URGENT_LEVEL_THRESHOLD:
+                return PRIORITY_URGENT
+        except Exception as e:
+            logger.debug(f"⚠️ No se pudo consultar urgencia de {incident_type}: {e}")
+
+    if not state.get("authenticated"):
+        return PRIORITY_LOW
+
+    return PRIORITY_NORMAL
+
+
+def get_llm_priority() -> int:
+    """Prioridad activa en el contexto actual"""
+    return _current_priority.get()
+
+
+def set_llm_priority(priority: int):
+    """Fijar la prioridad para el contexto actual (y las tareas que cree)"""
+    return _current_priority.set(priority)
+
+
+@contextmanager
+def llm_priority_scope(priority: int) -> Iterator[None]:
+    """Context manager para ejecutar un bloque con una prioridad concreta"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+# =====================================================
+# Token bucket adaptativo
+# =====================================================
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket de peticiones por segundo.
+
+    El ritmo baja de forma multiplicativa cuando Azure avisa de cuota escasa
+    o devuelve 429, y se recupera de forma aditiva hasta el máximo configurado.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int, min_requests_per_minute: float = 6.0):
+        self.max_rate = requests_per_minute / 60.0
+        self.min_rate = min(min_requests_per_minute, requests_per_minute) / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self) -> float:
+        """Esperar hasta disponer de un token. Devuelve el tiempo esperado."""
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - start
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Detener el envío durante `seconds` (Retry-After)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def decrease(self, factor: float = 0.5):
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * factor)
+
+    def increase(self, step_fraction: float = 0.05):
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate * step_fraction)
+
+
+def _header(headers: Mapping[str, Any], name: str) -> Optional[str]:
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _float_header(headers: Mapping[str, Any], name: str) -> Optional[float]:
+    value = _header(headers, name)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, Any]], default: float = 1.0) -> float:
+    """Extraer el tiempo de espera de retry-after-ms / retry-after"""
+    if not headers:
+        return default
+    retry_ms = _float_header(headers, "retry-after-ms")
+    if retry_ms is not None:
+        return retry_ms / 1000.0
+    retry_s = _float_header(headers, "retry-after")
+    if retry_s is not None:
+        return retry_s
+    return default
+
+
+# =====================================================
+# Planificador
+# =====================================================
+
+class LLMScheduler:
+    """
+    Planificador de llamadas al LLM con prioridad, concurrencia acotada y
+    control de ritmo adaptativo.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 300,
+        burst: int = 10,
+        max_retries: int = 3,
+        low_remaining_requests: int = 5,
+        low_remaining_tokens: int = 2000
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.low_remaining_requests = low_remaining_requests
+        self.low_remaining_tokens = low_remaining_tokens
+        self.bucket = AdaptiveTokenBucket(requests_per_minute, burst)
+
+        self._active = 0
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        self._recent_waits: Deque[float] = deque(maxlen=500)
+        self.stats: Dict[str, Any] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "by_priority": {name: {"submitted": 0, "total_wait_seconds": 0.0} for name in PRIORITY_NAMES.values()},
+        }
+
+    # -------------------------------------------------
+    # Cola con prioridad
+    # -------------------------------------------------
+
+    @property
+    def queue_depth(self) -> int:
+        """Llamadas esperando hueco de concurrencia"""
+        return len(self._heap)
+
+    async def _acquire_slot(self, priority: int):
+        if self._active < self.max_concurrency and not self._heap:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._sequence), future))
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._heap))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # El slot ya se había concedido: devolverlo
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    # -------------------------------------------------
+    # Adaptación a cabeceras de Azure
+    # -------------------------------------------------
+
+    def observe_headers(self, headers: Optional[Mapping[str, Any]]):
+        """Ajustar el ritmo según x-ratelimit-remaining-*"""
+        if not headers:
+            return
+        remaining_requests = _float_header(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _float_header(headers, "x-ratelimit-remaining-tokens")
+
+        low_requests = remaining_requests is not None and remaining_requests <= self.low_remaining_requests
+        low_tokens = remaining_tokens is not None and remaining_tokens <= self.low_remaining_tokens
+
+        if low_requests or low_tokens:
+            self.bucket.decrease(0.8)
+            logger.debug(f"🐢 Cuota escasa (req={remaining_requests}, tok={remaining_tokens}), ritmo {self.bucket.rate * 60:.0f}/min")
+        else:
+            self.bucket.increase()
+
+    def observe_rate_limit(self, headers: Optional[Mapping[str, Any]]):
+        """Reaccionar a un 429: pausar y reducir el ritmo"""
+        wait = retry_after_seconds(headers)
+        self.stats["rate_limited"] += 1
+        self.bucket.pause(wait)
+        self.bucket.decrease(0.5)
+        logger.warning(f"⏳ 429 de Azure: pausa {wait:.1f}s, ritmo {self.bucket.rate * 60:.0f}/min")
+
+    # -------------------------------------------------
+    # Ejecución
+    # -------------------------------------------------
+
+    def _record_wait(self, priority: int, waited: float):
+        self._recent_waits.append(waited)
+        self.stats["total_wait_seconds"] += waited
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+        bucket = self.stats["by_priority"][PRIORITY_NAMES.get(priority, "normal")]
+        bucket["submitted"] += 1
+        bucket["total_wait_seconds"] += waited
+
+    async def run(self, call: Callable[[], Awaitable[Any]], priority: Optional[int] = None) -> Any:
+        """
+        Ejecutar `call` respetando prioridad, concurrencia y ritmo.
+
+        Los 429 y timeouts se reintentan aquí (hasta max_retries), volviendo
+        a pasar por la cola.
+        """
+        if priority is None:
+            priority = get_llm_priority()
+
+        self.stats["submitted"] += 1
+        attempt = 0
+
+        while True:
+            queued_at = time.monotonic()
+            await self._acquire_slot(priority)
+            try:
+                await self.bucket.acquire()
+                if attempt == 0:
+                    self._record_wait(priority, time.monotonic() - queued_at)
+
+                with llm_attempt_scope(attempt):
+                    result = await call()
+                self.observe_headers(getattr(result, "response_metadata", {}).get("headers"))
+                self.stats["completed"] += 1
+                return result
+
+            except Exception as e:
+                retryable, headers = self._classify_error(e)
+                if retryable and attempt < self.max_retries:
+                    attempt += 1
+                    self.stats["retries"] += 1
+                    if headers is not None:
+                        self.observe_rate_limit(headers)
+                    continue
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self._release_slot()
+
+    def _classify_error(self, error: Exception) -> Tuple[bool, Optional[Mapping[str, Any]]]:
+        """
+        Determinar si el error es reintentable.
+
+        Returns:
+            (reintentable, cabeceras si es un 429 o None)
+        """
+        try:
+            import openai
+        except ImportError:
+            return False, None
+
+        if isinstance(error, openai.RateLimitError):
+            response = getattr(error, "response", None)
+            return True, dict(response.headers) if response is not None else {}
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True, None
+        return False, None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del planificador"""
+        waits = sorted(self._recent_waits)
+        p95 = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        return {
+            **self.stats,
+            "queue_depth": self.queue_depth,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "current_requests_per_minute": round(self.bucket.rate * 60, 2),
+            "avg_wait_seconds": self.stats["total_wait_seconds"] / max(1, self.stats["submitted"]),
+            "p95_wait_seconds": p95,
+        }
+
+
+class ScheduledChatModel(ChatModelWrapper):
+    """Envoltorio que hace pasar cada llamada por el LLMScheduler"""
+
+    def __init__(self, llm: Any, scheduler: LLMScheduler):
+        super().__init__(llm)
+        self.scheduler = scheduler
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        return await self.scheduler.run(
+            lambda: self.llm.ainvoke(llm_input, config=config, **kwargs)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.scheduler.get_stats()
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_llm_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Obtener instancia singleton del planificador"""
+    global _llm_scheduler
+    if _llm_scheduler is None:
+        from config.settings import get_settings
+        llm_settings = get_settings().llm
+        # Los límites son por deployment: escalan con el número de deployments
+        deployments = max(1, len(llm_settings.azure_targets))
+        _llm_scheduler = LLMScheduler(
+            max_concurrency=llm_settings.scheduler_max_concurrency * deployments,
+            requests_per_minute=llm_settings.scheduler_requests_per_minute * deployments,
+            burst=llm_settings.scheduler_burst * deployments,
+            max_retries=llm_settings.scheduler_max_retries
+        )
+    return _llm_scheduler
+
+
+def reset_llm_scheduler():
+    """Resetear el planificador global (útil para tests)"""
+    global _llm_scheduler
+    _llm_scheduler = None
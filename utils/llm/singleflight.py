@@ -0,0 +1,134 @@
+# =====================================================
+# utils/llm/singleflight.py - Coalescencia de peticiones idénticas
+# =====================================================
+"""
+Capa single-flight para el LLM.
+
+Si llegan a la vez varias peticiones idénticas (mismo prompt y mismos
+parámetros, p.ej. generate_natural_message("solicitar_email") al abrir
+muchas sesiones), solo la primera llega a Azure; el resto espera a esa
+misma llamada y recibe su resultado.
+
+La llamada compartida se ejecuta con el contexto y la config del primer
+solicitante, así que solo se agrupan peticiones que no dependen de ellos:
+- La clave incluye las etiquetas de la config y la prioridad del planificador.
+- Las llamadas en streaming (astream_events) no se agrupan: sus tokens deben
+  emitirse en los callbacks de cada solicitante.
+- Cada petición agrupada deja su propio registro de telemetría (status
+  "coalesced", con su nodo y sesión) y un span llm.coalesced.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables.config import ensure_config
+
+from utils.tracing import SPAN_KIND_CLIENT, get_tracer
+
+from .cache import build_cache_key, get_generation_params
+from .scheduler import get_llm_priority
+from .streaming import is_streaming_config
+from .telemetry import UNKNOWN, LLMCallRecord, LLMTelemetry, get_llm_call_context
+from .wrappers import ChatModelWrapper
+
+logger = logging.getLogger("LLM.SingleFlight")
+
+
+class _Flight:
+    """Llamada en curso compartida por varios solicitantes"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlightChatModel(ChatModelWrapper):
+    """Envoltorio que agrupa las llamadas concurrentes idénticas en una sola"""
+
+    def __init__(self, llm: Any, telemetry: Optional[LLMTelemetry] = None):
+        super().__init__(llm)
+        self.telemetry = telemetry
+        self._flights: Dict[str, _Flight] = {}
+        self.stats = {"calls": 0, "upstream_calls": 0, "coalesced": 0, "streaming_bypass": 0}
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        self.stats["calls"] += 1
+
+        if is_streaming_config(config):
+            self.stats["streaming_bypass"] += 1
+            self.stats["upstream_calls"] += 1
+            return await self.llm.ainvoke(llm_input, config=config, **kwargs)
+
+        key = build_cache_key(llm_input, {
+            **get_generation_params(self.llm, **kwargs),
+            "tags": sorted(ensure_config(config).get("tags") or []),
+            "priority": get_llm_priority(),
+        })
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.stats["coalesced"] += 1
+            logger.debug(f"🔗 Petición LLM agrupada con otra en curso: {key[:12]}")
+            return await self._follow(flight)
+
+        task = asyncio.ensure_future(self.llm.ainvoke(llm_input, config=config, **kwargs))
+        flight = _Flight(task)
+        self._flights[key] = flight
+        task.add_done_callback(lambda _t, k=key, f=flight: self._finish(k, f))
+        self.stats["upstream_calls"] += 1
+        return await self._wait(flight)
+
+    async def _follow(self, flight: _Flight) -> Any:
+        """Esperar una llamada ajena dejando traza y telemetría propias"""
+        context = get_llm_call_context()
+        deployment = getattr(self.llm, "deployment_name", None) or UNKNOWN
+        start = time.perf_counter()
+        status, error = "coalesced", None
+
+        with get_tracer().span("llm.coalesced", SPAN_KIND_CLIENT, **{"llm.deployment": deployment}):
+            try:
+                return await self._wait(flight)
+            except BaseException as e:
+                status, error = "error", type(e).__name__
+                raise
+            finally:
+                if self.telemetry is not None:
+                    self.telemetry.record(LLMCallRecord(
+                        timestamp=time.time(),
+                        node=context.get("node") or UNKNOWN,
+                        session_id=context.get("session_id") or UNKNOWN,
+                        deployment=deployment,
+                        status=status,
+                        latency_seconds=time.perf_counter() - start,
+                        prompt_tokens=0,
+                        completion_tokens=0,
+                        attempt=0,
+                        cost=0.0,
+                        error=error,
+                    ))
+
+    async def _wait(self, flight: _Flight) -> Any:
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # Si ya nadie espera el resultado, cancelar la llamada a Azure
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Evitar el aviso "exception was never retrieved" si nadie esperaba ya
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de coalescencia"""
+        return {**self.stats, "in_flight": len(self._flights)}
+
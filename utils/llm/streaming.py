@@ -0,0 +1,121 @@
+# =====================================================
+# utils/llm/streaming.py - Filtrado de tokens en streaming
+# =====================================================
+"""
+Utilidades para enviar al usuario los tokens del LLM mientras se generan.
+
+Los nodos mezclan dos tipos de llamadas:
+- Decisiones JSON (authenticate, classify, confirmación): solo se reenvía
+  el campo de texto para el usuario ("message_to_user"), parseando el JSON
+  parcial a medida que llega.
+- Mensajes en texto libre (generate_natural_message): se reenvían tal cual
+  si la llamada lleva la etiqueta STREAM_TO_USER_TAG.
+
+El resto de llamadas (clasificación interna, extracción) y las copias del
+hedging (HEDGE_TAG) no se muestran.
+"""
+
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from langchain_core.runnables.config import ensure_config
+from langchain_core.tracers._streaming import _StreamingCallbackHandler
+from langchain_core.utils.json import parse_partial_json
+
+# Etiqueta para marcar llamadas cuyo texto va directamente al usuario
+STREAM_TO_USER_TAG = "stream_to_user"
+
+# Etiqueta de la copia duplicada por HedgedChatModel: su texto nunca se
+# muestra (ya se está mostrando el de la llamada original)
+HEDGE_TAG = "llm_hedge"
+
+# Campos JSON que contienen el mensaje para el usuario
+USER_FACING_JSON_FIELDS = ("message_to_user",)
+
+_FENCE_PATTERN = re.compile(r"^```(?:json)?\s*", re.IGNORECASE)
+
+
+def is_streaming_config(config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    True si la llamada emitirá tokens en streaming (astream_events).
+
+    Se combina con la config ambiente de LangGraph, igual que hace el chat
+    model al decidir si usa la API de streaming.
+    """
+    callbacks = ensure_config(config).get("callbacks")
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    return any(isinstance(h, _StreamingCallbackHandler) for h in handlers)
+
+
+class UserFacingStreamFilter:
+    """
+    Acumula los chunks de cada ejecución del LLM (por run_id) y devuelve
+    solo el texto nuevo que debe mostrarse al usuario.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, str] = {}
+        self._emitted: Dict[str, int] = {}
+        self._modes: Dict[str, Optional[str]] = {}
+
+    def feed(self, run_id: str, chunk: str, tags: Optional[Iterable[str]] = None) -> str:
+        """
+        Añadir un chunk de la ejecución run_id.
+
+        Returns:
+            Texto nuevo para el usuario (puede ser cadena vacía)
+        """
+        buffer = self._buffers.get(run_id, "") + (chunk or "")
+        self._buffers[run_id] = buffer
+
+        mode = self._modes.get(run_id)
+        if mode is None:
+            mode = self._detect_mode(buffer, tags)
+            if mode is None:
+                return ""
+            self._modes[run_id] = mode
+
+        if mode == "text":
+            visible = buffer
+        elif mode == "json":
+            visible = self._extract_json_message(buffer)
+        else:
+            return ""
+
+        already = self._emitted.get(run_id, 0)
+        if len(visible) <= already:
+            return ""
+        self._emitted[run_id] = len(visible)
+        return visible[already:]
+
+    def _detect_mode(self, buffer: str, tags: Optional[Iterable[str]]) -> Optional[str]:
+        """Decidir si la ejecución es JSON, texto para el usuario o interna"""
+        if tags and HEDGE_TAG in tags:
+            return "hidden"
+        stripped = buffer.lstrip()
+        if not stripped:
+            return None
+        if stripped.startswith("{") or stripped.startswith("`"):
+            if stripped.startswith("`") and len(stripped) < 3:
+                return None
+            return "json"
+        if tags and STREAM_TO_USER_TAG in tags:
+            return "text"
+        return "hidden"
+
+    def _extract_json_message(self, buffer: str) -> str:
+        """Extraer el campo para el usuario del JSON parcial"""
+        text = _FENCE_PATTERN.sub("", buffer.strip())
+        if text.endswith("```"):
+            text = text[:-3]
+        try:
+            parsed = parse_partial_json(text)
+        except Exception:
+            return ""
+        if not isinstance(parsed, dict):
+            return ""
+        for field in USER_FACING_JSON_FIELDS:
+            value = parsed.get(field)
+            if isinstance(value, str):
+                return value
+        return ""
@@ -0,0 +1,207 @@
+# =====================================================
+# utils/llm/structured.py - Salida JSON validada contra modelos pydantic
+# =====================================================
+"""
+Decisiones del LLM como JSON validado en una sola pasada.
+
+- La llamada pide JSON mode a Azure (response_format json_object), así que la
+  respuesta ya llega como JSON sin bloques ``` ni texto alrededor. Si el
+  deployment no lo admite (400 que menciona response_format), se repite la
+  llamada sin él y no se vuelve a pedir a ese deployment
+- Se valida directamente contra el modelo pydantic de la decisión
+- Si falla, una única llamada de reparación con la respuesta, el error y el
+  esquema (mucho más corta que repetir el prompt completo); si también falla,
+  StructuredOutputError y el nodo usa su fallback de siempre
+- Contadores por prompt: a la primera, reparadas y fallidas
+"""
+
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Set, Type, TypeVar
+
+from langchain_core.utils.json import parse_json_markdown
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger("LLM.Structured")
+
+T = TypeVar("T", bound=BaseModel)
+
+JSON_MODE = {"type": "json_object"}
+
+# Deployments que han rechazado response_format (no se les vuelve a pedir)
+_json_mode_unsupported: Set[str] = set()
+
+REPAIR_PROMPT = """Tu respuesta anterior debía ser un JSON válido según este esquema, pero no lo era.
+
+ESQUEMA:
+{schema}
+
+RESPUESTA ANTERIOR:
+{raw_output}
+
+ERROR:
+{error}
+
+Devuelve SOLO el JSON corregido, sin explicaciones."""
+
+
+class StructuredOutputError(ValueError):
+    """La respuesta no es válida ni tras la llamada de reparación"""
+
+
+class StructuredOutputStats:
+    """Contadores de fallos de parseo por prompt"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "first_pass": 0, "repaired": 0, "failed": 0}
+        )
+
+    def observe(self, prompt_name: str, outcome: str):
+        counters = self._counters[prompt_name]
+        counters["calls"] += 1
+        counters[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Por prompt: contadores, tasa de fallos a la primera y llamadas de reparación"""
+        stats = {}
+        for name, counters in self._counters.items():
+            calls = counters["calls"]
+            stats[name] = {
+                **counters,
+                "parse_failure_rate": (calls - counters["first_pass"]) / calls if calls else 0.0,
+                "repair_calls": counters["repaired"] + counters["failed"],
+            }
+        return stats
+
+    def clear(self):
+        self._counters.clear()
+
+
+def parse_structured(text: Any, schema: Type[T], prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> T:
+    """Parsear y validar una respuesta (tolera ``` y texto alrededor del JSON)"""
+    if isinstance(text, dict):
+        data = text
+    else:
+        data = parse_json_markdown(str(text))
+    if not isinstance(data, dict):
+        raise ValueError(f"Se esperaba un objeto JSON, llegó {type(data).__name__}")
+    if prepare is not None:
+        data = prepare(data)
+    return schema.model_validate(data)
+
+
+def _deployment(llm: Any) -> str:
+    return getattr(llm, "deployment_name", None) or getattr(llm, "model_name", None) or "default"
+
+
+def _json_mode_kwargs(llm: Any, prompt: str) -> Dict[str, Any]:
+    """Azure exige que el prompt mencione JSON para activar JSON mode"""
+    from config.settings import get_settings
+    if (
+        get_settings().llm.structured_output_json_mode
+        and "json" in prompt.lower()
+        and _deployment(llm) not in _json_mode_unsupported
+    ):
+        return {"response_format": JSON_MODE}
+    return {}
+
+
+def _is_json_mode_rejected(error: Exception) -> bool:
+    """400 de Azure por response_format (modelo o api-version sin JSON mode)"""
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, openai.BadRequestError) and "response_format" in str(error)
+
+
+async def _ainvoke(llm: Any, prompt: str, kwargs: Dict[str, Any]) -> Any:
+    """Llamada al LLM; si el deployment rechaza JSON mode, se repite sin él"""
+    try:
+        return await llm.ainvoke(prompt, **kwargs)
+    except Exception as e:
+        if "response_format" not in kwargs or not _is_json_mode_rejected(e):
+            raise
+        deployment = _deployment(llm)
+        _json_mode_unsupported.add(deployment)
+        logger.warning(f"🧩 {deployment} no admite JSON mode (response_format): se desactiva para este deployment")
+        # Sin response_format también para la posible llamada de reparación
+        kwargs.pop("response_format")
+        return await llm.ainvoke(prompt, **kwargs)
+
+
+async def ainvoke_structured(
+    llm: Any,
+    prompt: str,
+    schema: Type[T],
+    prompt_name: str,
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    **llm_kwargs
+) -> T:
+    """
+    Invocar al LLM y devolver la decisión validada.
+
+    Args:
+        llm: Chat model (get_llm())
+        prompt: Prompt ya formateado
+        schema: Modelo pydantic de la decisión
+        prompt_name: Nombre del prompt para los contadores
+        prepare: Normalización opcional del dict antes de validar
+        **llm_kwargs: Argumentos extra para ainvoke (p.ej. max_tokens)
+
+    Raises:
+        StructuredOutputError: Si la respuesta no es válida tras la reparación
+        LLMCircuitOpenError: Si el circuito del LLM está abierto
+    """
+    stats = get_structured_output_stats()
+    kwargs = {**_json_mode_kwargs(llm, prompt), **llm_kwargs}
+
+    response = await _ainvoke(llm, prompt, kwargs)
+    try:
+        result = parse_structured(response.content, schema, prepare)
+        stats.observe(prompt_name, "first_pass")
+        return result
+    except (ValueError, ValidationError) as e:
+        error = e
+        logger.warning(f"🧩 {prompt_name}: respuesta no válida, llamada de reparación ({type(e).__name__})")
+
+    repair_prompt = REPAIR_PROMPT.format(
+        schema=json.dumps(schema.model_json_schema(), ensure_ascii=False),
+        raw_output=response.content,
+        error=str(error)[:1000]
+    )
+    repaired = await _ainvoke(llm, repair_prompt, kwargs)
+    try:
+        result = parse_structured(repaired.content, schema, prepare)
+        stats.observe(prompt_name, "repaired")
+        return result
+    except (ValueError, ValidationError) as e:
+        stats.observe(prompt_name, "failed")
+        raise StructuredOutputError(f"{prompt_name}: respuesta no válida tras reparación: {e}") from e
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_structured_output_stats: Optional[StructuredOutputStats] = None
+
+
+def get_structured_output_stats() -> StructuredOutputStats:
+    """Obtener instancia singleton de los contadores"""
+    global _structured_output_stats
+    if _structured_output_stats is None:
+        _structured_output_stats = StructuredOutputStats()
+    return _structured_output_stats
+
+
+def reset_structured_output_stats():
+    """Resetear los contadores globales"""
+    global _structured_output_stats
+    _structured_output_stats = None
+
+
+def reset_json_mode_support():
+    """Volver a pedir JSON mode a todos los deployments"""
+    _json_mode_unsupported.clear()
@@ -0,0 +1,381 @@
+# =====================================================
+# utils/llm/telemetry.py - Telemetría por llamada al LLM
+# =====================================================
+"""
+Registro en proceso de cada llamada a Azure OpenAI.
+
+Un callback de LangChain (añadido a los clientes en get_llm()) anota por
+llamada: tokens de prompt y completion, tiempo real, intento (reintentos del
+planificador), deployment, nodo (BaseNode.name) y sesión.
+
+El nodo y la sesión se propagan con una ContextVar que fija BaseNode al
+ejecutar; si no hay nodo, se usan los metadatos de LangGraph
+(langgraph_node / thread_id).
+
+Exportación:
+- Texto Prometheus: get_llm_telemetry().to_prometheus()
+- Traza JSONL: LLM_TELEMETRY_TRACE_PATH o get_llm_telemetry().export_jsonl()
+- Informe p50/p95/p99 por nodo: scripts/llm_telemetry_report.py
+- Span llm.call por llamada dentro del span del nodo (utils/tracing.py)
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.tracing import SPAN_KIND_CLIENT, STATUS_ERROR, get_tracer
+
+logger = logging.getLogger("LLM.Telemetry")
+
+UNKNOWN = "unknown"
+
+# Límites (segundos) del histograma de latencia en Prometheus
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+_call_context: ContextVar[Dict[str, Optional[str]]] = ContextVar("llm_call_context", default={})
+_current_attempt: ContextVar[int] = ContextVar("llm_attempt", default=0)
+
+
+# =====================================================
+# Contexto de la llamada (nodo, sesión, intento)
+# =====================================================
+
+@contextmanager
+def llm_call_context(node: Optional[str] = None, session_id: Optional[str] = None) -> Iterator[None]:
+    """Atribuir las llamadas al LLM hechas dentro del bloque a un nodo y una sesión"""
+    current = _call_context.get()
+    token = _call_context.set({
+        "node": node or current.get("node"),
+        "session_id": session_id or current.get("session_id"),
+    })
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def get_llm_call_context() -> Dict[str, Optional[str]]:
+    return dict(_call_context.get())
+
+
+@contextmanager
+def llm_attempt_scope(attempt: int) -> Iterator[None]:
+    """Marcar el número de reintento de la llamada en curso (lo usa el planificador)"""
+    token = _current_attempt.set(attempt)
+    try:
+        yield
+    finally:
+        _current_attempt.reset(token)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil por el método del rango más cercano (values ordenados)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+# =====================================================
+# Registro de métricas
+# =====================================================
+
+@dataclass
+class LLMCallRecord:
+    """Una llamada al LLM"""
+    timestamp: float
+    node: str
+    session_id: str
+    deployment: str
+    status: str
+    latency_seconds: float
+    prompt_tokens: int
+    completion_tokens: int
+    attempt: int
+    cost: float
+    error: Optional[str] = None
+
+
+class _NodeAggregate:
+    """Acumulados por (nodo, deployment)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class LLMTelemetry:
+    """Registro en memoria de las llamadas al LLM, exportable a Prometheus y JSONL"""
+
+    def __init__(
+        self,
+        max_records: int = 10000,
+        trace_path: Optional[str] = None,
+        prompt_cost_per_1k: float = 0.0,
+        completion_cost_per_1k: float = 0.0
+    ):
+        self.records: Deque[LLMCallRecord] = deque(maxlen=max_records)
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.prompt_cost_per_1k = prompt_cost_per_1k
+        self.completion_cost_per_1k = completion_cost_per_1k
+        self._aggregates: Dict[tuple, _NodeAggregate] = defaultdict(_NodeAggregate)
+        self._lock = threading.Lock()
+        self.callback = LLMTelemetryCallback(self)
+
+    def record(self, record: LLMCallRecord):
+        with self._lock:
+            self.records.append(record)
+            aggregate = self._aggregates[(record.node, record.deployment)]
+            if record.status == "coalesced":
+                # Esperó a una llamada idéntica en curso: no llegó a Azure
+                aggregate.coalesced += 1
+            else:
+                self._add_call(aggregate, record)
+
+        if self.trace_path is not None:
+            self._append_trace([record])
+
+    def _add_call(self, aggregate: _NodeAggregate, record: LLMCallRecord):
+        aggregate.calls += 1
+        aggregate.errors += record.status != "ok"
+        aggregate.retries += record.attempt > 0
+        aggregate.prompt_tokens += record.prompt_tokens
+        aggregate.completion_tokens += record.completion_tokens
+        aggregate.cost += record.cost
+        aggregate.latency_sum += record.latency_seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if record.latency_seconds <= bound:
+                aggregate.latency_buckets[i] += 1
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_cost_per_1k + completion_tokens * self.completion_cost_per_1k) / 1000
+
+    # -------------------------------------------------
+    # Exportación
+    # -------------------------------------------------
+
+    def _append_trace(self, records: Iterable[LLMCallRecord], path: Optional[Path] = None):
+        path = path or self.trace_path
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo escribir la traza de telemetría LLM: {e}")
+
+    def export_jsonl(self, path: str) -> int:
+        """Volcar los registros en memoria a un fichero JSONL"""
+        with self._lock:
+            records = list(self.records)
+        self._append_trace(records, Path(path))
+        return len(records)
+
+    def to_prometheus(self) -> str:
+        """Métricas en formato de texto de Prometheus"""
+        lines = [
+            "# HELP eroski_llm_calls_total Llamadas al LLM",
+            "# TYPE eroski_llm_calls_total counter",
+        ]
+        with self._lock:
+            aggregates = sorted(self._aggregates.items())
+
+        def labels(node: str, deployment: str, **extra: str) -> str:
+            items = {"node": node, "deployment": deployment, **extra}
+            return ",".join(f'{k}="{v}"' for k, v in items.items())
+
+        for (node, deployment), agg in aggregates:
+            lines.append(f"eroski_llm_calls_total{{{labels(node, deployment)}}} {agg.calls}")
+
+        sections = [
+            ("eroski_llm_errors_total", "Llamadas al LLM con error", lambda a: a.errors),
+            ("eroski_llm_coalesced_total", "Peticiones al LLM agrupadas con otra idéntica en curso", lambda a: a.coalesced),
+            ("eroski_llm_retries_total", "Reintentos de llamadas al LLM", lambda a: a.retries),
+            ("eroski_llm_cost_total", "Coste estimado de las llamadas al LLM", lambda a: round(a.cost, 6)),
+        ]
+        for name, help_text, value in sections:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (node, deployment), agg in aggregates:
+                lines.append(f"{name}{{{labels(node, deployment)}}} {value(agg)}")
+
+        lines += ["# HELP eroski_llm_tokens_total Tokens consumidos", "# TYPE eroski_llm_tokens_total counter"]
+        for (node, deployment), agg in aggregates:
+            lines.append(f"eroski_llm_tokens_total{{{labels(node, deployment, kind='prompt')}}} {agg.prompt_tokens}")
+            lines.append(f"eroski_llm_tokens_total{{{labels(node, deployment, kind='completion')}}} {agg.completion_tokens}")
+
+        lines += ["# HELP eroski_llm_latency_seconds Latencia de las llamadas al LLM", "# TYPE eroski_llm_latency_seconds histogram"]
+        for (node, deployment), agg in aggregates:
+            for bound, count in zip(LATENCY_BUCKETS, agg.latency_buckets):
+                lines.append(f"eroski_llm_latency_seconds_bucket{{{labels(node, deployment, le=str(bound))}}} {count}")
+            lines.append(f"eroski_llm_latency_seconds_bucket{{{labels(node, deployment, le='+Inf')}}} {agg.calls}")
+            lines.append(f"eroski_llm_latency_seconds_sum{{{labels(node, deployment)}}} {agg.latency_sum:.6f}")
+            lines.append(f"eroski_llm_latency_seconds_count{{{labels(node, deployment)}}} {agg.calls}")
+
+        return "\n".join(lines) + "\n"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumen por nodo (latencias p50/p95/p99 de los registros en memoria)"""
+        with self._lock:
+            records = list(self.records)
+        return summarize_records(asdict(r) for r in records)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self._aggregates.clear()
+
+
+def summarize_records(records: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Agrupar registros (dicts de LLMCallRecord) por nodo.
+
+    Returns:
+        {nodo: {calls, coalesced, errors, retries, latency p50/p95/p99, tokens, cost}}
+    """
+    by_node: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        by_node[record.get("node") or UNKNOWN].append(record)
+
+    summary = {}
+    for node, node_records in sorted(by_node.items()):
+        items = [r for r in node_records if r["status"] != "coalesced"]
+        latencies = sorted(r["latency_seconds"] for r in items)
+        summary[node] = {
+            "calls": len(items),
+            "coalesced": len(node_records) - len(items),
+            "errors": sum(r["status"] != "ok" for r in items),
+            "retries": sum(r["attempt"] > 0 for r in items),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in items),
+            "completion_tokens": sum(r["completion_tokens"] for r in items),
+            "cost": round(sum(r.get("cost", 0.0) for r in items), 6),
+        }
+    return summary
+
+
+# =====================================================
+# Callback de LangChain
+# =====================================================
+
+class LLMTelemetryCallback(BaseCallbackHandler):
+    """Callback que registra cada llamada del chat model en LLMTelemetry"""
+
+    # Ejecutar en el hilo/contexto de la llamada para leer las ContextVar
+    run_inline = True
+
+    def __init__(self, telemetry: LLMTelemetry):
+        self.telemetry = telemetry
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        metadata = metadata or {}
+        context = _call_context.get()
+        invocation_params = kwargs.get("invocation_params") or {}
+        self._runs[run_id] = {
+            "start": time.perf_counter(),
+            "node": context.get("node") or metadata.get("langgraph_node") or UNKNOWN,
+            "session_id": context.get("session_id") or metadata.get("thread_id") or UNKNOWN,
+            "deployment": invocation_params.get("azure_deployment") or metadata.get("ls_model_name")
+                          or invocation_params.get("model") or UNKNOWN,
+            "attempt": _current_attempt.get(),
+        }
+        self._runs[run_id]["span"] = get_tracer().start_span(
+            "llm.call", SPAN_KIND_CLIENT,
+            **{"llm.deployment": self._runs[run_id]["deployment"], "llm.attempt": self._runs[run_id]["attempt"]}
+        )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self._record(run, "ok", prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        self._record(run, "error", 0, 0, error=type(error).__name__)
+
+    def _record(self, run: Dict[str, Any], status: str, prompt_tokens: int, completion_tokens: int, error: Optional[str] = None):
+        span = run.get("span")
+        if span is not None:
+            span.set_attribute("llm.prompt_tokens", prompt_tokens)
+            span.set_attribute("llm.completion_tokens", completion_tokens)
+            if error:
+                span.status_code, span.status_message = STATUS_ERROR, error
+            get_tracer().end_span(span)
+
+        self.telemetry.record(LLMCallRecord(
+            timestamp=time.time(),
+            node=run["node"],
+            session_id=run["session_id"],
+            deployment=run["deployment"],
+            status=status,
+            latency_seconds=time.perf_counter() - run["start"],
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            attempt=run["attempt"],
+            cost=self.telemetry.cost(prompt_tokens, completion_tokens),
+            error=error,
+        ))
+
+
+def _token_usage(response: LLMResult) -> tuple:
+    """Tokens (prompt, completion) de la respuesta"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_telemetry: Optional[LLMTelemetry] = None
+
+
+def get_llm_telemetry() -> LLMTelemetry:
+    """Obtener instancia singleton del registro de telemetría"""
+    global _telemetry
+    if _telemetry is None:
+        from config.settings import get_settings
+        llm_settings = get_settings().llm
+        _telemetry = LLMTelemetry(
+            max_records=llm_settings.telemetry_max_records,
+            trace_path=llm_settings.telemetry_trace_path,
+            prompt_cost_per_1k=llm_settings.telemetry_prompt_cost_per_1k,
+            completion_cost_per_1k=llm_settings.telemetry_completion_cost_per_1k
+        )
+    return _telemetry
+
+
+def reset_llm_telemetry():
+    """Resetear el registro global"""
+    global _telemetry
+    _telemetry = None
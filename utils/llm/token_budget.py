@@ -0,0 +1,234 @@
+# =====================================================
+# utils/llm/token_budget.py - Presupuesto de tokens por tipo de prompt
+# =====================================================
+"""
+max_tokens dinámico y recorte de prompts según el tipo de llamada.
+
+LLMSettings.max_tokens era un único valor para todo: igual para una
+confirmación de una palabra que para un JSON de ClassificationDecision. Cada
+tipo de prompt tiene ahora un perfil con:
+- max_completion_tokens: límite de la respuesta (menos tokens → menos latencia)
+- max_prompt_tokens: tamaño máximo del prompt; si se supera se recorta
+
+El recorte quita primero lo más antiguo del campo indicado (normalmente el
+historial, que ya llega compactado con resumen desde history.py) y, si no
+basta, el centro del prompt, conservando instrucciones y formato de salida.
+
+Los tokens se cuentan en local con tiktoken; si no está disponible (o no se
+puede descargar la codificación) se estima por número de caracteres.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("LLM.TokenBudget")
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "\n[...]\n"
+
+
+@dataclass(frozen=True)
+class TokenProfile:
+    """Límites de tokens de un tipo de prompt"""
+    max_completion_tokens: int
+    max_prompt_tokens: int
+
+
+DEFAULT_PROFILES: Dict[str, TokenProfile] = {
+    "confirmation": TokenProfile(max_completion_tokens=300, max_prompt_tokens=3000),
+    "confirmation_intent": TokenProfile(max_completion_tokens=10, max_prompt_tokens=1500),
+    "phase1": TokenProfile(max_completion_tokens=400, max_prompt_tokens=6000),
+    "phase2": TokenProfile(max_completion_tokens=600, max_prompt_tokens=6000),
+    "auth_decision": TokenProfile(max_completion_tokens=500, max_prompt_tokens=6000),
+    "classification": TokenProfile(max_completion_tokens=600, max_prompt_tokens=6000),
+    "natural_message": TokenProfile(max_completion_tokens=150, max_prompt_tokens=2000),
+    "followup_questions": TokenProfile(max_completion_tokens=150, max_prompt_tokens=2000),
+    "history_summary": TokenProfile(max_completion_tokens=250, max_prompt_tokens=4000),
+}
+
+
+class TokenCounter:
+    """Contador de tokens con tiktoken y estimación por caracteres como fallback"""
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self._encoding: Any = None
+        self._loaded = False
+
+    @property
+    def encoding(self) -> Any:
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model or "gpt-4")
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # Sin tiktoken o sin acceso a la codificación: estimación
+                logger.warning(f"⚠️ tiktoken no disponible, estimando tokens por caracteres: {e}")
+                self._encoding = None
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def keep_tail(self, text: str, max_tokens: int) -> str:
+        """Últimos max_tokens tokens del texto"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[-max_tokens:])
+        return text[-max_tokens * CHARS_PER_TOKEN:]
+
+    def truncate_middle(self, text: str, max_tokens: int) -> str:
+        """Recortar el centro del texto dejando principio y final"""
+        if self.count(text) <= max_tokens:
+            return text
+        keep = max(0, max_tokens - self.count(TRUNCATION_MARKER))
+        head, tail = keep // 2, keep - keep // 2
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            return self.encoding.decode(tokens[:head]) + TRUNCATION_MARKER + self.encoding.decode(tokens[len(tokens) - tail:])
+        return text[:head * CHARS_PER_TOKEN] + TRUNCATION_MARKER + text[len(text) - tail * CHARS_PER_TOKEN:]
+
+
+class TokenBudget:
+    """Perfiles de tokens y ajuste de prompts antes de llamar al LLM"""
+
+    def __init__(
+        self,
+        profiles: Optional[Dict[str, TokenProfile]] = None,
+        counter: Optional[TokenCounter] = None,
+        context_window: int = 8192,
+        default_max_tokens: int = 2000,
+        enabled: bool = True
+    ):
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.counter = counter or TokenCounter()
+        self.context_window = context_window
+        self.default_max_tokens = default_max_tokens
+        self.enabled = enabled
+        self.stats = {"calls": 0, "truncated": 0, "prompt_tokens": 0, "truncated_tokens": 0}
+
+    def profile(self, name: str) -> TokenProfile:
+        """Perfil del tipo de prompt (por defecto: max_tokens global)"""
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = TokenProfile(self.default_max_tokens, self.context_window - self.default_max_tokens)
+        return profile
+
+    def prompt_limit(self, profile: TokenProfile) -> int:
+        """El prompt y la respuesta tienen que caber en la ventana de contexto"""
+        return min(profile.max_prompt_tokens, self.context_window - profile.max_completion_tokens)
+
+    def prepare(self, prompt: str, profile_name: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Ajustar un prompt ya formateado a su perfil.
+
+        Returns:
+            (prompt recortado si hacía falta, kwargs para ainvoke con max_tokens)
+        """
+        if not self.enabled:
+            return prompt, {}
+
+        profile = self.profile(profile_name)
+        limit = self.prompt_limit(profile)
+        tokens = self.counter.count(prompt)
+        if tokens > limit:
+            prompt = self._truncated(prompt, tokens, limit, profile_name)
+        self._observe(tokens)
+        return prompt, {"max_tokens": profile.max_completion_tokens}
+
+    def format(
+        self,
+        template: Any,
+        data: Dict[str, Any],
+        profile_name: str,
+        shrink_field: Optional[str] = "conversation_history"
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Formatear una plantilla (str o PromptTemplate) ajustándola a su perfil.
+
+        Si el prompt no cabe, se recorta primero lo más antiguo de shrink_field.
+
+        Returns:
+            (prompt, kwargs para ainvoke con max_tokens)
+        """
+        prompt = template.format(**data)
+        if not self.enabled:
+            return prompt, {}
+
+        profile = self.profile(profile_name)
+        limit = self.prompt_limit(profile)
+        tokens = self.counter.count(prompt)
+
+        if tokens > limit and shrink_field and data.get(shrink_field):
+            field = str(data[shrink_field])
+            keep = self.counter.count(field) - (tokens - limit) - self.counter.count(TRUNCATION_MARKER)
+            data = {**data, shrink_field: TRUNCATION_MARKER.lstrip() + self.counter.keep_tail(field, keep)}
+            prompt = template.format(**data)
+            logger.info(f"✂️ {shrink_field} recortado para {profile_name} ({tokens} > {limit} tokens)")
+
+        new_tokens = self.counter.count(prompt)
+        if new_tokens > limit:
+            prompt = self._truncated(prompt, new_tokens, limit, profile_name)
+        elif new_tokens < tokens:
+            self.stats["truncated"] += 1
+            self.stats["truncated_tokens"] += tokens - new_tokens
+
+        self._observe(tokens)
+        return prompt, {"max_tokens": profile.max_completion_tokens}
+
+    def _truncated(self, prompt: str, tokens: int, limit: int, profile_name: str) -> str:
+        logger.warning(f"✂️ Prompt {profile_name} recortado: {tokens} > {limit} tokens")
+        self.stats["truncated"] += 1
+        self.stats["truncated_tokens"] += tokens - limit
+        return self.counter.truncate_middle(prompt, limit)
+
+    def _observe(self, tokens: int):
+        self.stats["calls"] += 1
+        self.stats["prompt_tokens"] += tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "exact_counting": self.counter.exact}
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_token_budget: Optional[TokenBudget] = None
+
+
+def get_token_budget() -> TokenBudget:
+    """Obtener instancia singleton del presupuesto de tokens"""
+    global _token_budget
+    if _token_budget is None:
+        from config.settings import get_settings
+        llm_settings = get_settings().llm
+        _token_budget = TokenBudget(
+            profiles={name: TokenProfile(**limits) for name, limits in llm_settings.token_profiles.items()},
+            counter=TokenCounter(llm_settings.model),
+            context_window=llm_settings.context_window_tokens,
+            default_max_tokens=llm_settings.max_tokens,
+            enabled=llm_settings.token_budget_enabled
+        )
+    return _token_budget
+
+
+def reset_token_budget():
+    """Resetear el presupuesto global"""
+    global _token_budget
+    _token_budget = None
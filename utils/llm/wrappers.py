@@ -0,0 +1,44 @@
+# =====================================================
+# utils/llm/wrappers.py - Base para envoltorios del chat model
+# =====================================================
+"""
+Clase base para las capas que se apilan sobre el chat model en get_llm()
+(cache, scheduler, ...). Cada capa implementa ainvoke/invoke y delega el
+resto de atributos al modelo envuelto.
+"""
+
+from typing import Any, Dict, Optional, Type
+
+
+class ChatModelWrapper:
+    """Envoltorio transparente sobre un chat model de LangChain"""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+
+    async def ainvoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        return await self.llm.ainvoke(llm_input, config=config, **kwargs)
+
+    def invoke(self, llm_input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        return self.llm.invoke(llm_input, config=config, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def unwrap_llm(llm: Any) -> Any:
+    """Obtener el chat model original bajo todas las capas"""
+    while isinstance(llm, ChatModelWrapper):
+        llm = llm.llm
+    return llm
+
+
+def find_llm_layer(llm: Any, layer_type: Type) -> Optional[Any]:
+    """Buscar una capa concreta (p.ej. SingleFlightChatModel) en la pila"""
+    while llm is not None:
+        if isinstance(llm, layer_type):
+            return llm
+        llm = llm.llm if isinstance(llm, ChatModelWrapper) else None
+    return None
@@ -0,0 +1,356 @@
+# =====================================================
+# utils/tracing.py - Trazas por turno (turno → nodo → LLM → BD)
+# =====================================================
+"""
+Spans anidados de cada turno del workflow, exportados como JSON compatible
+con OTLP (ExportTraceServiceRequest).
+
+Jerarquía:
+- graph.turn: un turno de EroskiChatInterface (atributo session.id)
+- node.<nombre>: ejecución de un nodo (BaseNode.execute / node_wrapper)
+- router.<nombre>: decisión de un router del workflow (atributo route)
+- llm.call: llamada al chat model (desde el callback de telemetría)
+- db.query: consulta de un repositorio (BaseRepository)
+
+El span actual se propaga con una ContextVar, igual que llm_call_context, así
+que las tareas asyncio que lanza LangGraph heredan el padre. Cuando termina
+el span raíz se escribe una línea JSON con todos los spans del turno en
+LOG_TRACING_PATH o en stdout (LOG_TRACING_EXPORTER=stdout).
+
+Desactivado por defecto (LOG_TRACING_ENABLED): span() no hace nada.
+Resumen y camino crítico por turno: scripts/trace_summary.py
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("Tracing")
+
+# Valores de SpanKind y StatusCode de OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """Un span con los campos que exporta OTLP"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str = ""
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status_code: int = STATUS_UNSET
+    status_message: str = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:500]
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("stringValue", "doubleValue", "boolValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+class Tracer:
+    """Crea spans y exporta cada turno completo como una línea OTLP JSON"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        exporter: str = "file",
+        path: Optional[str] = "logs/traces.jsonl",
+        service_name: str = "eroski-chatbot",
+        keep_last: int = 100
+    ):
+        self.enabled = enabled
+        self.exporter = exporter
+        self.path = Path(path) if path else None
+        self.service_name = service_name
+        self.exported: Deque[Dict[str, Any]] = deque(maxlen=keep_last)
+        self._pending: Dict[str, List[Span]] = defaultdict(list)
+        self._open_roots: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Spans
+    # -------------------------------------------------
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        parent: Optional[Span] = None,
+        **attributes: Any
+    ) -> Optional[Span]:
+        """Abrir un span hijo del actual (o raíz si no hay); None si está desactivado"""
+        if not self.enabled:
+            return None
+        parent = parent or _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent else "",
+            kind=kind,
+            attributes={k: v for k, v in attributes.items() if v is not None},
+        )
+        if parent is None:
+            with self._lock:
+                self._open_roots[span.trace_id] = span.span_id
+        return span
+
+    def end_span(self, span: Optional[Span]):
+        """Cerrar un span; al cerrar la raíz se exporta el turno completo"""
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if span.status_code == STATUS_UNSET:
+            span.status_code = STATUS_OK
+
+        with self._lock:
+            if self._open_roots.get(span.trace_id) == span.span_id:
+                del self._open_roots[span.trace_id]
+                spans = self._pending.pop(span.trace_id, []) + [span]
+            elif span.trace_id in self._open_roots:
+                self._pending[span.trace_id].append(span)
+                return
+            else:
+                # Span tardío (p.ej. llamada cubierta por hedging): se exporta suelto
+                spans = [span]
+        self.export(spans)
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Span como bloque `with`; los spans creados dentro son sus hijos"""
+        span = self.start_span(name, kind, **attributes)
+        if span is None:
+            yield None
+            return
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Generador async consumido desde otro contexto
+                _current_span.set(None)
+            self.end_span(span)
+
+    # -------------------------------------------------
+    # Exportación
+    # -------------------------------------------------
+
+    def to_otlp(self, spans: Iterable[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "eroski.tracing"},
+                    "spans": [span.to_otlp() for span in sorted(spans, key=lambda s: s.start_ns)],
+                }],
+            }]
+        }
+
+    def export(self, spans: List[Span]):
+        payload = self.to_otlp(spans)
+        self.exported.append(payload)
+        line = json.dumps(payload, ensure_ascii=False)
+        try:
+            if self.exporter == "stdout" or self.path is None:
+                sys.stdout.write(line + "\n")
+                sys.stdout.flush()
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo exportar la traza: {e}")
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced_router(router: Callable) -> Callable:
+    """Envolver un router del workflow en un span router.<nombre> con la ruta elegida"""
+
+    @functools.wraps(router)
+    def wrapper(state, *args, **kwargs):
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return router(state, *args, **kwargs)
+        with tracer.span(f"router.{router.__name__}") as span:
+            route = router(state, *args, **kwargs)
+            span.set_attribute("route", str(route))
+            return route
+
+    return wrapper
+
+
+# =====================================================
+# Lectura de trazas y camino crítico
+# =====================================================
+
+def load_otlp_spans(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Aplanar líneas OTLP JSON en dicts de span (ignora líneas corruptas)"""
+    spans = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        for resource_spans in payload.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    spans.append({
+                        "trace_id": span["traceId"],
+                        "span_id": span["spanId"],
+                        "parent_span_id": span.get("parentSpanId", ""),
+                        "name": span["name"],
+                        "start_ns": int(span["startTimeUnixNano"]),
+                        "end_ns": int(span["endTimeUnixNano"]),
+                        "attributes": {a["key"]: _attribute_value(a["value"]) for a in span.get("attributes", [])},
+                        "error": span.get("status", {}).get("code") == STATUS_ERROR,
+                    })
+    return spans
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Camino crítico de un turno: desde el final de cada span se toma el hijo
+    que termina más tarde, luego el que termina antes del inicio de ese, etc.
+
+    Returns:
+        Lista en orden de ejecución de {name, depth, duration_ms, self_ms, attributes}
+    """
+    by_id = {span["span_id"]: span for span in spans}
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span["parent_span_id"] in by_id:
+            children[span["parent_span_id"]].append(span)
+        else:
+            roots.append(span)
+
+    path: List[Dict[str, Any]] = []
+
+    def walk(span: Dict[str, Any], depth: int):
+        chosen = []
+        cursor = span["end_ns"]
+        for child in sorted(children[span["span_id"]], key=lambda s: s["end_ns"], reverse=True):
+            if child["end_ns"] <= cursor:
+                chosen.append(child)
+                cursor = child["start_ns"]
+        duration = span["end_ns"] - span["start_ns"]
+        path.append({
+            "name": span["name"],
+            "depth": depth,
+            "duration_ms": duration / 1e6,
+            "self_ms": (duration - sum(c["end_ns"] - c["start_ns"] for c in chosen)) / 1e6,
+            "attributes": span["attributes"],
+        })
+        for child in reversed(chosen):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s["start_ns"]):
+        walk(root, 0)
+    return path
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Obtener instancia singleton del tracer"""
+    global _tracer
+    if _tracer is None:
+        try:
+            from config.settings import get_settings
+            log_settings = get_settings().logging
+            _tracer = Tracer(
+                enabled=log_settings.tracing_enabled,
+                exporter=log_settings.tracing_exporter,
+                path=log_settings.tracing_path,
+                service_name=log_settings.tracing_service_name
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Configuración de trazas no disponible, trazas desactivadas: {e}")
+            _tracer = Tracer(enabled=False)
+    return _tracer
+
+
+def reset_tracer():
+    """Resetear el tracer global"""
+    global _tracer
+    _tracer = None
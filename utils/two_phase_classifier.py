@@ -3,14 +3,26 @@
 # =====================================================
 
 from typing import Dict, Any, Optional, List
+import asyncio
 from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.types import Command
 from datetime import datetime
 import logging
+import json
 from pydantic import BaseModel, Field
 
 from models.eroski_state import EroskiState
 from utils.llm.providers import get_llm
+from utils.llm.history import compact_history, format_history, merge_history_updates
+from utils.llm.circuit_breaker import LLMCircuitOpenError
+from utils.llm.token_budget import get_token_budget
+from utils.llm.structured import ainvoke_structured
+from utils.incident_preclassifier import DEFAULT_CONFIG_PATH as INCIDENT_CATALOG_PATH, PreClassification, preclassify_messages
+from utils.incident_helpers import (
+    SolutionSearcher, incidents_file_lock, read_incidents_file,
+    wait_for_incident_initialization, write_incidents_file
+)
+from config.settings import get_settings
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
@@ -199,6 +211,9 @@ class TwoPhaseClassifier:
         # Prompts para cada fase
         self.phase1_prompt = build_phase_1_prompt()
         self.phase2_prompt = build_phase_2_prompt()
+        
+        # Búsqueda por palabras clave para el modo degradado
+        self._solution_searcher: Optional[SolutionSearcher] = None
     
     async def classify_incident(self, state: EroskiState) -> Command:
         """
@@ -211,11 +226,27 @@ class TwoPhaseClassifier:
             Command con estado actualizado
         """
         
+        # Compactar historial (resumen de mensajes antiguos) antes de construir prompts
+        state, history_updates = await compact_history(state)
+        command = await self._classify_incident(state)
+        return merge_history_updates(command, history_updates)
+    
+    async def _classify_incident(self, state: EroskiState) -> Command:
+        """Clasificación en dos fases sobre el estado con historial compactado"""
+        
         # ✅ FASE 1: Identificar TIPO de incidencia
         if not state.get("incident_type"):
             self.logger.info("🔍 FASE 1: Identificando tipo de incidencia...")
             
-            phase1_result = await self._execute_phase_1(state)
+            # Si el preclasificador local está seguro, no hace falta el LLM
+            preclassification = self._preclassify(state)
+            phase1_result = self._try_local_phase_1(state, preclassification)
+            
+            if phase1_result is None:
+                candidates = self._speculative_candidates(preclassification)
+                if candidates:
+                    return await self._classify_speculative(state, candidates)
+                phase1_result = await self._execute_phase_1(state)
             
             if phase1_result.incident_type_identified and phase1_result.confidence_level >= 0.7:
                 # Actualizar estado con tipo identificado
@@ -239,6 +270,178 @@ class TwoPhaseClassifier:
             self.logger.info(f"🔍 FASE 2: Identificando problema específico para {state.get('incident_type')}...")
             return await self._execute_phase_2_with_state(state)
     
+    def _preclassify(self, state: EroskiState) -> Optional[PreClassification]:
+        """Ejecutar el preclasificador local (BM25) sobre los mensajes del usuario"""
+        workflow_settings = get_settings().workflow
+        if not workflow_settings.preclassifier_enabled and not workflow_settings.speculative_phase2_enabled:
+            return None
+        
+        try:
+            user_messages = [m.content for m in state.get("messages", []) if isinstance(m, HumanMessage)]
+            return preclassify_messages(user_messages)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error en preclasificador local: {e}")
+            return None
+    
+    def _try_local_phase_1(
+        self,
+        state: EroskiState,
+        preclassification: Optional[PreClassification] = None
+    ) -> Optional[IncidentTypeDecision]:
+        """
+        Intentar resolver la FASE 1 con el preclasificador local (BM25).
+        
+        Returns:
+            IncidentTypeDecision si la confianza supera el umbral, None si hay que usar el LLM
+        """
+        workflow_settings = get_settings().workflow
+        if not workflow_settings.preclassifier_enabled:
+            return None
+        
+        result = preclassification or self._preclassify(state)
+        if result is None:
+            return None
+        
+        if not result.incident_type or result.confidence < workflow_settings.preclassifier_threshold:
+            self.logger.debug(f"🔎 Preclasificador no concluyente ({result.incident_type}, {result.confidence:.2f})")
+            return None
+        
+        self.logger.info(f"⚡ FASE 1 local: {result.incident_type} (confianza: {result.confidence:.2f}), sin LLM")
+        return IncidentTypeDecision(
+            incident_type_identified=True,
+            incident_type=result.incident_type,
+            confidence_level=result.confidence,
+            keywords_detected=result.matched_terms,
+            reasoning="Preclasificador local BM25",
+            needs_clarification=False
+        )
+    
+    def _speculative_candidates(self, preclassification: Optional[PreClassification]) -> List[str]:
+        """Tipos candidatos (top-k del preclasificador) para lanzar la FASE 2 especulativa"""
+        workflow_settings = get_settings().workflow
+        if not workflow_settings.speculative_phase2_enabled or preclassification is None:
+            return []
+        
+        return [
+            incident_type
+            for incident_type, probability in preclassification.ranking[:workflow_settings.speculative_phase2_top_k]
+            if probability >= workflow_settings.speculative_phase2_min_probability
+        ]
+    
+    async def _classify_speculative(self, state: EroskiState, candidates: List[str]) -> Command:
+        """
+        FASE 1 y FASE 2 especulativa en paralelo.
+        
+        Se lanza la FASE 2 de cada tipo candidato a la vez que la FASE 1. Cuando
+        la FASE 1 resuelve, se cancelan las FASE 2 de los tipos perdedores y se
+        reutiliza la del ganador; si el ganador no estaba entre los candidatos,
+        se ejecuta su FASE 2 como siempre.
+        """
+        self.logger.info(f"🔀 FASE 2 especulativa para {candidates} en paralelo con FASE 1")
+        
+        phase1_task = asyncio.ensure_future(self._execute_phase_1(state))
+        phase2_tasks = {
+            incident_type: asyncio.ensure_future(self._execute_phase_2(self._speculative_state(state, incident_type)))
+            for incident_type in candidates
+        }
+        
+        try:
+            phase1_result = await phase1_task
+        except BaseException:
+            for task in phase2_tasks.values():
+                task.cancel()
+            raise
+        
+        identified = phase1_result.incident_type_identified and phase1_result.confidence_level >= 0.7
+        winner = phase1_result.incident_type if identified else None
+        
+        losers = [task for incident_type, task in phase2_tasks.items() if incident_type != winner]
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+        
+        if identified:
+            updated_state = self._update_state_after_phase1(state, phase1_result)
+            self.logger.info(f"✅ FASE 1 COMPLETADA: {phase1_result.incident_type} (confianza: {phase1_result.confidence_level})")
+            
+            if winner in phase2_tasks:
+                self.logger.info(f"⚡ FASE 2 especulativa reutilizada para {winner}")
+                return await self._execute_phase_2_with_state(updated_state, await phase2_tasks[winner])
+            
+            self.logger.info(f"↩️ {winner} no estaba entre los candidatos, FASE 2 secuencial")
+            return await self._execute_phase_2_with_state(updated_state)
+        
+        elif phase1_result.needs_clarification:
+            return self._ask_for_type_clarification(state, phase1_result)
+        
+        else:
+            return self._ask_general_clarification(state)
+    
+    def _speculative_state(self, state: EroskiState, incident_type: str) -> EroskiState:
+        """Estado hipotético para la FASE 2 de un tipo candidato (aún sin datos de FASE 1)"""
+        speculative_state = dict(state)
+        speculative_state["incident_type"] = incident_type
+        return EroskiState(speculative_state)
+    
+    # ========== MODO DEGRADADO (CIRCUITO LLM ABIERTO) ==========
+    
+    def _rule_based_phase_1(self, state: EroskiState) -> IncidentTypeDecision:
+        """FASE 1 sin LLM: mejor tipo del preclasificador, sin umbral de atajo"""
+        self.logger.warning("🔌 Circuito LLM abierto: FASE 1 por palabras clave")
+        
+        user_messages = [m.content for m in state.get("messages", []) if isinstance(m, HumanMessage)]
+        result = preclassify_messages(user_messages)
+        
+        return IncidentTypeDecision(
+            incident_type_identified=result.incident_type is not None,
+            incident_type=result.incident_type,
+            confidence_level=result.confidence,
+            keywords_detected=result.matched_terms,
+            reasoning="Modo degradado: preclasificador local (LLM no disponible)",
+            needs_clarification=result.incident_type is None
+        )
+    
+    def _rule_based_phase_2(self, state: EroskiState, incident_type: str) -> SpecificProblemDecision:
+        """FASE 2 sin LLM: búsqueda por palabras clave en el catálogo de problemas"""
+        self.logger.warning(f"🔌 Circuito LLM abierto: FASE 2 por palabras clave para {incident_type}")
+        
+        user_text = " ".join(m.content for m in state.get("messages", []) if isinstance(m, HumanMessage))
+        problem, solution = self._get_solution_searcher().find_best_solution(incident_type, user_text)
+        
+        if problem and solution:
+            return SpecificProblemDecision(
+                problem_identified=True,
+                specific_problem=problem,
+                problem_description=problem,
+                solution_available=True,
+                proposed_solution=solution,
+                additional_info="Modo degradado: coincidencia por palabras clave",
+                confidence_level=0.6,
+                next_action="provide_solution"
+            )
+        
+        return SpecificProblemDecision(
+            problem_identified=False,
+            specific_problem=None,
+            problem_description="Problema no especificado claramente",
+            solution_available=False,
+            proposed_solution=None,
+            confidence_level=0.0,
+            next_action="ask_details"
+        )
+    
+    def _get_solution_searcher(self) -> SolutionSearcher:
+        """SolutionSearcher sobre el catálogo de scripts/eroski_incidents.json (carga perezosa)"""
+        if self._solution_searcher is None:
+            try:
+                with open(INCIDENT_CATALOG_PATH, "r", encoding="utf-8") as f:
+                    incident_types = json.load(f).get("incident_types", {})
+            except Exception as e:
+                self.logger.error(f"❌ Error cargando catálogo de problemas: {e}")
+                incident_types = {}
+            self._solution_searcher = SolutionSearcher(incident_types)
+        return self._solution_searcher
+    
     async def _execute_phase_1(self, state: EroskiState) -> IncidentTypeDecision:
         """Ejecutar FASE 1: Identificación del tipo"""
         
@@ -255,19 +458,25 @@ class TwoPhaseClassifier:
         }
         
         # Ejecutar LLM Fase 1
-        formatted_prompt = self.phase1_prompt.format(**prompt_data)
-        response = await self.llm.ainvoke(formatted_prompt)
-        
-        # Parsear respuesta
-        decision_data = self.phase1_parser.parse(response.content)
-        return IncidentTypeDecision(**decision_data)
+        formatted_prompt, llm_kwargs = get_token_budget().format(self.phase1_prompt, prompt_data, "phase1")
+        try:
+            return await ainvoke_structured(
+                self.llm, formatted_prompt, IncidentTypeDecision, "phase1", **llm_kwargs
+            )
+        except LLMCircuitOpenError:
+            return self._rule_based_phase_1(state)
     
-    async def _execute_phase_2_with_state(self, state: EroskiState) -> Command:
-        """Ejecutar FASE 2 con validación mejorada"""
+    async def _execute_phase_2_with_state(
+        self,
+        state: EroskiState,
+        phase2_result: Optional[SpecificProblemDecision] = None
+    ) -> Command:
+        """Ejecutar FASE 2 con validación mejorada (o procesar un resultado ya obtenido)"""
         
         try:
-            # Ejecutar Fase 2
-            phase2_result = await self._execute_phase_2(state)
+            # Ejecutar Fase 2 si no viene ya calculada (ejecución especulativa)
+            if phase2_result is None:
+                phase2_result = await self._execute_phase_2(state)
             
             # ✅ VALIDACIÓN ADICIONAL: Verificar que problem_description no sea None
             if phase2_result.problem_description is None:
@@ -287,6 +496,8 @@ class TwoPhaseClassifier:
             
             # Procesar resultado según el next_action
             if phase2_result.next_action == "provide_solution" and phase2_result.solution_available:
+                # El registro puede estar inicializándose en paralelo (classify)
+                await wait_for_incident_initialization(state.get("incident_code"))
                 return self._provide_solution(state, phase2_result)
             
             elif phase2_result.next_action == "ask_details":
@@ -369,32 +580,24 @@ class TwoPhaseClassifier:
         
         try:
             # Ejecutar LLM con prompt de FASE 2
-            formatted_prompt = self.phase2_prompt.format(**prompt_data)
+            formatted_prompt, llm_kwargs = get_token_budget().format(self.phase2_prompt, prompt_data, "phase2")
             
             self.logger.debug(f"📝 Prompt FASE 2 generado (primeros 200 chars): {formatted_prompt[:200]}...")
             
-            response = await self.llm.ainvoke(formatted_prompt)
-            
-            self.logger.debug(f"🤖 Respuesta LLM FASE 2: {response.content}")
-            
-            # Parsear respuesta JSON
-            decision_data = self.phase2_parser.parse(response.content)
-            
-            # ✅ VALIDACIÓN CRÍTICA: Asegurar que problem_description no sea None
-            if decision_data.get("problem_description") is None:
-                self.logger.warning("⚠️ problem_description es None, aplicando fallback")
-                decision_data["problem_description"] = "Problema no especificado claramente"
-            
-            # Crear objeto SpecificProblemDecision
-            phase2_result = SpecificProblemDecision(**decision_data)
+            phase2_result = await ainvoke_structured(
+                self.llm, formatted_prompt, SpecificProblemDecision, "phase2",
+                prepare=self._ensure_problem_description, **llm_kwargs
+            )
             
             self.logger.info(f"✅ FASE 2 completada: problema='{phase2_result.problem_description}', acción='{phase2_result.next_action}'")
             
             return phase2_result
             
+        except LLMCircuitOpenError:
+            return self._rule_based_phase_2(state, incident_type)
+            
         except Exception as e:
             self.logger.error(f"❌ Error en FASE 2: {e}")
-            self.logger.error(f"Respuesta raw que causó error: {getattr(response, 'content', 'N/A')}")
             
             # Fallback: Crear decisión de escalación
             return SpecificProblemDecision(
@@ -408,6 +611,13 @@ class TwoPhaseClassifier:
                 next_action="escalate"
             )
 
+    def _ensure_problem_description(self, decision_data: Dict[str, Any]) -> Dict[str, Any]:
+        """✅ VALIDACIÓN CRÍTICA: Asegurar que problem_description no sea None"""
+        if decision_data.get("problem_description") is None:
+            self.logger.warning("⚠️ problem_description es None, aplicando fallback")
+            decision_data["problem_description"] = "Problema no especificado claramente"
+        return decision_data
+
 
     def _get_specific_problems_for_type(self, incident_type: str) -> str:
         """
@@ -620,17 +830,16 @@ class TwoPhaseClassifier:
     📋 *Código de incidencia: {incident_code}*"""
 
         # ✅ ACTUALIZAR PERSISTENCIA COMPLETA CON MENSAJES
+        # (quien llama espera antes a wait_for_incident_initialization)
         try:
             from pathlib import Path
-            import json
             from datetime import datetime
             from langchain_core.messages import HumanMessage, AIMessage
             
             incidents_file = Path("incidents_database.json")
             
-            if incidents_file.exists():
-                with open(incidents_file, 'r', encoding='utf-8') as f:
-                    incidents_data = json.load(f)
+            with incidents_file_lock():
+                incidents_data = read_incidents_file(incidents_file)
                 
                 if incident_code in incidents_data:
                     
@@ -663,9 +872,7 @@ class TwoPhaseClassifier:
                             })
                     
                     incidents_data[incident_code]["mensajes"] = serialized_messages
-                    
-                    with open(incidents_file, 'w', encoding='utf-8') as f:
-                        json.dump(incidents_data, f, indent=2, ensure_ascii=False)
+                    write_incidents_file(incidents_file, incidents_data)
                     
                     self.logger.info(f"✅ Persistencia y mensajes actualizados para {incident_code}")
                     self.logger.info(f"   - Mensajes guardados: {len(serialized_messages)}")
@@ -687,7 +894,6 @@ class TwoPhaseClassifier:
         """Método auxiliar para actualizar persistencia"""
         try:
             from pathlib import Path
-            import json
             from datetime import datetime
             
             incidents_file = Path("incidents_database.json")
@@ -696,22 +902,21 @@ class TwoPhaseClassifier:
                 self.logger.warning(f"⚠️ Archivo de incidencias no existe: {incidents_file}")
                 return False
             
-            # Cargar datos existentes
-            with open(incidents_file, 'r', encoding='utf-8') as f:
-                incidents_data = json.load(f)
-            
-            # Verificar que existe el registro
-            if incident_code not in incidents_data:
-                self.logger.warning(f"⚠️ Incidencia {incident_code} no encontrada en persistencia")
-                return False
-            
-            # Actualizar registro
-            incidents_data[incident_code].update(updates)
-            incidents_data[incident_code]["timestamp_actualizacion"] = datetime.now().isoformat()
-            
-            # Guardar archivo
-            with open(incidents_file, 'w', encoding='utf-8') as f:
-                json.dump(incidents_data, f, indent=2, ensure_ascii=False)
+            with incidents_file_lock():
+                # Cargar datos existentes
+                incidents_data = read_incidents_file(incidents_file)
+                
+                # Verificar que existe el registro
+                if incident_code not in incidents_data:
+                    self.logger.warning(f"⚠️ Incidencia {incident_code} no encontrada en persistencia")
+                    return False
+                
+                # Actualizar registro
+                incidents_data[incident_code].update(updates)
+                incidents_data[incident_code]["timestamp_actualizacion"] = datetime.now().isoformat()
+                
+                # Guardar archivo (escritura atómica)
+                write_incidents_file(incidents_file, incidents_data)
             
             self.logger.info(f"✅ Incidencia {incident_code} actualizada en persistencia")
             return True
@@ -762,17 +967,8 @@ He identificado que el problema es con **{incident_type}**. Para darte la soluci
     # ========== MÉTODOS AUXILIARES ==========
 
     def _format_conversation_history(self, state: EroskiState) -> str:
-        """Formatear historial de conversación"""
-        messages = state.get("messages", [])
-        formatted = []
-        
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                formatted.append(f"👤 Usuario: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                formatted.append(f"🤖 Asistente: {msg.content}")
-        
-        return "\n".join(formatted) if formatted else "Sin historial previo"
+        """Formatear historial de conversación (resumen + ventana de mensajes recientes)"""
+        return format_history(state)
     
     def _get_last_user_message(self, state: EroskiState) -> str:
         """Obtener último mensaje del usuario"""
@@ -0,0 +1,275 @@
+# =====================================================
+# utils/visit_budget.py - Presupuesto de visitas por nodo, turno y sesión
+# =====================================================
+"""
+Límite barato de visitas para cortar bucles de nodos dentro de un turno y
+sesiones que no avanzan turno tras turno.
+
+El estado guarda un mapa compacto `node_visits` ({nodo: visitas}) que se
+acumula con el reducer merge_node_visits: cada nodo solo escribe {nodo: 1}.
+Comprobar el presupuesto es O(1) por nodo (y O(nº de nodos) para el total del
+turno), sin recorrer execution_path ni preguntar al LLM si está atascado.
+
+Los presupuestos por nodo y por turno son de una ejecución del grafo: cada
+turno vuelve a entrar por START, así que EroskiChatInterface envía
+reset_node_visits() en el input del turno y el reducer vacía el mapa antes de
+contar.
+
+El presupuesto por sesión usa un segundo mapa, `session_visits`, que no se
+reinicia por turno (solo en reset_session). Solo cuenta las visitas con
+trabajo: la de un nodo que solo pasa al siguiente (p. ej. authenticate con el
+usuario ya autenticado, que solo actualiza current_node/last_activity) no
+cuenta, así que la entrada por START de cada turno no consume presupuesto.
+Agotado, cada turno siguiente escala al entrar sin más llamadas al LLM.
+
+Se aplica en dos puntos:
+- enforce_visit_budget(router, path_map): antes de que el router envíe a un
+  nodo sin presupuesto, la ruta se cambia por la de escalación
+- with_visit_budget(nombre, nodo): al entrar en el nodo (también cuando se
+  llega por Command(goto=...)), si no queda presupuesto se salta a escalate
+  sin ejecutar el nodo; si queda, cuenta la visita
+
+Presupuestos (WorkflowSettings): WORKFLOW_VISIT_BUDGET_PER_NODE,
+WORKFLOW_VISIT_BUDGET_PER_TURN, WORKFLOW_VISIT_BUDGET_PER_SESSION y
+WORKFLOW_VISIT_BUDGET_NODE_OVERRIDES (JSON, p. ej. {"classify": 3}). El nodo
+de escalación nunca se limita.
+"""
+
+import dataclasses
+import functools
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from langgraph.types import Command
+
+logger = logging.getLogger("VisitBudget")
+
+ESCALATE_NODE = "escalate"
+
+# Clave centinela de node_visits: el reducer vacía el mapa en vez de sumar
+RESET_VISITS = "__reset__"
+
+# Campos que actualiza un nodo que solo pasa al siguiente (no cuenta en la sesión)
+PASS_THROUGH_KEYS = frozenset({"current_node", "last_activity"})
+
+
+def reset_node_visits() -> Dict[str, int]:
+    """Actualización de node_visits/session_visits que reinicia el contador (inicio de turno o de sesión)"""
+    return {RESET_VISITS: 1}
+
+
+def merge_node_visits(left: Optional[Dict[str, int]], right: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Reducer de node_visits y session_visits: sumar los incrementos {nodo: n} al mapa acumulado"""
+    right = right or {}
+    merged = {} if RESET_VISITS in right else dict(left or {})
+    for node, count in right.items():
+        if node != RESET_VISITS:
+            merged[node] = merged.get(node, 0) + count
+    return merged
+
+
+def is_pass_through(update: Any) -> bool:
+    """True si la actualización del nodo solo lo marca como visitado"""
+    return isinstance(update, dict) and set(update) <= PASS_THROUGH_KEYS
+
+
+class VisitBudget:
+    """Presupuesto de visitas por nodo y por turno (node_visits) y por sesión (session_visits)"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        per_node: int = 5,
+        per_turn: int = 15,
+        per_session: int = 40,
+        node_overrides: Optional[Dict[str, int]] = None,
+        escalate_node: str = ESCALATE_NODE
+    ):
+        self.enabled = enabled
+        self.per_node = per_node
+        self.per_turn = per_turn
+        self.per_session = per_session
+        self.node_overrides = dict(node_overrides or {})
+        self.escalate_node = escalate_node
+        self.stats = {"visits": 0, "blocked_routes": 0, "blocked_entries": 0}
+
+    def node_budget(self, node: str) -> int:
+        """Visitas permitidas a un nodo (<= 0: sin límite)"""
+        return self.node_overrides.get(node, self.per_node)
+
+    @staticmethod
+    def visits(state: Mapping[str, Any]) -> Dict[str, int]:
+        return state.get("node_visits") or {}
+
+    @staticmethod
+    def session_visits(state: Mapping[str, Any]) -> Dict[str, int]:
+        return state.get("session_visits") or {}
+
+    def _session_exhausted(self, state: Mapping[str, Any]) -> Optional[str]:
+        if self.per_session > 0 and sum(self.session_visits(state).values()) >= self.per_session:
+            return f"Límite de {self.per_session} pasos por sesión alcanzado"
+        return None
+
+    def exceeded(self, state: Mapping[str, Any], node: str) -> Optional[str]:
+        """
+        Comprobar si entrar en `node` supera algún presupuesto.
+
+        Returns:
+            Motivo legible si se supera, None si la visita está permitida
+        """
+        if not self.enabled or node == self.escalate_node:
+            return None
+
+        visits = self.visits(state)
+        budget = self.node_budget(node)
+        if budget > 0 and visits.get(node, 0) >= budget:
+            return f"Límite de {budget} visitas al paso '{node}' alcanzado"
+
+        if self.per_turn > 0 and sum(visits.values()) >= self.per_turn:
+            return f"Límite de {self.per_turn} pasos por turno alcanzado"
+        return self._session_exhausted(state)
+
+    def exhausted_reason(self, state: Mapping[str, Any]) -> Optional[str]:
+        """Primer presupuesto agotado en el estado (para explicar una escalación desde el router)"""
+        if not self.enabled:
+            return None
+
+        visits = self.visits(state)
+        if self.per_turn > 0 and sum(visits.values()) >= self.per_turn:
+            return f"Límite de {self.per_turn} pasos por turno alcanzado"
+        for node, count in visits.items():
+            budget = self.node_budget(node)
+            if node != self.escalate_node and budget > 0 and count >= budget:
+                return f"Límite de {budget} visitas al paso '{node}' alcanzado"
+        return self._session_exhausted(state)
+
+    def escalation_update(self, node: str, reason: str) -> Dict[str, Any]:
+        """Actualización de estado para escalar sin ejecutar el nodo (el mensaje lo da escalate)"""
+        return {
+            "escalation_needed": True,
+            "escalation_reason": reason,
+            "escalation_level": "supervisor",
+            "current_node": node,
+            "awaiting_user_input": False,
+            "last_activity": datetime.now()
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del presupuesto de visitas"""
+        return {
+            **self.stats,
+            "per_node": self.per_node,
+            "per_turn": self.per_turn,
+            "per_session": self.per_session,
+            "node_overrides": dict(self.node_overrides),
+        }
+
+
+def enforce_visit_budget(router: Callable, path_map: Dict[str, str], budget: Optional[VisitBudget] = None) -> Callable:
+    """
+    Envolver un router para que no envíe a un nodo sin presupuesto.
+
+    Si el nodo destino de la ruta elegida ha agotado su presupuesto (o el
+    turno o la sesión el suyo), se devuelve la ruta que lleva a escalate.
+    """
+    escalate_routes = [route for route, target in path_map.items() if target == ESCALATE_NODE]
+
+    @functools.wraps(router)
+    def wrapper(state, *args, **kwargs):
+        route = router(state, *args, **kwargs)
+        visit_budget = budget or get_visit_budget()
+        target = path_map.get(route)
+        if not escalate_routes or target is None:
+            return route
+
+        reason = visit_budget.exceeded(state, target)
+        if reason is None:
+            return route
+
+        visit_budget.stats["blocked_routes"] += 1
+        logger.warning(f"⛔ {reason}: ruta '{route}' → '{escalate_routes[0]}' ({router.__name__})")
+        return escalate_routes[0]
+
+    return wrapper
+
+
+def with_visit_budget(name: str, node: Callable, budget: Optional[VisitBudget] = None) -> Callable:
+    """
+    Envolver un nodo del grafo: comprobar el presupuesto antes de ejecutarlo
+    y contar la visita en node_visits (y en session_visits si no es de paso).
+    """
+
+    @functools.wraps(node)
+    async def wrapper(state, *args, **kwargs):
+        visit_budget = budget or get_visit_budget()
+        extra: Dict[str, Any] = {}
+
+        reason = visit_budget.exceeded(state, name)
+        if reason is not None:
+            visit_budget.stats["blocked_entries"] += 1
+            logger.warning(f"⛔ {reason}: se escala sin ejecutar '{name}'")
+            return Command(
+                update=visit_budget.escalation_update(name, reason),
+                goto=visit_budget.escalate_node
+            )
+
+        if name == visit_budget.escalate_node and not state.get("escalation_reason"):
+            # Escalación decidida por un router por falta de presupuesto
+            reason = visit_budget.exhausted_reason(state)
+            if reason is not None:
+                extra = {"escalation_needed": True, "escalation_reason": reason}
+                state = {**state, **extra}
+
+        result = await node(state, *args, **kwargs)
+        visit_budget.stats["visits"] += 1
+
+        # Siempre el incremento (nunca el mapa completo): lo acumula merge_node_visits
+        if isinstance(result, Command):
+            update = result.update if isinstance(result.update, dict) else {}
+            return dataclasses.replace(result, update={**extra, **update, **_visit_update(name, update)})
+        if isinstance(result, dict):
+            return {**extra, **result, **_visit_update(name, result)}
+        return result
+
+    return wrapper
+
+
+def _visit_update(name: str, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Incrementos de visitas; la sesión no cuenta las visitas de paso"""
+    visit = {"node_visits": {name: 1}}
+    if not is_pass_through(update):
+        visit["session_visits"] = {name: 1}
+    return visit
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_visit_budget: Optional[VisitBudget] = None
+
+
+def get_visit_budget() -> VisitBudget:
+    """Obtener instancia singleton del presupuesto de visitas"""
+    global _visit_budget
+    if _visit_budget is None:
+        try:
+            from config.settings import get_settings
+            workflow_settings = get_settings().workflow
+            _visit_budget = VisitBudget(
+                enabled=workflow_settings.visit_budget_enabled,
+                per_node=workflow_settings.visit_budget_per_node,
+                per_turn=workflow_settings.visit_budget_per_turn,
+                per_session=workflow_settings.visit_budget_per_session,
+                node_overrides=workflow_settings.visit_budget_node_overrides
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Configuración de presupuesto de visitas no disponible, usando valores por defecto: {e}")
+            _visit_budget = VisitBudget()
+    return _visit_budget
+
+
+def reset_visit_budget():
+    """Resetear el presupuesto global"""
+    global _visit_budget
+    _visit_budget = None
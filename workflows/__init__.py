@@ -1,4 +1,30 @@
-from .eroski_main_workflow import EroskiFinalWorkflow
-from .base_workflow import BaseWorkflow
+# =====================================================
+# workflows/__init__.py - Exportaciones perezosas de workflows
+# =====================================================
+"""
+Exportaciones perezosas (PEP 562): importar workflows.workflow_manager o
+workflows.graph_registry no construye ni importa los workflows ni sus nodos.
+"""
 
-__all__ = ["EroskiFinalWorkflow", "BaseWorkflow"]
\ No newline at end of file
+import importlib
+from typing import Any, Dict
+
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "EroskiFinalWorkflow": ".eroski_main_workflow",
+    "BaseWorkflow": ".base_workflow",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -5,12 +5,11 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Callable, Optional
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.checkpoint.memory import MemorySaver
 import logging
-from nodes import escalate_supervisor_node
 
 from models.eroski_state import EroskiState
 from config.settings import get_settings
+from .checkpointer import get_checkpointer
 
 class BaseWorkflow(ABC):
     """
@@ -67,7 +66,7 @@ class BaseWorkflow(ABC):
         Compilar el workflow con checkpointer para persistencia de estado.
         
         Args:
-            checkpointer: Checkpointer a usar (MemorySaver por defecto)
+            checkpointer: Checkpointer a usar (el de settings.workflow.checkpointer_backend por defecto)
             
         Returns:
             Grafo compilado con checkpointer
@@ -77,7 +76,7 @@ class BaseWorkflow(ABC):
             
             # Usar checkpointer por defecto si no se proporciona
             if checkpointer is None:
-                checkpointer = MemorySaver()
+                checkpointer = get_checkpointer()
             
             # Construir grafo
             graph = self.build_graph()
@@ -0,0 +1,839 @@
+# =====================================================
+# workflows/checkpointer.py - Checkpointer persistente y acotado
+# =====================================================
+"""
+Checkpointer de sesiones con límites de tamaño y caducidad.
+
+El MemorySaver guardaba todos los checkpoints de todos los thread_id para
+siempre: la memoria crecía con cada conversación, el estado se perdía al
+reiniciar y obligaba a un único proceso. Este módulo ofrece backends
+intercambiables sobre el mismo esquema SQL:
+
+- memory: SQLite en memoria (un proceso, sin persistencia, pero acotado)
+- sqlite: fichero SQLite (un nodo, sobrevive a reinicios)
+- postgres: asyncpg con settings.database (varios nodos comparten sesiones)
+
+Todos aplican:
+- Almacenamiento por canal: cada versión de un canal se guarda una vez en
+  lg_blobs y el checkpoint solo lleva channel_versions, así un put escribe
+  los canales que cambiaron y no el estado completo (messages incluido)
+- Máximo de checkpoints por hilo: tras cada put se borran los más antiguos
+  y las versiones de canal que ya no usa ningún checkpoint conservado
+- Poda por TTL: hilos terminados (flow_completed) o inactivos caducan;
+  se ejecuta de forma periódica dentro de put()
+- Métricas: hilos, checkpoints, blobs, writes y bytes almacenados
+
+get_checkpointer() devuelve el checkpointer compartido por todo el proceso.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint,
+    CheckpointMetadata, CheckpointTuple, get_checkpoint_id, get_checkpoint_metadata
+)
+
+logger = logging.getLogger("Checkpointer")
+
+# Canal del estado que marca una conversación terminada
+FINISHED_CHANNEL = "flow_completed"
+
+# Las consultas usan parámetros numerados de Postgres ($1); SQLite los
+# recibe convertidos a ?1
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS lg_checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT,
+        checkpoint {blob} NOT NULL,
+        metadata_type TEXT,
+        metadata {blob} NOT NULL,
+        created_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS lg_blobs (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        channel TEXT NOT NULL,
+        version TEXT NOT NULL,
+        type TEXT NOT NULL,
+        blob {blob},
+        PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+    )""",
+    """CREATE TABLE IF NOT EXISTS lg_writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        value {blob},
+        task_path TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )""",
+    """CREATE TABLE IF NOT EXISTS lg_threads (
+        thread_id TEXT PRIMARY KEY,
+        updated_at DOUBLE PRECISION NOT NULL,
+        finished BOOLEAN NOT NULL DEFAULT FALSE
+    )""",
+    "CREATE INDEX IF NOT EXISTS lg_threads_updated_at ON lg_threads (updated_at)",
+]
+
+CHECKPOINT_COLUMNS = (
+    "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+    "type, checkpoint, metadata_type, metadata"
+)
+
+SELECT_CHECKPOINT = f"""SELECT {CHECKPOINT_COLUMNS} FROM lg_checkpoints
+    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3"""
+
+SELECT_LATEST_CHECKPOINT = f"""SELECT {CHECKPOINT_COLUMNS} FROM lg_checkpoints
+    WHERE thread_id = $1 AND checkpoint_ns = $2
+    ORDER BY checkpoint_id DESC LIMIT 1"""
+
+SELECT_OLDEST_CHECKPOINT = f"""SELECT {CHECKPOINT_COLUMNS} FROM lg_checkpoints
+    WHERE thread_id = $1 AND checkpoint_ns = $2
+    ORDER BY checkpoint_id ASC LIMIT 1"""
+
+SELECT_WRITES = """SELECT task_id, channel, type, value FROM lg_writes
+    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+    ORDER BY task_id, idx"""
+
+UPSERT_CHECKPOINT = """INSERT INTO lg_checkpoints
+    (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) DO UPDATE SET
+        type = excluded.type, checkpoint = excluded.checkpoint,
+        metadata_type = excluded.metadata_type, metadata = excluded.metadata"""
+
+# Las versiones de un canal son inmutables: si ya existe no se reescribe
+INSERT_BLOB = """INSERT INTO lg_blobs (thread_id, checkpoint_ns, channel, version, type, blob)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (thread_id, checkpoint_ns, channel, version) DO NOTHING"""
+
+UPSERT_THREAD = """INSERT INTO lg_threads (thread_id, updated_at, finished) VALUES ($1, $2, $3)
+    ON CONFLICT (thread_id) DO UPDATE SET updated_at = excluded.updated_at, finished = excluded.finished"""
+
+INSERT_WRITE = """INSERT INTO lg_writes
+    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO NOTHING"""
+
+# Los canales especiales (__error__, __interrupt__...) se sobrescriben
+UPSERT_WRITE = """INSERT INTO lg_writes
+    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO UPDATE SET
+        channel = excluded.channel, type = excluded.type, value = excluded.value"""
+
+# Conservar los $3 checkpoints más recientes del hilo
+TRIM_CHECKPOINTS = """DELETE FROM lg_checkpoints
+    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id <= (
+        SELECT checkpoint_id FROM lg_checkpoints
+        WHERE thread_id = $1 AND checkpoint_ns = $2
+        ORDER BY checkpoint_id DESC LIMIT 1 OFFSET $3
+    )"""
+
+TRIM_WRITES = """DELETE FROM lg_writes
+    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id NOT IN (
+        SELECT checkpoint_id FROM lg_checkpoints WHERE thread_id = $1 AND checkpoint_ns = $2
+    )"""
+
+# Las versiones son crecientes por canal: las anteriores a la que usa el
+# checkpoint más antiguo conservado ya no las lee nadie
+TRIM_BLOBS = """DELETE FROM lg_blobs
+    WHERE thread_id = $1 AND checkpoint_ns = $2 AND channel = $3 AND version < $4"""
+
+EXPIRED_THREADS = "SELECT thread_id FROM lg_threads WHERE updated_at < $1 OR (finished AND updated_at < $2)"
+
+PRUNE = [
+    f"DELETE FROM lg_writes WHERE thread_id IN ({EXPIRED_THREADS})",
+    f"DELETE FROM lg_blobs WHERE thread_id IN ({EXPIRED_THREADS})",
+    f"DELETE FROM lg_checkpoints WHERE thread_id IN ({EXPIRED_THREADS})",
+    f"DELETE FROM lg_threads WHERE thread_id IN ({EXPIRED_THREADS})",
+]
+
+DELETE_THREAD = [
+    "DELETE FROM lg_writes WHERE thread_id = $1",
+    "DELETE FROM lg_blobs WHERE thread_id = $1",
+    "DELETE FROM lg_checkpoints WHERE thread_id = $1",
+    "DELETE FROM lg_threads WHERE thread_id = $1",
+]
+
+SELECT_STATS = """SELECT
+    (SELECT COUNT(*) FROM lg_threads),
+    (SELECT COUNT(*) FROM lg_checkpoints),
+    (SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM lg_checkpoints),
+    (SELECT COUNT(*) FROM lg_blobs),
+    (SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM lg_blobs),
+    (SELECT COUNT(*) FROM lg_writes),
+    (SELECT COALESCE(SUM(LENGTH(value)), 0) FROM lg_writes)"""
+
+
+class BoundedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Base común: serialización, límites y consultas compartidas.
+
+    Cada checkpoint se guarda en una fila sin channel_values; los valores
+    van a lg_blobs por (canal, versión) y solo se escriben los de
+    new_versions. Recortar el historial de un hilo es borrar filas.
+    """
+
+    backend = "base"
+
+    def __init__(
+        self,
+        max_per_thread: int = 20,
+        idle_ttl_seconds: float = 86400,
+        finished_ttl_seconds: float = 3600,
+        prune_interval_seconds: float = 300,
+        serde=None
+    ):
+        super().__init__(serde=serde)
+        self.max_per_thread = max_per_thread
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self.prune_interval_seconds = prune_interval_seconds
+        self._last_prune = time.monotonic()
+        self.stats = {"puts": 0, "trimmed_checkpoints": 0, "pruned_threads": 0, "prune_runs": 0}
+
+    # -------------------------------------------------
+    # Helpers
+    # -------------------------------------------------
+
+    def _checkpoint_row(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> Tuple:
+        configurable = config["configurable"]
+        checkpoint = {**checkpoint, "channel_values": {}}
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        return (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            checkpoint["id"],
+            configurable.get("checkpoint_id"),  # parent
+            checkpoint_type,
+            checkpoint_blob,
+            metadata_type,
+            metadata_blob,
+            time.time(),
+        )
+
+    def _blob_rows(self, config: RunnableConfig, checkpoint: Checkpoint, new_versions: ChannelVersions) -> List[Tuple]:
+        """Filas de lg_blobs para los canales que cambiaron en este checkpoint"""
+        configurable = config["configurable"]
+        values = checkpoint.get("channel_values", {})
+        rows = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                blob_type, blob = self.serde.dumps_typed(values[channel])
+            else:
+                blob_type, blob = "empty", None
+            rows.append((
+                configurable["thread_id"],
+                configurable.get("checkpoint_ns", ""),
+                channel,
+                str(version),
+                blob_type,
+                blob,
+            ))
+        return rows
+
+    def _write_rows(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str) -> List[Tuple[str, Tuple]]:
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            write_type, write_blob = self.serde.dumps_typed(value)
+            query = UPSERT_WRITE if channel in WRITES_IDX_MAP else INSERT_WRITE
+            rows.append((query, (
+                configurable["thread_id"],
+                configurable.get("checkpoint_ns", ""),
+                configurable["checkpoint_id"],
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                write_type,
+                write_blob,
+                task_path,
+            )))
+        return rows
+
+    def _load_checkpoint(self, row: Sequence[Any]) -> Checkpoint:
+        return self.serde.loads_typed((row[4], bytes(row[5])))
+
+    @staticmethod
+    def _blobs_query(row: Sequence[Any], checkpoint: Checkpoint) -> Tuple[Optional[str], List[Any]]:
+        """Consulta de los blobs (canal, versión) que usa un checkpoint"""
+        versions = checkpoint.get("channel_versions", {})
+        if not versions:
+            return None, []
+        args: List[Any] = [row[0], row[1]]
+        pairs = []
+        for channel, version in versions.items():
+            args.extend((channel, str(version)))
+            pairs.append(f"(${len(args) - 1}, ${len(args)})")
+        query = f"""SELECT channel, type, blob FROM lg_blobs
+            WHERE thread_id = $1 AND checkpoint_ns = $2
+            AND (channel, version) IN (VALUES {", ".join(pairs)})"""
+        return query, args
+
+    def _trim_blob_rows(self, row: Optional[Sequence[Any]]) -> List[Tuple]:
+        """Argumentos de TRIM_BLOBS a partir del checkpoint más antiguo conservado"""
+        if row is None:
+            return []
+        versions = self._load_checkpoint(row).get("channel_versions", {})
+        return [(row[0], row[1], channel, str(version)) for channel, version in versions.items()]
+
+    def _to_tuple(
+        self,
+        row: Sequence[Any],
+        checkpoint: Checkpoint,
+        blobs: Sequence[Sequence[Any]],
+        writes: Sequence[Sequence[Any]]
+    ) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, _, _, metadata_type, metadata_blob = row
+        checkpoint["channel_values"] = {
+            channel: self.serde.loads_typed((blob_type, bytes(blob)))
+            for channel, blob_type, blob in blobs
+            if blob_type != "empty"
+        }
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, bytes(metadata_blob))),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((write_type, bytes(value))))
+                for task_id, channel, write_type, value in writes
+            ],
+        )
+
+    @staticmethod
+    def _get_query(config: RunnableConfig) -> Tuple[str, Tuple]:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            return SELECT_CHECKPOINT, (*key, checkpoint_id)
+        return SELECT_LATEST_CHECKPOINT, key
+
+    @staticmethod
+    def _list_query(config: Optional[RunnableConfig], before: Optional[RunnableConfig]) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        args: List[Any] = []
+
+        def where(column: str, op: str, value: Any):
+            args.append(value)
+            clauses.append(f"{column} {op} ${len(args)}")
+
+        if config:
+            where("thread_id", "=", config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where("checkpoint_ns", "=", checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where("checkpoint_id", "=", checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where("checkpoint_id", "<", before_id)
+
+        query = f"SELECT {CHECKPOINT_COLUMNS} FROM lg_checkpoints"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return query + " ORDER BY checkpoint_id DESC", args
+
+    def _matches(self, row: Sequence[Any], filter: Optional[Dict[str, Any]]) -> bool:
+        if not filter:
+            return True
+        metadata = self.serde.loads_typed((row[6], bytes(row[7])))
+        return all(metadata.get(key) == value for key, value in filter.items())
+
+    @staticmethod
+    def _is_finished(checkpoint: Checkpoint) -> bool:
+        return bool(checkpoint.get("channel_values", {}).get(FINISHED_CHANNEL))
+
+    def _prune_cutoffs(self, now: Optional[float] = None) -> Tuple[float, float]:
+        """(corte de inactividad, corte de terminados); 0 desactiva el TTL"""
+        now = time.time() if now is None else now
+        idle = now - self.idle_ttl_seconds if self.idle_ttl_seconds > 0 else 0.0
+        finished = now - self.finished_ttl_seconds if self.finished_ttl_seconds > 0 else 0.0
+        return idle, finished
+
+    def _prune_due(self) -> bool:
+        if self.prune_interval_seconds <= 0:
+            return False
+        if time.monotonic() - self._last_prune < self.prune_interval_seconds:
+            return False
+        self._last_prune = time.monotonic()
+        return True
+
+    def _record_prune(self, pruned: int):
+        self.stats["prune_runs"] += 1
+        self.stats["pruned_threads"] += pruned
+        if pruned:
+            logger.info(f"🧹 Checkpointer {self.backend}: {pruned} hilos caducados eliminados")
+
+    def _format_stats(self, row: Sequence[Any]) -> Dict[str, Any]:
+        threads, checkpoints, checkpoint_bytes, blobs, blob_bytes, writes, write_bytes = (int(value) for value in row)
+        return {
+            "backend": self.backend,
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "blobs": blobs,
+            "writes": writes,
+            "checkpoint_bytes": checkpoint_bytes,
+            "blob_bytes": blob_bytes,
+            "write_bytes": write_bytes,
+            "stored_bytes": checkpoint_bytes + blob_bytes + write_bytes,
+            "max_per_thread": self.max_per_thread,
+            **self.stats,
+        }
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+class SQLiteCheckpointSaver(BoundedCheckpointSaver):
+    """
+    Checkpointer sobre SQLite (fichero o ":memory:").
+
+    Una sola conexión protegida con un lock. Los métodos async ejecutan los
+    síncronos en un hilo (asyncio.to_thread): el commit del WAL, la poda o la
+    espera del lock no bloquean el event loop.
+    """
+
+    def __init__(self, path: str = ":memory:", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.backend = "memory" if path == ":memory:" else "sqlite"
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._transaction() as cursor:
+            if path != ":memory:":
+                cursor.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                cursor.execute(statement.format(blob="BLOB"))
+
+    @staticmethod
+    def _sql(query: str) -> str:
+        return re.sub(r"\$(\d+)", r"?\1", query)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        with self._lock, self._conn:
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def _fetch_tuple(self, cursor: sqlite3.Cursor, row: Sequence[Any]) -> CheckpointTuple:
+        checkpoint = self._load_checkpoint(row)
+        query, args = self._blobs_query(row, checkpoint)
+        blobs = cursor.execute(self._sql(query), args).fetchall() if query else []
+        writes = cursor.execute(self._sql(SELECT_WRITES), tuple(row[:3])).fetchall()
+        return self._to_tuple(row, checkpoint, blobs, writes)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        query, args = self._get_query(config)
+        with self._transaction() as cursor:
+            row = cursor.execute(self._sql(query), args).fetchone()
+            if row is None:
+                return None
+            return self._fetch_tuple(cursor, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query, args = self._list_query(config, before)
+        with self._transaction() as cursor:
+            rows = cursor.execute(self._sql(query), args).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if self._matches(row, filter):
+                    results.append(self._fetch_tuple(cursor, row))
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        row = self._checkpoint_row(config, checkpoint, metadata)
+        thread_id, checkpoint_ns, checkpoint_id = row[:3]
+        with self._transaction() as cursor:
+            cursor.executemany(self._sql(INSERT_BLOB), self._blob_rows(config, checkpoint, new_versions))
+            cursor.execute(self._sql(UPSERT_CHECKPOINT), row)
+            if checkpoint_ns == "":
+                cursor.execute(self._sql(UPSERT_THREAD), (thread_id, row[-1], self._is_finished(checkpoint)))
+            if self.max_per_thread > 0:
+                cursor.execute(self._sql(TRIM_CHECKPOINTS), (thread_id, checkpoint_ns, self.max_per_thread))
+                trimmed = max(cursor.rowcount, 0)
+                self.stats["trimmed_checkpoints"] += trimmed
+                cursor.execute(self._sql(TRIM_WRITES), (thread_id, checkpoint_ns))
+                if trimmed:
+                    oldest = cursor.execute(self._sql(SELECT_OLDEST_CHECKPOINT), (thread_id, checkpoint_ns)).fetchone()
+                    cursor.executemany(self._sql(TRIM_BLOBS), self._trim_blob_rows(oldest))
+            self.stats["puts"] += 1
+
+        if self._prune_due():
+            self.prune()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._transaction() as cursor:
+            for query, args in self._write_rows(config, writes, task_id, task_path):
+                cursor.execute(self._sql(query), args)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._transaction() as cursor:
+            for query in DELETE_THREAD:
+                cursor.execute(self._sql(query), (thread_id,))
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Eliminar hilos caducados; devuelve cuántos"""
+        cutoffs = self._prune_cutoffs(now)
+        with self._transaction() as cursor:
+            pruned = cursor.execute(
+                self._sql(EXPIRED_THREADS.replace("SELECT thread_id", "SELECT COUNT(*)")), cutoffs
+            ).fetchone()[0]
+            if pruned:
+                for query in PRUNE:
+                    cursor.execute(self._sql(query), cutoffs)
+        self._record_prune(pruned)
+        return pruned
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._transaction() as cursor:
+            row = cursor.execute(SELECT_STATS).fetchone()
+        return {**self._format_stats(row), "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: [*self.list(config, filter=filter, before=before, limit=limit)])
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, now: Optional[float] = None) -> int:
+        return await asyncio.to_thread(self.prune, now)
+
+    async def aget_stats(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.get_stats)
+
+
+class PostgresCheckpointSaver(BoundedCheckpointSaver):
+    """
+    Checkpointer sobre Postgres con asyncpg (settings.database).
+
+    Solo API async: el grafo se usa con ainvoke/astream_events/aget_state,
+    así que los métodos síncronos heredados lanzan NotImplementedError.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, database_settings=None, **kwargs):
+        super().__init__(**kwargs)
+        if database_settings is None:
+            from config.settings import get_settings
+            database_settings = get_settings().database
+        self.database_settings = database_settings
+        self._pool = None
+
+    async def get_pool(self):
+        """Pool de conexiones (lazy) y creación del esquema la primera vez"""
+        if self._pool is None:
+            import asyncpg
+
+            db_config = self.database_settings
+            pool = await asyncpg.create_pool(
+                host=db_config.host,
+                port=db_config.port,
+                user=db_config.user,
+                password=db_config.password,
+                database=db_config.name,
+                min_size=db_config.pool_min_size,
+                max_size=db_config.pool_max_size,
+                command_timeout=db_config.command_timeout
+            )
+            async with pool.acquire() as conn:
+                for statement in SCHEMA:
+                    await conn.execute(statement.format(blob="BYTEA"))
+            self._pool = pool
+            logger.info("✅ Checkpointer Postgres listo")
+        return self._pool
+
+    async def _fetch_tuple(self, conn, row: Sequence[Any]) -> CheckpointTuple:
+        checkpoint = self._load_checkpoint(row)
+        query, args = self._blobs_query(row, checkpoint)
+        blobs = await conn.fetch(query, *args) if query else []
+        writes = await conn.fetch(SELECT_WRITES, *row[:3])
+        return self._to_tuple(row, checkpoint, blobs, writes)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        query, args = self._get_query(config)
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(query, *args)
+            if row is None:
+                return None
+            return await self._fetch_tuple(conn, row)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        query, args = self._list_query(config, before)
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(query, *args)
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if self._matches(row, filter):
+                    results.append(await self._fetch_tuple(conn, row))
+        for item in results:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        row = self._checkpoint_row(config, checkpoint, metadata)
+        thread_id, checkpoint_ns, checkpoint_id = row[:3]
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                blob_rows = self._blob_rows(config, checkpoint, new_versions)
+                if blob_rows:
+                    await conn.executemany(INSERT_BLOB, blob_rows)
+                await conn.execute(UPSERT_CHECKPOINT, *row)
+                if checkpoint_ns == "":
+                    await conn.execute(UPSERT_THREAD, thread_id, row[-1], self._is_finished(checkpoint))
+                if self.max_per_thread > 0:
+                    status = await conn.execute(TRIM_CHECKPOINTS, thread_id, checkpoint_ns, self.max_per_thread)
+                    trimmed = int(status.split()[-1])
+                    self.stats["trimmed_checkpoints"] += trimmed
+                    await conn.execute(TRIM_WRITES, thread_id, checkpoint_ns)
+                    if trimmed:
+                        oldest = await conn.fetchrow(SELECT_OLDEST_CHECKPOINT, thread_id, checkpoint_ns)
+                        trim_rows = self._trim_blob_rows(oldest)
+                        if trim_rows:
+                            await conn.executemany(TRIM_BLOBS, trim_rows)
+        self.stats["puts"] += 1
+
+        if self._prune_due():
+            await self.aprune()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for query, args in self._write_rows(config, writes, task_id, task_path):
+                    await conn.execute(query, *args)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for query in DELETE_THREAD:
+                    await conn.execute(query, thread_id)
+
+    async def aprune(self, now: Optional[float] = None) -> int:
+        """Eliminar hilos caducados; devuelve cuántos"""
+        cutoffs = self._prune_cutoffs(now)
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                pruned = await conn.fetchval(
+                    EXPIRED_THREADS.replace("SELECT thread_id", "SELECT COUNT(*)"), *cutoffs
+                )
+                if pruned:
+                    for query in PRUNE:
+                        await conn.execute(query, *cutoffs)
+        self._record_prune(pruned)
+        return pruned
+
+    async def aget_stats(self) -> Dict[str, Any]:
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(SELECT_STATS)
+        return self._format_stats(row)
+
+    async def close(self):
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+
+
+def create_checkpointer(settings=None) -> BoundedCheckpointSaver:
+    """
+    Crear el checkpointer configurado en settings.workflow.checkpointer_backend.
+
+    Si el backend persistente no se puede abrir se usa SQLite en memoria
+    (mismos límites, sin persistencia) para no impedir el arranque.
+    """
+    if settings is None:
+        from config.settings import get_settings
+        settings = get_settings()
+
+    workflow_settings = settings.workflow
+    backend = workflow_settings.checkpointer_backend
+    limits = {
+        "max_per_thread": workflow_settings.checkpointer_max_per_thread,
+        "idle_ttl_seconds": workflow_settings.checkpointer_idle_ttl_seconds,
+        "finished_ttl_seconds": workflow_settings.checkpointer_finished_ttl_seconds,
+        "prune_interval_seconds": workflow_settings.checkpointer_prune_interval_seconds,
+    }
+
+    try:
+        if backend == "postgres":
+            saver = PostgresCheckpointSaver(settings.database, **limits)
+        elif backend == "sqlite":
+            saver = SQLiteCheckpointSaver(workflow_settings.checkpointer_sqlite_path, **limits)
+        else:
+            saver = SQLiteCheckpointSaver(":memory:", **limits)
+        logger.info(f"💾 Checkpointer {saver.backend} (máx. {saver.max_per_thread} checkpoints por hilo)")
+        return saver
+    except Exception as e:
+        logger.warning(f"⚠️ Checkpointer {backend} no disponible ({e}); usando SQLite en memoria")
+        return SQLiteCheckpointSaver(":memory:", **limits)
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_checkpointer: Optional[BoundedCheckpointSaver] = None
+
+
+def get_checkpointer() -> BoundedCheckpointSaver:
+    """
+    Obtener el checkpointer compartido por el proceso.
+
+    Todos los workflows usan el mismo: una sola conexión SQLite o pool de
+    Postgres, y los límites por hilo y la poda se aplican sobre todas las
+    sesiones.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = create_checkpointer()
+    return _checkpointer
+
+
+def reset_checkpointer():
+    """Resetear el checkpointer global"""
+    global _checkpointer
+    _checkpointer = None
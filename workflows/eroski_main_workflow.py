@@ -12,12 +12,14 @@ CAMBIOS PRINCIPALES:
 """
 
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 from typing import Literal, Dict, Any
 import logging
 
 from models.eroski_state import EroskiState, ConsultaType
+from utils.tracing import traced_router
+from utils.visit_budget import enforce_visit_budget, with_visit_budget
 from .base_workflow import BaseWorkflow
+from .checkpointer import get_checkpointer
 
 # Importar nodos usando el sistema de fallback
 from nodes.authenticate_llm_driven import llm_driven_authenticate_node
@@ -37,7 +39,7 @@ class EroskiFinalWorkflow(BaseWorkflow):
     
     def __init__(self):
         super().__init__("EroskiMainWorkflow")
-        self.memory = MemorySaver()
+        self.memory = get_checkpointer()
         
     def get_entry_point(self) -> str:
         return "authenticate"
@@ -74,16 +76,20 @@ class EroskiFinalWorkflow(BaseWorkflow):
             # NUEVO: Importar nodo LLM-driven
             
             # NUEVO: Usar instancia única para el nodo de autenticación
-            graph.add_node("authenticate", llm_driven_authenticate_node)
-            
-            # Nodos existentes usando funciones wrapper
-            graph.add_node("classify", classify_query_node)
-            graph.add_node("collect_incident", collect_incident_details_node)
-            graph.add_node("search_solution", search_solution_node)
-            graph.add_node("search_knowledge", search_knowledge_node)
-            graph.add_node("escalate", escalate_supervisor_node)
-            graph.add_node("verify", verify_resolution_node)
-            graph.add_node("finalize", finalize_conversation_node)
+            nodes = {
+                "authenticate": llm_driven_authenticate_node,
+                # Nodos existentes usando funciones wrapper
+                "classify": classify_query_node,
+                "collect_incident": collect_incident_details_node,
+                "search_solution": search_solution_node,
+                "search_knowledge": search_knowledge_node,
+                "escalate": escalate_supervisor_node,
+                "verify": verify_resolution_node,
+                "finalize": finalize_conversation_node,
+            }
+            # Presupuesto de visitas: cuenta cada visita y escala al entrar sin presupuesto
+            for name, node in nodes.items():
+                graph.add_node(name, with_visit_budget(name, node))
             
             self.logger.info("✅ Todos los nodos agregados correctamente (LLM-driven integrado)")
             
@@ -98,9 +104,8 @@ class EroskiFinalWorkflow(BaseWorkflow):
         graph.add_edge(START, "authenticate")
         
         # NUEVO: AUTHENTICATE con router LLM-driven
-        graph.add_conditional_edges(
-            "authenticate",
-            self.route_authenticate_simple,  # Router mejorado
+        self._add_routes(
+            graph, "authenticate", self.route_authenticate_simple,  # Router mejorado
             {
                 "cancelled": END,             # Usuario canceló → Terminar conversación
                 "need_input": END,           # Esperando input del usuario → Terminar y esperar
@@ -110,9 +115,8 @@ class EroskiFinalWorkflow(BaseWorkflow):
         )
         
         # CLASSIFY: Puede solicitar clarificación y terminar, o continuar
-        graph.add_conditional_edges(
-            "classify",
-            self.route_classify,
+        self._add_routes(
+            graph, "classify", self.route_classify,
             {
                 "incident": "collect_incident",  # Es incidencia
                 "query": "search_knowledge",     # Es consulta
@@ -123,9 +127,8 @@ class EroskiFinalWorkflow(BaseWorkflow):
         )
         
         # COLLECT_INCIDENT: Puede solicitar más detalles y terminar, o continuar
-        graph.add_conditional_edges(
-            "collect_incident",
-            self.route_collect_incident,
+        self._add_routes(
+            graph, "collect_incident", self.route_collect_incident,
             {
                 "search_solution": "search_solution",  # Buscar solución
                 "escalate": "escalate",                # Muy complejo
@@ -134,9 +137,8 @@ class EroskiFinalWorkflow(BaseWorkflow):
         )
         
         # SEARCH_SOLUTION: Buscar solución en base de conocimiento
-        graph.add_conditional_edges(
-            "search_solution",
-            self.route_search_solution,
+        self._add_routes(
+            graph, "search_solution", self.route_search_solution,
             {
                 "solution_found": "verify",    # Solución encontrada
                 "escalate": "escalate",        # No hay solución
@@ -145,9 +147,8 @@ class EroskiFinalWorkflow(BaseWorkflow):
         )
         
         # SEARCH_KNOWLEDGE: Para consultas generales
-        graph.add_conditional_edges(
-            "search_knowledge",
-            self.route_search_knowledge,
+        self._add_routes(
+            graph, "search_knowledge", self.route_search_knowledge,
             {
                 "information_provided": "finalize",  # Información proporcionada
                 "escalate": "escalate",               # No se encontró información
@@ -156,9 +157,8 @@ class EroskiFinalWorkflow(BaseWorkflow):
         )
         
         # VERIFY: Verificar si la solución funcionó
-        graph.add_conditional_edges(
-            "verify",
-            self.route_verify,
+        self._add_routes(
+            graph, "verify", self.route_verify,
             {
                 "resolved": "finalize",        # Problema resuelto
                 "not_resolved": "escalate",    # No funcionó la solución
@@ -173,6 +173,10 @@ class EroskiFinalWorkflow(BaseWorkflow):
         
         return graph
 
+    def _add_routes(self, graph: StateGraph, source: str, router, path_map: Dict[str, Any]):
+        """Aristas condicionales con traza y presupuesto de visitas (sin presupuesto → escalate)"""
+        graph.add_conditional_edges(source, traced_router(enforce_visit_budget(router, path_map)), path_map)
+
     # ========== ROUTING FUNCTIONS MEJORADAS ==========
     def route_authenticate_simple(self, state):
         """Router simplificado - solo para casos sin goto"""
@@ -647,6 +651,7 @@ Si necesitas más ayuda, no dudes en contactarnos nuevamente.
             "current_node": "finalize",
             "messages": [AIMessage(content=message)],
             "conversation_ended": True,
+            "flow_completed": True,
             "awaiting_user_input": False,
             "last_activity": datetime.now()
         })
@@ -687,6 +692,8 @@ Si necesitas más ayuda, no dudes en contactarnos nuevamente.
             "current_node": state.get("current_node"),
             "execution_path": execution_path,
             "total_nodes_visited": len(execution_path),
+            "node_visits": dict(state.get("node_visits") or {}),
+            "session_visits": dict(state.get("session_visits") or {}),
             "total_time_minutes": (current_time - start_time).total_seconds() / 60 if start_time else 0,
             "authenticated": state.get("authenticated", False),
             "ready_for_classification": state.get("ready_for_classification", False),
@@ -709,9 +716,11 @@ def create_eroski_workflow() -> EroskiFinalWorkflow:
 def get_compiled_eroski_graph():
     """
     Obtener grafo compilado listo para usar con nodos mejorados.
+    (compartido: se compila una vez por proceso)
     """
-    workflow = create_eroski_workflow()
-    return workflow.compile_with_checkpointer()
+    from .graph_registry import get_graph_registry
+    from .workflow_manager import WorkflowType
+    return get_graph_registry().get(WorkflowType.INCIDENCIA)
 
 def get_workflow_description() -> str:
     """
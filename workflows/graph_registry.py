@@ -0,0 +1,147 @@
+# =====================================================
+# workflows/graph_registry.py - Registro de grafos compilados
+# =====================================================
+"""
+Registro de grafos compilados compartido por todo el proceso.
+
+Antes, graph.py, WorkflowManager y EroskiChatInterface compilaban cada uno su
+grafo: cada compilación reconstruía todos los nodos y creaba un MemorySaver
+nuevo. Ahora cada WorkflowType se compila una sola vez por proceso (con y sin
+checkpointer) y todas las sesiones comparten el mismo grafo; el estado de
+cada sesión vive en el checkpointer, indexado por thread_id.
+
+warm() compila de antemano al arrancar para que el primer mensaje no pague
+la compilación.
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .workflow_manager import WorkflowType
+
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+    from .base_workflow import BaseWorkflow
+
+logger = logging.getLogger("GraphRegistry")
+
+
+def _create_main_workflow() -> "BaseWorkflow":
+    from .eroski_main_workflow import EroskiFinalWorkflow
+    return EroskiFinalWorkflow()
+
+
+def _create_managed_workflow(workflow_type: str) -> "BaseWorkflow":
+    from .workflow_manager import get_workflow_manager
+    return get_workflow_manager().get_workflow(workflow_type)
+
+
+class CompiledGraphRegistry:
+    """Un workflow y un grafo compilado por tipo, compartidos entre sesiones"""
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], "BaseWorkflow"]]] = None):
+        # El workflow de incidencias es el principal (EroskiFinalWorkflow);
+        # el resto se resuelve con el WorkflowManager
+        self._factories: Dict[str, Callable[[], "BaseWorkflow"]] = {
+            WorkflowType.INCIDENCIA: _create_main_workflow,
+            **(factories or {}),
+        }
+        self._workflows: Dict[str, "BaseWorkflow"] = {}
+        self._graphs: Dict[Tuple[str, bool], "CompiledStateGraph"] = {}
+        self._lock = threading.RLock()
+        self.stats = {"compiles": 0, "hits": 0, "compile_seconds": {}}
+
+    def workflow(self, workflow_type: str = WorkflowType.INCIDENCIA) -> "BaseWorkflow":
+        """Instancia única del workflow"""
+        workflow_type = WorkflowType(workflow_type)
+        with self._lock:
+            if workflow_type not in self._workflows:
+                factory = self._factories.get(workflow_type)
+                self._workflows[workflow_type] = factory() if factory else _create_managed_workflow(workflow_type)
+            return self._workflows[workflow_type]
+
+    def get(self, workflow_type: str = WorkflowType.INCIDENCIA, checkpointer: bool = True) -> "CompiledStateGraph":
+        """
+        Grafo compilado del workflow (se compila la primera vez).
+
+        Args:
+            workflow_type: Tipo de workflow
+            checkpointer: Compilar con checkpointer (sesiones con estado persistente)
+        """
+        key = (WorkflowType(workflow_type), checkpointer)
+        graph = self._graphs.get(key)
+        if graph is not None:
+            self.stats["hits"] += 1
+            return graph
+
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self.stats["hits"] += 1
+                return graph
+
+            workflow = self.workflow(key[0])
+            start = time.perf_counter()
+            graph = workflow.compile_with_checkpointer() if checkpointer else workflow.compile()
+            elapsed = time.perf_counter() - start
+
+            self._graphs[key] = graph
+            self.stats["compiles"] += 1
+            self.stats["compile_seconds"][f"{key[0].value}{'+checkpointer' if checkpointer else ''}"] = elapsed
+            logger.info(f"📦 Grafo {key[0].value} compilado y registrado en {elapsed:.2f}s")
+            return graph
+
+    def warm(self, workflow_types: Optional[Iterable[str]] = None, checkpointer: bool = True) -> Dict[str, float]:
+        """
+        Compilar de antemano los workflows indicados (por defecto, el principal).
+
+        Returns:
+            {workflow_type: segundos de compilación (0 si ya estaba compilado)}
+        """
+        timings = {}
+        for workflow_type in workflow_types or [WorkflowType.INCIDENCIA]:
+            start = time.perf_counter()
+            try:
+                self.get(workflow_type, checkpointer=checkpointer)
+                timings[WorkflowType(workflow_type).value] = time.perf_counter() - start
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo precompilar {workflow_type}: {e}")
+        return timings
+
+    def is_compiled(self, workflow_type: str = WorkflowType.INCIDENCIA, checkpointer: bool = True) -> bool:
+        return (WorkflowType(workflow_type), checkpointer) in self._graphs
+
+    def clear(self):
+        """Olvidar grafos y workflows (se recompilan al pedirlos)"""
+        with self._lock:
+            self._graphs.clear()
+            self._workflows.clear()
+        logger.info("🧹 Registro de grafos limpiado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "compiled": [f"{t.value}{'+checkpointer' if c else ''}" for t, c in self._graphs],
+        }
+
+
+# =====================================================
+# Instancia global
+# =====================================================
+_graph_registry: Optional[CompiledGraphRegistry] = None
+
+
+def get_graph_registry() -> CompiledGraphRegistry:
+    """Obtener instancia singleton del registro de grafos"""
+    global _graph_registry
+    if _graph_registry is None:
+        _graph_registry = CompiledGraphRegistry()
+    return _graph_registry
+
+
+def reset_graph_registry():
+    """Resetear el registro global (útil para tests)"""
+    global _graph_registry
+    _graph_registry = None
@@ -1,16 +1,23 @@
 # =====================================================
 # workflow/workflow_manager.py - CON DEBUG MEJORADO PARA DIAGNOSTICAR
 # =====================================================
-from typing import Dict, Type, Union, List, Any, Optional, TYPE_CHECKING
+"""
+Registro perezoso de workflows: cada WorkflowType tiene una fábrica que se
+importa e instancia la primera vez que se pide el workflow. Crear el
+WorkflowManager (o importar WorkflowType) ya no importa langgraph, los
+nodos ni los LLMs de todos los workflows.
+"""
+from typing import Callable, Dict, Union, List, Any, Optional, Tuple, TYPE_CHECKING
 from enum import Enum
-from workflows import BaseWorkflow
-from langgraph.graph.state import CompiledStateGraph
+import importlib
 import logging
+import threading
 import traceback
 
 # ✅ SOLUCIÓN: Imports corregidos
 from config.settings import get_settings
 if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
     from .base_workflow import BaseWorkflow
 
 class WorkflowType(str, Enum):
@@ -19,178 +26,109 @@ class WorkflowType(str, Enum):
     ESCALACION = "escalacion"
     CONSULTA = "consulta"
 
+# Fábrica por tipo: (módulo, clase). El workflow de incidencias es
+# EroskiFinalWorkflow, el mismo que compila el registro de grafos.
+WORKFLOW_FACTORIES: Dict[WorkflowType, Tuple[str, str]] = {
+    WorkflowType.INCIDENCIA: ("workflows.eroski_main_workflow", "EroskiFinalWorkflow"),
+    WorkflowType.CONSULTA: ("workflows.consulta_workflow", "ConsultaWorkflow"),
+    WorkflowType.ESCALACION: ("workflows.escalacion_workflow", "EscalacionWorkflow"),
+}
+
+REQUIRED_WORKFLOW_METHODS = ["build_graph", "get_entry_point", "get_workflow_description"]
+
 class WorkflowManager:
     """
     Gestor centralizado de workflows con debug mejorado.
     
     Responsabilidades:
-    - Registrar y mantener workflows disponibles
+    - Registrar fábricas de workflows (instanciados en el primer uso)
     - Diagnosticar problemas de carga
     - Proporcionar fallbacks seguros
     - Manejar caché de workflows compilados
     """
     
-    def __init__(self):
-        self.workflows: Dict[str, BaseWorkflow] = {}
+    def __init__(self, factories: Optional[Dict[str, Union[Tuple[str, str], Callable[[], "BaseWorkflow"]]]] = None):
+        self.workflows: Dict[str, "BaseWorkflow"] = {}  # Instancias ya cargadas
         self.logger = logging.getLogger("WorkflowManager")
         self.settings = get_settings()
         self.load_errors: Dict[str, str] = {}  # Guardar errores de carga para debug
-        self._register_workflows()
+        self._factories: Dict[WorkflowType, Union[Tuple[str, str], Callable[[], "BaseWorkflow"]]] = {}
+        self._lock = threading.RLock()
+        self._register_workflows(factories)
     
-    def _register_workflows(self):
-        """Registrar todos los workflows disponibles con debug detallado"""
-        try:
-            self.logger.info("📋 === INICIANDO REGISTRO DE WORKFLOWS ===")
-            
-            # ✅ WORKFLOW 1: IncidenciaWorkflow (CRÍTICO)
-            self._try_register_incidencia_workflow()
-            
-            # ✅ WORKFLOW 2: ConsultaWorkflow (opcional)
-            self._try_register_consulta_workflow()
-            
-            # ✅ WORKFLOW 3: EscalacionWorkflow (opcional)
-            self._try_register_escalacion_workflow()
-            
-            # ✅ VERIFICACIÓN FINAL
-            self._verify_registration_results()
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error crítico registrando workflows: {e}")
-            self.logger.error(f"📍 Traceback completo: {traceback.format_exc()}")
-            raise
+    def _register_workflows(self, factories: Optional[Dict[str, Any]] = None):
+        """Registrar las fábricas de workflows (sin importar ni instanciar nada)"""
+        for workflow_type, factory in {**WORKFLOW_FACTORIES, **(factories or {})}.items():
+            self.register_workflow(workflow_type, factory)
+        self.logger.info(f"📋 Workflows registrados (carga perezosa): {[t.value for t in self._factories]}")
     
-    def _try_register_incidencia_workflow(self):
-        """Intentar registrar IncidenciaWorkflow con debug detallado"""
+    def register_workflow(self, workflow_type: str, factory: Union[Tuple[str, str], Callable[[], "BaseWorkflow"]]):
+        """
+        Registrar la fábrica de un workflow.
         
-        workflow_name = "IncidenciaWorkflow"
-        self.logger.info(f"🔍 === CARGANDO {workflow_name} ===")
+        Args:
+            workflow_type: Tipo de workflow
+            factory: (módulo, clase) o callable sin argumentos que crea el workflow
+        """
+        workflow_type = WorkflowType(workflow_type)
+        with self._lock:
+            self._factories[workflow_type] = factory
+            self.workflows.pop(workflow_type, None)
+            self.load_errors.pop(workflow_type.value, None)
+    
+    def _load_workflow(self, workflow_type: WorkflowType) -> Optional["BaseWorkflow"]:
+        """Importar e instanciar un workflow registrado con debug detallado"""
+        
+        factory = self._factories[workflow_type]
+        self.logger.info(f"🔍 === CARGANDO workflow {workflow_type.value} ===")
         
         try:
-            # Step 1: Verificar import del módulo
-            self.logger.info("📦 Step 1: Importando módulo incidencia_workflow...")
-            from .incidencia_workflow import IncidenciaWorkflow
-            self.logger.info("✅ Step 1: Módulo importado exitosamente")
-            
-            # Step 2: Crear instancia
-            self.logger.info("🏗️ Step 2: Creando instancia de IncidenciaWorkflow...")
-            workflow_instance = IncidenciaWorkflow()
-            self.logger.info(f"✅ Step 2: Instancia creada - Nombre: {workflow_instance.name}")
-            
-            # Step 3: Verificar métodos requeridos
-            self.logger.info("🔍 Step 3: Verificando métodos requeridos...")
-            required_methods = ["build_graph", "get_entry_point", "get_workflow_description"]
-            for method in required_methods:
-                if hasattr(workflow_instance, method):
-                    self.logger.debug(f"✓ Método {method} disponible")
-                else:
+            # Step 1: Importar el módulo y crear la instancia
+            if isinstance(factory, tuple):
+                module_name, class_name = factory
+                workflow_instance = getattr(importlib.import_module(module_name), class_name)()
+            else:
+                workflow_instance = factory()
+            self.logger.info(f"✅ Instancia creada - Nombre: {workflow_instance.name}")
+            
+            # Step 2: Verificar métodos requeridos
+            for method in REQUIRED_WORKFLOW_METHODS:
+                if not hasattr(workflow_instance, method):
                     raise AttributeError(f"Método requerido {method} no encontrado")
-            self.logger.info("✅ Step 3: Todos los métodos requeridos disponibles")
-            
-            # Step 4: Intentar construir grafo (test)
-            self.logger.info("🔧 Step 4: Probando construcción de grafo...")
-            try:
-                test_graph = workflow_instance.build_graph()
-                self.logger.info(f"✅ Step 4: Grafo construido exitosamente con {len(test_graph.nodes)} nodos")
-            except Exception as e:
-                self.logger.warning(f"⚠️ Step 4: Error construyendo grafo (continuando): {e}")
             
-            # Step 5: Registrar workflow
-            self.logger.info("📝 Step 5: Registrando workflow...")
-            self.workflows[WorkflowType.INCIDENCIA] = workflow_instance
-            self.logger.info("✅ IncidenciaWorkflow registrado exitosamente ✅")
+            self.workflows[workflow_type] = workflow_instance
+            self.logger.info(f"✅ Workflow {workflow_type.value} registrado exitosamente")
+            return workflow_instance
             
         except ImportError as e:
             error_msg = f"ImportError: {e}"
-            self.logger.error(f"❌ {workflow_name} - {error_msg}")
-            self.load_errors[workflow_name] = error_msg
+            self.logger.warning(f"⚠️ Workflow {workflow_type.value} no disponible - {error_msg}")
             
         except AttributeError as e:
             error_msg = f"AttributeError: {e}"
-            self.logger.error(f"❌ {workflow_name} - {error_msg}")
-            self.load_errors[workflow_name] = error_msg
+            self.logger.error(f"❌ Workflow {workflow_type.value} - {error_msg}")
             
         except Exception as e:
             error_msg = f"Error general: {type(e).__name__}: {e}"
-            self.logger.error(f"❌ {workflow_name} - {error_msg}")
+            self.logger.error(f"❌ Workflow {workflow_type.value} - {error_msg}")
             self.logger.error(f"📍 Traceback: {traceback.format_exc()}")
-            self.load_errors[workflow_name] = error_msg
-    
-    def _try_register_consulta_workflow(self):
-        """Intentar registrar ConsultaWorkflow"""
         
-        try:
-            self.logger.info("🔍 Cargando ConsultaWorkflow...")
-            from .consulta_workflow import ConsultaWorkflow
-            workflow_instance = ConsultaWorkflow()
-            self.workflows[WorkflowType.CONSULTA] = workflow_instance
-            self.logger.info("✅ ConsultaWorkflow registrado")
-            
-        except ImportError as e:
-            self.logger.warning(f"⚠️ ConsultaWorkflow no disponible: {e}")
-            self.load_errors["ConsultaWorkflow"] = f"ImportError: {e}"
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error cargando ConsultaWorkflow: {e}")
-            self.load_errors["ConsultaWorkflow"] = f"Error: {e}"
+        self.load_errors[workflow_type.value] = error_msg
+        return None
     
-    def _try_register_escalacion_workflow(self):
-        """Intentar registrar EscalacionWorkflow"""
-        
+    def is_available(self, workflow_name: str) -> bool:
+        """Workflow registrado y sin error de carga (no lo instancia)"""
         try:
-            self.logger.info("🔍 Cargando EscalacionWorkflow...")
-            from .escalacion_workflow import EscalacionWorkflow
-            workflow_instance = EscalacionWorkflow()
-            self.workflows[WorkflowType.ESCALACION] = workflow_instance
-            self.logger.info("✅ EscalacionWorkflow registrado")
-            
-        except ImportError as e:
-            self.logger.warning(f"⚠️ EscalacionWorkflow no disponible: {e}")
-            self.load_errors["EscalacionWorkflow"] = f"ImportError: {e}"
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error cargando EscalacionWorkflow: {e}")
-            self.load_errors["EscalacionWorkflow"] = f"Error: {e}"
-    
-    def _verify_registration_results(self):
-        """Verificar resultados del registro"""
-        
-        workflows_count = len(self.workflows)
-        errors_count = len(self.load_errors)
-        
-        self.logger.info("📊 === RESUMEN DE REGISTRO ===")
-        self.logger.info(f"✅ Workflows cargados: {workflows_count}")
-        self.logger.info(f"❌ Errores de carga: {errors_count}")
-        
-        if self.workflows:
-            self.logger.info(f"📋 Workflows disponibles: {list(self.workflows.keys())}")
-        
-        if self.load_errors:
-            self.logger.warning("🚨 Errores encontrados:")
-            for workflow, error in self.load_errors.items():
-                self.logger.warning(f"   • {workflow}: {error}")
-        
-        # ✅ VERIFICACIÓN CRÍTICA: Al menos un workflow debe estar disponible
-        if not self.workflows:
-            self.logger.error("❌ CRÍTICO: No se pudo cargar ningún workflow")
-            self.logger.error("📋 Errores detallados:")
-            for workflow, error in self.load_errors.items():
-                self.logger.error(f"   🔴 {workflow}: {error}")
-            
-            raise RuntimeError(
-                f"❌ No se pudo cargar ningún workflow. "
-                f"Errores: {dict(self.load_errors)}"
-            )
-        
-        # ⚠️ ADVERTENCIA: Si no está IncidenciaWorkflow (el principal)
-        if WorkflowType.INCIDENCIA not in self.workflows:
-            self.logger.warning("⚠️ ADVERTENCIA: IncidenciaWorkflow no disponible")
-            self.logger.warning("🔄 Se usarán workflows alternativos")
-        
-        self.logger.info("✅ === REGISTRO COMPLETADO ===")
+            workflow_type = WorkflowType(workflow_name)
+        except ValueError:
+            return False
+        return workflow_type in self.workflows or (
+            workflow_type in self._factories and workflow_type.value not in self.load_errors
+        )
 
-    def get_workflow(self, workflow_name: str) -> BaseWorkflow:
+    def get_workflow(self, workflow_name: str) -> "BaseWorkflow":
         """
-        Obtener workflow por nombre con mejor manejo de errores.
+        Obtener workflow por nombre (se instancia en el primer uso).
         
         Args:
             workflow_name: Nombre del workflow
@@ -199,47 +137,59 @@ class WorkflowManager:
             Instancia del workflow
             
         Raises:
-            ValueError: Si el workflow no existe
+            ValueError: Si el workflow no existe o no se pudo cargar
         """
-        if workflow_name not in self.workflows:
-            available = list(self.workflows.keys())
-            error_details = self.load_errors.get(workflow_name, "No se intentó cargar")
-            
-            raise ValueError(
-                f"Workflow '{workflow_name}' no encontrado. "
-                f"Disponibles: {available}. "
-                f"Error de carga: {error_details}"
-            )
-        
-        return self.workflows[workflow_name]
+        try:
+            workflow_type = WorkflowType(workflow_name)
+        except ValueError:
+            workflow_type = None
+        
+        with self._lock:
+            if workflow_type in self.workflows:
+                return self.workflows[workflow_type]
+            
+            if workflow_type in self._factories and workflow_type.value not in self.load_errors:
+                workflow = self._load_workflow(workflow_type)
+                if workflow is not None:
+                    return workflow
+        
+        error_details = self.load_errors.get(getattr(workflow_type, "value", workflow_name), "No se intentó cargar")
+        raise ValueError(
+            f"Workflow '{workflow_name}' no encontrado. "
+            f"Disponibles: {self.list_workflows()}. "
+            f"Error de carga: {error_details}"
+        )
     
-    def get_compiled_workflow(self, workflow_name: str) -> CompiledStateGraph:
-        """Obtener workflow compilado listo para ejecución."""
-        workflow = self.get_workflow(workflow_name)
-        return workflow.compile()
+    def get_compiled_workflow(self, workflow_name: str) -> "CompiledStateGraph":
+        """Obtener workflow compilado listo para ejecución (compilado una vez por proceso)."""
+        from .graph_registry import get_graph_registry
+        self.get_workflow(workflow_name)
+        return get_graph_registry().get(workflow_name, checkpointer=False)
     
     def list_workflows(self) -> List[str]:
-        """Listar workflows disponibles."""
-        return list(self.workflows.keys())
+        """Listar workflows disponibles (registrados y sin error de carga)."""
+        return [workflow_type for workflow_type in self._factories if self.is_available(workflow_type)]
     
-    def get_default_workflow(self) -> BaseWorkflow:
+    def get_default_workflow(self) -> "BaseWorkflow":
         """
         Obtener workflow por defecto con fallback inteligente.
         
         Returns:
             Workflow por defecto (preferiblemente IncidenciaWorkflow)
         """
-        # Preferir IncidenciaWorkflow
-        if WorkflowType.INCIDENCIA in self.workflows:
-            return self.get_workflow(WorkflowType.INCIDENCIA)
-        
-        # Fallback al primer workflow disponible
-        if self.workflows:
-            fallback_name = list(self.workflows.keys())[0]
-            self.logger.warning(f"🔄 Usando fallback workflow: {fallback_name}")
-            return self.workflows[fallback_name]
-        
-        raise RuntimeError("❌ No hay workflows disponibles")
+        # Preferir IncidenciaWorkflow; si no, el primer workflow que cargue
+        for workflow_type in [WorkflowType.INCIDENCIA] + self.list_workflows():
+            if not self.is_available(workflow_type):
+                continue
+            try:
+                workflow = self.get_workflow(workflow_type)
+            except ValueError:
+                continue
+            if workflow_type != WorkflowType.INCIDENCIA:
+                self.logger.warning(f"🔄 Usando fallback workflow: {workflow_type}")
+            return workflow
+        
+        raise RuntimeError(f"❌ No hay workflows disponibles. Errores: {dict(self.load_errors)}")
     
     def select_workflow_for_context(self, context: Dict[str, Any]) -> str:
         """
@@ -247,7 +197,7 @@ class WorkflowManager:
         """
         # Si hay escalación marcada y EscalacionWorkflow disponible
         if (context.get("escalar_a_supervisor", False) and 
-            WorkflowType.ESCALACION in self.workflows):
+            self.is_available(WorkflowType.ESCALACION)):
             return WorkflowType.ESCALACION
         
         # Si parece ser una consulta simple y ConsultaWorkflow disponible
@@ -257,16 +207,17 @@ class WorkflowManager:
         
         palabras_consulta = ["consulta", "pregunta", "estado", "información", "cómo", "dónde", "cuándo"]
         if (any(palabra in ultimo_mensaje for palabra in palabras_consulta) and
-            WorkflowType.CONSULTA in self.workflows):
+            self.is_available(WorkflowType.CONSULTA)):
             return WorkflowType.CONSULTA
         
         # Preferir IncidenciaWorkflow si está disponible
-        if WorkflowType.INCIDENCIA in self.workflows:
+        if self.is_available(WorkflowType.INCIDENCIA):
             return WorkflowType.INCIDENCIA
         
         # Fallback al primer workflow disponible
-        if self.workflows:
-            fallback = list(self.workflows.keys())[0]
+        available = self.list_workflows()
+        if available:
+            fallback = available[0]
             self.logger.warning(f"🔄 Fallback a: {fallback}")
             return fallback
         
@@ -275,11 +226,12 @@ class WorkflowManager:
     def get_debug_info(self) -> Dict[str, Any]:
         """Obtener información de debug del WorkflowManager"""
         return {
+            "workflows_registered": [workflow_type.value for workflow_type in self._factories],
             "workflows_loaded": list(self.workflows.keys()),
             "load_errors": dict(self.load_errors),
             "workflows_count": len(self.workflows),
             "errors_count": len(self.load_errors),
-            "default_available": WorkflowType.INCIDENCIA in self.workflows
+            "default_available": self.is_available(WorkflowType.INCIDENCIA)
         }
 
 # ✅ Singleton pattern para WorkflowManager